@@ -0,0 +1,339 @@
+"""Admission control for the extraction endpoint.
+
+Every ``/api/process-fx`` request holds its (possibly multi-megabyte
+base64) body for as long as it waits on a provider, so under a burst the
+process accepts far more work than the providers can answer and every
+request slows down together. ``AdmissionMiddleware`` bounds that:
+
+- at most ``ADMISSION_MAX_IN_FLIGHT`` requests run at once, and at most
+  ``ADMISSION_MAX_PER_USER`` of them for one ``user_name``
+- up to ``ADMISSION_MAX_QUEUE`` more wait for a slot, text requests ahead
+  of image ones; a text request arriving at a full queue takes the place
+  of the newest image request waiting
+- a request that cannot be queued, or waits longer than
+  ``ADMISSION_MAX_WAIT_S``, gets a 429 with a ``Retry-After`` estimated
+  from the recent service time. When the queue is full and holds no image
+  request to displace, the 429 is sent before the body is read
+
+Admitted responses carry their queueing time in ``X-Queue-Wait-Ms``.
+``AdmissionController.stats()`` reports in-flight and queued requests,
+rejections by reason and queueing-time percentiles. The controller lives
+on the event loop, so it needs no locks.
+"""
+import asyncio
+import bisect
+import itertools
+import math
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import orjson
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.responses import dumps
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import current_entity_name, partition
+
+ADMISSION_PATHS = frozenset({"/api/process-fx"})
+QUEUE_WAIT_HEADER = "X-Queue-Wait-Ms"
+
+# Lower runs first
+PRIORITY_TEXT = 0
+PRIORITY_IMAGE = 1
+PRIORITY_NAMES = {PRIORITY_TEXT: "text", PRIORITY_IMAGE: "image"}
+
+# Queueing times kept for the percentiles in stats()
+WAIT_SAMPLES = 1024
+# Weight of the latest request in the service time average behind Retry-After
+SERVICE_TIME_WEIGHT = 0.2
+RETRY_AFTER_MAX_S = 60
+
+
+class Rejected(Exception):
+    """A request the controller turned away; ``retry_after`` is in whole seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("key", "user", "priority", "future", "enqueued")
+
+    def __init__(self, key: tuple, user: str, priority: int, future: asyncio.Future):
+        self.key = key
+        self.user = user
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+class AdmissionController:
+    """Global and per-user in-flight limits with a bounded priority queue."""
+
+    def __init__(self, max_in_flight: int, max_per_user: int, max_queue: int, max_wait: float):
+        self.max_in_flight = max_in_flight
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._users: Dict[str, int] = {}
+        # Waiters sorted by (priority, arrival)
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._service_time: Optional[float] = None
+        self._waits: deque = deque(maxlen=WAIT_SAMPLES)
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+        self.peak_queue = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def _can_run(self, user: str) -> bool:
+        return self.in_flight < self.max_in_flight and self._users.get(user, 0) < self.max_per_user
+
+    def _start(self, user: str, wait: float) -> None:
+        self.in_flight += 1
+        self._users[user] = self._users.get(user, 0) + 1
+        self.admitted += 1
+        self._waits.append(wait)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new request is likely to have drained."""
+        service = self._service_time or 1.0
+        rounds = (len(self._queue) + 1) / max(self.max_in_flight, 1)
+        return max(1, min(RETRY_AFTER_MAX_S, math.ceil(service * rounds)))
+
+    def _reject(self, reason: str) -> Rejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return Rejected(reason, self.retry_after())
+
+    def saturated(self) -> bool:
+        """Whether any request arriving now would be rejected whatever its priority and user."""
+        return (
+            self.in_flight >= self.max_in_flight
+            and len(self._queue) >= self.max_queue
+            and not any(waiter.priority > PRIORITY_TEXT for waiter in self._queue)
+        )
+
+    def reject_saturated(self) -> Rejected:
+        return self._reject("queue_full")
+
+    async def acquire(self, user: str, priority: int) -> float:
+        """Wait for a slot; returns the seconds spent queued or raises Rejected."""
+        # Waiters that could run were started when the last slot was freed, so
+        # anyone still queued is held by their user limit and does not go first
+        if self._can_run(user):
+            self._start(user, 0.0)
+            return 0.0
+
+        if sum(1 for waiter in self._queue if waiter.user == user) >= self.max_per_user:
+            raise self._reject("user_limit")
+        if len(self._queue) >= self.max_queue:
+            # Displace the newest waiter of a lower priority, or turn this one away
+            if not self._queue or self._queue[-1].priority <= priority:
+                raise self._reject("queue_full")
+            victim = self._queue[-1]
+            self._queue.pop()
+            victim.future.set_exception(self._reject("preempted"))
+
+        waiter = _Waiter((priority, next(self._sequence)), user, priority, asyncio.get_running_loop().create_future())
+        bisect.insort(self._queue, waiter)
+        self.peak_queue = max(self.peak_queue, len(self._queue))
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.exception():
+                # Granted as the timeout fired
+                return waiter.future.result()
+            self._remove(waiter)
+            raise self._reject("timeout")
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.exception():
+                self.release(user, None)
+            else:
+                self._remove(waiter)
+            raise
+
+    def _remove(self, waiter: _Waiter) -> None:
+        index = bisect.bisect_left(self._queue, waiter)
+        if index < len(self._queue) and self._queue[index] is waiter:
+            del self._queue[index]
+        if not waiter.future.done():
+            waiter.future.cancel()
+
+    def release(self, user: str, service_time: Optional[float]) -> None:
+        """Give a slot back (with the request's duration once it ran) and start the next waiters."""
+        self.in_flight -= 1
+        count = self._users.get(user, 0) - 1
+        if count > 0:
+            self._users[user] = count
+        else:
+            self._users.pop(user, None)
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += SERVICE_TIME_WEIGHT * (service_time - self._service_time)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        index = 0
+        now = time.perf_counter()
+        while index < len(self._queue) and self.in_flight < self.max_in_flight:
+            waiter = self._queue[index]
+            if self._can_run(waiter.user):
+                del self._queue[index]
+                wait = now - waiter.enqueued
+                self._start(waiter.user, wait)
+                waiter.future.set_result(wait)
+            else:
+                # That user is at their limit; someone behind them may run
+                index += 1
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def percentile(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else 0.0
+
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._queue:
+            queued[PRIORITY_NAMES[waiter.priority]] += 1
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "users_in_flight": len(self._users),
+            "queued": queued,
+            "queue_depth": len(self._queue),
+            "max_queue": self.max_queue,
+            "peak_queue": self.peak_queue,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "service_ms": round(self._service_time * 1000, 1) if self._service_time is not None else None,
+            "retry_after_s": self.retry_after()
+        }
+
+
+def user_key(user: str) -> str:
+    """Key of ``user`` for the per-user limit; users of different entities may share a name."""
+    entity = partition()
+    return user if entity is None else f"{entity}/{user}"
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller, creating it on first use."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            settings.ADMISSION_MAX_IN_FLIGHT,
+            settings.ADMISSION_MAX_PER_USER,
+            settings.ADMISSION_MAX_QUEUE,
+            settings.ADMISSION_MAX_WAIT_S
+        )
+    return _controller
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return b""
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _send_rejection(send: Send, rejected: Rejected) -> None:
+    body = dumps({"detail": "Too many extraction requests, retry later", "reason": rejected.reason})
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(rejected.retry_after).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Admit requests to ADMISSION_PATHS through the controller (see the module docstring)."""
+
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller
+
+    def _log_rejection(self, controller: AdmissionController, rejected: Rejected, user: Optional[str]) -> None:
+        logger.warning(
+            f"Extraction request rejected: {rejected.reason}",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            user_id=user,
+            data={"retry_after": rejected.retry_after, "in_flight": controller.in_flight, "queue_depth": controller.queue_depth},
+            tags=["api", "admission", "rejected"]
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in ADMISSION_PATHS:
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller or get_admission_controller()
+        if controller.saturated():
+            rejected = controller.reject_saturated()
+            self._log_rejection(controller, rejected, None)
+            await _send_rejection(send, rejected)
+            return
+
+        body = await _read_body(receive)
+        try:
+            request = orjson.loads(body)
+            user = str(request.get("user_name") or "")
+            priority = PRIORITY_TEXT if request.get("input_type") == "text" else PRIORITY_IMAGE
+        except (orjson.JSONDecodeError, AttributeError):
+            # Malformed bodies are answered by the endpoint's own validation
+            user, priority = "", PRIORITY_TEXT
+
+        key = user_key(user)
+        try:
+            wait = await controller.acquire(key, priority)
+        except Rejected as rejected:
+            self._log_rejection(controller, rejected, user)
+            await _send_rejection(send, rejected)
+            return
+
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(raw=message["headers"])[QUEUE_WAIT_HEADER] = f"{wait * 1000:.0f}"
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, replay, send_wrapper)
+        finally:
+            controller.release(key, time.perf_counter() - started)
@@ -1,22 +1,27 @@
 from fastapi import APIRouter, HTTPException, Body, Depends
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-import json
-import os
+from pydantic import BaseModel, ValidationError
+from typing import Callable, List, Dict, Any, Optional
+import copy
+import time
 from app.main import logger
 from core_logging.client import EventType, LogLevel
+from app.entities import current_entity, current_entity_name
 
+from app.api.admission import get_admission_controller
+from app.api.responses import FastJSONResponse
+from app.config import settings
+from app.schemas.trade_summary import correction_prompt, parse_extraction, validation_errors
 from app.services.ai_service import AIService
-from app.services.swap_service import SwapParamTransformer, load_ql_parameters, create_swap_cashflows, transform_output
+from app.services.cascade import cascade_extract, get_cascade_metrics
+from app.services.provider_router import get_provider_router
+from app.services.trade_store import get_trade_store, compute_input_digest
+from app.services.fx_service import settle_fx_trade, settle_fx_trades
 
 router = APIRouter()
 
 # Initialize service
 ai_service = AIService()
 
-# Get parameters from environment variables
-my_entity = os.environ.get('MY_ENTITY')
-
 # Define request models
 class PersonCompanyPair(BaseModel):
     person: str
@@ -26,138 +31,241 @@ class ProcessFXRequest(BaseModel):
     input_type: str
     input_image: Optional[str] = None
     input_text: Optional[str] = None
+    # "OpenAI", "Anthropic", "Google", or "auto" to let the provider router choose
     ai_provider: str = "OpenAI"
     user_name: str
     user_entity: str
     person_company_pairs: List[PersonCompanyPair] = []
 
-@router.post("/process-fx")
-async def process_fx(request: ProcessFXRequest):
-    try:
-        logger.info(
-            "Received swap processing request",
-            event_type=EventType.INTEGRATION,
-            entity=my_entity,
-            user_id=request.user_name,
-            data={
-                "input_type": request.input_type,
-                "ai_provider": request.ai_provider
-            },
-            tags=["api", "process-fx", "request"]
-        )
+class FXSettlementRequest(BaseModel):
+    trades: List[Dict[str, Any]]
 
-        print(f"Received request: {request}")
-        
-        # Update AI service with user info
-        ai_service.update_user_info(request.user_name, request.user_entity)
-        
-        # Convert Pydantic models to dict for compatibility
-        person_company_pairs = [pair.dict() for pair in request.person_company_pairs]
-        ai_service.update_person_company_pairs(person_company_pairs)
-        
-        # Process based on input type
-        if request.input_type == 'image':
-            if not request.input_image:
-                error_msg = 'No image data provided'
-                logger.warning(
-                    error_msg,
-                    event_type=EventType.INTEGRATION,
-                    entity=my_entity,
-                    user_id=request.user_name,
-                    tags=["api", "validation", "error"]
-                )
-                raise HTTPException(status_code=400, detail=error_msg)
-            
-            logger.info(
-                "Processing image for text extraction",
-                event_type=EventType.SYSTEM_EVENT,
-                entity=my_entity,
-                user_id=request.user_name,
-                tags=["api", "image", "extraction"]
-            )
-            
-            extracted_text = ai_service.extract_text(request.input_image)
-                
-        elif request.input_type == 'text':
-            if not request.input_text:
-                error_msg = 'No input text provided'
-                logger.warning(
-                    error_msg,
-                    event_type=EventType.INTEGRATION,
-                    entity=my_entity,
-                    user_id=request.user_name,
-                    tags=["api", "validation", "error"]
-                )
-                raise HTTPException(status_code=400, detail=error_msg)
-                
-            logger.info(
-                "Using provided text input",
-                event_type=EventType.SYSTEM_EVENT,
-                entity=my_entity,
-                user_id=request.user_name,
-                data={"text_length": len(request.input_text)},
-                tags=["api", "text", "input"]
-            )
-            extracted_text = request.input_text
-            
-        else:
-            error_msg = 'Invalid input type'
+class ExtractionCancelled(Exception):
+    """The client cancelled the extraction; raised at the next stage boundary."""
+
+def _no_progress(stage: str, progress: float) -> None:
+    pass
+
+def run_extraction(
+    request: ProcessFXRequest,
+    service: AIService,
+    on_stage: Callable[[str, float], None] = _no_progress
+) -> Dict[str, Any]:
+    """The /process-fx pipeline: extraction, validation, storage and settlement.
+
+    Blocking; ``service`` is this request's copy of the AIService.
+    ``on_stage(stage, progress)`` is called before each step and may raise
+    ExtractionCancelled to stop before the next provider call. Bad input
+    or provider output raises HTTPException.
+    """
+    start_time = time.perf_counter()
+    entity = current_entity()
+    if entity.ai_provider and "ai_provider" not in request.model_fields_set:
+        # Requests that do not pick a provider get their entity's
+        request = request.model_copy(update={"ai_provider": entity.ai_provider})
+    logger.info(
+        "Received swap processing request",
+        event_type=EventType.INTEGRATION,
+        entity=current_entity_name(),
+        user_id=request.user_name,
+        data={
+            "input_type": request.input_type,
+            "ai_provider": request.ai_provider
+        },
+        tags=["api", "process-fx", "request"]
+    )
+
+    # Update AI service with user info
+    service.update_user_info(request.user_name, request.user_entity)
+
+    # Convert Pydantic models to dict for compatibility
+    person_company_pairs = [pair.dict() for pair in request.person_company_pairs]
+    service.update_person_company_pairs(person_company_pairs)
+
+    # Process based on input type
+    if request.input_type == 'image':
+        if not request.input_image:
+            error_msg = 'No image data provided'
             logger.warning(
                 error_msg,
                 event_type=EventType.INTEGRATION,
-                entity=my_entity,
+                entity=current_entity_name(),
                 user_id=request.user_name,
-                data={"input_type": request.input_type},
                 tags=["api", "validation", "error"]
             )
             raise HTTPException(status_code=400, detail=error_msg)
-        
-        print(f"Extracted text: {extracted_text}")
 
-        # Process text with AI
         logger.info(
-            "Processing text with AI",
-            event_type=EventType.TRANSACTION,
-            entity=my_entity,
+            "Processing image for text extraction",
+            event_type=EventType.SYSTEM_EVENT,
+            entity=current_entity_name(),
             user_id=request.user_name,
-            data={"provider": request.ai_provider},
-            tags=["api", "ai", "processing"]
+            tags=["api", "image", "extraction"]
         )
-        
-        raw_json_str = ai_service.process_text(extracted_text, request.ai_provider)
-        trade_json = json.loads(raw_json_str)
-        
-        if "TradeSummary" not in trade_json:
-            error_msg = 'Invalid JSON structure from AI processing'
-            logger.error(
+
+        on_stage("reading_image", 0.1)
+        extracted_text = service.extract_text(request.input_image)
+
+    elif request.input_type == 'text':
+        if not request.input_text:
+            error_msg = 'No input text provided'
+            logger.warning(
                 error_msg,
-                event_type=EventType.SYSTEM_EVENT,
-                entity=my_entity,
+                event_type=EventType.INTEGRATION,
+                entity=current_entity_name(),
                 user_id=request.user_name,
-                data={"received_json": trade_json},
-                tags=["api", "ai", "error", "json"]
+                tags=["api", "validation", "error"]
             )
-            raise HTTPException(status_code=500, detail=error_msg)
-
-        # Transform and calculate cashflows
-        # COMMENT transformer = SwapParamTransformer()
-        # COMMENT intermediate_params = transformer.transform_json(trade_json)
-        # COMMENT params = load_ql_parameters(intermediate_params)
-        # COMMENT leg1, leg2 = create_swap_cashflows(**params)
-        # COMMENT output_data = transform_output(trade_json, leg1, leg2)
-        
-        # Log success
+            raise HTTPException(status_code=400, detail=error_msg)
+
         logger.info(
-            "FX processing completed successfully",
-            event_type=EventType.TRANSACTION,
-            entity=my_entity,
+            "Using provided text input",
+            event_type=EventType.SYSTEM_EVENT,
+            entity=current_entity_name(),
             user_id=request.user_name,
-            data={"trade_json": trade_json},  # Changed to use trade_json since output_data is commented out
-            tags=["api", "process-fx", "success"]
+            data={"text_length": len(request.input_text)},
+            tags=["api", "text", "input"]
+        )
+        extracted_text = request.input_text
+
+    else:
+        error_msg = 'Invalid input type'
+        logger.warning(
+            error_msg,
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            user_id=request.user_name,
+            data={"input_type": request.input_type},
+            tags=["api", "validation", "error"]
+        )
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    # Process text with AI
+    on_stage("extracting_trade", 0.4 if request.input_type == 'image' else 0.1)
+    logger.info(
+        "Processing text with AI",
+        event_type=EventType.TRANSACTION,
+        entity=current_entity_name(),
+        user_id=request.user_name,
+        data={"provider": request.ai_provider},
+        tags=["api", "ai", "processing"]
+    )
+
+    # Validated and normalized straight from the provider's text; invalid
+    # fields are sent back to the model for a targeted retry. Providers with
+    # a cascade answer with their small model first (app.services.cascade)
+    trade_json, raw_json_str, usages = cascade_extract(service, extracted_text, request.ai_provider, on_stage)
+    attempt = 0
+    while trade_json is None:
+        try:
+            trade_json = parse_extraction(raw_json_str)
+            break
+        except ValidationError as e:
+            errors = validation_errors(e)
+            # An answer that does not validate counts against its provider's routing stats
+            service.report_invalid()
+            if attempt >= settings.EXTRACTION_RETRIES:
+                error_msg = 'Invalid JSON structure from AI processing'
+                logger.error(
+                    error_msg,
+                    event_type=EventType.SYSTEM_EVENT,
+                    entity=current_entity_name(),
+                    user_id=request.user_name,
+                    data={"received": raw_json_str, "errors": errors, "attempts": attempt + 1},
+                    tags=["api", "ai", "error", "json"]
+                )
+                raise HTTPException(status_code=500, detail=f"{error_msg}: {'; '.join(errors)}")
+        attempt += 1
+        logger.warning(
+            f"AI output failed validation, retrying ({attempt}/{settings.EXTRACTION_RETRIES})",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            user_id=request.user_name,
+            data={"errors": errors},
+            tags=["api", "ai", "validation", "retry"]
+        )
+        on_stage("retrying", 0.7)
+        # The correction goes back to the provider that gave the answer, also when routed
+        raw_json_str = service.process_text(
+            extracted_text,
+            service.last_usage.get("provider", request.ai_provider),
+            correction=correction_prompt(raw_json_str, errors)
+        )
+        usages.append(service.last_usage)
+
+    # Persist the validated trade for later history lookups
+    on_stage("storing", 0.9)
+    trade_id = None
+    try:
+        usage = service.last_usage
+        # Retries are part of the extraction's cost
+        costs = [u["cost"] for u in usages if u.get("cost") is not None]
+        trade_id = get_trade_store().save_trade(
+            trade_json,
+            input_digest=compute_input_digest(
+                request.input_type,
+                request.input_image if request.input_type == 'image' else request.input_text
+            ),
+            provider=usage.get("provider", request.ai_provider),
+            model=usage.get("model"),
+            latency_ms=int((time.perf_counter() - start_time) * 1000),
+            cost=sum(costs) if costs else None,
+            user_name=request.user_name,
+            user_entity=request.user_entity,
+            input_type=request.input_type,
+            tenant=entity.name
         )
-        
-        return trade_json  # Return trade_json since output_data is commented out
-        
+    except Exception as e:
+        # History is best-effort; never fail an extraction because of it
+        logger.log_exception(
+            e,
+            message="Error persisting trade to local store",
+            level=LogLevel.ERROR,
+            tags=["api", "trade-store", "error"],
+            entity=current_entity_name()
+        )
+
+    # Settlement dates and forward check; best-effort, like the history store
+    # (FX trades only: a swap's TradeSummary has no "Currency 1" and no settlement)
+    on_stage("settling", 0.95)
+    settlement = None
+    if "Currency 1" in trade_json["TradeSummary"]:
+        try:
+            settlement = settle_fx_trade(trade_json)
+        except Exception as e:
+            logger.warning(
+                f"Could not compute FX settlement: {e}",
+                event_type=EventType.SYSTEM_EVENT,
+                entity=current_entity_name(),
+                user_id=request.user_name,
+                tags=["api", "process-fx", "settlement", "error"]
+            )
+            settlement = {"Error": str(e)}
+    # Cashflows are not computed here: GET /trades/{TradeId}/cashflows
+    # prices them on first request and caches them
+    trade_json = {**trade_json, "Settlement": settlement, "TradeId": trade_id}
+
+    # Log success
+    logger.info(
+        "FX processing completed successfully",
+        event_type=EventType.TRANSACTION,
+        entity=current_entity_name(),
+        user_id=request.user_name,
+        data={"trade_json": trade_json},
+        tags=["api", "process-fx", "success"]
+    )
+
+    return trade_json
+
+@router.post("/process-fx")
+def process_fx(request: ProcessFXRequest):
+    # Sync, so the provider calls run in the threadpool and the event loop keeps
+    # serving (and rejecting) other requests; admission control in front of this
+    # endpoint (app.api.admission) bounds how many run at once
+    # The user details are per request; the provider clients are shared
+    service = copy.copy(ai_service)
+    try:
+        return FastJSONResponse(run_extraction(request, service))
     except Exception as e:
         if not isinstance(e, HTTPException):
             logger.log_exception(
@@ -165,7 +273,41 @@ async def process_fx(request: ProcessFXRequest):
                 message="Unexpected error in process_fx endpoint",
                 level=LogLevel.CRITICAL,
                 tags=["api", "error", "fatal"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             raise HTTPException(status_code=500, detail=str(e))
-        raise
\ No newline at end of file
+        raise
+
+@router.get("/process-fx/admission")
+def process_fx_admission():
+    """In-flight and queued extraction requests, rejections and queueing times."""
+    return FastJSONResponse(get_admission_controller().stats())
+
+@router.get("/process-fx/providers")
+def process_fx_providers():
+    """Rolling latency, error rate and cost per provider, and the routing decisions made."""
+    return FastJSONResponse(get_provider_router().stats())
+
+@router.get("/process-fx/cascade")
+def process_fx_cascade():
+    """Extractions answered by small models, escalations to the large ones and the latency saved."""
+    return FastJSONResponse(get_cascade_metrics().stats())
+
+@router.post("/fx/settlement")
+def fx_settlement(request: FXSettlementRequest):
+    """Spot/value dates and implied-vs-quoted forward checks for a batch of FX trade JSONs."""
+    start_time = time.perf_counter()
+    results = settle_fx_trades(request.trades)
+    errors = sum(1 for result in results if result["status"] == "error")
+    logger.info(
+        "FX settlement batch completed",
+        event_type=EventType.INTEGRATION,
+        entity=current_entity_name(),
+        data={
+            "trades": len(request.trades),
+            "errors": errors,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        },
+        tags=["api", "fx", "settlement", "success"]
+    )
+    return FastJSONResponse({"results": results})
@@ -0,0 +1,171 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
+import time
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import current_entity_name
+
+from app.api.responses import FastJSONResponse, dumps
+from app.config import settings
+from app.services.portfolio_service import stream_portfolio_cashflows, value_trades
+from app.services.scenario_service import run_scenarios
+from app.swap_calculator.curves import get_curve
+from app.swap_calculator.scenarios import load_scenarios
+
+router = APIRouter()
+
+class PortfolioCashflowRequest(BaseModel):
+    trades: List[Dict[str, Any]]
+    chunk_size: Optional[int] = None
+
+class PortfolioValuationRequest(BaseModel):
+    trades: List[Dict[str, Any]]
+    curve: str
+    entity: Optional[str] = None
+    buckets: bool = True
+
+class PortfolioScenarioRequest(BaseModel):
+    trades: List[Dict[str, Any]]
+    curve: str
+    scenarios: str
+    entity: Optional[str] = None
+    confidence: List[float] = [0.99, 0.975]
+    trade_pnl: bool = False
+
+@router.post("/portfolio/cashflows")
+async def portfolio_cashflows(request: PortfolioCashflowRequest):
+    """Compute cashflows for many swap trade JSONs on the process pool.
+
+    The response is newline-delimited JSON, one line per trade in completion
+    order: ``{"index": i, "status": "ok", "result": {...}}`` or
+    ``{"index": i, "status": "error", "error": "..."}``, followed by a final
+    ``{"summary": {...}}`` line.
+    """
+    if len(request.trades) > settings.PORTFOLIO_MAX_TRADES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.PORTFOLIO_MAX_TRADES} trades per request"
+        )
+    chunk_size = request.chunk_size or settings.PORTFOLIO_CHUNK_SIZE
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+
+    logger.info(
+        "Pricing portfolio cashflows",
+        event_type=EventType.INTEGRATION,
+        entity=current_entity_name(),
+        data={"trades": len(request.trades), "chunk_size": chunk_size},
+        tags=["api", "portfolio", "cashflow"]
+    )
+
+    async def stream():
+        start_time = time.perf_counter()
+        ok = errors = 0
+        async for result in stream_portfolio_cashflows(request.trades, chunk_size):
+            if result["status"] == "ok":
+                ok += 1
+            else:
+                errors += 1
+            yield dumps(result) + b"\n"
+
+        summary = {
+            "trades": len(request.trades),
+            "ok": ok,
+            "errors": errors,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        }
+        logger.info(
+            "Portfolio cashflows completed",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            data=summary,
+            tags=["api", "portfolio", "cashflow", "success"]
+        )
+        yield dumps({"summary": summary}) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/portfolio/valuation")
+def portfolio_valuation(request: PortfolioValuationRequest):
+    """NPV, parallel DV01 and bucketed DV01 (1bp zero-rate bumps per curve node).
+
+    All trades are valued against the curve of the given index. NPVs are
+    from ``entity``'s side when it is a party to a trade (defaults to the
+    request's entity), otherwise from the fixed-leg payer's.
+    """
+    if len(request.trades) > settings.PORTFOLIO_MAX_TRADES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.PORTFOLIO_MAX_TRADES} trades per request"
+        )
+    curve = get_curve(request.curve)
+    if curve is None:
+        raise HTTPException(status_code=404, detail=f"No curve available for index {request.curve}")
+
+    start_time = time.perf_counter()
+    valuation = value_trades(request.trades, curve, request.entity or current_entity_name(), request.buckets)
+    errors = sum(1 for result in valuation["results"] if result["status"] == "error")
+
+    logger.info(
+        "Portfolio valuation completed",
+        event_type=EventType.INTEGRATION,
+        entity=current_entity_name(),
+        data={
+            "trades": len(request.trades),
+            "errors": errors,
+            "curve": curve.name,
+            "buckets": request.buckets,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        },
+        tags=["api", "portfolio", "valuation", "success"]
+    )
+    return FastJSONResponse(valuation)
+
+
+@router.post("/portfolio/scenarios")
+def portfolio_scenarios(request: PortfolioScenarioRequest):
+    """Revalue trades under every shock of a historical scenario file.
+
+    Returns the portfolio P&L per scenario, historical VaR and expected
+    shortfall per confidence level, and per trade its base NPV (plus its
+    P&L per scenario when ``trade_pnl`` is set).
+    """
+    if len(request.trades) > settings.PORTFOLIO_MAX_TRADES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.PORTFOLIO_MAX_TRADES} trades per request"
+        )
+    if not all(0 < level < 1 for level in request.confidence):
+        raise HTTPException(status_code=400, detail="Confidence levels must be between 0 and 1")
+    curve = get_curve(request.curve)
+    if curve is None:
+        raise HTTPException(status_code=404, detail=f"No curve available for index {request.curve}")
+    try:
+        scenarios = load_scenarios(request.scenarios)
+        if scenarios is not None:
+            scenarios.node_shifts(curve)
+    except ValueError as e:
+        logger.warning(
+            f"Invalid scenario file {request.scenarios}: {e}",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            tags=["api", "portfolio", "scenarios", "error"]
+        )
+        raise HTTPException(status_code=422, detail=str(e))
+    if scenarios is None:
+        raise HTTPException(status_code=404, detail=f"No scenario file {request.scenarios}")
+    if not len(scenarios):
+        raise HTTPException(status_code=422, detail=f"Scenario file {request.scenarios} has no scenarios")
+
+    result = run_scenarios(
+        request.trades,
+        curve,
+        scenarios,
+        request.entity or current_entity_name(),
+        request.confidence,
+        request.trade_pnl
+    )
+    return FastJSONResponse(result)
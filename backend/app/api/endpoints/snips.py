@@ -0,0 +1,260 @@
+"""Persistent WebSocket channel for the desktop client: ``/api/ws/snips``.
+
+One connection carries any number of extractions, told apart by a
+client-chosen ``id``. Client to server:
+
+- text frame ``{"type": "extract", "id": ..., <ProcessFXRequest fields>}``
+  for a text snip
+- binary frame for an image snip: a 4-byte big-endian length, that many
+  bytes of the same JSON (``input_type: "image"``, no ``input_image``),
+  then the raw PNG bytes, which are not base64-encoded on the wire
+- text frame ``{"type": "cancel", "id": ...}`` when the user closes or
+  replaces a snip
+
+Server to client, as JSON text frames:
+
+- ``{"type": "accepted", "id", "queue_wait_ms"}`` once admission control
+  (the same limits as ``/api/process-fx``) lets it run, or
+  ``{"type": "rejected", "id", "reason", "retry_after"}``
+- ``{"type": "stage", "id", "stage", "progress"}`` before each step of
+  the pipeline (``reading_image``, ``extracting_trade``, ``escalating``
+  from a small model to the large one, ``retrying``, ``storing``,
+  ``settling``)
+- ``{"type": "result", "id", "trade"}`` with the ``/api/process-fx``
+  response body, ``{"type": "error", "id", "status", "detail"}``, or
+  ``{"type": "cancelled", "id"}``
+
+Extractions run the same ``run_extraction`` pipeline as
+``/api/process-fx``. A cancelled extraction stops at its next stage
+boundary, so a provider call already under way finishes but none after it
+(text processing after an image read, a retry) is made. Closing the
+connection cancels everything it started.
+"""
+import asyncio
+import base64
+import copy
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+
+from app.api.admission import PRIORITY_IMAGE, PRIORITY_TEXT, Rejected, get_admission_controller, user_key
+from app.api.endpoints.fx import ExtractionCancelled, ProcessFXRequest, ai_service, run_extraction
+from app.api.responses import dumps
+
+router = APIRouter()
+
+# Length of the JSON header at the start of a binary frame
+FRAME_HEADER = struct.Struct(">I")
+# Close code when the server can no longer send events
+WS_INTERNAL_ERROR = 1011
+
+
+def _json_object(data) -> Dict[str, Any]:
+    message = orjson.loads(data)
+    if not isinstance(message, dict):
+        raise ValueError("expected a JSON object")
+    return message
+
+
+class _Snip:
+    """One extraction on a connection."""
+
+    __slots__ = ("id", "user", "task", "cancelled", "running")
+
+    def __init__(self, snip_id: str, user: str):
+        self.id = snip_id
+        self.user = user
+        self.task: Optional[asyncio.Task] = None
+        # Set on the event loop, checked by the pipeline thread at each stage boundary
+        self.cancelled = threading.Event()
+        self.running = False
+
+
+class SnipChannel:
+    """The extractions of one WebSocket connection and its single writer."""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.snips: Dict[str, _Snip] = {}
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        self.completed = 0
+
+    def push(self, message: Dict[str, Any]) -> None:
+        """Queue an event for the client (event loop only)."""
+        self.outbox.put_nowait(message)
+
+    def push_threadsafe(self, message: Dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self.outbox.put_nowait, message)
+
+    async def writer(self) -> None:
+        # Frames are sent from this task only, in the order the events were queued
+        try:
+            while True:
+                message = await self.outbox.get()
+                await self.websocket.send_text(dumps(message).decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Events can no longer reach the client: close, so the reader stops taking work
+            logger.log_exception(
+                e,
+                message="Snip channel writer failed",
+                level=LogLevel.ERROR,
+                tags=["api", "ws", "error"],
+                entity=current_entity_name()
+            )
+            try:
+                await self.websocket.close(code=WS_INTERNAL_ERROR)
+            except Exception:
+                pass
+
+    def parse(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """The JSON of a text or binary frame, with the image of a binary one base64-encoded."""
+        if message.get("text") is not None:
+            return _json_object(message["text"])
+        frame = message.get("bytes") or b""
+        if len(frame) < FRAME_HEADER.size:
+            raise ValueError("binary frame without a header")
+        (length,) = FRAME_HEADER.unpack_from(frame)
+        header = _json_object(frame[FRAME_HEADER.size:FRAME_HEADER.size + length])
+        # AIService.extract_text sends the image to the provider as base64
+        header["input_image"] = base64.b64encode(frame[FRAME_HEADER.size + length:]).decode("ascii")
+        return header
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        kind = message.get("type")
+        snip_id = message.get("id")
+        if not isinstance(snip_id, str) or not snip_id:
+            self.push({"type": "error", "id": snip_id, "status": 400, "detail": "Missing id"})
+            return
+        if kind == "cancel":
+            self.cancel(snip_id)
+        elif kind == "extract":
+            self.start(snip_id, message)
+        else:
+            self.push({"type": "error", "id": snip_id, "status": 400, "detail": f"Unknown message type: {kind}"})
+
+    def start(self, snip_id: str, message: Dict[str, Any]) -> None:
+        if snip_id in self.snips:
+            self.push({"type": "error", "id": snip_id, "status": 409, "detail": "An extraction with this id is running"})
+            return
+        try:
+            request = ProcessFXRequest.model_validate({k: v for k, v in message.items() if k not in ("type", "id")})
+        except ValidationError as e:
+            logger.warning(
+                f"Invalid extraction request on the snip channel: {e.error_count()} errors",
+                event_type=EventType.INTEGRATION,
+                entity=current_entity_name(),
+                tags=["api", "ws", "validation", "error"]
+            )
+            self.push({"type": "error", "id": snip_id, "status": 422, "detail": e.errors(include_url=False, include_input=False)})
+            return
+        snip = _Snip(snip_id, request.user_name)
+        self.snips[snip_id] = snip
+        snip.task = asyncio.create_task(self.run(snip, request))
+
+    def cancel(self, snip_id: str) -> None:
+        snip = self.snips.get(snip_id)
+        if snip is None:
+            return
+        snip.cancelled.set()
+        if not snip.running:
+            # Still waiting for admission: leave the queue now
+            snip.task.cancel()
+
+    def cancel_all(self) -> None:
+        for snip_id in list(self.snips):
+            self.cancel(snip_id)
+
+    async def run(self, snip: _Snip, request: ProcessFXRequest) -> None:
+        controller = get_admission_controller()
+        priority = PRIORITY_TEXT if request.input_type == "text" else PRIORITY_IMAGE
+        key = user_key(request.user_name)
+        try:
+            wait = await controller.acquire(key, priority)
+        except Rejected as rejected:
+            self.snips.pop(snip.id, None)
+            self.push({"type": "rejected", "id": snip.id, "reason": rejected.reason, "retry_after": rejected.retry_after})
+            return
+        except asyncio.CancelledError:
+            self.snips.pop(snip.id, None)
+            self.push({"type": "cancelled", "id": snip.id})
+            return
+
+        snip.running = True
+        self.push({"type": "accepted", "id": snip.id, "queue_wait_ms": round(wait * 1000)})
+
+        def on_stage(stage: str, progress: float) -> None:
+            if snip.cancelled.is_set():
+                raise ExtractionCancelled()
+            self.push_threadsafe({"type": "stage", "id": snip.id, "stage": stage, "progress": progress})
+
+        started = time.perf_counter()
+        try:
+            trade = await run_in_threadpool(run_extraction, request, copy.copy(ai_service), on_stage)
+            self.push({"type": "result", "id": snip.id, "trade": trade})
+        except ExtractionCancelled:
+            self.push({"type": "cancelled", "id": snip.id})
+        except HTTPException as e:
+            self.push({"type": "error", "id": snip.id, "status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.log_exception(
+                e,
+                message="Unexpected error in snip channel extraction",
+                level=LogLevel.ERROR,
+                tags=["api", "ws", "error"],
+                entity=current_entity_name()
+            )
+            self.push({"type": "error", "id": snip.id, "status": 500, "detail": str(e)})
+        finally:
+            controller.release(key, time.perf_counter() - started)
+            self.snips.pop(snip.id, None)
+            self.completed += 1
+
+
+@router.websocket("/ws/snips")
+async def snip_channel(websocket: WebSocket):
+    await websocket.accept()
+    channel = SnipChannel(websocket)
+    writer = asyncio.create_task(channel.writer())
+    opened = time.perf_counter()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect" or writer.done():
+                # Disconnected, or the writer failed and closed the connection
+                break
+            try:
+                parsed = channel.parse(message)
+            except (orjson.JSONDecodeError, ValueError) as e:
+                channel.push({"type": "error", "id": None, "status": 400, "detail": f"Unreadable frame: {e}"})
+                continue
+            channel.handle(parsed)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.cancel_all()
+        writer.cancel()
+        logger.info(
+            "Snip channel closed",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            data={
+                "extractions": channel.completed,
+                "cancelled_on_close": len(channel.snips),
+                "duration_s": round(time.perf_counter() - opened, 1)
+            },
+            tags=["api", "ws", "snips"]
+        )
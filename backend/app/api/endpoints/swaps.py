@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Dict, Any
+import time
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+
+from app.api.responses import dumps
+from app.services.swap_service import iter_swap_output
+
+router = APIRouter()
+
+# Cashflow records per write; each write is flushed (and compressed) on its own
+STREAM_BATCH_SIZE = 256
+
+class SwapCashflowRequest(BaseModel):
+    trade: Dict[str, Any]
+
+@router.post("/swaps/cashflows")
+def stream_swap_cashflows(request: SwapCashflowRequest):
+    """Cashflows of one swap as newline-delimited JSON, generated while they are sent.
+
+    Lines are ``{"tradeInfo": {...}}``, then for each leg a ``{"leg": {...}}``
+    header followed by one line per cashflow, and a final
+    ``{"summary": {...}}`` line (or ``{"error": "..."}`` if generation fails
+    part way). Suited to long Daily/Weekly schedules, which are never built
+    as a whole.
+    """
+    records = iter_swap_output(request.trade)
+    try:
+        # Parse the trade before the response starts, so bad input is a 400
+        first = next(records)
+    except (KeyError, ValueError, TypeError) as e:
+        logger.warning(
+            f"Invalid swap trade for cashflow stream: {e}",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            tags=["api", "swaps", "cashflow", "error"]
+        )
+        raise HTTPException(status_code=400, detail=f"Invalid trade: {e}")
+
+    def stream():
+        start_time = time.perf_counter()
+        yield dumps(first) + b"\n"
+        periods = []
+        batch = []
+        try:
+            for record in records:
+                if "leg" in record:
+                    periods.append(record["leg"]["periods"])
+                batch.append(dumps(record))
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield b"\n".join(batch) + b"\n"
+                    batch = []
+        except Exception as e:
+            logger.log_exception(
+                e,
+                message="Error streaming swap cashflows",
+                level=LogLevel.ERROR,
+                tags=["api", "swaps", "cashflow", "error"],
+                entity=current_entity_name()
+            )
+            batch.append(dumps({"error": str(e)}))
+            yield b"\n".join(batch) + b"\n"
+            return
+
+        summary = {
+            "periods": periods,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        }
+        logger.info(
+            "Swap cashflow stream completed",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            data=summary,
+            tags=["api", "swaps", "cashflow", "success"]
+        )
+        batch.append(dumps({"summary": summary}))
+        yield b"\n".join(batch) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
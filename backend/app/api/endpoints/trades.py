@@ -0,0 +1,196 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from typing import Optional, Union, Literal
+import time
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import current_entity_name, partition
+
+from app.api.responses import FastJSONResponse, dumps
+from app.services.trade_store import get_trade_store, decode_cursor, encode_cursor, SORT_COLUMNS
+from app.services.repricing_service import get_repricing_service, TradeNotFound
+from app.services.cashflow_service import get_cashflow_service
+from app.swap_calculator.terms import parse_date
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 1000
+
+class LegAmendment(BaseModel):
+    notional: Optional[float] = None
+    rate: Optional[Union[float, str]] = None
+    spread: Optional[float] = None
+    amortization_type: Optional[Literal["BULLET", "LINEAR"]] = None
+
+class TradeAmendment(BaseModel):
+    leg1: Optional[LegAmendment] = None
+    leg2: Optional[LegAmendment] = None
+
+def _date_filter(name: str, value: Optional[str]) -> Optional[str]:
+    """A date filter as the ISO text the store's date columns are compared with."""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise HTTPException(status_code=400, detail=f"{name} must be a DD-MM-YYYY or YYYY-MM-DD date, got {value!r}")
+    return parsed.isoformat()
+
+@router.get("/trades")
+def list_trades(
+    counterparty: Optional[str] = None,
+    currency_pair: Optional[str] = Query(None, description="e.g. USD/CLP"),
+    trade_date_from: Optional[str] = Query(None, description="DD-MM-YYYY or YYYY-MM-DD"),
+    trade_date_to: Optional[str] = Query(None, description="DD-MM-YYYY or YYYY-MM-DD"),
+    maturity_from: Optional[str] = Query(None, description="DD-MM-YYYY or YYYY-MM-DD"),
+    maturity_to: Optional[str] = Query(None, description="DD-MM-YYYY or YYYY-MM-DD"),
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Page through stored trades, newest first.
+
+    The response is streamed as ``{"items": [...], "next_cursor": ...}``;
+    pass ``next_cursor`` back as ``cursor`` to fetch the following page.
+    """
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    trade_date_from = _date_filter("trade_date_from", trade_date_from)
+    trade_date_to = _date_filter("trade_date_to", trade_date_to)
+    maturity_from = _date_filter("maturity_from", maturity_from)
+    maturity_to = _date_filter("maturity_to", maturity_to)
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(
+        "Querying trade history",
+        event_type=EventType.INTEGRATION,
+        entity=current_entity_name(),
+        data={
+            "counterparty": counterparty,
+            "currency_pair": currency_pair,
+            "sort": sort,
+            "limit": limit
+        },
+        tags=["api", "trades", "query"]
+    )
+
+    rows = get_trade_store().iter_trades(
+        counterparty=counterparty,
+        currency_pair=currency_pair,
+        trade_date_from=trade_date_from,
+        trade_date_to=trade_date_to,
+        maturity_from=maturity_from,
+        maturity_to=maturity_to,
+        sort=sort,
+        cursor=cursor,
+        limit=limit,
+        tenant=partition()
+    )
+
+    def stream():
+        yield b'{"items":['
+        count = 0
+        last = None
+        for row in rows:
+            if count:
+                yield b","
+            yield dumps(row)
+            count += 1
+            last = row
+        next_cursor = None
+        if last is not None and count == limit:
+            next_cursor = encode_cursor(last[sort], last["id"])
+        yield b'],"next_cursor":' + dumps(next_cursor) + b"}"
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+@router.get("/trades/{trade_id}")
+def get_trade(trade_id: int):
+    """Fetch a single stored trade."""
+    trade = get_trade_store().get_trade(trade_id, partition())
+    if trade is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    return FastJSONResponse(trade)
+
+@router.get("/trades/{trade_id}/cashflows")
+async def get_trade_cashflows(trade_id: int):
+    """Cashflows of a stored swap, computed on first request and then served from memory.
+
+    ``/process-fx`` only stores the extracted trade and returns its
+    ``TradeId``; the schedule is priced (in a worker thread) the first time
+    it is requested here. The ``X-Cashflow-Cache`` header says whether the
+    response was cached (``hit``) or computed for this request (``miss``).
+    """
+    service = get_cashflow_service()
+    # Hits whose market data was checked recently need no threadpool hop
+    body = service.cached(trade_id)
+    cached = body is not None
+    if body is None:
+        try:
+            body, cached = await run_in_threadpool(service.get_cashflows, trade_id)
+        except TradeNotFound:
+            raise HTTPException(status_code=404, detail="Trade not found")
+        except (KeyError, ValueError, TypeError) as e:
+            logger.warning(
+                f"Cashflows of trade {trade_id} cannot be computed: {e}",
+                event_type=EventType.INTEGRATION,
+                entity=current_entity_name(),
+                tags=["api", "trades", "cashflow", "error"]
+            )
+            raise HTTPException(status_code=422, detail=f"Cashflows cannot be computed: {e}")
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"X-Cashflow-Cache": "hit" if cached else "miss"}
+    )
+
+@router.patch("/trades/{trade_id}/cashflows")
+def amend_trade_cashflows(trade_id: int, amendment: TradeAmendment):
+    """Amend a stored swap's notional, rate, spread or amortization and return its cashflows.
+
+    Schedules and accrual fractions of recently priced trades are kept in
+    memory, so only the amount columns of the amended legs are recomputed.
+    The ``X-Repricing`` header says whether that was the case
+    (``incremental``) or the trade had to be priced from scratch (``full``).
+    """
+    amendments = {}
+    for leg_number, leg in ((1, amendment.leg1), (2, amendment.leg2)):
+        if leg is not None:
+            changes = leg.model_dump(exclude_none=True)
+            if changes:
+                amendments[leg_number] = changes
+    if not amendments:
+        raise HTTPException(status_code=400, detail="Nothing to amend")
+
+    start_time = time.perf_counter()
+    try:
+        output, incremental = get_repricing_service().amend(trade_id, amendments)
+    except TradeNotFound:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    except (KeyError, ValueError, TypeError) as e:
+        logger.warning(
+            f"Trade {trade_id} cannot be amended: {e}",
+            event_type=EventType.INTEGRATION,
+            entity=current_entity_name(),
+            tags=["api", "trades", "amend", "error"]
+        )
+        raise HTTPException(status_code=422, detail=f"Trade cannot be amended: {e}")
+    get_cashflow_service().invalidate(trade_id)
+
+    logger.info(
+        "Trade cashflows amended",
+        event_type=EventType.INTEGRATION,
+        entity=current_entity_name(),
+        data={
+            "trade_id": trade_id,
+            "incremental": incremental,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 2)
+        },
+        tags=["api", "trades", "amend", "success"]
+    )
+    return FastJSONResponse(output, headers={"X-Repricing": "incremental" if incremental else "full"})
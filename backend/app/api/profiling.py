@@ -0,0 +1,284 @@
+"""Opt-in per-request CPU and memory profiles.
+
+With ``PROFILING=header`` a request carrying ``X-Profile: 1`` is profiled;
+with ``PROFILING=all`` every request is; ``PROFILING=off`` ignores the
+header. A profiled request gets (``X-Profile: cpu`` or ``X-Profile: memory``
+asks for only one of them):
+
+- a wall-clock sampling profile of the process's threads (every
+  ``PROFILE_INTERVAL_MS``), so the threadpool running sync endpoints and
+  streamed responses is covered along with the event loop; threads idling
+  in the selector or a worker queue are left out
+- a tracemalloc snapshot diff between the start and the end of the
+  request (allocations still alive when it finishes) and its peak.
+  Tracing every allocation slows allocation-heavy code several times over
+  and skews the CPU samples towards it; ask for ``cpu`` alone for timings
+
+Both are written to ``PROFILE_DIR`` as collapsed stacks
+(``<id>.cpu.folded``, ``<id>.mem.folded``) that flamegraph.pl, inferno or
+speedscope read directly, with a ``<id>.json`` summary. The response
+carries the profile id in ``X-Profile-Id``.
+
+tracemalloc and the sampler are process-wide, so one request is profiled
+at a time (others get ``X-Profile-Status: busy``) and requests running
+concurrently show up in the CPU profile under their own threads. When a
+request does not ask for a profile the middleware only looks at its
+headers.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+
+PROFILE_HEADER = b"x-profile"
+# X-Profile values -> (cpu, memory)
+PROFILE_KINDS = {
+    b"1": (True, True), b"true": (True, True), b"yes": (True, True), b"on": (True, True),
+    b"cpu": (True, False), b"memory": (False, True),
+}
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_STATUS_HEADER = "X-Profile-Status"
+
+# Leaf frames of threads waiting for work rather than serving a request
+IDLE_FRAMES = frozenset({
+    ("select", "selectors.py"),
+    ("wait", "threading.py"),
+    ("wait", "connection.py"),
+    ("_worker", "thread.py"),
+})
+
+# Lines of the JSON summary's top functions and allocation sites
+SUMMARY_TOP = 25
+
+_active = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    cwd = os.getcwd()
+    if filename.startswith(cwd):
+        filename = os.path.relpath(filename, cwd)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    # ";" separates frames in the folded format
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+class _Sampler(threading.Thread):
+    """Samples the Python stacks of every other thread at a fixed interval."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                code = frame.f_code
+                if ident == own or (code.co_name, os.path.basename(code.co_filename)) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                self.stacks[(names.get(ident, f"thread-{ident}"), tuple(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class ProfileSession:
+    """CPU sampler and tracemalloc diff around one request."""
+
+    def __init__(self, method: str, path: str, cpu: bool = True, memory: bool = True):
+        self.id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self._owns_tracemalloc = memory and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+        self._before = None
+        if memory:
+            tracemalloc.reset_peak()
+            self._before = tracemalloc.take_snapshot()
+        self._sampler = _Sampler(settings.PROFILE_INTERVAL_MS / 1000) if cpu else None
+        self._started = time.perf_counter()
+        if self._sampler is not None:
+            self._sampler.start()
+
+    def finish(self) -> Dict[str, Any]:
+        """Stop sampling, diff the heap and write the profile files; returns the summary."""
+        duration = time.perf_counter() - self._started
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        base = os.path.join(settings.PROFILE_DIR, self.id)
+        summary = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(duration * 1000, 1)
+        }
+        if self._sampler is not None:
+            self._sampler.stop()
+            summary["cpu"] = self._write_cpu(f"{base}.cpu.folded")
+        if self._before is not None:
+            summary["memory"] = self._write_memory(f"{base}.mem.folded")
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        _prune_profiles()
+        return summary
+
+    def _write_cpu(self, path: str) -> Dict[str, Any]:
+        stacks = self._sampler.stacks
+        with open(path, "w", encoding="utf-8") as f:
+            for (thread, stack), count in stacks.most_common():
+                f.write(";".join([thread] + [_frame_label(code) for code in reversed(stack)]) + f" {count}\n")
+        self_samples: Counter = Counter()
+        for (_, stack), count in stacks.items():
+            self_samples[_frame_label(stack[0])] += count
+        return {
+            "interval_ms": settings.PROFILE_INTERVAL_MS,
+            "samples": self._sampler.samples,
+            "top_self": self_samples.most_common(SUMMARY_TOP),
+            "file": os.path.basename(path)
+        }
+
+    def _write_memory(self, path: str) -> Dict[str, Any]:
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        stats = after.filter_traces(ignore).compare_to(self._before.filter_traces(ignore), "traceback")
+        grown = [stat for stat in stats if stat.size_diff > 0]
+        top_lines: Counter = Counter()
+        with open(path, "w", encoding="utf-8") as f:
+            for stat in grown:
+                # Tracebacks are most recent frame first
+                frames = [f"{frame.filename}:{frame.lineno}".replace(";", ",") for frame in reversed(stat.traceback)]
+                f.write(";".join(frames) + f" {stat.size_diff}\n")
+                top_lines[f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}"] += stat.size_diff
+        return {
+            "peak_bytes": peak,
+            "retained_bytes": sum(stat.size_diff for stat in stats),
+            "top_retained": top_lines.most_common(SUMMARY_TOP),
+            "file": os.path.basename(path)
+        }
+
+
+def _prune_profiles() -> None:
+    """Keep the PROFILE_KEEP most recent profiles (0 keeps them all)."""
+    if settings.PROFILE_KEEP <= 0:
+        return
+    # Ids start with their timestamp, so names sort oldest first
+    summaries = sorted(name for name in os.listdir(settings.PROFILE_DIR) if name.endswith(".json"))
+    for name in summaries[:-settings.PROFILE_KEEP]:
+        profile_id = name[:-len(".json")]
+        for suffix in (".json", ".cpu.folded", ".mem.folded"):
+            try:
+                os.remove(os.path.join(settings.PROFILE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def start_profile(method: str, path: str, cpu: bool = True, memory: bool = True) -> Optional[ProfileSession]:
+    """Start profiling a request, or None while another request is being profiled."""
+    if not _active.acquire(blocking=False):
+        return None
+    try:
+        return ProfileSession(method, path, cpu, memory)
+    except Exception:
+        _active.release()
+        raise
+
+
+def finish_profile(session: ProfileSession) -> Optional[Dict[str, Any]]:
+    try:
+        summary = session.finish()
+    except Exception as e:
+        logger.log_exception(
+            e,
+            message="Error writing request profile",
+            level=LogLevel.ERROR,
+            tags=["api", "profiling", "error"],
+            entity=current_entity_name()
+        )
+        return None
+    finally:
+        _active.release()
+    logger.info(
+        "Request profiled",
+        event_type=EventType.SYSTEM_EVENT,
+        entity=current_entity_name(),
+        data={key: summary[key] for key in ("id", "method", "path", "status", "duration_ms")},
+        tags=["api", "profiling"]
+    )
+    return summary
+
+
+class ProfilingMiddleware:
+    """Profile the requests that ask for it (see the module docstring)."""
+
+    def __init__(self, app: ASGIApp, mode: str = "off"):
+        self.app = app
+        self.mode = mode
+
+    def _requested(self, scope: Scope) -> Optional[Tuple[bool, bool]]:
+        """(cpu, memory) to capture, or None when the request is not profiled."""
+        if self.mode != "header":
+            return (True, True) if self.mode == "all" else None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return PROFILE_KINDS.get(value.strip().lower())
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        kinds = self._requested(scope) if scope["type"] == "http" else None
+        if kinds is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = start_profile(scope["method"], scope["path"], *kinds)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if session is None:
+                    headers[PROFILE_STATUS_HEADER] = "busy"
+                else:
+                    session.status = message["status"]
+                    headers[PROFILE_ID_HEADER] = session.id
+            await send(message)
+
+        try:
+            # Streamed responses are covered too: the app returns once the body is sent
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if session is not None:
+                # Diffing the heap and writing the files stays off the event loop
+                await anyio.to_thread.run_sync(finish_profile, session)
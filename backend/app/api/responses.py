@@ -0,0 +1,40 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# datetime/date, dataclasses and NumPy arrays are handled natively by orjson
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for the few types orjson can't serialize on its own."""
+    if isinstance(obj, Decimal):
+        if not obj.is_finite():
+            # NaN/Infinity are not JSON; null, as orjson writes non-finite floats
+            return None
+        # Emit the exact decimal digits as a JSON number, no float round-trip
+        return orjson.Fragment(str(obj))
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes the same way FastJSONResponse does."""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Endpoints that return this class directly skip FastAPI's
+    ``jsonable_encoder`` pass, so large cashflow payloads are serialized
+    in a single native call.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,68 @@
+"""Binding each request to the entity it is served for.
+
+Clients name their entity in an ``X-Entity`` header, or in an ``entity``
+query parameter where they cannot set headers (WebSocket clients in a
+browser); the desktop client sends its user's entity (``user_entity``).
+Requests naming neither get the default entity (``run.py --entity``).
+Naming an entity the registry does not list, or none when several are
+registered without a default, is a 400, or a closed handshake for
+WebSockets.
+"""
+from typing import Optional
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.api.responses import dumps
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import UnknownEntity, bind_entity, current_entity_name, get_entity_registry, unbind_entity
+
+ENTITY_HEADER = "X-Entity"
+# WebSocket close code for a policy violation
+WS_POLICY_VIOLATION = 1008
+
+
+def requested_entity(scope: Scope) -> Optional[str]:
+    return Headers(scope=scope).get(ENTITY_HEADER) or QueryParams(scope.get("query_string", b"")).get("entity")
+
+
+class EntityMiddleware:
+    """Resolve the request's entity and make it current while the app serves it."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        name = requested_entity(scope)
+        try:
+            entity = get_entity_registry().resolve(name)
+        except UnknownEntity:
+            detail = f"Unknown entity: {name}" if name else f"No entity given: set the {ENTITY_HEADER} header"
+            logger.warning(
+                f"Request for unknown entity {name!r}" if name else "Request without an entity",
+                event_type=EventType.INTEGRATION,
+                entity=current_entity_name(),
+                data={"path": scope["path"]},
+                tags=["api", "entity", "error"]
+            )
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": WS_POLICY_VIOLATION})
+                return
+            body = dumps({"detail": detail})
+            await send({
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        token = bind_entity(entity)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            unbind_entity(token)
@@ -10,7 +10,83 @@ class Settings:
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+    # Entities served by this process and their settings (see app/entities.py)
+    ENTITIES_FILE = os.getenv("ENTITIES_FILE", "data/entities.json")
+
     # Logging Configuration
     LOGGING_API_URL = os.getenv("LOGGING_API_URL", "http://localhost:8001/api/")
+
+    # Responses smaller than this (in bytes) are sent uncompressed
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+    # Extra attempts when a provider's TradeSummary fails validation (each one costs a model call)
+    EXTRACTION_RETRIES = int(os.getenv("EXTRACTION_RETRIES", 1))
+
+    # Routing of ai_provider="auto" extractions (app/services/provider_router.py): calls kept per
+    # provider and model, how long they count, calls before a provider is ranked, share of
+    # extractions sent to another provider than the best, and the objective's price of one second
+    # of p95 latency and of one USD
+    ROUTING_WINDOW = int(os.getenv("ROUTING_WINDOW", 200))
+    ROUTING_MAX_AGE_S = float(os.getenv("ROUTING_MAX_AGE_S", 3600))
+    ROUTING_MIN_SAMPLES = int(os.getenv("ROUTING_MIN_SAMPLES", 5))
+    ROUTING_EXPLORE = float(os.getenv("ROUTING_EXPLORE", 0.05))
+    ROUTING_LATENCY_WEIGHT = float(os.getenv("ROUTING_LATENCY_WEIGHT", 1.0))
+    ROUTING_COST_WEIGHT = float(os.getenv("ROUTING_COST_WEIGHT", 100.0))
+    # Providers tried by an "auto" extraction before its error is returned
+    ROUTING_ATTEMPTS = int(os.getenv("ROUTING_ATTEMPTS", 2))
+
+    # Model cascade (app/services/cascade.py): providers whose extractions go to a small model first,
+    # as provider=model pairs ("OpenAI=gpt-4o-mini,Google"; a provider alone uses its default small
+    # model), the self-reported confidence below which the large model is asked instead, and how far
+    # (relative) a forward price may be from spot
+    CASCADE_MODELS = os.getenv("CASCADE_MODELS", "")
+    CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", 0.8))
+    CASCADE_MAX_FORWARD_GAP = float(os.getenv("CASCADE_MAX_FORWARD_GAP", 0.2))
+
+    # Admission control of /api/process-fx: requests running at once (overall and per user_name),
+    # requests waiting for a slot and how long they may wait before a 429
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 8))
+    ADMISSION_MAX_PER_USER = int(os.getenv("ADMISSION_MAX_PER_USER", 2))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+    ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", 10))
+
+    # Local trade history store
+    TRADE_STORE_PATH = os.getenv("TRADE_STORE_PATH", "data/trades.db")
+
+    # Portfolio cashflow batches (0 workers = one per CPU core)
+    PORTFOLIO_WORKERS = int(os.getenv("PORTFOLIO_WORKERS", 0))
+    PORTFOLIO_CHUNK_SIZE = int(os.getenv("PORTFOLIO_CHUNK_SIZE", 250))
+    PORTFOLIO_MAX_TRADES = int(os.getenv("PORTFOLIO_MAX_TRADES", 50000))
+
+    # Priced swaps kept in memory for incremental re-pricing of amendments
+    REPRICING_CACHE_SIZE = int(os.getenv("REPRICING_CACHE_SIZE", 1024))
+
+    # Serialized cashflows of stored trades kept in memory after their first request (MiB)
+    CASHFLOW_CACHE_MB = int(os.getenv("CASHFLOW_CACHE_MB", 64))
+
+    # How long a check of an index's curve and fixings files vouches for cached cashflows
+    # served on the event loop (seconds); after that the next request re-checks them in a worker
+    CASHFLOW_MARKET_CHECK_S = float(os.getenv("CASHFLOW_MARKET_CHECK_S", 1.0))
+
+    # Discount curves per floating index (<CURVE_DIR>/<INDEX>.txt) used to project floating coupons
+    CURVE_DIR = os.getenv("CURVE_DIR", "data/curves")
+
+    # Daily overnight index fixings (<FIXINGS_DIR>/<INDEX>.fix) for compounded floating coupons
+    FIXINGS_DIR = os.getenv("FIXINGS_DIR", "data/fixings")
+
+    # Historical curve shocks (<SCENARIO_DIR>/<NAME>.txt) for scenario revaluation
+    SCENARIO_DIR = os.getenv("SCENARIO_DIR", "data/scenarios")
+
+    # Largest gap (bp of spot) between a quoted FX forward and the curve-implied one
+    FX_FORWARD_TOLERANCE_BP = float(os.getenv("FX_FORWARD_TOLERANCE_BP", 10))
+
+    # Per-request profiles: "off", "header" (requests sending X-Profile: 1) or "all";
+    # off unless set, as profiling slows requests down and writes files to PROFILE_DIR
+    PROFILING = os.getenv("PROFILING", "off").lower()
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", 8))
+    # Most recent profiles kept on disk (0 keeps them all)
+    PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 200))
     
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""Entities (tenants) served by this process and the entity of the current request.
+
+One process serves every entity in the registry, sharing its provider
+clients, worker pools and market data. The registry is read once from
+``ENTITIES_FILE``, a JSON object of per-entity settings::
+
+    {
+        "Banco ABC1": {"ai_provider": "Anthropic", "cashflow_cache_mb": 32},
+        "Banco XYZ": {}
+    }
+
+Omitted settings take the process-wide values from ``app.config``. The
+entity given to ``run.py --entity`` (``MY_ENTITY``) is the default one and
+is added to the registry when the file does not list it.
+
+``EntityMiddleware`` (``app.api.tenancy``) binds each request to its
+entity; everything below reads it with ``current_entity()``, including
+code running in the request's worker threads. With more than one entity
+registered, stored trades and the caches built from them are kept apart
+per entity (``partition()``), and without a default entity every request
+must name its own. With one, or none, everything behaves as a
+single-entity deployment did.
+"""
+import contextvars
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+# "auto" routes each extraction by recent provider latency, errors and cost (app.services.provider_router)
+AI_PROVIDERS = ("OpenAI", "Anthropic", "Google", "auto")
+
+
+class UnknownEntity(LookupError):
+    pass
+
+
+class Entity:
+    """One entity and its settings."""
+
+    __slots__ = ("name", "ai_provider", "cashflow_cache_mb", "repricing_cache_size")
+
+    def __init__(
+        self,
+        name: Optional[str],
+        ai_provider: Optional[str] = None,
+        cashflow_cache_mb: Optional[int] = None,
+        repricing_cache_size: Optional[int] = None
+    ):
+        if ai_provider is not None and ai_provider not in AI_PROVIDERS:
+            raise ValueError(f"Unknown AI provider for entity {name}: {ai_provider}")
+        self.name = name
+        # Provider for extractions that do not ask for one (None keeps the request default)
+        self.ai_provider = ai_provider
+        self.cashflow_cache_mb = settings.CASHFLOW_CACHE_MB if cashflow_cache_mb is None else int(cashflow_cache_mb)
+        self.repricing_cache_size = settings.REPRICING_CACHE_SIZE if repricing_cache_size is None else int(repricing_cache_size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class EntityRegistry:
+    """The entities this process serves and the one requests get by default."""
+
+    def __init__(self, entities: List[Entity], default: Optional[str] = None):
+        self._entities = {entity.name: entity for entity in entities}
+        if default is not None and default not in self._entities:
+            self._entities[default] = Entity(default)
+        self.default = self._entities[default] if default is not None else Entity(None)
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def names(self) -> List[str]:
+        return list(self._entities)
+
+    @property
+    def isolated(self) -> bool:
+        """Whether trades and caches are kept apart per entity."""
+        return len(self._entities) > 1
+
+    def resolve(self, name: Optional[str]) -> Entity:
+        """The entity called ``name`` (the default one for None); raises UnknownEntity.
+
+        An empty registry accepts any name with the process-wide settings.
+        With several entities and no default, a name is required.
+        """
+        if not name:
+            if self.isolated and self.default.name is None:
+                # Trades are kept apart and there is no entity to fall back to
+                raise UnknownEntity(name)
+            return self.default
+        entity = self._entities.get(name)
+        if entity is None:
+            if self._entities:
+                raise UnknownEntity(name)
+            return Entity(name)
+        return entity
+
+
+def load_registry(path: Optional[str], default: Optional[str]) -> EntityRegistry:
+    """Read the registry file (absent means no entities besides the default one)."""
+    entities = []
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError(f"{path} must map entity names to their settings")
+        for name, options in config.items():
+            unknown = set(options or {}) - set(Entity.__slots__[1:])
+            if unknown:
+                raise ValueError(f"Unknown settings for entity {name}: {', '.join(sorted(unknown))}")
+            entities.append(Entity(name, **(options or {})))
+    return EntityRegistry(entities, default)
+
+
+_registry: Optional[EntityRegistry] = None
+
+
+def get_entity_registry() -> EntityRegistry:
+    """Return the process-wide entity registry, loading it on first use."""
+    global _registry
+    if _registry is None:
+        _registry = load_registry(settings.ENTITIES_FILE, os.environ.get('MY_ENTITY') or None)
+    return _registry
+
+
+_current: contextvars.ContextVar[Optional[Entity]] = contextvars.ContextVar("entity", default=None)
+
+
+def bind_entity(entity: Entity) -> contextvars.Token:
+    """Make ``entity`` the current one in this context; pass the token to ``unbind_entity``."""
+    return _current.set(entity)
+
+
+def unbind_entity(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current_entity() -> Entity:
+    """The entity of the request being served, or the default one outside requests."""
+    entity = _current.get()
+    return entity if entity is not None else get_entity_registry().default
+
+
+def current_entity_name() -> Optional[str]:
+    return current_entity().name
+
+
+def partition() -> Optional[str]:
+    """Key of the current entity's stored trades and caches (None when they are shared).
+
+    Raises UnknownEntity when they are kept apart but there is no current
+    entity, so that reads are never left unfiltered.
+    """
+    if not get_entity_registry().isolated:
+        return None
+    name = current_entity().name
+    if name is None:
+        raise UnknownEntity(name)
+    return name
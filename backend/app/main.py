@@ -1,9 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
+from app.api.compression import CompressionMiddleware
+from app.api.responses import FastJSONResponse
 from core_logging.client import LogClient, EventType
 
-app = FastAPI(title="FX Snipper")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Services import this module, so they are only imported once it has loaded
+    from app.services.portfolio_service import shutdown_pool
+    shutdown_pool()
+
+app = FastAPI(title="FX Snipper", default_response_class=FastJSONResponse, lifespan=lifespan)
+
+# Initialize the Core Logging client
+logger = LogClient(
+    app_name="FX Snipper",
+    api_url="http://localhost:8001/api/",
+    default_source="FX Snipper"
+)
+
+# Inside CORS, so browsers can read its 429s (and the 400s of unknown entities)
+from app.api.admission import AdmissionMiddleware
+app.add_middleware(AdmissionMiddleware)
+
+# Around admission, whose per-user limits are per entity
+from app.api.tenancy import EntityMiddleware
+app.add_middleware(EntityMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,17 +36,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id", "X-Profile-Status", "X-Queue-Wait-Ms", "Retry-After"],
 )
 
-# Initialize the Core Logging client
-logger = LogClient(
-    app_name="FX Snipper",
-    api_url="http://localhost:8001/api/",
-    default_source="FX Snipper"
-)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# Outermost middleware, so a profile covers compression and body parsing too
+from app.api.profiling import ProfilingMiddleware
+app.add_middleware(ProfilingMiddleware, mode=settings.PROFILING)
 
 # Import routers
-from app.api.endpoints import fx
+from app.api.endpoints import fx, trades, portfolio, swaps, snips
 
 # Include routers
-app.include_router(fx.router, prefix="/api", tags=["fx"])
\ No newline at end of file
+app.include_router(fx.router, prefix="/api", tags=["fx"])
+app.include_router(trades.router, prefix="/api", tags=["trades"])
+app.include_router(portfolio.router, prefix="/api", tags=["portfolio"])
+app.include_router(swaps.router, prefix="/api", tags=["swaps"])
+app.include_router(snips.router, prefix="/api", tags=["snips"])
@@ -0,0 +1,313 @@
+# backend/app/schemas/trade_summary.py
+"""Typed TradeSummary of an extraction, validated straight from the provider's text.
+
+``parse_extraction`` runs the raw model output through a pydantic-core
+validator compiled once at import (no ``json.loads`` and dict walking),
+picks the FX or swap shape from the keys present and normalizes the
+free-text values on the way in:
+
+- amounts: "5MM", "2.5bn", "USD 500K", "1,000,000" -> float
+- dates: DD-MM-YYYY, ISO or "/"-separated -> DD-MM-YYYY
+- start lags: "T+2", "2 days" -> 2
+- "Not Mentioned", "N/A", "", null -> "Not Mentioned"
+
+Keys the models do not declare (optional leg terms such as "Coupon
+Frequency" or "Spread") are kept as they came. Invalid output raises a
+``ValidationError`` listing every bad field, in microseconds, which
+``correction_prompt`` turns into a targeted retry. ``consistency_errors``
+adds the cross-field checks that small-model answers must also pass (see
+app.services.cascade).
+"""
+import re
+from datetime import date
+from typing import Annotated, Any, Dict, List, Optional, Union
+
+from pydantic import (
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    Discriminator,
+    Field,
+    PlainSerializer,
+    Tag,
+    TypeAdapter,
+    ValidationError,
+    model_validator
+)
+
+from app.swap_calculator.terms import (
+    NOT_MENTIONED,
+    format_date,
+    is_missing,
+    maturity_term,
+    parse_amount,
+    parse_date,
+    parse_number
+)
+
+_CURRENCY = re.compile(r"^[A-Z]{3}$")
+_START_LAG = re.compile(r"^(?:t ?\+? ?)?(\d+)(?: ?(?:d|days?|bd|business days?|dias?|días?))?$", re.IGNORECASE)
+_DIRECTIONS = {"buy": "Buy", "buys": "Buy", "bid": "Buy", "compra": "Buy", "sell": "Sell", "sells": "Sell", "offer": "Sell", "venta": "Sell"}
+_LEG_TYPES = {"fixed": "Fixed", "fija": "Fixed", "floating": "Floating", "float": "Floating", "variable": "Floating", "flotante": "Floating"}
+
+
+def _optional(parse):
+    """Before-validator mapping the "Not Mentioned" spellings to None and parsing the rest."""
+    def validate(value: Any) -> Any:
+        return None if is_missing(value) else parse(value)
+    return BeforeValidator(validate)
+
+
+def _required(parse):
+    def validate(value: Any) -> Any:
+        if is_missing(value):
+            raise ValueError(f"is required (got {value!r})")
+        return parse(value)
+    return BeforeValidator(validate)
+
+
+def _or_not_mentioned(value: Any) -> Any:
+    return NOT_MENTIONED if value is None else value
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        raise ValueError("must be text")
+    return str(value).strip()
+
+
+def _rate(value: Any) -> Union[float, str]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _text(value)
+
+
+def _amount(value: Any) -> float:
+    amount = parse_amount(value)
+    if amount is None:
+        raise ValueError(f"invalid amount {value!r}")
+    return amount
+
+
+def _number(value: Any) -> float:
+    number = parse_number(value)
+    if number is None:
+        raise ValueError(f"invalid number {value!r}")
+    return number
+
+
+def _date(value: Any) -> date:
+    parsed = parse_date(str(value).strip())
+    if parsed is None:
+        raise ValueError(f"invalid date {value!r}, expected DD-MM-YYYY")
+    return parsed
+
+
+def _currency(value: Any) -> str:
+    currency = str(value).strip().upper()
+    if not _CURRENCY.match(currency):
+        raise ValueError(f"invalid currency {value!r}, expected an ISO code")
+    return currency
+
+
+def _start_lag(value: Any) -> int:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    match = _START_LAG.match(str(value).strip())
+    if not match:
+        raise ValueError(f"invalid start lag {value!r}, expected a number of days")
+    return int(match.group(1))
+
+
+def _swap_start_lag(value: Any) -> int:
+    # The extraction prompt defaults a missing start lag to T+0
+    return 0 if is_missing(value) else _start_lag(value)
+
+
+def _maturity(value: Any) -> str:
+    text = str(value).strip()
+    if text.lower() == "spot":
+        return text
+    term = maturity_term(text)
+    if term is None:
+        raise ValueError(f"invalid maturity {value!r}, expected DD-MM-YYYY or a tenor")
+    return format_date(term) if isinstance(term, date) else text
+
+
+def _direction(value: Any) -> str:
+    direction = _DIRECTIONS.get(str(value).strip().lower())
+    if direction is None:
+        raise ValueError(f"invalid direction {value!r}, expected Buy or Sell")
+    return direction
+
+
+def _leg_type(value: Any) -> str:
+    leg_type = _LEG_TYPES.get(str(value).strip().lower())
+    if leg_type is None:
+        raise ValueError(f"invalid leg type {value!r}, expected Fixed or Floating")
+    return leg_type
+
+
+Text = Annotated[Optional[str], _optional(_text), PlainSerializer(_or_not_mentioned)]
+Amount = Annotated[Optional[float], _optional(_amount), PlainSerializer(_or_not_mentioned)]
+Price = Annotated[Optional[float], _optional(_number), PlainSerializer(_or_not_mentioned)]
+StartLag = Annotated[Optional[int], _optional(_start_lag), PlainSerializer(_or_not_mentioned)]
+Maturity = Annotated[Optional[str], _optional(_maturity), PlainSerializer(_or_not_mentioned)]
+Direction = Annotated[Optional[str], _optional(_direction), PlainSerializer(_or_not_mentioned)]
+TradeDate = Annotated[date, _required(_date), PlainSerializer(format_date)]
+Currency = Annotated[str, _required(_currency)]
+
+
+class _Summary(BaseModel):
+    # Undeclared keys are kept, so optional terms survive the round trip
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+
+class Party(_Summary):
+    name: Text = Field(None, alias="Name")
+    company: Text = Field(None, alias="Company")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _company_only(cls, value: Any) -> Any:
+        # "Price Maker": "Bank A" instead of {"Name": ..., "Company": ...}
+        if isinstance(value, str):
+            return {"Company": value}
+        return value
+
+
+class FXPrices(_Summary):
+    spot_price: Price = Field(None, alias="Spot Price")
+    forward_price: Price = Field(None, alias="Forward Price")
+
+
+class FXTradeSummary(_Summary):
+    currency1: Currency = Field(alias="Currency 1")
+    currency2: Currency = Field(alias="Currency 2")
+    direction: Direction = Field(None, alias="Direction")
+    trade_date: TradeDate = Field(alias="Trade Date")
+    start_lag: StartLag = Field(None, alias="Start Lag")
+    maturity: Maturity = Field(None, alias="Maturity")
+    notional_amount: Amount = Field(None, alias="Notional Amount")
+    price_maker: Party = Field(default_factory=Party, alias="Price Maker")
+    price_taker: Party = Field(default_factory=Party, alias="Price Taker")
+    prices: FXPrices = Field(default_factory=FXPrices, alias="Prices")
+
+
+class SwapLeg(_Summary):
+    leg_type: Annotated[str, _required(_leg_type)] = Field(alias="Leg Type")
+    # A fixed rate ("5.25%", 5.25) or a floating index name ("ICP", "SOFR")
+    rate: Annotated[Union[float, str], _required(_rate)] = Field(alias="Rate")
+    company: Text = Field(None, alias="Company")
+    leg_currency: Currency = Field(alias="Leg Currency")
+    notional_amount: Annotated[float, _required(_amount)] = Field(alias="Notional Amount")
+    date_basis: Annotated[str, _required(_text)] = Field(alias="Date Basis")
+    business_date_adjustment: Annotated[str, _required(_text)] = Field(alias="Business Date Adjustment")
+
+
+class SwapTradeSummary(_Summary):
+    trade_date: TradeDate = Field(alias="Trade Date")
+    start_lag: Annotated[int, BeforeValidator(_swap_start_lag)] = Field(0, alias="Start Lag")
+    maturity: Annotated[str, _required(_maturity)] = Field(alias="Maturity")
+    price_maker: Any = Field(NOT_MENTIONED, alias="Price Maker")
+    price_taker: Any = Field(NOT_MENTIONED, alias="Price Taker")
+    accepted_price: Any = Field(NOT_MENTIONED, alias="Accepted Price")
+    accepted_side: Any = Field(NOT_MENTIONED, alias="Accepted Side")
+    leg1: SwapLeg = Field(alias="Leg 1 Payer")
+    leg2: SwapLeg = Field(alias="Leg 2 Payer")
+
+
+class FXTrade(_Summary):
+    trade_summary: FXTradeSummary = Field(alias="TradeSummary")
+
+
+class SwapTrade(_Summary):
+    trade_summary: SwapTradeSummary = Field(alias="TradeSummary")
+
+
+def _trade_kind(value: Any) -> Optional[str]:
+    summary = value.get("TradeSummary") if isinstance(value, dict) else getattr(value, "trade_summary", None)
+    if isinstance(summary, SwapTradeSummary) or (isinstance(summary, dict) and "Leg 1 Payer" in summary):
+        return "swap"
+    return "fx"
+
+
+_EXTRACTION = TypeAdapter(Annotated[
+    Union[Annotated[FXTrade, Tag("fx")], Annotated[SwapTrade, Tag("swap")]],
+    Discriminator(_trade_kind)
+])
+
+
+def _strip_fences(raw: str) -> str:
+    """Drop the ```json fences some models put around their answer despite the prompt."""
+    text = raw.strip()
+    if text.startswith("```"):
+        text = text.partition("\n")[2]
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text
+
+
+def parse_extraction(raw: Union[str, bytes]) -> Dict[str, Any]:
+    """Validated, normalized trade JSON (``{"TradeSummary": {...}}``) from a provider's raw output.
+
+    Raises pydantic's ValidationError when the output is not JSON or does
+    not have a valid FX or swap TradeSummary.
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", "replace")
+    trade = _EXTRACTION.validate_json(_strip_fences(raw))
+    return trade.model_dump(mode="json", by_alias=True)
+
+
+def validation_errors(error: ValidationError) -> List[str]:
+    """One "<field path>: <problem>" line per invalid field, in the trade JSON's own key names."""
+    lines = []
+    for item in error.errors(include_url=False):
+        loc = [str(part) for part in item["loc"] if part not in ("fx", "swap")]
+        message = item["msg"].removeprefix("Value error, ")
+        lines.append(f"{'.'.join(loc) or 'output'}: {message}")
+    return lines
+
+
+def consistency_errors(trade: Dict[str, Any], max_forward_gap: float) -> List[str]:
+    """Cross-field problems of a ``parse_extraction`` result, in ``validation_errors``' format.
+
+    A maturity date must fall after the trade date, and a quoted forward
+    price within ``max_forward_gap`` (relative) of the spot price; a larger
+    gap usually means the forward points were read as the price.
+    """
+    summary = trade["TradeSummary"]
+    errors = []
+    term = maturity_term(summary["Maturity"]) if not is_missing(summary.get("Maturity")) else None
+    if isinstance(term, date) and term <= parse_date(summary["Trade Date"]):
+        errors.append(f"TradeSummary.Maturity: {summary['Maturity']} is not after the trade date {summary['Trade Date']}")
+    prices = summary.get("Prices")
+    if isinstance(prices, dict):
+        spot, forward = prices.get("Spot Price"), prices.get("Forward Price")
+        if isinstance(spot, float) and isinstance(forward, float):
+            if spot <= 0 or forward <= 0:
+                errors.append("TradeSummary.Prices: spot and forward prices must be positive")
+            elif abs(forward / spot - 1) > max_forward_gap:
+                errors.append(
+                    f"TradeSummary.Prices.Forward Price: {forward:g} is {abs(forward / spot - 1):.0%} away "
+                    f"from the spot price {spot:g}"
+                )
+    return errors
+
+
+def correction_prompt(raw: str, errors: List[str]) -> str:
+    """Follow-up instructions asking the model to fix only the fields that failed validation."""
+    problems = "\n        ".join(f"- {line}" for line in errors)
+    return f"""
+
+        Your previous answer was:
+
+        {raw.strip()[:4000]}
+
+        It was rejected because of these fields:
+        {problems}
+
+        Return the complete JSON again with these fields corrected, keeping every other field as it was.
+        Use "Not Mentioned" for anything the chat does not state. Return only the JSON, without markdown.
+        """
@@ -1,5 +1,5 @@
-import os
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
 import logging
 import json
@@ -9,14 +9,58 @@ import google.generativeai as gemini
 from PIL import Image
 import base64
 import io
+import time
 
 from app.config import settings
 from app.main import logger
 from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+from app.services.provider_router import get_provider_router
 from core_ai_cost import AICostCalculator, AIProvider
 
-# Get parameters from environment variables
-my_entity = os.environ.get('MY_ENTITY')
+# Model behind each provider's process_text
+TEXT_MODELS = {
+    "OpenAI": "gpt-4o-2024-11-20",
+    "Anthropic": "claude-3-7-sonnet-20250219",
+    "Google": "gemini-1.5-pro"
+}
+# Default small model of each provider for the model cascade (CASCADE_MODELS, app/services/cascade.py)
+SMALL_TEXT_MODELS = {
+    "OpenAI": "gpt-4o-mini",
+    "Anthropic": "claude-3-5-haiku-20241022",
+    "Google": "gemini-1.5-flash"
+}
+# ai_provider value that lets the provider router choose
+AUTO_PROVIDER = "auto"
+# Model names core_ai_cost prices under, where they differ from the API's
+COST_MODEL_NAMES = {
+    "claude-3-7-sonnet-20250219": "claude-3.7-sonnet",
+    "claude-3-5-haiku-20241022": "claude-3.5-haiku"
+}
+# Appended to a small model's prompt; the cascade escalates answers below CASCADE_MIN_CONFIDENCE
+CONFIDENCE_PROMPT = """
+
+        Next to "TradeSummary", add a top-level "Confidence" key: a number between 0 and 1 saying how
+        sure you are that every field is right. Use a low value when the chat is ambiguous or a field
+        had to be guessed.
+        """
+
+
+@lru_cache(maxsize=8)
+def _parse_cascade_models(spec: str) -> Dict[str, str]:
+    models = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        provider, _, model = (part.strip() for part in item.partition("="))
+        if provider not in TEXT_MODELS:
+            raise ValueError(f"Unknown AI provider in CASCADE_MODELS: {provider}")
+        models[provider] = model or SMALL_TEXT_MODELS[provider]
+    return models
+
+
+def cascade_models() -> Dict[str, str]:
+    """Small model of every provider with a cascade, from CASCADE_MODELS."""
+    return _parse_cascade_models(settings.CASCADE_MODELS)
+
 
 class AIService:
     def __init__(self):
@@ -27,6 +71,10 @@ class AIService:
         self.user_name = None
         self.user_entity = None
         self.person_company_pairs = []
+
+        # Provider, model, timing and cost of the most recent process_text call
+        self.last_usage = {}
+        self._last_sample = None
         
         # Initialize clients
         if self.openai_api_key:
@@ -55,6 +103,32 @@ class AIService:
     def update_person_company_pairs(self, pairs: List[Dict[str, str]]):
         """Update the person-company pairs mapping."""
         self.person_company_pairs = pairs
+
+    def _record_usage(self, provider: str, model: str, duration_ms: int, cost_data: Any):
+        """Remember provider, model, latency and cost of the last extraction call."""
+        cost = None
+        if isinstance(cost_data, dict):
+            cost = cost_data.get("total_cost")
+        self.last_usage = {
+            "provider": provider,
+            "model": model,
+            "duration_ms": duration_ms,
+            "cost": cost
+        }
+
+    def report_invalid(self):
+        """Count the last process_text answer as a failed extraction (it did not validate)."""
+        if self._last_sample is not None:
+            self._last_sample.ok = False
+
+    def available_providers(self) -> Dict[str, str]:
+        """Text model of every provider with credentials, for routing."""
+        configured = {
+            "OpenAI": self.openai_client is not None,
+            "Anthropic": self.anthropic_client is not None,
+            "Google": bool(self.google_api_key)
+        }
+        return {provider: model for provider, model in TEXT_MODELS.items() if configured[provider]}
     
     def extract_text(self, image_input: str) -> str:
         """Extract text from an image using OpenAI's Vision API."""
@@ -67,7 +141,7 @@ class AIService:
                 event_type=EventType.SYSTEM_EVENT,
                 user_id=self.user_name,
                 tags=["api", "extract", "error", "config"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             raise ValueError("OpenAI API key is not set")
 
@@ -77,7 +151,7 @@ class AIService:
                 event_type=EventType.SYSTEM_EVENT,
                 user_id=self.user_name,
                 tags=["api", "extract", "image"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             
             # If image_input is already base64, use it directly
@@ -88,7 +162,7 @@ class AIService:
                     "Invalid image format provided",
                     event_type=EventType.SYSTEM_EVENT,
                     user_id=self.user_name,
-                    entity=my_entity,
+                    entity=current_entity_name(),
                     tags=["api", "extract", "error", "format"]
                 )
                 raise ValueError("Invalid image input format")
@@ -140,7 +214,7 @@ class AIService:
                 output_tokens=output_tokens,
                 log_cost=True,
                 user_id=self.user_name,
-                entity=my_entity,
+                entity=current_entity_name(),
                 context={
                     "request_id": request_id,
                     "duration_ms": str(execution_time_ms),
@@ -156,7 +230,7 @@ class AIService:
                 "Successfully extracted text from image",
                 event_type=EventType.SYSTEM_EVENT,
                 user_id=self.user_name,
-                entity=my_entity,
+                entity=current_entity_name(),
                 data={"text_length": len(response.choices[0].message.content)},
                 tags=["api", "extract", "success"]
             )
@@ -168,7 +242,7 @@ class AIService:
                 e,
                 message="Failed to extract text from image",
                 user_id=self.user_name,
-                entity=my_entity,
+                entity=current_entity_name(),
                 level=LogLevel.ERROR,
                 tags=["api", "extract", "error"]
             )
@@ -181,7 +255,7 @@ class AIService:
                 "User name and entity must be set before processing text",
                 event_type=EventType.SYSTEM_EVENT,
                 tags=["api", "prompt", "error", "config"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             raise ValueError("User name and entity must be set before processing text")
 
@@ -265,18 +339,67 @@ class AIService:
         DO NOT include any markdown in the JSON output, such as ```json or ```
         """
     
-    def process_text(self, extracted_text: str, ai_provider: str = "OpenAI") -> str:
-        """Process the extracted text to generate structured JSON output."""
+    def process_text(
+        self,
+        extracted_text: str,
+        ai_provider: str = "OpenAI",
+        correction: Optional[str] = None,
+        cascade: bool = False
+    ) -> str:
+        """Process the extracted text to generate structured JSON output.
+
+        ``correction`` is appended to the prompt when retrying an answer
+        that failed validation (see app.schemas.trade_summary.correction_prompt).
+        With ``ai_provider="auto"`` the provider router picks the provider,
+        and the next best one is tried when it fails. With ``cascade`` a
+        provider listed in CASCADE_MODELS answers with its small model, with
+        JSON-constrained output and a self-reported confidence
+        (see app.services.cascade).
+        """
+        small_models = cascade_models() if cascade else {}
+        if ai_provider != AUTO_PROVIDER:
+            return self._process_with(extracted_text, ai_provider, correction, small_models.get(ai_provider))
+        ranked = get_provider_router().choose(self.available_providers(), self.user_name)
+        for attempt, provider in enumerate(ranked[:max(settings.ROUTING_ATTEMPTS, 1)]):
+            try:
+                return self._process_with(extracted_text, provider, correction, small_models.get(provider))
+            except Exception as e:
+                error = e
+                if attempt + 1 < min(len(ranked), settings.ROUTING_ATTEMPTS):
+                    logger.warning(
+                        f"{provider} failed, trying {ranked[attempt + 1]}",
+                        event_type=EventType.TRANSACTION,
+                        user_id=self.user_name,
+                        entity=current_entity_name(),
+                        tags=["ai", "routing", "fallback"]
+                    )
+        raise error
+
+    def _process_with(
+        self,
+        extracted_text: str,
+        ai_provider: str,
+        correction: Optional[str],
+        small_model: Optional[str] = None
+    ) -> str:
+        model_name = small_model or TEXT_MODELS.get(ai_provider)
         EXTRACTION_PROMPT = self.get_extraction_prompt(extracted_text)
+        if correction:
+            EXTRACTION_PROMPT += correction
+        if small_model:
+            EXTRACTION_PROMPT += CONFIDENCE_PROMPT
         request_id = f"req-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        self.last_usage = {}
+        self._last_sample = None
+        call_started = time.perf_counter()
 
         try:
             logger.info(
                 f"Processing text with {ai_provider} AI",
                 event_type=EventType.TRANSACTION,
                 user_id=self.user_name,
-                entity=my_entity,
-                data={"text_length": len(extracted_text)},
+                entity=current_entity_name(),
+                data={"text_length": len(extracted_text), "retry": bool(correction), "model": model_name},
                 tags=["ai", "process", ai_provider.lower()]
             )
             
@@ -286,14 +409,16 @@ class AIService:
                         "OpenAI API key is not set",
                         event_type=EventType.SYSTEM_EVENT,
                         user_id=self.user_name,
-                        entity=my_entity,
+                        entity=current_entity_name(),
                         tags=["ai", "process", "error", "config"]
                     )
                     raise ValueError("OpenAI API key is not set.")
 
                 # Capture start time for performance tracking
                 start_time = datetime.utcnow()
-                model = "gpt-4o-2024-11-20"
+                model = model_name
+                # Small models are held to a JSON object; the large one keeps its free-text answer
+                json_mode = {"response_format": {"type": "json_object"}} if small_model else {}
 
                 response = self.openai_client.chat.completions.create(
                     model=model,
@@ -308,7 +433,8 @@ class AIService:
                         }
                     ],
                     max_tokens=1000,
-                    temperature=0
+                    temperature=0,
+                    **json_mode
                 )
                 
                 # Calculate execution time
@@ -327,7 +453,7 @@ class AIService:
                     output_tokens=output_tokens,
                     log_cost=True,
                     user_id=self.user_name,
-                    entity=my_entity,
+                    entity=current_entity_name(),
                     context={
                         "request_id": request_id,
                         "duration_ms": str(execution_time_ms),
@@ -337,6 +463,7 @@ class AIService:
                     },
                     tags=["ai-cost", "openai", "gpt4o", "extraction"]
                 )
+                self._record_usage("OpenAI", model, execution_time_ms, cost_data)
 
                 result = response.choices[0].message.content
 
@@ -346,7 +473,7 @@ class AIService:
                         "Anthropic API key is not set",
                         event_type=EventType.SYSTEM_EVENT,
                         user_id=self.user_name,
-                        entity=my_entity,
+                        entity=current_entity_name(),
                         tags=["ai", "process", "error", "config"]
                     )
                     raise ValueError("Anthropic API key is not set.")
@@ -354,13 +481,17 @@ class AIService:
                 # Capture start time for performance tracking
                 start_time = datetime.utcnow()
 
+                messages = [{
+                    "role": "user",
+                    "content": EXTRACTION_PROMPT
+                }]
+                if small_model:
+                    # Anthropic has no JSON mode: start the answer as a JSON object instead
+                    messages.append({"role": "assistant", "content": "{"})
                 response = self.anthropic_client.messages.create(
-                    model="claude-3-7-sonnet-20250219",
+                    model=model_name,
                     system="You are an expert in interpreting Bloomberg chat messages between FX traders. You will study chat snippets and extract the key trade details from the chat, in JSON format. Do not put Markdown around the extracted JSON. Only provide the JSON itself, I don't want any complementary text at all.",
-                    messages=[{
-                        "role": "user",
-                        "content": EXTRACTION_PROMPT
-                    }],
+                    messages=messages,
                     max_tokens=2000,
                     temperature=0
                 )
@@ -376,23 +507,24 @@ class AIService:
                 # Calculate cost using our calculator
                 cost_data = self.cost_calculator.calculate_cost(
                     provider=AIProvider.ANTHROPIC,
-                    model_name="claude-3.7-sonnet",
+                    model_name=COST_MODEL_NAMES.get(model_name, model_name),
                     input_tokens=input_tokens,
                     output_tokens=output_tokens,
                     log_cost=True,  # The calculator will log the cost
                     user_id=self.user_name,
-                    entity=my_entity,  # Pass entity for proper logging
+                    entity=current_entity_name(),  # Pass entity for proper logging
                     context={
                         "request_id": request_id,
                         "duration_ms": execution_time_ms,
                         "text_length": len(extracted_text),
                         "ai_provider": "Anthropic",
-                        "model": "claude-3-7-sonnet-20250219"
+                        "model": model_name
                     },
                     tags=["ai-cost", "anthropic", "claude", "extraction"]
                 )
+                self._record_usage("Anthropic", model_name, execution_time_ms, cost_data)
                 
-                result = response.content[0].text
+                result = ("{" if small_model else "") + response.content[0].text
             
             elif ai_provider == "Google":
                 if not self.google_api_key:
@@ -400,7 +532,7 @@ class AIService:
                         "Google API key is not set",
                         event_type=EventType.SYSTEM_EVENT,
                         user_id=self.user_name,
-                        entity=my_entity,
+                        entity=current_entity_name(),
                         tags=["ai", "process", "error", "config"]
                     )
                     raise ValueError("Google API key is not set")
@@ -414,11 +546,11 @@ class AIService:
                         "top_p": 1,
                         "top_k": 1,
                         "max_output_tokens": 1000,
-                        "response_mime_type": "text/plain",
+                        "response_mime_type": "application/json" if small_model else "text/plain",
                     }
                     
                     model = gemini.GenerativeModel(
-                        model_name="gemini-1.5-pro",
+                        model_name=model_name,
                         generation_config=generation_config,
                         system_instruction="You are an expert in interpreting Bloomberg chat messages between FX traders. You will study chat snippets and extract the key trade details from the chat, in JSON format. Do not put Markdown around the extracted JSON. Only provide the JSON itself, I don't want any complementary text at all, or markdown."
                     )
@@ -441,22 +573,23 @@ class AIService:
                     # Calculate cost
                     cost_data = self.cost_calculator.calculate_cost(
                         provider=AIProvider.GOOGLE,
-                        model_name="gemini-1.5-pro",
+                        model_name=model_name,
                         input_tokens=estimated_input_tokens,
                         output_tokens=estimated_output_tokens,
                         log_cost=True,
                         user_id=self.user_name,
-                        entity=my_entity,
+                        entity=current_entity_name(),
                         context={
                             "request_id": request_id,
                             "duration_ms": str(execution_time_ms),
                             "text_length": str(len(extracted_text)),
                             "ai_provider": "Google",
-                            "model": "gemini-1.5-pro",
+                            "model": model_name,
                             "estimated_tokens": "true"  # Flag that tokens are estimated
                         },
                         tags=["ai-cost", "google", "gemini", "extraction"]
                     )
+                    self._record_usage("Google", model_name, execution_time_ms, cost_data)
 
                     result = response.text
                     
@@ -465,7 +598,7 @@ class AIService:
                         e,
                         message=f"Error with Google API during processing",
                         user_id=self.user_name,
-                        entity=my_,
+                        entity=current_entity_name(),
                         level=LogLevel.ERROR,
                         tags=["ai", "process", "error", "google"]
                     )
@@ -476,7 +609,7 @@ class AIService:
                     f"Invalid AI provider specified: {ai_provider}",
                     event_type=EventType.SYSTEM_EVENT,
                     user_id=self.user_name,
-                    entity=my_entity,
+                    entity=current_entity_name(),
                     tags=["ai", "process", "error", "config"]
                 )
                 raise ValueError("Invalid AIProvider specified. Use 'OpenAI', 'Anthropic' or 'Google'.")
@@ -485,19 +618,29 @@ class AIService:
                 f"Successfully processed text with {ai_provider}",
                 event_type=EventType.TRANSACTION,
                 user_id=self.user_name,
-                entity=my_entity,
+                entity=current_entity_name(),
                 data={"result": result},
                 tags=["ai", "process", "success", ai_provider.lower()]
             )
-            
+
+            # Counted as a success only now that nothing can fail any more;
+            # the except below counts failures, so each call is recorded once
+            usage = self.last_usage
+            self._last_sample = get_provider_router().record(
+                usage["provider"], usage["model"], usage["duration_ms"], usage["cost"], ok=True
+            )
             return result
 
         except Exception as e:
+            if model_name:
+                get_provider_router().record(
+                    ai_provider, model_name, (time.perf_counter() - call_started) * 1000, None, ok=False
+                )
             logger.log_exception(
                 e,
                 message=f"Error processing text with {ai_provider} API",
                 user_id=self.user_name,
-                entity=my_entity,
+                entity=current_entity_name(),
                 level=LogLevel.ERROR,
                 tags=["ai", "process", "error"]
             )
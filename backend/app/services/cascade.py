@@ -0,0 +1,177 @@
+"""Model cascade: a provider's small model first, its large model only when needed.
+
+For a provider listed in ``CASCADE_MODELS`` the extraction first goes to
+its small model (``SMALL_TEXT_MODELS`` unless configured otherwise), asked
+for JSON-constrained output and a self-reported "Confidence". The answer
+is kept when it
+
+- validates as a TradeSummary (required fields and their formats),
+- passes ``consistency_errors`` (maturity after the trade date, forward
+  price within ``CASCADE_MAX_FORWARD_GAP`` of spot), and
+- reports a confidence of at least ``CASCADE_MIN_CONFIDENCE``;
+
+otherwise, or when the small model fails, the extraction escalates to the
+provider's large model and carries on as without a cascade. A rejected
+answer counts as a failure of the small model in the provider router.
+
+``CascadeMetrics`` counts extractions, escalations and their reasons per
+provider, and the latency saved: for every kept answer the large model's
+recent median latency (from the provider router) minus the small model's,
+less the small model's latency on every escalation.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import current_entity_name
+
+from app.schemas.trade_summary import consistency_errors, parse_extraction, validation_errors
+from app.services.ai_service import AUTO_PROVIDER, TEXT_MODELS, AIService, cascade_models
+from app.services.provider_router import get_provider_router
+
+CONFIDENCE_KEY = "Confidence"
+
+
+def check_answer(raw: str) -> Tuple[Optional[Dict[str, Any]], List[str], str]:
+    """(trade JSON, problems, reason) of a small model's answer; it is kept when there are no problems."""
+    try:
+        trade_json = parse_extraction(raw)
+    except ValidationError as e:
+        return None, validation_errors(e), "invalid"
+    confidence = trade_json.pop(CONFIDENCE_KEY, None)
+    problems = consistency_errors(trade_json, settings.CASCADE_MAX_FORWARD_GAP)
+    if problems:
+        return None, problems, "inconsistent"
+    if not isinstance(confidence, (int, float)) or isinstance(confidence, bool):
+        return None, [f"{CONFIDENCE_KEY}: missing or not a number ({confidence!r})"], "low_confidence"
+    if confidence < settings.CASCADE_MIN_CONFIDENCE:
+        return None, [f"{CONFIDENCE_KEY}: {confidence:g} is below {settings.CASCADE_MIN_CONFIDENCE:g}"], "low_confidence"
+    return trade_json, [], "accepted"
+
+
+class CascadeMetrics:
+    """Per provider counts of cascaded extractions, escalations and latency saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, provider: str, model: str, reason: str, small_ms: float, large_p50_ms: Optional[float]) -> None:
+        """One cascaded extraction; ``large_p50_ms`` is the large model's recent median, if known."""
+        with self._lock:
+            counts = self._providers.get(provider)
+            if counts is None:
+                counts = self._providers[provider] = {
+                    "model": model, "extractions": 0, "escalations": 0, "reasons": {},
+                    "small_ms": 0.0, "saved_ms": 0.0, "unestimated": 0
+                }
+            counts["model"] = model
+            counts["extractions"] += 1
+            counts["small_ms"] += small_ms
+            if reason != "accepted":
+                counts["escalations"] += 1
+                counts["reasons"][reason] = counts["reasons"].get(reason, 0) + 1
+                # The small model's call was wasted time
+                counts["saved_ms"] -= small_ms
+            elif large_p50_ms is None:
+                counts["unestimated"] += 1
+            else:
+                counts["saved_ms"] += large_p50_ms - small_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {provider: dict(counts, reasons=dict(counts["reasons"])) for provider, counts in self._providers.items()}
+        return {
+            provider: {
+                "model": counts["model"],
+                "extractions": counts["extractions"],
+                "escalations": counts["escalations"],
+                "escalation_rate": round(counts["escalations"] / counts["extractions"], 4),
+                "reasons": counts["reasons"],
+                "small_mean_ms": round(counts["small_ms"] / counts["extractions"], 1),
+                "latency_saved_ms": round(counts["saved_ms"], 1),
+                "latency_saved_per_extraction_ms": round(counts["saved_ms"] / counts["extractions"], 1),
+                # Kept answers before the large model had recent calls to compare with
+                "unestimated": counts["unestimated"]
+            }
+            for provider, counts in providers.items()
+        }
+
+
+_metrics: Optional[CascadeMetrics] = None
+
+
+def get_cascade_metrics() -> CascadeMetrics:
+    """Return the process-wide cascade metrics, creating them on first use."""
+    global _metrics
+    if _metrics is None:
+        _metrics = CascadeMetrics()
+    return _metrics
+
+
+def cascade_extract(
+    service: AIService,
+    extracted_text: str,
+    ai_provider: str,
+    on_stage: Optional[Callable[[str, float], None]] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], List[Dict[str, Any]]]:
+    """The first answer of an extraction, through the cascade when the provider has one.
+
+    Returns ``(trade JSON, None, usages)`` when a small model's answer is
+    kept, else ``(None, the large model's raw answer, usages)`` for the
+    usual validation and retries. ``on_stage("escalating", ...)`` is called
+    before the large model is asked, so a cancelled extraction stops there.
+    """
+    small_models = cascade_models()
+    if not small_models or (ai_provider != AUTO_PROVIDER and ai_provider not in small_models):
+        raw = service.process_text(extracted_text, ai_provider)
+        return None, raw, [service.last_usage]
+
+    usages = []
+    started = time.perf_counter()
+    try:
+        raw = service.process_text(extracted_text, ai_provider, cascade=True)
+    except Exception as e:
+        # Escalate to the large model of the same provider ("auto" routes again)
+        provider, model = ai_provider, small_models.get(ai_provider)
+        problems, reason = [str(e)], "error"
+    else:
+        usage = service.last_usage
+        usages.append(usage)
+        provider, model = usage.get("provider", ai_provider), usage.get("model")
+        if model != small_models.get(provider):
+            # "auto" routed to a provider without a cascade: this is the large model's answer
+            return None, raw, usages
+        trade_json, problems, reason = check_answer(raw)
+        if trade_json is None:
+            service.report_invalid()
+    small_ms = usages[0].get("duration_ms", 0) if usages else (time.perf_counter() - started) * 1000
+
+    large_p50_ms = None
+    if provider in TEXT_MODELS:
+        summary = get_provider_router().summary(provider, TEXT_MODELS[provider])
+        if summary and summary["samples"]:
+            large_p50_ms = summary["p50_ms"]
+    if model:
+        get_cascade_metrics().record(provider, model, reason, small_ms, large_p50_ms)
+    if reason == "accepted":
+        return trade_json, None, usages
+
+    logger.warning(
+        f"Escalating extraction from {model or provider} to the large model: {reason}",
+        event_type=EventType.TRANSACTION,
+        user_id=service.user_name,
+        entity=current_entity_name(),
+        data={"provider": provider, "model": model, "problems": problems, "small_ms": small_ms},
+        tags=["ai", "cascade", "escalation", reason]
+    )
+    if on_stage is not None:
+        on_stage("escalating", 0.5)
+    raw = service.process_text(extracted_text, provider)
+    usages.append(service.last_usage)
+    return None, raw, usages
@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+from app.api.responses import dumps
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import current_entity, current_entity_name, partition
+from app.services.repricing_service import TradeNotFound
+from app.services.swap_service import SwapParamTransformer, create_swap_cashflows, load_ql_parameters, transform_output
+from app.services.trade_store import get_trade_store
+from app.swap_calculator.curves import curve_version, get_curve
+from app.swap_calculator.fixings import fixings_version, get_fixings
+
+
+def _market_version() -> Tuple[int, int]:
+    return curve_version(), fixings_version()
+
+
+class _CachedCashflows:
+    """Serialized cashflow output of one trade and the market data it was priced with."""
+
+    __slots__ = ("body", "index", "curve", "fixings", "version")
+
+    def __init__(self, body: bytes, index: Optional[str], curve: Any, fixings: Any, version: Tuple[int, int]):
+        self.body = body
+        self.index = index
+        self.curve = curve
+        self.fixings = fixings
+        # Market data version the entry was last known current at
+        self.version = version
+
+    def is_current(self) -> bool:
+        # A rebuilt index curve or new fixings change the floating coupons; stats their files
+        return get_curve(self.index) is self.curve and get_fixings(self.index) is self.fixings
+
+
+class CashflowService:
+    """Cashflows of stored trades, computed on first request and cached as JSON bytes.
+
+    Extraction only stores the trade; its schedule is priced when someone
+    asks for it, through the same SwapParamTransformer / create_swap_cashflows
+    / transform_output path as a one-off pricing. Concurrent first requests
+    for the same trade share one computation. The cache is an LRU bounded by
+    the size of the serialized outputs. An instance only sees the stored
+    trades of ``tenant`` (all of them for None).
+
+    ``cached`` answers hits without touching the disk, so it can run on the
+    event loop: the market data must not have been reloaded since the entry
+    was priced, and its index's files must have been checked by a worker
+    thread within ``CASHFLOW_MARKET_CHECK_S``.
+    """
+
+    def __init__(self, max_bytes: int, tenant: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.tenant = tenant
+        self._cache: "OrderedDict[int, _CachedCashflows]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        # index -> time.monotonic() of the last check of its curve and fixings files
+        self._checked: Dict[Optional[str], float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, trade_id: int) -> Optional[bytes]:
+        """Cached cashflows of a trade if they are known current without file access, else None."""
+        with self._lock:
+            entry = self._cache.get(trade_id)
+            if entry is None or entry.version != _market_version():
+                return None
+            checked = self._checked.get(entry.index)
+            if checked is None or time.monotonic() - checked > settings.CASHFLOW_MARKET_CHECK_S:
+                return None
+            self._cache.move_to_end(trade_id)
+            self.hits += 1
+        return entry.body
+
+    def lookup(self, trade_id: int) -> Optional[bytes]:
+        """Cached cashflows of a trade, or None when they have to be computed.
+
+        Blocking: checks the index's curve and fixings files.
+        """
+        with self._lock:
+            entry = self._cache.get(trade_id)
+            if entry is not None:
+                self._cache.move_to_end(trade_id)
+        if entry is None:
+            return None
+        version = _market_version()
+        if not entry.is_current():
+            self.invalidate(trade_id)
+            return None
+        with self._lock:
+            entry.version = version
+            self._checked[entry.index] = time.monotonic()
+            self.hits += 1
+        return entry.body
+
+    def get_cashflows(self, trade_id: int) -> Tuple[bytes, bool]:
+        """Serialized cashflows of a stored trade and whether they came from the cache.
+
+        Blocking; call from a worker thread. Raises TradeNotFound for an
+        unknown id, and KeyError/ValueError/TypeError for a trade that is
+        not a swap or cannot be priced.
+        """
+        body = self.lookup(trade_id)
+        if body is not None:
+            return body, True
+
+        with self._lock:
+            pending = self._pending.get(trade_id)
+            if pending is None:
+                future: Future = Future()
+                self._pending[trade_id] = future
+        if pending is not None:
+            # Another request is already pricing this trade
+            return pending.result(), True
+
+        try:
+            body = self._compute(trade_id)
+            future.set_result(body)
+            return body, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[trade_id]
+
+    def _compute(self, trade_id: int) -> bytes:
+        start_time = time.perf_counter()
+        record = get_trade_store().get_trade(trade_id, self.tenant)
+        if record is None:
+            raise TradeNotFound(trade_id)
+        trade_json = record["trade_json"]
+
+        params = load_ql_parameters(SwapParamTransformer().transform_json(trade_json))
+        # Market data as of pricing, so later changes to it are detected
+        index = params["floating_leg"].get("rate")
+        version = _market_version()
+        curve, fixings = get_curve(index), get_fixings(index)
+        checked = time.monotonic()
+        fixed_cashflows, floating_cashflows = create_swap_cashflows(**params)
+        body = dumps(transform_output(trade_json, fixed_cashflows, floating_cashflows))
+        self._put(trade_id, _CachedCashflows(body, index, curve, fixings, version))
+
+        with self._lock:
+            self._checked[index] = checked
+            self.misses += 1
+        logger.info(
+            "Trade cashflows computed",
+            event_type=EventType.SYSTEM_EVENT,
+            data={
+                "trade_id": trade_id,
+                "bytes": len(body),
+                "duration_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                "cache": self.stats()
+            },
+            tags=["swap", "cashflow", "cache"],
+            entity=current_entity_name()
+        )
+        return body
+
+    def _put(self, trade_id: int, entry: _CachedCashflows) -> None:
+        with self._lock:
+            previous = self._cache.pop(trade_id, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            if len(entry.body) > self.max_bytes:
+                return
+            self._cache[trade_id] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def invalidate(self, trade_id: int) -> None:
+        """Drop a trade's cached cashflows (e.g. after it was amended)."""
+        with self._lock:
+            entry = self._cache.pop(trade_id, None)
+            if entry is not None:
+                self._size -= len(entry.body)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "trades": len(self._cache),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_cashflow_services: Dict[Optional[str], CashflowService] = {}
+_services_lock = threading.Lock()
+
+
+def get_cashflow_service() -> CashflowService:
+    """Return the current entity's cashflow service, creating it on first use.
+
+    With several entities each gets its own cache, sized by its
+    ``cashflow_cache_mb``, so one entity's trades never evict another's.
+    """
+    key = partition()
+    service = _cashflow_services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _cashflow_services.get(key)
+            if service is None:
+                service = CashflowService(current_entity().cashflow_cache_mb * 2**20, key)
+                _cashflow_services[key] = service
+    return service
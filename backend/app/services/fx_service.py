@@ -0,0 +1,152 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.swap_calculator.fx import currency_curve, forward_prices, settlement_table, spot_lag
+from app.swap_calculator.terms import format_date, is_missing, parse_date, parse_number
+
+_CURRENCY = re.compile(r"^[A-Z]{3}$")
+
+
+def parse_price(value: Any) -> Optional[float]:
+    """Read an extracted price ("950.25", "950,25", "1,085", "1,234.5"); None when not mentioned.
+
+    A lone comma is the decimal separator, so European-style quotes such as
+    "1,085" are 1.085 and not 1085 (which would fail every forward check).
+    """
+    if is_missing(value):
+        return None
+    price = parse_number(value)
+    if price is None:
+        raise ValueError(f"Invalid price: {value}")
+    return price
+
+
+class FXTerms:
+    """The fields of an FX TradeSummary needed for settlement."""
+
+    __slots__ = ("currency1", "currency2", "trade_date", "start_lag", "maturity", "spot_price", "forward_price")
+
+    def __init__(self, trade_json: Dict[str, Any]):
+        summary = trade_json.get("TradeSummary", trade_json)
+        self.currency1 = self._currency(summary.get("Currency 1"))
+        self.currency2 = self._currency(summary.get("Currency 2"))
+        trade_date = summary.get("Trade Date")
+        self.trade_date = parse_date(str(trade_date).strip())
+        if self.trade_date is None:
+            raise ValueError(f"Invalid trade date: {trade_date}")
+        start_lag = summary.get("Start Lag")
+        if is_missing(start_lag):
+            self.start_lag = None
+        else:
+            match = re.search(r"\d+", str(start_lag))
+            if not match:
+                raise ValueError(f"Invalid start lag: {start_lag}")
+            self.start_lag = int(match.group())
+        maturity = summary.get("Maturity")
+        self.maturity = None if is_missing(maturity) else str(maturity).strip()
+        prices = summary.get("Prices") or {}
+        self.spot_price = parse_price(prices.get("Spot Price"))
+        self.forward_price = parse_price(prices.get("Forward Price"))
+
+    @staticmethod
+    def _currency(value: Any) -> str:
+        currency = str(value or "").strip().upper()
+        if not _CURRENCY.match(currency):
+            raise ValueError(f"Invalid currency: {value}")
+        return currency
+
+
+def _settlement_dates(terms: FXTerms) -> Tuple[Dict[str, Any], int, int]:
+    """Settlement block of one trade, with its spot and value date ordinals."""
+    spot_table = settlement_table(terms.currency1, terms.currency2)
+    spot = spot_table.spot_date(terms.trade_date)
+    if terms.start_lag is None or terms.start_lag == spot_table.lag:
+        start = spot
+    else:
+        start = settlement_table(terms.currency1, terms.currency2, terms.start_lag).spot_date(terms.trade_date)
+    # Tenors run from spot; a trade without a maturity settles on its start date
+    value = spot_table.value_date(spot, terms.maturity) if terms.maturity else start
+    settlement = {
+        "Pair": spot_table.pair,
+        "Spot Lag": spot_lag(terms.currency1, terms.currency2),
+        "Calendar": spot_table.calendar.name,
+        "Spot Date": format_date(spot),
+        "Start Date": format_date(start),
+        "Value Date": format_date(value),
+        "Days": value.toordinal() - spot.toordinal(),
+    }
+    return settlement, spot.toordinal(), value.toordinal()
+
+
+def _forward_check(terms: FXTerms, implied: float, reason: Optional[str]) -> Dict[str, Any]:
+    if reason:
+        return {"Status": "Not Available", "Reason": reason}
+    check = {
+        "Implied Forward": round(implied, 6),
+        "Implied Points": round(implied - terms.spot_price, 6),
+    }
+    if terms.forward_price is None:
+        check["Status"] = "No Quoted Forward"
+        return check
+    difference = terms.forward_price - implied
+    difference_bp = difference / terms.spot_price * 1e4
+    within = abs(difference_bp) <= settings.FX_FORWARD_TOLERANCE_BP
+    check.update({
+        "Quoted Points": round(terms.forward_price - terms.spot_price, 6),
+        "Difference": round(difference, 6),
+        "Difference (bp)": round(difference_bp, 2),
+        "Within Tolerance": within,
+        "Status": "OK" if within else "Outside Tolerance",
+    })
+    return check
+
+
+def settle_fx_trades(trade_jsons: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Settlement dates and forward checks for a batch of FX TradeSummary JSONs.
+
+    Dates come from the memoized per-pair settlement tables; the implied
+    forwards of the whole batch are priced in one vectorized pass. Trades
+    that cannot be read are reported individually.
+    """
+    results: List[Dict[str, Any]] = []
+    rows: List[Tuple[int, FXTerms, Dict[str, Any]]] = []
+    spot_prices, spot_ordinals, value_ordinals, base_curves, quote_curves = [], [], [], [], []
+    curves: Dict[str, Any] = {}
+    for index, trade_json in enumerate(trade_jsons):
+        try:
+            terms = FXTerms(trade_json)
+            settlement, spot_ordinal, value_ordinal = _settlement_dates(terms)
+        except (ValueError, TypeError, AttributeError) as e:
+            results.append({"index": index, "status": "error", "error": str(e)})
+            continue
+        results.append({"index": index, "status": "ok", "settlement": settlement})
+        rows.append((index, terms, settlement))
+        spot_prices.append(terms.spot_price if terms.spot_price is not None else np.nan)
+        spot_ordinals.append(spot_ordinal)
+        value_ordinals.append(value_ordinal)
+        for currency, column in ((terms.currency1, base_curves), (terms.currency2, quote_curves)):
+            if currency not in curves:
+                curves[currency] = currency_curve(currency)
+            column.append(curves[currency])
+
+    implied = forward_prices(spot_prices, spot_ordinals, value_ordinals, base_curves, quote_curves) if rows else []
+    for row, (index, terms, settlement) in enumerate(rows):
+        reason = None
+        if terms.spot_price is None or terms.spot_price <= 0:
+            reason = "No spot price"
+        elif base_curves[row] is None or quote_curves[row] is None:
+            missing = [c for c, curve in ((terms.currency1, base_curves[row]), (terms.currency2, quote_curves[row])) if curve is None]
+            reason = f"No discount curve for {', '.join(missing)}"
+        settlement["Forward Check"] = _forward_check(terms, float(implied[row]), reason)
+    return results
+
+
+def settle_fx_trade(trade_json: Dict[str, Any]) -> Dict[str, Any]:
+    """Settlement block of a single FX TradeSummary; raises ValueError when it cannot be read."""
+    result = settle_fx_trades([trade_json])[0]
+    if result["status"] == "error":
+        raise ValueError(result["error"])
+    return result["settlement"]
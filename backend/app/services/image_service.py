@@ -1,5 +1,4 @@
 import base64
-import os
 import io
 from PIL import Image
 from pathlib import Path
@@ -7,9 +6,7 @@ from typing import Optional, List, Dict
 import logging
 from app.main import logger
 from core_logging.client import EventType, LogLevel
-
-# Get parameters from environment variables
-my_entity = os.environ.get('MY_ENTITY')
+from app.entities import current_entity_name
 
 class ImageService:
     def __init__(self):
@@ -22,7 +19,7 @@ class ImageService:
                 f"Encoding image from path: {image_path}",
                 event_type=EventType.SYSTEM_EVENT,
                 tags=["image", "encode", "file"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             
             path = Path(image_path)
@@ -32,7 +29,7 @@ class ImageService:
                     f"Image file not found: {image_path}",
                     event_type=EventType.SYSTEM_EVENT,
                     tags=["image", "encode", "error", "file-not-found"],
-                    entity=my_entity
+                    entity=current_entity_name()
                 )
                 raise FileNotFoundError(f"Image file not found: {image_path}")
 
@@ -44,7 +41,7 @@ class ImageService:
                 event_type=EventType.SYSTEM_EVENT,
                 data={"encoded_length": len(encoded)},
                 tags=["image", "encode", "success"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             
             return encoded
@@ -55,7 +52,7 @@ class ImageService:
                     message=f"Error encoding image from path: {image_path}",
                     level=LogLevel.ERROR,
                     tags=["image", "encode", "error"],
-                    entity=my_entity
+                    entity=current_entity_name()
                 )
             raise
 
@@ -67,7 +64,7 @@ class ImageService:
                 event_type=EventType.SYSTEM_EVENT,
                 data={"image_size": f"{pil_image.width}x{pil_image.height}"},
                 tags=["image", "encode", "pil"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             
             buffered = io.BytesIO()
@@ -79,7 +76,7 @@ class ImageService:
                 event_type=EventType.SYSTEM_EVENT,
                 data={"encoded_length": len(encoded)},
                 tags=["image", "encode", "success"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             
             return encoded
@@ -89,6 +86,6 @@ class ImageService:
                 message="Error encoding PIL image",
                 level=LogLevel.ERROR,
                 tags=["image", "encode", "error"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             raise
\ No newline at end of file
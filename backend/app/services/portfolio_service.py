@@ -0,0 +1,214 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+from app.swap_calculator.adapters import prepare_swap_parameters
+from app.swap_calculator.vectorized import calculate_portfolio_leg_arrays
+from app.swap_calculator.curves import DiscountCurve
+from app.swap_calculator.valuation import BUMP, ValuationBlock, fixed_payer_signs
+from app.services.swap_service import transform_output
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Trades priced per vectorized block when building a valuation
+VALUATION_CHUNK_SIZE = 2000
+
+
+def create_pool(workers: int) -> ProcessPoolExecutor:
+    """Start a process pool whose workers can attach to shared memory segments."""
+    # Workers must share the parent's resource tracker; one started inside a
+    # worker would unlink the segments it attached to when the worker exits
+    resource_tracker.ensure_running()
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        workers = settings.PORTFOLIO_WORKERS or os.cpu_count() or 1
+        _pool = create_pool(workers)
+        logger.info(
+            "Portfolio process pool started",
+            event_type=EventType.SYSTEM_EVENT,
+            data={"workers": workers},
+            tags=["portfolio", "pool", "init"],
+            entity=current_entity_name()
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the process pool (called on application shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _error(index: int, e: Exception) -> Dict[str, Any]:
+    return {"index": index, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def _price_legs(
+    chunk: Sequence[Tuple[int, Dict[str, Any]]],
+    results: Dict[int, Dict[str, Any]]
+) -> List[Tuple[int, Dict[str, Any], Any]]:
+    """Parse and price (index, trade_json) pairs with the vectorized engine.
+
+    Returns (index, trade_json, (fixed, floating)) for the trades that
+    priced; failures are recorded in ``results`` so a bad trade only fails
+    itself.
+    """
+    parsed = []
+    for index, trade_json in chunk:
+        try:
+            parsed.append((index, trade_json, prepare_swap_parameters(trade_json)))
+        except Exception as e:
+            results[index] = _error(index, e)
+
+    try:
+        legs = calculate_portfolio_leg_arrays([params for _, _, params in parsed])
+    except Exception:
+        # Fall back to one trade at a time to find the one that broke the block
+        legs = []
+        for index, _, params in parsed:
+            try:
+                legs.append(calculate_portfolio_leg_arrays([params])[0])
+            except Exception as e:
+                results[index] = _error(index, e)
+                legs.append(None)
+
+    return [
+        (index, trade_json, trade_legs)
+        for (index, trade_json, _), trade_legs in zip(parsed, legs)
+        if trade_legs is not None
+    ]
+
+
+def price_chunk(chunk: Sequence[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Compute cashflows for a chunk of (index, trade_json) pairs.
+
+    Runs inside a worker process; the trades of the chunk are priced
+    together by the vectorized engine.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    for index, trade_json, (fixed, floating) in _price_legs(chunk, results):
+        try:
+            output = transform_output(trade_json, fixed, floating)
+            results[index] = {"index": index, "status": "ok", "result": output}
+        except Exception as e:
+            results[index] = _error(index, e)
+
+    return [results[index] for index, _ in chunk]
+
+
+async def stream_portfolio_cashflows(
+    trades: Sequence[Dict[str, Any]],
+    chunk_size: int
+) -> AsyncIterator[Dict[str, Any]]:
+    """Fan trades out to the process pool and yield results as chunks finish.
+
+    Results arrive in completion order, each tagged with the trade's index
+    in the request.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    indexed = list(enumerate(trades))
+    pending = {}
+    for i in range(0, len(indexed), chunk_size):
+        chunk = indexed[i:i + chunk_size]
+        pending[loop.run_in_executor(pool, price_chunk, chunk)] = chunk
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    chunk_results = future.result()
+                except Exception as e:
+                    # The worker itself died; report every trade of the chunk
+                    logger.log_exception(
+                        e,
+                        message="Portfolio worker failed",
+                        level=LogLevel.ERROR,
+                        tags=["portfolio", "worker", "error"],
+                        entity=current_entity_name()
+                    )
+                    chunk_results = [_error(index, e) for index, _ in chunk]
+                for result in chunk_results:
+                    yield result
+    finally:
+        # Client went away or the generator was closed early
+        for future in pending:
+            future.cancel()
+
+
+def build_valuation_block(
+    trades: Sequence[Dict[str, Any]],
+    entity: Optional[str] = None
+) -> Tuple[ValuationBlock, List[int], Dict[int, Dict[str, Any]]]:
+    """Price swap trade JSONs and flatten them into a ValuationBlock.
+
+    Returns the block, the request index of each of its trades, and the
+    error results of the trades that could not be parsed or priced.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    indexed = list(enumerate(trades))
+    priced = []
+    # Chunked so the padded leg blocks stay small; the valuation block is compact
+    for i in range(0, len(indexed), VALUATION_CHUNK_SIZE):
+        priced.extend(_price_legs(indexed[i:i + VALUATION_CHUNK_SIZE], results))
+
+    block = ValuationBlock(
+        [legs for _, _, legs in priced],
+        fixed_payer_signs([trade_json for _, trade_json, _ in priced], entity)
+    )
+    return block, [index for index, _, _ in priced], results
+
+
+def value_trades(
+    trades: Sequence[Dict[str, Any]],
+    curve: DiscountCurve,
+    entity: Optional[str] = None,
+    buckets: bool = True
+) -> Dict[str, Any]:
+    """NPV and DV01 (optionally bucketed) of swap trade JSONs against one curve.
+
+    Trades that cannot be parsed or priced are reported individually. NPVs
+    are from ``entity``'s side when it is a party, otherwise from the
+    fixed-leg payer's.
+    """
+    block, valid, results = build_valuation_block(trades, entity)
+    if buckets:
+        values = block.sensitivities(curve)
+    else:
+        npv = block.npv(curve)
+        parallel = curve.shifted([BUMP] * (len(curve.node_ordinals) - 1))
+        values = {"npv": npv, "dv01": block.npv(parallel) - npv}
+
+    npvs = values["npv"].tolist()
+    dv01s = values["dv01"].tolist()
+    bucket_rows = values["buckets"].tolist() if buckets else None
+    for row, index in enumerate(valid):
+        result = {"index": index, "status": "ok", "npv": npvs[row], "dv01": dv01s[row]}
+        if bucket_rows is not None:
+            result["buckets"] = bucket_rows[row]
+        results[index] = result
+
+    return {
+        "curve": {
+            "index": curve.name,
+            "asof": curve.asof.isoformat(),
+            "interpolation": curve.interpolation,
+            "tenors": list(curve.node_labels)
+        },
+        "results": [results[index] for index in range(len(trades))]
+    }
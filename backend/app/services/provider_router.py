@@ -0,0 +1,203 @@
+"""Provider routing for ``ai_provider="auto"`` extractions.
+
+Every ``AIService.process_text`` call is recorded per provider and model
+with its latency, its cost and whether it produced a valid TradeSummary
+(an exception, or an answer that failed validation, is not). Over the
+last ``ROUTING_WINDOW`` calls within ``ROUTING_MAX_AGE_S`` the router
+keeps latency percentiles, the error rate and the cost per successful
+extraction, and ranks the available providers by the expected price of
+one successful extraction::
+
+    (ROUTING_LATENCY_WEIGHT * p95 seconds + ROUTING_COST_WEIGHT * cost per success) / success rate
+
+Providers with fewer than ``ROUTING_MIN_SAMPLES`` recent calls are tried
+first, and a ``ROUTING_EXPLORE`` share of extractions goes to a provider
+other than the best, so the statistics of every provider stay current.
+Each decision is logged with the scores behind it.
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import current_entity_name
+
+# Floor on the success rate in the objective, so a failing provider scores high but finite
+MIN_SUCCESS_RATE = 0.05
+
+
+class CallSample:
+    """One provider call; ``ok`` is cleared when its answer fails validation."""
+
+    __slots__ = ("at", "latency_ms", "cost", "ok")
+
+    def __init__(self, latency_ms: float, cost: Optional[float], ok: bool):
+        self.at = time.monotonic()
+        self.latency_ms = latency_ms
+        self.cost = cost
+        self.ok = ok
+
+
+class ProviderStats:
+    """Rolling window of the calls to one provider and model."""
+
+    def __init__(self, window: int, max_age: float):
+        self.max_age = max_age
+        self._samples: deque = deque(maxlen=window)
+        self.calls = 0
+
+    def add(self, sample: CallSample) -> None:
+        self._samples.append(sample)
+        self.calls += 1
+
+    def recent(self) -> List[CallSample]:
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0].at < cutoff:
+            self._samples.popleft()
+        return list(self._samples)
+
+    def summary(self) -> Dict[str, Any]:
+        samples = self.recent()
+        if not samples:
+            return {"samples": 0, "calls": self.calls}
+        latencies = sorted(sample.latency_ms for sample in samples)
+        successes = sum(1 for sample in samples if sample.ok)
+        costs = [sample.cost for sample in samples if sample.cost is not None]
+
+        def percentile(q: float) -> float:
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "samples": len(samples),
+            "calls": self.calls,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "error_rate": round(1 - successes / len(samples), 4),
+            # Every call is paid for, including the ones whose answer is thrown away
+            "cost_per_success": sum(costs) / successes if successes and costs else None
+        }
+
+
+class ProviderRouter:
+    """Per provider/model call statistics and the choice of provider for "auto" extractions."""
+
+    def __init__(
+        self,
+        window: int,
+        max_age: float,
+        min_samples: int,
+        explore: float,
+        latency_weight: float,
+        cost_weight: float,
+        seed: Optional[int] = None
+    ):
+        self.window = window
+        self.max_age = max_age
+        self.min_samples = min_samples
+        self.explore = explore
+        self.latency_weight = latency_weight
+        self.cost_weight = cost_weight
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.decisions: Dict[str, int] = {}
+
+    def record(self, provider: str, model: str, latency_ms: float, cost: Optional[float], ok: bool) -> CallSample:
+        """Add a finished call; keep the sample to mark its answer invalid later."""
+        sample = CallSample(latency_ms, cost, ok)
+        with self._lock:
+            stats = self._stats.get((provider, model))
+            if stats is None:
+                stats = self._stats[(provider, model)] = ProviderStats(self.window, self.max_age)
+            stats.add(sample)
+        return sample
+
+    def score(self, summary: Dict[str, Any]) -> float:
+        """Expected price of one successful extraction under the configured objective (lower is better)."""
+        success_rate = max(1 - summary["error_rate"], MIN_SUCCESS_RATE)
+        cost = summary["cost_per_success"] or 0.0
+        return (self.latency_weight * summary["p95_ms"] / 1000 + self.cost_weight * cost) / success_rate
+
+    def rank(self, candidates: Dict[str, str]) -> Tuple[List[str], str, Dict[str, Any]]:
+        """Order providers ({provider: model}) best first; returns the order, the reason and the scores."""
+        with self._lock:
+            summaries = {
+                provider: (self._stats[(provider, model)].summary() if (provider, model) in self._stats else {"samples": 0})
+                for provider, model in candidates.items()
+            }
+            draw = self._random.random()
+            pick = self._random.randrange(max(len(candidates) - 1, 1))
+        scores = {provider: self.score(s) for provider, s in summaries.items() if s["samples"]}
+        warming = sorted(
+            (provider for provider, s in summaries.items() if s["samples"] < max(self.min_samples, 1)),
+            key=lambda provider: summaries[provider]["samples"]
+        )
+        ranked = warming + sorted(
+            (provider for provider in candidates if provider not in warming),
+            key=lambda provider: scores[provider]
+        )
+        reason = "warm-up" if warming else "best"
+        if not warming and len(ranked) > 1 and draw < self.explore:
+            ranked.insert(0, ranked.pop(1 + pick))
+            reason = "explore"
+        return ranked, reason, {
+            provider: {"score": round(scores[provider], 4) if provider in scores else None, **summaries[provider]}
+            for provider in candidates
+        }
+
+    def choose(self, candidates: Dict[str, str], user: Optional[str] = None) -> List[str]:
+        """Rank the providers for one extraction and log the decision."""
+        if not candidates:
+            raise ValueError("No AI provider is configured")
+        ranked, reason, scores = self.rank(candidates)
+        with self._lock:
+            self.decisions[ranked[0]] = self.decisions.get(ranked[0], 0) + 1
+        logger.info(
+            f"Routed extraction to {ranked[0]}",
+            event_type=EventType.TRANSACTION,
+            user_id=user,
+            entity=current_entity_name(),
+            data={"provider": ranked[0], "model": candidates[ranked[0]], "reason": reason, "ranking": ranked, "scores": scores},
+            tags=["ai", "routing", reason]
+        )
+        return ranked
+
+    def summary(self, provider: str, model: str) -> Optional[Dict[str, Any]]:
+        """Recent stats of one provider and model; None before its first call."""
+        with self._lock:
+            stats = self._stats.get((provider, model))
+            return stats.summary() if stats is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {f"{provider}/{model}": stats.summary() for (provider, model), stats in self._stats.items()}
+            decisions = dict(self.decisions)
+        return {
+            "providers": providers,
+            "decisions": decisions,
+            "objective": {"latency_weight": self.latency_weight, "cost_weight": self.cost_weight},
+            "window": self.window,
+            "max_age_s": self.max_age
+        }
+
+
+_router: Optional[ProviderRouter] = None
+
+
+def get_provider_router() -> ProviderRouter:
+    """Return the process-wide provider router, creating it on first use."""
+    global _router
+    if _router is None:
+        _router = ProviderRouter(
+            settings.ROUTING_WINDOW,
+            settings.ROUTING_MAX_AGE_S,
+            settings.ROUTING_MIN_SAMPLES,
+            settings.ROUTING_EXPLORE,
+            settings.ROUTING_LATENCY_WEIGHT,
+            settings.ROUTING_COST_WEIGHT
+        )
+    return _router
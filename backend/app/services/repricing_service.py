@@ -0,0 +1,211 @@
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.main import logger
+from core_logging.client import EventType
+from app.entities import current_entity, current_entity_name, partition
+from app.swap_calculator.adapters import prepare_swap_parameters, parse_rate
+from app.swap_calculator.curves import get_curve
+from app.swap_calculator.fixings import get_fixings
+from app.swap_calculator.vectorized import LegCashflows, calculate_swap_leg_arrays, reprice_leg
+from app.services.swap_service import transform_output
+from app.services.trade_store import get_trade_store
+
+# Amendment field -> TradeSummary leg field it is recorded under
+AMENDABLE_FIELDS = {
+    "notional": "Notional Amount",
+    "rate": "Rate",
+    "spread": "Spread",
+    "amortization_type": "Amortization Type",
+}
+
+
+class TradeNotFound(LookupError):
+    pass
+
+
+class PricedSwap:
+    """A swap's trade JSON together with its computed legs.
+
+    The legs keep their schedule and accrual fractions, so amendments to
+    amounts only need ``reprice_leg``.
+    """
+
+    __slots__ = ("trade_json", "fixed", "floating", "leg1_is_fixed")
+
+    def __init__(self, trade_json: Dict[str, Any], fixed: LegCashflows, floating: LegCashflows, leg1_is_fixed: bool):
+        self.trade_json = trade_json
+        self.fixed = fixed
+        self.floating = floating
+        self.leg1_is_fixed = leg1_is_fixed
+
+    def leg(self, leg_number: int) -> LegCashflows:
+        return self.fixed if (leg_number == 1) == self.leg1_is_fixed else self.floating
+
+    def output(self) -> Dict[str, Any]:
+        return transform_output(self.trade_json, self.fixed, self.floating)
+
+
+def _normalize_changes(leg: LegCashflows, changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate one leg's amendment; raises ValueError for values a full pricing would reject."""
+    changes = {field: value for field, value in changes.items() if value is not None}
+    unknown = set(changes) - set(AMENDABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Fields cannot be amended: {', '.join(sorted(unknown))}")
+    if "notional" in changes:
+        changes["notional"] = float(changes["notional"])
+    if "spread" in changes:
+        if not leg.is_floating:
+            raise ValueError("Only the floating leg has a spread")
+        changes["spread"] = float(changes["spread"])
+    if "rate" in changes:
+        if leg.is_floating:
+            # The floating "rate" is the reference rate name
+            changes["rate"] = str(changes["rate"])
+        else:
+            rate = changes["rate"]
+            if isinstance(rate, (int, float)):
+                rate = float(rate)
+            if not isinstance(parse_rate(rate), float):
+                raise ValueError(f"Invalid fixed rate: {rate}")
+            changes["rate"] = rate
+    return changes
+
+
+def price_swap(trade_json: Dict[str, Any]) -> PricedSwap:
+    """Full pricing: parse, build schedules and compute both legs."""
+    params = prepare_swap_parameters(trade_json)
+    fixed, floating = calculate_swap_leg_arrays(
+        params["trade_date"],
+        params["effective_date"],
+        params["termination_date"],
+        params["fixed_leg"],
+        params["floating_leg"]
+    )
+    # prepare_swap_parameters only puts leg 2 first when leg 1 is explicitly floating
+    leg1_type = trade_json["TradeSummary"]["Leg 1 Payer"]["Leg Type"].lower()
+    leg2_type = trade_json["TradeSummary"]["Leg 2 Payer"]["Leg Type"].lower()
+    leg1_is_fixed = not (leg1_type == "floating" and leg2_type == "fixed")
+    return PricedSwap(trade_json, fixed, floating, leg1_is_fixed)
+
+
+class RepricingService:
+    """Keeps recently priced swaps by trade id and applies amendments incrementally.
+
+    An instance only sees the stored trades of ``tenant`` (all of them for None).
+    """
+
+    def __init__(self, max_size: int, tenant: Optional[str] = None):
+        self.max_size = max_size
+        self.tenant = tenant
+        self._cache: "OrderedDict[int, PricedSwap]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Amendments are read-modify-write on the stored trade; run them one at a time
+        self._amend_lock = threading.Lock()
+
+    def _get(self, trade_id: int) -> Optional[PricedSwap]:
+        with self._lock:
+            priced = self._cache.get(trade_id)
+            if priced is not None:
+                self._cache.move_to_end(trade_id)
+            return priced
+
+    def _put(self, trade_id: int, priced: PricedSwap) -> None:
+        with self._lock:
+            self._cache[trade_id] = priced
+            self._cache.move_to_end(trade_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, trade_id: int) -> None:
+        with self._lock:
+            self._cache.pop(trade_id, None)
+
+    def get_priced(self, trade_id: int) -> Tuple[PricedSwap, bool]:
+        """Return the priced swap for a stored trade and whether it was cached."""
+        priced = self._get(trade_id)
+        # A rebuilt index curve or new fixings invalidate the floating coupons
+        floating = priced.floating if priced is not None else None
+        if (
+            floating is not None
+            and floating.curve is get_curve(floating.reference_rate_name)
+            and floating.fixings is get_fixings(floating.reference_rate_name)
+        ):
+            return priced, True
+        record = get_trade_store().get_trade(trade_id, self.tenant)
+        if record is None:
+            raise TradeNotFound(trade_id)
+        priced = price_swap(record["trade_json"])
+        self._put(trade_id, priced)
+        return priced, False
+
+    def amend(self, trade_id: int, amendments: Dict[int, Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Apply per-leg amendments ({leg_number: {field: value}}) to a stored swap.
+
+        Only the amount columns of the amended legs are recomputed. The
+        amended trade JSON is written back to the trade store. Returns the
+        transformed output and whether the cached schedules were reused.
+        """
+        with self._amend_lock:
+            return self._amend(trade_id, amendments)
+
+    def _amend(self, trade_id: int, amendments: Dict[int, Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        priced, cached = self.get_priced(trade_id)
+
+        trade_json = copy.deepcopy(priced.trade_json)
+        legs = {1: priced.leg(1), 2: priced.leg(2)}
+        for leg_number, changes in amendments.items():
+            leg = legs[leg_number]
+            changes = _normalize_changes(leg, changes)
+            leg_json = trade_json["TradeSummary"][f"Leg {leg_number} Payer"]
+            for field, value in changes.items():
+                leg_json[AMENDABLE_FIELDS[field]] = value
+
+            rate = changes.get("rate")
+            legs[leg_number] = reprice_leg(
+                leg,
+                notional=float(changes["notional"]) if "notional" in changes else None,
+                # Same parsing as a full re-pricing of the amended JSON
+                rate=rate if leg.is_floating or rate is None else parse_rate(rate),
+                spread=changes.get("spread"),
+                amortization_type=changes.get("amortization_type")
+            )
+
+        fixed, floating = (legs[1], legs[2]) if priced.leg1_is_fixed else (legs[2], legs[1])
+        amended = PricedSwap(trade_json, fixed, floating, priced.leg1_is_fixed)
+
+        get_trade_store().update_trade_json(trade_id, trade_json, self.tenant)
+        self._put(trade_id, amended)
+
+        logger.info(
+            "Trade amended",
+            event_type=EventType.SYSTEM_EVENT,
+            data={
+                "trade_id": trade_id,
+                "legs": sorted(amendments),
+                "fields": sorted({f for changes in amendments.values() for f in changes}),
+                "schedule_reused": cached
+            },
+            tags=["swap", "repricing", "amend"],
+            entity=current_entity_name()
+        )
+        return amended.output(), cached
+
+
+_repricing_services: Dict[Optional[str], RepricingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_repricing_service() -> RepricingService:
+    """Return the current entity's repricing service (its own cache of ``repricing_cache_size``)."""
+    key = partition()
+    service = _repricing_services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _repricing_services.get(key)
+            if service is None:
+                service = RepricingService(current_entity().repricing_cache_size, key)
+                _repricing_services[key] = service
+    return service
@@ -0,0 +1,218 @@
+"""Historical-scenario revaluation of a swap book on the process pool.
+
+The book is priced once, flattened into a ValuationBlock and reduced to its
+discount weights (NPV per trade as a linear function of the discount
+factors of the book's dates). Those arrays, the base NPVs and the output
+P&L matrix live in one shared memory segment: workers attach to it by
+name, so a task only carries the (table-less) curve and its slice of the
+scenario shifts, and writes its P&L rows in place.
+"""
+import os
+import time
+from concurrent.futures import Executor, wait
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+from app.services.portfolio_service import build_valuation_block, get_pool
+from app.swap_calculator.curves import DiscountCurve
+from app.swap_calculator.scenarios import ScenarioSet, tail_risk
+from app.swap_calculator.valuation import ValuationBlock
+
+# Scenario tasks per worker, so uneven tasks still balance out
+TASKS_PER_WORKER = 4
+
+# (offset, shape, dtype) per array in a segment
+Layout = Dict[str, Tuple[int, Tuple[int, ...], str]]
+
+
+class SharedArrays:
+    """Named numpy arrays packed into one shared memory segment."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: Layout):
+        self.shm = shm
+        self.layout = layout
+        self._arrays = {
+            name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for name, (offset, shape, dtype) in layout.items()
+        }
+
+    @classmethod
+    def create(cls, specs: Dict[str, Tuple[Tuple[int, ...], Any]]) -> "SharedArrays":
+        """Allocate a segment holding an array per (shape, dtype) spec."""
+        layout: Layout = {}
+        size = 0
+        for name, (shape, dtype) in specs.items():
+            dtype = np.dtype(dtype)
+            layout[name] = (size, tuple(shape), dtype.str)
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            size += -(-nbytes // 64) * 64  # keep every array 64-byte aligned
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        return cls(shm, layout)
+
+    @classmethod
+    def attach(cls, name: str, layout: Layout) -> "SharedArrays":
+        return cls(shared_memory.SharedMemory(name=name), layout)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._arrays[name]
+
+    def close(self) -> None:
+        # Views must go before the buffer can be released
+        self._arrays.clear()
+        self.shm.close()
+
+
+def _revalue_into(shared: SharedArrays, curve: DiscountCurve, shifts: np.ndarray, first_row: int) -> None:
+    trade, slot, weight = shared["trade"], shared["slot"], shared["weight"]
+    dates, base, pnl = shared["dates"], shared["base"], shared["pnl"]
+    n_trades = len(base)
+    for i, row in enumerate(shifts):
+        dfs = curve.shifted(row).interpolate(dates)
+        npv = np.bincount(trade, weights=weight * dfs[slot], minlength=n_trades)
+        pnl[first_row + i] = npv - base
+
+
+def revalue_scenarios(segment: str, layout: Layout, curve: DiscountCurve, shifts: np.ndarray, first_row: int) -> int:
+    """Worker task: write the P&L rows of a slice of scenarios into the segment."""
+    shared = SharedArrays.attach(segment, layout)
+    try:
+        _revalue_into(shared, curve, shifts, first_row)
+    finally:
+        shared.close()
+    return len(shifts)
+
+
+def scenario_pnl(
+    block: ValuationBlock,
+    curve: DiscountCurve,
+    node_shifts: np.ndarray,
+    pool: Optional[Executor] = None,
+    workers: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Base NPVs and the P&L of every trade under every scenario.
+
+    ``node_shifts`` holds decimal zero-rate shifts per curve node, one row per
+    scenario. Returns (base NPV per trade, n_scenarios x n_trades P&L).
+    """
+    node_shifts = np.asarray(node_shifts, dtype=np.float64)
+    trade, slot, weight = block.discount_weights(curve.asof_ordinal)
+    n_scenarios, n_trades = len(node_shifts), block.n_trades
+
+    shared = SharedArrays.create({
+        "trade": (trade.shape, np.int64),
+        "slot": (slot.shape, np.int64),
+        "weight": (weight.shape, np.float64),
+        "dates": (block.dates.shape, np.int64),
+        "base": ((n_trades,), np.float64),
+        "pnl": ((n_scenarios, n_trades), np.float64)
+    })
+    try:
+        shared["trade"][:] = trade
+        shared["slot"][:] = slot
+        shared["weight"][:] = weight
+        shared["dates"][:] = block.dates
+        base = np.bincount(trade, weights=weight * curve.interpolate(block.dates)[slot], minlength=n_trades)
+        shared["base"][:] = base
+        del trade, slot, weight
+
+        if pool is None:
+            pool = get_pool()
+        workers = workers or settings.PORTFOLIO_WORKERS or os.cpu_count() or 1
+        task_size = max(1, -(-n_scenarios // (workers * TASKS_PER_WORKER)))
+        # Only the node arrays travel with each task, not the per-day table
+        light_curve = curve.shifted(np.zeros(len(curve.node_ordinals) - 1))
+        futures = [
+            pool.submit(revalue_scenarios, shared.name, shared.layout, light_curve,
+                        node_shifts[i:i + task_size], i)
+            for i in range(0, n_scenarios, task_size)
+        ]
+        done, _ = wait(futures)
+        for future in done:
+            future.result()
+        pnl = shared["pnl"].copy()
+    finally:
+        shared.close()
+        shared.shm.unlink()
+    return base, pnl
+
+
+def run_scenarios(
+    trades: Sequence[Dict[str, Any]],
+    curve: DiscountCurve,
+    scenarios: ScenarioSet,
+    entity: Optional[str] = None,
+    confidence: Sequence[float] = (0.99, 0.975),
+    trade_pnl: bool = False
+) -> Dict[str, Any]:
+    """Revalue swap trade JSONs under every scenario of a set.
+
+    Returns the portfolio P&L per scenario, VaR and expected shortfall per
+    confidence level, and per trade its base NPV (and P&L vector when
+    ``trade_pnl``). Trades that cannot be parsed or priced are reported
+    individually and left out of the portfolio.
+    """
+    start_time = time.perf_counter()
+    block, valid, results = build_valuation_block(trades, entity)
+    node_shifts = scenarios.node_shifts(curve)
+    try:
+        base, pnl = scenario_pnl(block, curve, node_shifts)
+    except Exception as e:
+        logger.log_exception(
+            e,
+            message="Scenario revaluation failed",
+            level=LogLevel.ERROR,
+            tags=["portfolio", "scenarios", "error"],
+            entity=current_entity_name()
+        )
+        raise
+
+    portfolio_pnl = pnl.sum(axis=1)
+    risk: List[Dict[str, float]] = []
+    if len(portfolio_pnl):
+        for level in confidence:
+            var, es = tail_risk(portfolio_pnl, level)
+            risk.append({"confidence": level, "var": var, "es": es})
+
+    base_npvs = base.tolist()
+    trade_rows = pnl.T.tolist() if trade_pnl else None
+    for row, index in enumerate(valid):
+        result = {"index": index, "status": "ok", "npv": base_npvs[row]}
+        if trade_rows is not None:
+            result["pnl"] = trade_rows[row]
+        results[index] = result
+
+    logger.info(
+        "Scenario revaluation completed",
+        event_type=EventType.INTEGRATION,
+        data={
+            "trades": len(trades),
+            "valued": len(valid),
+            "scenarios": len(scenarios),
+            "scenario_set": scenarios.name,
+            "curve": curve.name,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        },
+        tags=["portfolio", "scenarios", "success"],
+        entity=current_entity_name()
+    )
+    return {
+        "curve": {"index": curve.name, "asof": curve.asof.isoformat()},
+        "scenario_set": scenarios.name,
+        "scenarios": [
+            {"name": name, "pnl": value}
+            for name, value in zip(scenarios.scenario_names, portfolio_pnl.tolist())
+        ],
+        "npv": float(base.sum()),
+        "risk": risk,
+        "results": [results[index] for index in range(len(trades))]
+    }
@@ -1,9 +1,10 @@
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Union, Any, Tuple, Optional
+from typing import Dict, Iterator, List, Union, Any, Tuple, Optional
 import math
-import os
+from functools import lru_cache
 from app.main import logger
 from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
 from app.swap_calculator.adapters import (
     prepare_swap_parameters,
     parse_date_basis,
@@ -13,10 +14,8 @@ from app.swap_calculator.adapters import (
     parse_rate,
     get_month_end_day
 )
-from app.swap_calculator.calculators import calculate_swap_cashflows
-
-# Get parameters from environment variables
-my_entity = os.environ.get('MY_ENTITY')
+from app.swap_calculator.calculators import Cashflow, calculate_swap_cashflows, iter_cashflows, iter_period_dates
+from app.swap_calculator.vectorized import LegCashflows
 
 def format_date_with_weekday(date_str: str) -> str:
     """Convert YYYY-MM-DD to DDD-DD-MM-YYYY format."""
@@ -32,8 +31,61 @@ def format_rate(rate: Union[str, float]) -> str:
         return rate
     return f"{rate:.3f}%"
 
-def transform_output(trade_json: dict, leg1_cashflows: list, leg2_cashflows: list) -> dict:
-    """Transform the API output to match the required format."""
+@lru_cache(maxsize=1 << 16)
+def _date_label(ordinal: int) -> str:
+    """Day ordinal -> DDD-DD-MM-YYYY label; each date is formatted once per process."""
+    return date.fromordinal(ordinal).strftime("%a-%d-%m-%Y")
+
+def _leg_columns(cashflows: Union[LegCashflows, List[Cashflow]]) -> Tuple[list, ...]:
+    """Column view of a leg in Cashflow field order, with dates as ordinals."""
+    if isinstance(cashflows, LegCashflows):
+        return cashflows.columns()
+    return (
+        [cf.start_date.toordinal() for cf in cashflows],
+        [cf.end_date.toordinal() for cf in cashflows],
+        [cf.rate for cf in cashflows],
+        [cf.spread for cf in cashflows],
+        [cf.notional for cf in cashflows],
+        [cf.amortization for cf in cashflows],
+        [cf.interest for cf in cashflows]
+    )
+
+def _trade_info(trade_summary: dict) -> dict:
+    """tradeInfo section of the output."""
+    return {
+        "tradeDate": trade_summary["Trade Date"],
+        "maturity": trade_summary["Maturity"],
+        "priceMaker": trade_summary["Price Maker"],
+        "priceTaker": trade_summary["Price Taker"],
+        "acceptedPrice": trade_summary["Accepted Price"],
+        "acceptedSide": trade_summary["Accepted Side"],
+        "leg1Type": trade_summary["Leg 1 Payer"]["Leg Type"],
+        "leg1Rate": trade_summary["Leg 1 Payer"]["Rate"],
+        "leg1Payer": trade_summary["Leg 1 Payer"]["Company"],
+        "leg1Currency": trade_summary["Leg 1 Payer"]["Leg Currency"],
+        "leg1NotionalAmount": trade_summary["Leg 1 Payer"]["Notional Amount"],
+        "leg1DayCountConvention": trade_summary["Leg 1 Payer"]["Date Basis"],
+        "leg1BusinessDayConvention": trade_summary["Leg 1 Payer"]["Business Date Adjustment"],
+        "leg2Type": trade_summary["Leg 2 Payer"]["Leg Type"],
+        "leg2Rate": trade_summary["Leg 2 Payer"]["Rate"],
+        "leg2Payer": trade_summary["Leg 2 Payer"]["Company"],
+        "leg2Currency": trade_summary["Leg 2 Payer"]["Leg Currency"],
+        "leg2NotionalAmount": trade_summary["Leg 2 Payer"]["Notional Amount"],
+        "leg2DayCountConvention": trade_summary["Leg 2 Payer"]["Date Basis"],
+        "leg2BusinessDayConvention": trade_summary["Leg 2 Payer"]["Business Date Adjustment"]
+    }
+
+def transform_output(
+    trade_json: dict,
+    leg1_cashflows: Union[LegCashflows, List[Cashflow]],
+    leg2_cashflows: Union[LegCashflows, List[Cashflow]]
+) -> dict:
+    """Transform the API output to match the required format.
+
+    Legs may be Cashflow lists (scalar engine) or LegCashflows (vectorized
+    engine). Dates are formatted through a shared cache and each distinct
+    rate once per trade.
+    """
     try:
         logger.info(
             "Transforming output data",
@@ -41,38 +93,28 @@ def transform_output(trade_json: dict, leg1_cashflows: list, leg2_cashflows: lis
             tags=["swap", "transform", "output"],
             data={"fixed_rate": trade_json["TradeSummary"]["Leg 1 Payer"]["Rate"],
                   "floating_rate": trade_json["TradeSummary"]["Leg 2 Payer"]["Rate"]},
-            entity=my_entity
+            entity=current_entity_name()
         )
         
         trade_summary = trade_json["TradeSummary"]
         
         # Create tradeInfo section
-        trade_info = {
-            "tradeDate": trade_summary["Trade Date"],
-            "maturity": trade_summary["Maturity"],
-            "priceMaker": trade_summary["Price Maker"],
-            "priceTaker": trade_summary["Price Taker"],
-            "acceptedPrice": trade_summary["Accepted Price"],
-            "acceptedSide": trade_summary["Accepted Side"],
-            "leg1Type": trade_summary["Leg 1 Payer"]["Leg Type"],
-            "leg1Rate": trade_summary["Leg 1 Payer"]["Rate"],
-            "leg1Payer": trade_summary["Leg 1 Payer"]["Company"],
-            "leg1Currency": trade_summary["Leg 1 Payer"]["Leg Currency"],
-            "leg1NotionalAmount": trade_summary["Leg 1 Payer"]["Notional Amount"],
-            "leg1DayCountConvention": trade_summary["Leg 1 Payer"]["Date Basis"],
-            "leg1BusinessDayConvention": trade_summary["Leg 1 Payer"]["Business Date Adjustment"],
-            "leg2Type": trade_summary["Leg 2 Payer"]["Leg Type"],
-            "leg2Rate": trade_summary["Leg 2 Payer"]["Rate"],
-            "leg2Payer": trade_summary["Leg 2 Payer"]["Company"],
-            "leg2Currency": trade_summary["Leg 2 Payer"]["Leg Currency"],
-            "leg2NotionalAmount": trade_summary["Leg 2 Payer"]["Notional Amount"],
-            "leg2DayCountConvention": trade_summary["Leg 2 Payer"]["Date Basis"],
-            "leg2BusinessDayConvention": trade_summary["Leg 2 Payer"]["Business Date Adjustment"]
-        }
+        trade_info = _trade_info(trade_summary)
 
         # Transform cashflows
-        def transform_cashflows(cashflows: list, leg_number: int, payer: str, 
+        date_label = _date_label
+        value_labels: Dict[Any, str] = {}
+
+        def label(value: Any) -> str:
+            try:
+                return value_labels[value]
+            except KeyError:
+                value_labels[value] = text = format_rate(value)
+                return text
+
+        def transform_cashflows(cashflows, leg_number: int, payer: str,
                             day_count: str, currency: str, leg_type: str) -> dict:
+            starts, ends, rates, spreads, notionals, amortizations, interests = _leg_columns(cashflows)
             return {
                 "legNumber": leg_number,
                 "payer": payer,
@@ -80,14 +122,16 @@ def transform_output(trade_json: dict, leg1_cashflows: list, leg2_cashflows: lis
                 "currency": currency,
                 "legType": leg_type,
                 "cashflows": [{
-                    "startDate": format_date_with_weekday(cf["Start Date"]),
-                    "endDate": format_date_with_weekday(cf["End Date"]),
-                    "rate": format_rate(cf["Rate"]),
-                    "spread": format_rate(cf["Spread"]),
-                    "remainingCapital": cf["Notional"],
-                    "amortization": cf["Amortization"],
-                    "interest": cf["Interest"]
-                } for cf in cashflows]
+                    "startDate": date_label(start),
+                    "endDate": date_label(end),
+                    "rate": label(rate),
+                    "spread": label(spread),
+                    "remainingCapital": notional,
+                    "amortization": amortization,
+                    "interest": interest
+                } for start, end, rate, spread, notional, amortization, interest in zip(
+                    starts, ends, rates, spreads, notionals, amortizations, interests
+                )]
             }
 
         # Create legs section
@@ -113,7 +157,7 @@ def transform_output(trade_json: dict, leg1_cashflows: list, leg2_cashflows: lis
             event_type=EventType.SYSTEM_EVENT,
             data={"leg1_flows": len(leg1_cashflows), "leg2_flows": len(leg2_cashflows)},
             tags=["swap", "transform", "success"],
-            entity=my_entity
+            entity=current_entity_name()
         )
         
         return {
@@ -126,7 +170,7 @@ def transform_output(trade_json: dict, leg1_cashflows: list, leg2_cashflows: lis
             message="Error transforming output data",
             level=LogLevel.ERROR,
             tags=["swap", "transform", "error"],
-            entity=my_entity
+            entity=current_entity_name()
         )
         raise
 
@@ -141,7 +185,7 @@ class SwapParamTransformer:
                 "Transforming trade JSON parameters",
                 event_type=EventType.SYSTEM_EVENT,
                 tags=["swap", "transform", "parameters"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             
             # Use the prepare_swap_parameters function from adapters.py
@@ -156,7 +200,7 @@ class SwapParamTransformer:
                     "termination_date": params["termination_date"].isoformat(),
                 },
                 tags=["swap", "transform", "success"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             
             return params
@@ -167,7 +211,7 @@ class SwapParamTransformer:
                 message="Error transforming trade JSON",
                 level=LogLevel.ERROR,
                 tags=["swap", "transform", "error"],
-                entity=my_entity
+                entity=current_entity_name()
             )
             raise
 
@@ -178,7 +222,7 @@ def load_ql_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
             "Loading QuantLib parameters",
             event_type=EventType.SYSTEM_EVENT,
             tags=["swap", "quantlib", "parameters"],
-            entity=my_entity
+            entity=current_entity_name()
         )
         
         # All we need to do is pass through the parameters already transformed
@@ -194,7 +238,7 @@ def load_ql_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
                 "termination_date": params["termination_date"].isoformat(),
             },
             tags=["swap", "quantlib", "success"],
-            entity=my_entity
+            entity=current_entity_name()
         )
         
         return params
@@ -205,7 +249,7 @@ def load_ql_parameters(params: Dict[str, Any]) -> Dict[str, Any]:
             message="Error loading QuantLib parameters",
             level=LogLevel.ERROR,
             tags=["swap", "quantlib", "error"],
-            entity=my_entity
+            entity=current_entity_name()
         )
         raise
 
@@ -217,7 +261,7 @@ def create_swap_cashflows(**kwargs) -> Tuple[List[Dict[str, Any]], List[Dict[str
             event_type=EventType.SYSTEM_EVENT,
             tags=["swap", "cashflow", "calculation"],
             data={"fixed_leg": kwargs["fixed_leg"], "floating_leg": kwargs["floating_leg"]},
-            entity=my_entity
+            entity=current_entity_name()
         )
         
         # Delegate to the calculator module
@@ -234,6 +278,76 @@ def create_swap_cashflows(**kwargs) -> Tuple[List[Dict[str, Any]], List[Dict[str
             message="Error creating swap cashflows",
             level=LogLevel.ERROR,
             tags=["swap", "cashflow", "error"],
-            entity=my_entity
+            entity=current_entity_name()
         )
-        raise
\ No newline at end of file
+        raise
+
+def _leg_periods(params: Dict[str, Any], leg: Dict[str, Any]) -> Iterator[Tuple[date, date]]:
+    return iter_period_dates(
+        params["effective_date"],
+        params["termination_date"],
+        leg["frequency"]["months"],
+        leg.get("business_day_convention", "ModifiedFollowing"),
+        leg.get("currency"),
+        leg["frequency"].get("days", 0)
+    )
+
+def iter_swap_output(trade_json: dict) -> Iterator[Dict[str, Any]]:
+    """transform_output of a swap as a stream of records, for schedules too long to build at once.
+
+    Yields ``{"tradeInfo": ...}``, then per leg a ``{"leg": ...}`` header
+    (with its number of periods) followed by one record per cashflow, in the
+    same format as transform_output. Schedules and cashflows are generated
+    lazily, so memory does not grow with the number of periods.
+    """
+    params = prepare_swap_parameters(trade_json)
+    trade_summary = trade_json["TradeSummary"]
+    yield {"tradeInfo": _trade_info(trade_summary)}
+
+    value_labels: Dict[Any, str] = {}
+
+    def label(value: Any) -> str:
+        try:
+            return value_labels[value]
+        except KeyError:
+            value_labels[value] = text = format_rate(value)
+            return text
+
+    # Same leg order as transform_output: fixed leg first, floating second
+    for leg_number, leg, is_floating in ((1, params["fixed_leg"], False), (2, params["floating_leg"], True)):
+        payer = trade_summary[f"Leg {leg_number} Payer"]
+        # A counting pass over the schedule keeps the periods themselves out of memory
+        payment_count = sum(1 for _ in _leg_periods(params, leg))
+        yield {"leg": {
+            "legNumber": leg_number,
+            "payer": payer["Company"],
+            "dayCountConvention": payer["Date Basis"],
+            "currency": payer["Leg Currency"],
+            "legType": payer["Leg Type"],
+            "periods": payment_count
+        }}
+        cashflows = iter_cashflows(
+            _leg_periods(params, leg),
+            payment_count,
+            leg["notional"],
+            None if is_floating else leg["rate"],
+            leg.get("spread", 0) if is_floating else 0.0,
+            leg.get("day_count_convention", "Actual/365"),
+            leg.get("amortization_type", "BULLET"),
+            is_floating,
+            leg.get("rate", "Unknown") if is_floating else None,
+            leg.get("lookback", 0),
+            leg.get("lockout", 0),
+            leg.get("observation_shift", False)
+        )
+        for cashflow in cashflows:
+            yield {
+                "legNumber": leg_number,
+                "startDate": _date_label(cashflow.start_date.toordinal()),
+                "endDate": _date_label(cashflow.end_date.toordinal()),
+                "rate": label(cashflow.rate),
+                "spread": label(cashflow.spread),
+                "remainingCapital": cashflow.notional,
+                "amortization": cashflow.amortization,
+                "interest": cashflow.interest
+            }
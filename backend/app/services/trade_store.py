@@ -0,0 +1,341 @@
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.swap_calculator.terms import parse_date
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name, get_entity_registry
+
+NOT_MENTIONED = "Not Mentioned"
+
+# Columns that can be used to order (and therefore paginate) query results
+SORT_COLUMNS = ("id", "trade_date", "maturity")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    tenant TEXT,
+    entity TEXT,
+    user_name TEXT,
+    input_type TEXT,
+    input_digest TEXT NOT NULL,
+    provider TEXT,
+    model TEXT,
+    latency_ms INTEGER,
+    cost REAL,
+    counterparty TEXT,
+    currency_pair TEXT,
+    trade_date TEXT,
+    maturity TEXT,
+    trade_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_trades_counterparty ON trades (counterparty, id);
+CREATE INDEX IF NOT EXISTS ix_trades_currency_pair ON trades (currency_pair, id);
+CREATE INDEX IF NOT EXISTS ix_trades_trade_date ON trades (trade_date, id);
+CREATE INDEX IF NOT EXISTS ix_trades_maturity ON trades (maturity, id);
+CREATE INDEX IF NOT EXISTS ix_trades_input_digest ON trades (input_digest);
+"""
+
+# Stores created before trades were kept per entity lack the tenant column
+_TENANT_INDEX = "CREATE INDEX IF NOT EXISTS ix_trades_tenant ON trades (tenant, id)"
+
+
+def compute_input_digest(input_type: str, content: Optional[str]) -> str:
+    """SHA-256 digest of the raw snip (text or base64 image) sent by the client."""
+    digest = hashlib.sha256()
+    digest.update(input_type.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update((content or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _to_iso_date(value: Any) -> Optional[str]:
+    """Convert a DD-MM-YYYY trade date to ISO so it sorts lexicographically."""
+    if not isinstance(value, str) or not value or value == NOT_MENTIONED:
+        return None
+    parsed = parse_date(value)
+    return parsed.isoformat() if parsed is not None else None
+
+
+def _extract_index_fields(trade_summary: Dict[str, Any], user_entity: Optional[str]) -> Dict[str, Optional[str]]:
+    """Pull the indexed lookup fields out of an FX or swap TradeSummary."""
+    if "Currency 1" in trade_summary:
+        ccy1 = trade_summary.get("Currency 1")
+        ccy2 = trade_summary.get("Currency 2")
+        companies = [
+            (trade_summary.get("Price Maker") or {}).get("Company"),
+            (trade_summary.get("Price Taker") or {}).get("Company"),
+        ]
+    else:
+        leg1 = trade_summary.get("Leg 1 Payer") or {}
+        leg2 = trade_summary.get("Leg 2 Payer") or {}
+        ccy1 = leg1.get("Leg Currency")
+        ccy2 = leg2.get("Leg Currency")
+        companies = [leg1.get("Company"), leg2.get("Company")]
+
+    # The counterparty is whichever side is not our own entity
+    companies = [c for c in companies if c and c != NOT_MENTIONED]
+    others = [c for c in companies if c != user_entity]
+    counterparty = others[0] if others else (companies[0] if companies else None)
+
+    currency_pair = None
+    if ccy1 and ccy2 and NOT_MENTIONED not in (ccy1, ccy2):
+        currency_pair = f"{ccy1}/{ccy2}".upper()
+
+    return {
+        "counterparty": counterparty,
+        "currency_pair": currency_pair,
+        "trade_date": _to_iso_date(trade_summary.get("Trade Date")),
+        "maturity": _to_iso_date(trade_summary.get("Maturity")),
+    }
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Encode the last row's sort key into an opaque pagination cursor."""
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, int(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+class TradeStore:
+    """Embedded SQLite store of every validated TradeSummary.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    readers streaming history never block the writer on the request path.
+
+    Every trade records the entity (``tenant``) it was extracted for.
+    Reads given a ``tenant`` only see that entity's trades; trades stored
+    before entities were recorded belong to ``default_tenant``.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, default_tenant: Optional[str] = None):
+        self.db_path = db_path or settings.TRADE_STORE_PATH
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(trades)")}
+        if "tenant" not in columns:
+            conn.execute("ALTER TABLE trades ADD COLUMN tenant TEXT")
+        conn.execute(_TENANT_INDEX)
+        if default_tenant is not None:
+            conn.execute("UPDATE trades SET tenant = ? WHERE tenant IS NULL", (default_tenant,))
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save_trade(
+        self,
+        trade_json: Dict[str, Any],
+        input_digest: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        latency_ms: Optional[int] = None,
+        cost: Optional[float] = None,
+        user_name: Optional[str] = None,
+        user_entity: Optional[str] = None,
+        input_type: Optional[str] = None,
+        tenant: Optional[str] = None,
+    ) -> int:
+        """Persist a validated trade for entity ``tenant`` and return its id."""
+        fields = _extract_index_fields(trade_json["TradeSummary"], user_entity)
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO trades (
+                    created_at, tenant, entity, user_name, input_type, input_digest,
+                    provider, model, latency_ms, cost,
+                    counterparty, currency_pair, trade_date, maturity, trade_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    datetime.utcnow().isoformat(timespec="milliseconds"),
+                    tenant,
+                    user_entity,
+                    user_name,
+                    input_type,
+                    input_digest,
+                    provider,
+                    model,
+                    latency_ms,
+                    cost,
+                    fields["counterparty"],
+                    fields["currency_pair"],
+                    fields["trade_date"],
+                    fields["maturity"],
+                    json.dumps(trade_json, separators=(",", ":")),
+                ),
+            )
+        return cursor.lastrowid
+
+    def update_trade_json(self, trade_id: int, trade_json: Dict[str, Any], tenant: Optional[str] = None) -> bool:
+        """Replace a stored trade's JSON (and index fields); False if the id is unknown (to ``tenant``)."""
+        conn = self._connection()
+        with conn:
+            row = conn.execute(
+                "SELECT entity FROM trades WHERE id = ?" + (" AND tenant = ?" if tenant is not None else ""),
+                (trade_id,) if tenant is None else (trade_id, tenant)
+            ).fetchone()
+            if row is None:
+                return False
+            fields = _extract_index_fields(trade_json["TradeSummary"], row["entity"])
+            conn.execute(
+                """
+                UPDATE trades
+                SET counterparty = ?, currency_pair = ?, trade_date = ?, maturity = ?, trade_json = ?
+                WHERE id = ?
+                """,
+                (
+                    fields["counterparty"],
+                    fields["currency_pair"],
+                    fields["trade_date"],
+                    fields["maturity"],
+                    json.dumps(trade_json, separators=(",", ":")),
+                    trade_id,
+                ),
+            )
+        return True
+
+    def get_trade(self, trade_id: int, tenant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fetch a single stored trade by id (None when it is not ``tenant``'s)."""
+        row = self._connection().execute(
+            "SELECT * FROM trades WHERE id = ?" + (" AND tenant = ?" if tenant is not None else ""),
+            (trade_id,) if tenant is None else (trade_id, tenant)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def iter_trades(
+        self,
+        counterparty: Optional[str] = None,
+        currency_pair: Optional[str] = None,
+        trade_date_from: Optional[str] = None,
+        trade_date_to: Optional[str] = None,
+        maturity_from: Optional[str] = None,
+        maturity_to: Optional[str] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        tenant: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield matching trades newest-first using keyset pagination.
+
+        Results are ordered by ``(sort, id)`` descending; passing the cursor
+        from the previous page continues strictly after its last row, so
+        every page is an index range scan regardless of how deep it is.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Invalid sort column: {sort}")
+
+        clauses = []
+        args = []
+        if tenant is not None:
+            clauses.append("tenant = ?")
+            args.append(tenant)
+        if counterparty:
+            clauses.append("counterparty = ?")
+            args.append(counterparty)
+        if currency_pair:
+            clauses.append("currency_pair = ?")
+            args.append(currency_pair.upper())
+        if trade_date_from:
+            clauses.append("trade_date >= ?")
+            args.append(trade_date_from)
+        if trade_date_to:
+            clauses.append("trade_date <= ?")
+            args.append(trade_date_to)
+        if maturity_from:
+            clauses.append("maturity >= ?")
+            args.append(maturity_from)
+        if maturity_to:
+            clauses.append("maturity <= ?")
+            args.append(maturity_to)
+
+        if sort != "id":
+            # Rows without a value for the sort column can't be keyset-paged
+            clauses.append(f"{sort} IS NOT NULL")
+
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor)
+            if sort == "id":
+                clauses.append("id < ?")
+                args.append(last_id)
+            else:
+                clauses.append(f"({sort}, id) < (?, ?)")
+                args.extend([sort_value, last_id])
+
+        order_by = "id DESC" if sort == "id" else f"{sort} DESC, id DESC"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT * FROM trades {where} ORDER BY {order_by} LIMIT ?"
+        args.append(limit)
+
+        # Fetched in one step: a StreamingResponse may resume this generator
+        # on another threadpool thread, which has its own connection
+        rows = self._connection().execute(query, args).fetchall()
+        for row in rows:
+            yield self._row_to_dict(row)
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["trade_json"] = json.loads(record["trade_json"])
+        return record
+
+
+_trade_store: Optional[TradeStore] = None
+_trade_store_lock = threading.Lock()
+
+
+def get_trade_store() -> TradeStore:
+    """Return the process-wide trade store, creating it on first use."""
+    global _trade_store
+    if _trade_store is not None:
+        return _trade_store
+    # Concurrent first requests must not open (and migrate) the store twice
+    with _trade_store_lock:
+        if _trade_store is not None:
+            return _trade_store
+        try:
+            _trade_store = TradeStore(default_tenant=get_entity_registry().default.name)
+        except Exception as e:
+            logger.log_exception(
+                e,
+                message="Error opening trade store",
+                level=LogLevel.ERROR,
+                tags=["trade-store", "init", "error"],
+                entity=current_entity_name()
+            )
+            raise
+        logger.info(
+            "Trade store opened",
+            event_type=EventType.SYSTEM_EVENT,
+            data={"db_path": _trade_store.db_path},
+            tags=["trade-store", "init"],
+            entity=current_entity_name()
+        )
+    return _trade_store
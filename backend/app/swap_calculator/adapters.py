@@ -1,114 +1,17 @@
 # backend/app/swap_calculator/adapters.py
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from typing import Dict, Any, Union, Tuple
 import math
-from app.swap_calculator.constants import (
-    DayCountConvention, 
-    BusinessDayConvention, 
-    PaymentFrequency,
-    FREQUENCY_MONTHS
+import re
+# Term parsers live in terms; re-exported here for existing callers
+from app.swap_calculator.terms import (
+    parse_business_day_convention,
+    parse_date,
+    parse_date_basis,
+    parse_frequency,
+    parse_maturity
 )
 
-def parse_date_basis(date_basis_str: str) -> str:
-    """Convert a string date basis to a standardized format."""
-    date_basis_lower = date_basis_str.lower()
-    
-    if "actual/360" in date_basis_lower:
-        return DayCountConvention.ACT_360
-    elif "actual/365" in date_basis_lower:
-        return DayCountConvention.ACT_365
-    elif "30/360" in date_basis_lower:
-        return DayCountConvention.THIRTY_360
-    elif "30e/360" in date_basis_lower:
-        return DayCountConvention.THIRTY_E_360
-    
-    return DayCountConvention.ACT_360  # Default
-
-def parse_business_day_convention(bdc_str: str) -> str:
-    """Convert a string business day convention to a standardized format."""
-    bdc_lower = bdc_str.lower()
-    
-    if "modified following" in bdc_lower:
-        return BusinessDayConvention.MODIFIED_FOLLOWING
-    elif "following" in bdc_lower:
-        return BusinessDayConvention.FOLLOWING
-    elif "modified preceding" in bdc_lower:
-        return BusinessDayConvention.MODIFIED_PRECEDING
-    elif "preceding" in bdc_lower:
-        return BusinessDayConvention.PRECEDING
-    elif "no adjustment" in bdc_lower:
-        return BusinessDayConvention.UNADJUSTED
-    
-    return BusinessDayConvention.MODIFIED_FOLLOWING  # Default
-
-def parse_frequency(frequency_str: str) -> Dict[str, Any]:
-    """Convert a string frequency to standardized period and months."""
-    frequency_lower = frequency_str.lower()
-    
-    if "daily" in frequency_lower:
-        period = PaymentFrequency.DAILY
-    elif "weekly" in frequency_lower:
-        period = PaymentFrequency.WEEKLY
-    elif "monthly" in frequency_lower:
-        period = PaymentFrequency.MONTHLY
-    elif "quarterly" in frequency_lower:
-        period = PaymentFrequency.QUARTERLY
-    elif "semi-annually" in frequency_lower or "semiannually" in frequency_lower:
-        period = PaymentFrequency.SEMIANNUAL
-    elif "annually" in frequency_lower:
-        period = PaymentFrequency.ANNUAL
-    elif "one-off" in frequency_lower:
-        period = PaymentFrequency.ONCE
-    else:
-        period = PaymentFrequency.SEMIANNUAL  # Default
-    
-    return {
-        "period": period,
-        "months": FREQUENCY_MONTHS[period]
-    }
-
-def parse_maturity(maturity_str: str, effective_date: date) -> date:
-    """Convert a maturity string to a date."""
-    # Try to parse as a specific date first
-    try:
-        return datetime.strptime(maturity_str, "%d-%m-%Y").date()
-    except ValueError:
-        pass
-    
-    # Parse as a tenor (e.g., "5Y", "10Y", "1Y6M")
-    years = months = 0
-    
-    # Extract years
-    if "Y" in maturity_str:
-        years_part = maturity_str.split("Y")[0]
-        if years_part:
-            years = float(years_part)
-    
-    # Extract months
-    if "M" in maturity_str:
-        months_part = maturity_str.split("M")[0]
-        if "Y" in months_part:
-            months_part = months_part.split("Y")[1]
-        if months_part and months_part.strip():
-            months = int(months_part)
-    
-    # Calculate termination date
-    total_months = int(years * 12) + months
-    years_to_add = total_months // 12
-    months_to_add = total_months % 12
-    
-    new_year = effective_date.year + years_to_add
-    new_month = effective_date.month + months_to_add
-    
-    if new_month > 12:
-        new_year += 1
-        new_month -= 12
-    
-    # Handle month end adjustments
-    day = min(effective_date.day, get_month_end_day(new_year, new_month))
-    
-    return date(new_year, new_month, day)
-
 def get_month_end_day(year: int, month: int) -> int:
     """Get the last day of the specified month."""
     if month == 12:
@@ -136,13 +39,37 @@ def parse_rate(rate_value: Union[str, float]) -> float:
     
     return 0.0
 
+def parse_amortization_type(amortization_str: str) -> str:
+    """Convert an amortization description to BULLET or LINEAR."""
+    if "linear" in str(amortization_str).lower():
+        return "LINEAR"
+    return "BULLET"  # Default
+
+def parse_spread(spread_value: Union[str, float]) -> float:
+    """Convert a spread (in percent) to a float; unparseable values count as no spread."""
+    try:
+        return float(str(spread_value).replace("%", "").strip())
+    except ValueError:
+        return 0.0
+
+def parse_business_days(days_value: Union[str, int]) -> int:
+    """Convert a lookback/lockout such as "2", "2 BD" or "2 days" to a number of business days."""
+    match = re.search(r"\d+", str(days_value))
+    return int(match.group()) if match else 0
+
+def parse_flag(flag_value: Union[str, bool]) -> bool:
+    """Interpret yes/no style values ("Yes", "true", "Y", "1")."""
+    return str(flag_value).strip().lower() in ("yes", "y", "true", "1")
+
 def prepare_swap_parameters(trade_json: Dict[str, Any]) -> Dict[str, Any]:
     """Transform trade JSON into parameters for cashflow calculation."""
     trade_summary = trade_json["TradeSummary"]
     
     # Get trade date
     trade_date_str = trade_summary["Trade Date"]
-    trade_date = datetime.strptime(trade_date_str, "%d-%m-%Y").date()
+    trade_date = parse_date(trade_date_str)
+    if trade_date is None:
+        raise ValueError(f"Invalid trade date: {trade_date_str}")
     
     # Calculate effective date (trade date + start lag)
     start_lag = int(trade_summary.get("Start Lag", 0))
@@ -166,11 +93,23 @@ def prepare_swap_parameters(trade_json: Dict[str, Any]) -> Dict[str, Any]:
             "rate": rate,
             "notional": float(leg["Notional Amount"]),
             "currency": leg["Leg Currency"],
-            "date_basis": parse_date_basis(leg["Date Basis"]),
+            "day_count_convention": parse_date_basis(leg["Date Basis"]),
             "business_day_convention": parse_business_day_convention(leg["Business Date Adjustment"]),
             "frequency": parse_frequency(leg.get("Coupon Frequency", "Semi-Annually")),
             "company": leg["Company"]
         }
+        # Optional fields, only present once a trade has been amended
+        if "Spread" in leg:
+            params["spread"] = parse_spread(leg["Spread"])
+        if "Amortization Type" in leg:
+            params["amortization_type"] = parse_amortization_type(leg["Amortization Type"])
+        # Compounding conventions of overnight-index legs
+        if "Lookback Days" in leg:
+            params["lookback"] = parse_business_days(leg["Lookback Days"])
+        if "Lockout Days" in leg:
+            params["lockout"] = parse_business_days(leg["Lockout Days"])
+        if "Observation Shift" in leg:
+            params["observation_shift"] = parse_flag(leg["Observation Shift"])
         legs.append(params)
     
     # Determine which leg is fixed and which is floating
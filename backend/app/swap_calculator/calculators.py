@@ -1,17 +1,75 @@
 from datetime import date, timedelta
-from typing import List, Dict, Any, Tuple, Optional
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Optional, Sequence
 import math
-import calendar
+from functools import lru_cache
 # Default floating rate removed - no longer needed
 from app.swap_calculator.constants import (
+    BusinessDayConvention,
     FREQUENCY_MONTHS
 )
+from app.swap_calculator.calendars import HolidayCalendar, get_calendar
+from app.swap_calculator.daycount import DayCounter, DEFAULT_CONVENTION, get_day_counter
+from app.swap_calculator.curves import get_curve
+from app.swap_calculator.fixings import get_fixings, index_rates
+import numpy as np
 from app.main import logger
 from core_logging.client import EventType, LogLevel
-import os
+from app.entities import current_entity_name
 
-# Get parameters from environment variables
-my_entity = os.environ.get('MY_ENTITY', 'Unknown')
+class Cashflow:
+    """One period of a leg, holding native dates and numbers.
+
+    Formatting is left to ``transform_output``; ``to_dict`` gives the legacy
+    per-period dict with ISO date strings.
+    """
+
+    __slots__ = ("start_date", "end_date", "rate", "spread", "notional", "amortization", "interest")
+
+    def __init__(
+        self,
+        start_date: date,
+        end_date: date,
+        rate: Any,
+        spread: float,
+        notional: float,
+        amortization: float,
+        interest: Any
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.rate = rate
+        self.spread = spread
+        self.notional = notional
+        self.amortization = amortization
+        self.interest = interest
+
+    def __repr__(self) -> str:
+        return f"Cashflow({self.start_date}, {self.end_date}, notional={self.notional!r}, interest={self.interest!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "Start Date": self.start_date.isoformat(),
+            "End Date": self.end_date.isoformat(),
+            "Rate": self.rate,
+            "Spread": self.spread,
+            "Notional": self.notional,
+            "Amortization": self.amortization,
+            "Interest": self.interest
+        }
+
+def _get_day_counter(day_count_convention: str) -> DayCounter:
+    """Resolve a day count convention, falling back to Actual/365 for unknown names."""
+    try:
+        return get_day_counter(day_count_convention)
+    except ValueError:
+        logger.warning(
+            f"Day count convention '{day_count_convention}' not recognized. Using Actual/365.",
+            event_type=EventType.SYSTEM_EVENT,
+            tags=["quantlib", "cashflow", "warning"],
+            entity=current_entity_name()
+        )
+        return get_day_counter(DEFAULT_CONVENTION)
 
 def calculate_interest(
     notional: float,
@@ -33,106 +91,52 @@ def calculate_interest(
     Returns:
         The calculated interest amount
     """
-    accrual_days = (end_date - start_date).days
     rate_decimal = rate / 100  # Convert percentage to decimal
-    
-    if day_count_convention == "Actual/365" or day_count_convention == "Actual/365F":
-        return notional * rate_decimal * accrual_days / 365
-    
-    elif day_count_convention == "Actual/360":
-        return notional * rate_decimal * accrual_days / 360
-    
-    elif day_count_convention == "30/360" or day_count_convention == "Bond Basis":
-        # Implement 30/360 (ISDA) convention
-        d1 = min(start_date.day, 30)
-        d2 = min(end_date.day, 30) if d1 == 30 else end_date.day
-        days_360 = (360 * (end_date.year - start_date.year) + 
-                   30 * (end_date.month - start_date.month) + 
-                   (d2 - d1))
-        return notional * rate_decimal * days_360 / 360
-    
-    elif day_count_convention == "30E/360" or day_count_convention == "Eurobond Basis":
-        # European 30/360
-        d1 = min(start_date.day, 30)
-        d2 = min(end_date.day, 30)
-        days_360 = (360 * (end_date.year - start_date.year) + 
-                   30 * (end_date.month - start_date.month) + 
-                   (d2 - d1))
-        return notional * rate_decimal * days_360 / 360
-    
-    elif day_count_convention == "Actual/Actual" or day_count_convention == "Actual/Actual ISDA":
-        # Handle leap years properly
-        if start_date.year == end_date.year:
-            days_in_year = 366 if calendar.isleap(start_date.year) else 365
-            return notional * rate_decimal * accrual_days / days_in_year
-        else:
-            # Split calculation across years
-            interest = 0
-            current_date = start_date
-            while current_date < end_date:
-                year_end = date(current_date.year, 12, 31)
-                if year_end >= end_date:
-                    period_end = end_date
-                else:
-                    period_end = year_end
-                
-                days_in_period = (period_end - current_date).days
-                days_in_year = 366 if calendar.isleap(current_date.year) else 365
-                
-                interest += notional * rate_decimal * days_in_period / days_in_year
-                current_date = date(period_end.year + 1, 1, 1)
-            
-            return interest
-    
-    # Default to Actual/365 if convention not recognized
-    logger.warning(
-        f"Day count convention '{day_count_convention}' not recognized. Using Actual/365.",
-        event_type=EventType.SYSTEM_EVENT,
-        tags=["quantlib", "cashflow", "warning"],
-        entity=my_entity
-    )
-    return notional * rate_decimal * accrual_days / 365
+    year_fraction = _get_day_counter(day_count_convention).year_fraction
+    return notional * rate_decimal * year_fraction(start_date, end_date)
 
-def is_business_day(check_date: date) -> bool:
-    """Check if a given date is a business day (not weekend)."""
-    # This is a simplified implementation - in a real system, you'd check
-    # against a holiday calendar as well
-    return check_date.weekday() < 5  # 0-4 are Monday to Friday
+def _get_calendar(calendar: Optional[str]) -> HolidayCalendar:
+    """Resolve a calendar code, falling back to weekends only for unknown codes."""
+    try:
+        return get_calendar(calendar)
+    except ValueError:
+        logger.warning(
+            f"No holiday calendar for '{calendar}'. Using weekends only.",
+            event_type=EventType.SYSTEM_EVENT,
+            tags=["quantlib", "calendar", "warning"],
+            entity=current_entity_name()
+        )
+        return get_calendar(None)
 
-def adjust_for_business_day(check_date: date, convention: str) -> date:
+def is_business_day(check_date: date, calendar: Optional[str] = None) -> bool:
+    """
+    Check if a given date is a business day.
+
+    Args:
+        check_date: The date to check
+        calendar: Currency, financial centre or joint code (e.g. "USD+CLP").
+            None only excludes weekends.
+    """
+    return _get_calendar(calendar).is_business_day(check_date)
+
+def adjust_for_business_day(check_date: date, convention: str, calendar: Optional[str] = None) -> date:
     """
     Adjust a date according to the specified business day convention.
     
     Args:
         check_date: The date to adjust
         convention: The business day convention to apply
-            "FOLLOWING": Move to the next business day
-            "MODIFIED_FOLLOWING": Move to the next business day unless it's in the next month,
+            "Following": Move to the next business day
+            "ModifiedFollowing": Move to the next business day unless it's in the next month,
                                  in which case move to the previous business day
-            "PRECEDING": Move to the previous business day
-            "NONE": No adjustment
+            "Preceding": Move to the previous business day
+            "ModifiedPreceding": Move to the previous business day unless it's in the previous
+                                 month, in which case move to the next business day
+            "Unadjusted": No adjustment
+        calendar: Currency, financial centre or joint code whose holidays apply.
+            None only excludes weekends.
     """
-    if convention == "Unadjusted" or is_business_day(check_date):
-        return check_date
-    
-    if convention == "Following":
-        while not is_business_day(check_date):
-            check_date = check_date + timedelta(days=1)
-    elif convention == "ModifiedFollowing":
-        original_month = check_date.month
-        while not is_business_day(check_date):
-            check_date = check_date + timedelta(days=1)
-            # If we've moved to the next month, go back to previous business day
-            if check_date.month != original_month:
-                check_date = check_date - timedelta(days=1)
-                while not is_business_day(check_date):
-                    check_date = check_date - timedelta(days=1)
-                break
-    elif convention == "Preceding":
-        while not is_business_day(check_date):
-            check_date = check_date - timedelta(days=1)
-    
-    return check_date
+    return _get_calendar(calendar).adjust(check_date, convention)
 
 def add_months(start_date: date, months: int) -> date:
     """Add a number of months to a date, handling month-end logic."""
@@ -150,51 +154,113 @@ def add_months(start_date: date, months: int) -> date:
     current_day = min(start_date.day, _get_month_end_day(new_year, new_month))
     return date(new_year, new_month, current_day)
 
+# Maximum number of distinct schedules kept by calculate_period_dates
+SCHEDULE_CACHE_SIZE = 4096
+
+Schedule = Tuple[Tuple[date, date], ...]
+
+ONE_DAY = timedelta(days=1)
+FOLLOWING = BusinessDayConvention.FOLLOWING.value
+
 def calculate_period_dates(
     effective_date: date,
     termination_date: date,
     frequency_months: int,
-    business_day_convention: str
-) -> List[Tuple[date, date]]:
+    business_day_convention: str,
+    calendar: Optional[str] = None,
+    frequency_days: int = 0
+) -> Schedule:
     """
     Calculate period start and end dates based on frequency and business day convention.
+
+    End dates are adjusted against the holiday calendar of ``calendar``
+    (usually the leg currency); None only excludes weekends.
+    ``frequency_days`` (see ``FREQUENCY_DAYS``) selects a Daily (1) or
+    Weekly (7) schedule instead of a monthly one.
+
+    Schedules are memoized on (effective date, termination date, frequency,
+    business day convention, resolved calendar), so legs and trades that share
+    them reuse the same immutable tuple. See schedule_cache_stats().
     
-    Returns a list of tuples (start_date, end_date) for each period.
+    Returns a tuple of (start_date, end_date) tuples, one per period.
     """
-    logger.info(
-        "Calculating period dates",
-        event_type=EventType.SYSTEM_EVENT,
-        tags=["quantlib", "cashflow", "calculation"],
-        data={
-            "business_day_convention": business_day_convention,
-        },
-        entity=my_entity
+    return _build_period_dates(
+        effective_date,
+        termination_date,
+        frequency_months,
+        business_day_convention,
+        _get_calendar(calendar).name,
+        frequency_days
     )
+
+def iter_period_dates(
+    effective_date: date,
+    termination_date: date,
+    frequency_months: int,
+    business_day_convention: str,
+    calendar: Optional[str] = None,
+    frequency_days: int = 0
+) -> Iterator[Tuple[date, date]]:
+    """Lazily yield the periods of calculate_period_dates, without building or caching the schedule.
+
+    Meant for long day-based schedules that are streamed rather than kept.
     """
-    Calculate period start and end dates based on frequency and business day convention.
-    
-    Returns a list of tuples (start_date, end_date) for each period.
-    """
-    if frequency_months <= 0:
+    return _iter_periods(
+        effective_date,
+        termination_date,
+        frequency_months,
+        business_day_convention,
+        _get_calendar(calendar),
+        frequency_days
+    )
+
+def _iter_periods(
+    effective_date: date,
+    termination_date: date,
+    frequency_months: int,
+    business_day_convention: str,
+    holiday_calendar: HolidayCalendar,
+    frequency_days: int = 0
+) -> Iterator[Tuple[date, date]]:
+    if frequency_months <= 0 and frequency_days <= 0:
         # For one-off payments
-        return [(effective_date, termination_date)]
-    
-    periods = []
+        yield (effective_date, termination_date)
+        return
+
     start_date = effective_date
-    
+    step = 0
     while start_date < termination_date:
-        # Calculate the unadjusted end date
-        unadjusted_end_date = add_months(start_date, frequency_months)
-        
-        # Cap the end date at the termination date
-        if unadjusted_end_date > termination_date:
-            unadjusted_end_date = termination_date
-            
-        # Adjust the end date according to the business day convention
-        adjusted_end_date = adjust_for_business_day(unadjusted_end_date, business_day_convention)
+        step += 1
+        if frequency_days == 1:
+            # Daily periods run from one good business day to the next
+            adjusted_end_date = holiday_calendar.adjust(start_date + ONE_DAY, FOLLOWING)
+            if adjusted_end_date > termination_date:
+                adjusted_end_date = holiday_calendar.adjust(termination_date, business_day_convention)
+        else:
+            # Calculate the unadjusted end date
+            if frequency_days > 1:
+                # Weekly dates are counted from the effective date so adjustments do not drift
+                unadjusted_end_date = date.fromordinal(effective_date.toordinal() + step * frequency_days)
+            else:
+                unadjusted_end_date = add_months(start_date, frequency_months)
+
+            # Cap the end date at the termination date
+            if unadjusted_end_date > termination_date:
+                unadjusted_end_date = termination_date
+
+            # Adjust the end date according to the business day convention
+            adjusted_end_date = holiday_calendar.adjust(unadjusted_end_date, business_day_convention)
+
+        # A maturity that adjusts back onto (or before) the current start
+        # date would otherwise repeat the same empty period forever
+        if adjusted_end_date <= start_date:
+            if frequency_days > 1 and unadjusted_end_date < termination_date:
+                # A weekly date rolled back onto the previous one; try the next week
+                continue
+            break
         
         # Add the period
-        periods.append((start_date, adjusted_end_date))
+        yield (start_date, adjusted_end_date)
         
         # The next period starts after the current end date
         start_date = adjusted_end_date
@@ -202,8 +268,51 @@ def calculate_period_dates(
         # If we've reached or passed the termination date, we're done
         if start_date >= termination_date:
             break
-    
-    return periods
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def _build_period_dates(
+    effective_date: date,
+    termination_date: date,
+    frequency_months: int,
+    business_day_convention: str,
+    calendar_name: str,
+    frequency_days: int = 0
+) -> Schedule:
+    """Uncached schedule builder behind calculate_period_dates."""
+    logger.info(
+        "Calculating period dates",
+        event_type=EventType.SYSTEM_EVENT,
+        tags=["quantlib", "cashflow", "calculation"],
+        data={
+            "business_day_convention": business_day_convention,
+            "calendar": calendar_name,
+        },
+        entity=current_entity_name()
+    )
+    return tuple(_iter_periods(
+        effective_date,
+        termination_date,
+        frequency_months,
+        business_day_convention,
+        get_calendar(calendar_name),
+        frequency_days
+    ))
+
+def schedule_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the schedule cache."""
+    info = _build_period_dates.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+        "size": info.currsize,
+        "max_size": info.maxsize
+    }
+
+def clear_schedule_cache() -> None:
+    """Drop every memoized schedule (e.g. after holiday data changes)."""
+    _build_period_dates.cache_clear()
 
 def _get_month_end_day(year: int, month: int) -> int:
     """Get the last day of the specified month."""
@@ -219,7 +328,7 @@ def calculate_swap_cashflows(
     termination_date: date,
     fixed_leg: Dict[str, Any],
     floating_leg: Dict[str, Any]
-) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+) -> Tuple[List[Cashflow], List[Cashflow]]:
     """
     Calculate cashflows for a swap based on leg parameters.
     
@@ -238,7 +347,7 @@ def calculate_swap_cashflows(
                 "fixed_leg": fixed_leg,
                 "floating_leg": floating_leg
             },
-            entity=my_entity
+            entity=current_entity_name()
         )
         
         # Calculate period dates for fixed leg
@@ -248,7 +357,9 @@ def calculate_swap_cashflows(
             effective_date,
             termination_date,
             fixed_freq_months,
-            fixed_business_day_convention
+            fixed_business_day_convention,
+            fixed_leg.get("currency"),
+            fixed_leg["frequency"].get("days", 0)
         )
         
         # Calculate period dates for floating leg
@@ -258,7 +369,9 @@ def calculate_swap_cashflows(
             effective_date,
             termination_date,
             floating_freq_months,
-            floating_business_day_convention
+            floating_business_day_convention,
+            floating_leg.get("currency"),
+            floating_leg["frequency"].get("days", 0)
         )
         
         # Get day count conventions
@@ -293,7 +406,10 @@ def calculate_swap_cashflows(
             day_count_convention=floating_day_count,
             amortization_type=floating_amortization_type,
             is_floating=True,
-            reference_rate_name=reference_rate_name
+            reference_rate_name=reference_rate_name,
+            lookback=floating_leg.get("lookback", 0),
+            lockout=floating_leg.get("lockout", 0),
+            observation_shift=floating_leg.get("observation_shift", False)
         )
         
         logger.info(
@@ -301,10 +417,11 @@ def calculate_swap_cashflows(
             event_type=EventType.SYSTEM_EVENT,
             data={
                 "fixed_cashflows": len(fixed_cashflows),
-                "floating_cashflows": len(floating_cashflows)
+                "floating_cashflows": len(floating_cashflows),
+                "schedule_cache": schedule_cache_stats()
             },
             tags=["quantlib", "cashflow", "success"],
-            entity=my_entity
+            entity=current_entity_name()
         )
         
         return fixed_cashflows, floating_cashflows
@@ -315,20 +432,23 @@ def calculate_swap_cashflows(
             message="Error calculating swap cashflows",
             level=LogLevel.ERROR,
             tags=["quantlib", "cashflow", "error"],
-            entity=my_entity
+            entity=current_entity_name()
         )
         raise
 
 def _generate_cashflows(
-    periods: List[Tuple[date, date]],
+    periods: Sequence[Tuple[date, date]],
     notional: float,
     rate: Optional[float],
     spread: float = 0.0,
     day_count_convention: str = "Actual/365",
     amortization_type: str = "BULLET",
     is_floating: bool = False,
-    reference_rate_name: Optional[str] = None
-) -> List[Dict[str, Any]]:
+    reference_rate_name: Optional[str] = None,
+    lookback: int = 0,
+    lockout: int = 0,
+    observation_shift: bool = False
+) -> List[Cashflow]:
     """
     Generate cashflows for any leg type (fixed or floating).
     
@@ -340,59 +460,104 @@ def _generate_cashflows(
         day_count_convention: The day count convention to use
         amortization_type: The amortization schedule type (BULLET or LINEAR)
         is_floating: Whether this is a floating rate leg
-        reference_rate_name: Name of the reference rate for floating legs
+        reference_rate_name: Name of the reference rate for floating legs.
+            When fixings exist for it (see ``fixings.get_fixings``), floating
+            interest compounds them in arrears plus spread; periods (or their
+            parts) without fixings are projected from its curve (see
+            ``curves.get_curve``). Interest that cannot be determined is "TBD".
+        lookback, lockout, observation_shift: Compounding conventions for
+            floating legs with fixings (see ``fixings.FixingsStore``)
         
     Returns:
-        List of cashflow dictionaries
+        List of Cashflow objects, one per period
+    """
+    return list(iter_cashflows(
+        periods, len(periods), notional, rate, spread, day_count_convention, amortization_type,
+        is_floating, reference_rate_name, lookback, lockout, observation_shift
+    ))
+
+# Periods whose floating rates are computed together by iter_cashflows
+CASHFLOW_CHUNK_SIZE = 1024
+
+def iter_cashflows(
+    periods: Iterable[Tuple[date, date]],
+    payment_count: int,
+    notional: float,
+    rate: Optional[float],
+    spread: float = 0.0,
+    day_count_convention: str = "Actual/365",
+    amortization_type: str = "BULLET",
+    is_floating: bool = False,
+    reference_rate_name: Optional[str] = None,
+    lookback: int = 0,
+    lockout: int = 0,
+    observation_shift: bool = False
+) -> Iterator[Cashflow]:
+    """Lazily yield the cashflows of _generate_cashflows for an iterable of periods.
+
+    ``payment_count`` is the number of periods (amortization needs it up
+    front). Floating rates are computed ``CASHFLOW_CHUNK_SIZE`` periods at a
+    time, so memory stays bounded however long the schedule is.
     """
-    cashflows = []
     remaining_notional = notional
-    payment_count = len(periods)
-    
-    for i, (start_date, end_date) in enumerate(periods):
-        # Calculate accrual days
-        accrual_days = (end_date - start_date).days
-        
-        # Calculate amortization based on type
-        if amortization_type == "LINEAR":
-            # Distribute amortization equally across periods
-            amortization_per_period = notional / payment_count if payment_count > 0 else notional
-            if i == payment_count - 1:  # Last payment
-                amortization = remaining_notional  # Handle rounding errors
-            else:
-                amortization = amortization_per_period
-        else:  # Default is BULLET
-            # No amortization until final payment
-            if i == payment_count - 1:  # Last payment
-                amortization = remaining_notional
+    # Resolve the day count convention once for the whole leg
+    year_fraction = _get_day_counter(day_count_convention).year_fraction
+    rate_decimal = rate / 100 if rate is not None else None
+    if is_floating:
+        # Display reference rate name + spread
+        rate_display = f"{reference_rate_name}{'+' + str(spread) if spread > 0 else ''}"
+    else:
+        rate_display = rate
+
+    # Floating coupon rates from fixings and/or the curve
+    curve = get_curve(reference_rate_name) if is_floating else None
+    fixings = get_fixings(reference_rate_name) if is_floating else None
+    periods = iter(periods)
+    i = 0
+    while True:
+        chunk = list(islice(periods, CASHFLOW_CHUNK_SIZE))
+        if not chunk:
+            break
+        projected_rates = None
+        if curve is not None or fixings is not None:
+            size = len(chunk)
+            starts = np.fromiter((s.toordinal() for s, _ in chunk), dtype=np.int64, count=size)
+            ends = np.fromiter((e.toordinal() for _, e in chunk), dtype=np.int64, count=size)
+            accruals = np.fromiter((year_fraction(s, e) for s, e in chunk), dtype=np.float64, count=size)
+            rates = index_rates(curve, fixings, starts, ends, accruals, lookback, lockout, observation_shift)
+            projected_rates = (rates + spread / 100).tolist()
+
+        for j, (start_date, end_date) in enumerate(chunk):
+            # Calculate amortization based on type
+            if amortization_type == "LINEAR":
+                # Distribute amortization equally across periods
+                amortization_per_period = notional / payment_count if payment_count > 0 else notional
+                if i == payment_count - 1:  # Last payment
+                    amortization = remaining_notional  # Handle rounding errors
+                else:
+                    amortization = amortization_per_period
+            else:  # Default is BULLET
+                # No amortization until final payment
+                if i == payment_count - 1:  # Last payment
+                    amortization = remaining_notional
+                else:
+                    amortization = 0
+
+            # Calculate interest differently based on leg type
+            if projected_rates is not None and not math.isnan(projected_rates[j]):
+                # Floating leg from fixings or projected from the index curve
+                interest = remaining_notional * projected_rates[j] * year_fraction(start_date, end_date)
+            elif is_floating:
+                # For floating legs, interest will be determined later
+                interest = "TBD"  # To be determined
             else:
-                amortization = 0
-        
-        # Calculate interest differently based on leg type
-        if is_floating:
-            # For floating legs, interest will be determined later
-            # Display reference rate name + spread
-            rate_display = f"{reference_rate_name}{'+' + str(spread) if spread > 0 else ''}"
-            interest = "TBD"  # To be determined
-        else:
-            # For fixed legs, calculate interest based on fixed rate
-            interest = calculate_interest(remaining_notional, rate, start_date, end_date, day_count_convention)
-            rate_display = rate
-        
-        # Create cashflow entry
-        cashflow = {
-            "Start Date": start_date.strftime("%Y-%m-%d"),
-            "End Date": end_date.strftime("%Y-%m-%d"),
-            "Rate": rate_display,
-            "Spread": spread,
-            "Notional": remaining_notional,
-            "Amortization": amortization,
-            "Interest": interest
-        }
-        
-        cashflows.append(cashflow)
-        
-        # Update for next period
-        remaining_notional -= amortization
-    
-    return cashflows
\ No newline at end of file
+                # For fixed legs, calculate interest based on fixed rate
+                interest = remaining_notional * rate_decimal * year_fraction(start_date, end_date)
+
+            yield Cashflow(
+                start_date, end_date, rate_display, spread, remaining_notional, amortization, interest
+            )
+
+            # Update for next period
+            remaining_notional -= amortization
+            i += 1
@@ -0,0 +1,198 @@
+# backend/app/swap_calculator/calendars.py
+"""Holiday calendars with precomputed business-day lookup tables.
+
+Holidays are loaded from ``data/holidays/<CENTRE>.txt`` (one ISO date per
+line). For each calendar we precompute, over a fixed year range, a packed
+business-day bitmap and the offset of the next/previous business day for
+every calendar day, so every business-day adjustment is a single table
+lookup instead of a day-by-day walk.
+
+Calendars are addressed by financial centre ("CLSA") or currency ("CLP");
+joint calendars are written with "+" (e.g. "USD+CLP") and treat a day as a
+business day only when it is one in every member calendar.
+"""
+import os
+from array import array
+from datetime import date
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional
+
+import numpy as np
+
+from app.swap_calculator.constants import BusinessDayConvention, CURRENCY_CALENDARS
+
+HOLIDAY_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "holidays")
+
+# Year range covered by the lookup tables; dates outside it fall back to a
+# slower walk against the holiday set
+FIRST_YEAR = 2000
+LAST_YEAR = 2080
+
+WEEKENDS_ONLY = "WEEKENDS"
+
+
+@lru_cache(maxsize=None)
+def load_holidays(centre: str) -> FrozenSet[date]:
+    """Read the holiday file of a single financial centre."""
+    path = os.path.join(HOLIDAY_DATA_DIR, f"{centre}.txt")
+    holidays = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            holidays.add(date.fromisoformat(line.split()[0]))
+    return frozenset(holidays)
+
+
+@lru_cache(maxsize=1)
+def available_centres() -> FrozenSet[str]:
+    """Financial centres that have a holiday file."""
+    return frozenset(
+        name[:-4] for name in os.listdir(HOLIDAY_DATA_DIR)
+        if name.endswith(".txt")
+    )
+
+
+def _resolve_centres(code: Optional[str]) -> FrozenSet[str]:
+    """Turn "USD+CLP", "CLSA" or None into the set of centres to join."""
+    if not code or code.strip().upper() == WEEKENDS_ONLY:
+        return frozenset()
+    centres = set()
+    known = available_centres()
+    for part in code.upper().split("+"):
+        part = part.strip()
+        if part in CURRENCY_CALENDARS:
+            centres.add(CURRENCY_CALENDARS[part])
+        elif part in known:
+            centres.add(part)
+        else:
+            raise ValueError(f"Unknown calendar or currency: {part}")
+    return frozenset(centres)
+
+
+class HolidayCalendar:
+    """Business-day calendar backed by precomputed lookup tables."""
+
+    def __init__(self, name: str, holidays: Iterable[date], first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR):
+        self.name = name
+        self.holidays = frozenset(holidays)
+        self.first_ordinal = date(first_year, 1, 1).toordinal()
+        self.last_ordinal = date(last_year, 12, 31).toordinal()
+
+        size = self.last_ordinal - self.first_ordinal + 1
+        ordinals = np.arange(self.first_ordinal, self.last_ordinal + 1, dtype=np.int64)
+        # date.toordinal() of a Monday is 1 mod 7, so weekday = (ordinal - 1) % 7
+        business = (ordinals - 1) % 7 < 5
+        holiday_offsets = [
+            d.toordinal() - self.first_ordinal for d in self.holidays
+            if self.first_ordinal <= d.toordinal() <= self.last_ordinal
+        ]
+        business[holiday_offsets] = False
+
+        index = np.arange(size, dtype=np.int64)
+        # Offset of the previous (<=) and next (>=) business day for every day;
+        # the range edges point at themselves when no business day is left
+        previous = np.maximum.accumulate(np.where(business, index, -1))
+        previous = np.where(previous < 0, index, previous)
+        following = np.minimum.accumulate(np.where(business, index, size)[::-1])[::-1]
+        following = np.where(following >= size, index, following)
+
+        # Modified variants stay within the original month
+        months = (ordinals - 719163).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        modified_following = np.where(months[following] == months, following, previous)
+        modified_preceding = np.where(months[previous] == months, previous, following)
+
+        self.bitmap = np.packbits(business).tobytes()
+        self._tables: Dict[str, np.ndarray] = {
+            BusinessDayConvention.FOLLOWING.value: following,
+            BusinessDayConvention.PRECEDING.value: previous,
+            BusinessDayConvention.MODIFIED_FOLLOWING.value: modified_following,
+            BusinessDayConvention.MODIFIED_PRECEDING.value: modified_preceding,
+        }
+        # array('i') gives fast scalar indexing that returns plain ints
+        self._scalar_tables = {
+            convention: array("i", table.astype(np.int32).tobytes())
+            for convention, table in self._tables.items()
+        }
+
+    def __repr__(self) -> str:
+        return f"HolidayCalendar({self.name!r})"
+
+    def _in_range(self, ordinal: int) -> bool:
+        return self.first_ordinal <= ordinal <= self.last_ordinal
+
+    def is_business_day(self, check_date: date) -> bool:
+        """Weekday that is not a holiday."""
+        ordinal = check_date.toordinal()
+        if not self._in_range(ordinal):
+            return check_date.weekday() < 5 and check_date not in self.holidays
+        offset = ordinal - self.first_ordinal
+        return bool(self.bitmap[offset >> 3] >> (7 - (offset & 7)) & 1)
+
+    def adjust(self, check_date: date, convention: str) -> date:
+        """Adjust a date with a business day convention in O(1)."""
+        table = self._scalar_tables.get(convention)
+        if table is None:
+            # Unadjusted (or unknown) conventions leave the date alone
+            return check_date
+        ordinal = check_date.toordinal()
+        if not self._in_range(ordinal):
+            return self._adjust_slow(check_date, convention)
+        return date.fromordinal(self.first_ordinal + table[ordinal - self.first_ordinal])
+
+    def adjust_ordinals(self, ordinals: np.ndarray, convention: str) -> np.ndarray:
+        """Vectorized adjustment of an array of day ordinals (all within range)."""
+        table = self._tables.get(convention)
+        if table is None:
+            return ordinals
+        return self.first_ordinal + table[ordinals - self.first_ordinal]
+
+    def business_day_mask(self) -> np.ndarray:
+        """Business-day flag for every day of the table range (index 0 is ``first_ordinal``)."""
+        size = self.last_ordinal - self.first_ordinal + 1
+        return np.unpackbits(np.frombuffer(self.bitmap, dtype=np.uint8))[:size].astype(bool)
+
+    def _adjust_slow(self, check_date: date, convention: str) -> date:
+        """Day-by-day walk for dates outside the precomputed range."""
+        ordinal = check_date.toordinal()
+
+        def step(o: int, direction: int) -> int:
+            while not self.is_business_day(date.fromordinal(o)):
+                o += direction
+            return o
+
+        if convention == BusinessDayConvention.FOLLOWING:
+            return date.fromordinal(step(ordinal, 1))
+        if convention == BusinessDayConvention.PRECEDING:
+            return date.fromordinal(step(ordinal, -1))
+        if convention == BusinessDayConvention.MODIFIED_FOLLOWING:
+            adjusted = date.fromordinal(step(ordinal, 1))
+            if adjusted.month != check_date.month:
+                adjusted = date.fromordinal(step(ordinal, -1))
+            return adjusted
+        if convention == BusinessDayConvention.MODIFIED_PRECEDING:
+            adjusted = date.fromordinal(step(ordinal, -1))
+            if adjusted.month != check_date.month:
+                adjusted = date.fromordinal(step(ordinal, 1))
+            return adjusted
+        return check_date
+
+
+@lru_cache(maxsize=None)
+def _build_calendar(centres: FrozenSet[str]) -> HolidayCalendar:
+    holidays = set()
+    for centre in centres:
+        holidays |= load_holidays(centre)
+    name = "+".join(sorted(centres)) or WEEKENDS_ONLY
+    return HolidayCalendar(name, holidays)
+
+
+@lru_cache(maxsize=256)
+def get_calendar(code: Optional[str] = None) -> HolidayCalendar:
+    """Return the (cached) calendar for a centre, currency or joint code.
+
+    ``None`` gives a weekends-only calendar. Raises ValueError for codes
+    with no holiday data.
+    """
+    return _build_calendar(_resolve_centres(code))
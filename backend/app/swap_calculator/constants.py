@@ -7,6 +7,7 @@ class DayCountConvention(str, Enum):
     ACT_365 = "Actual/365"
     THIRTY_360 = "30/360"
     THIRTY_E_360 = "30E/360"
+    ACT_ACT_ISDA = "Actual/Actual ISDA"
 
 # Business day conventions
 class BusinessDayConvention(str, Enum):
@@ -37,6 +38,39 @@ FREQUENCY_MONTHS = {
     PaymentFrequency.ONCE: 0,
 }
 
+# Day-based frequencies: Daily steps one business day, Weekly seven calendar days
+FREQUENCY_DAYS = {
+    PaymentFrequency.DAILY: 1,
+    PaymentFrequency.WEEKLY: 7,
+}
+
+# Holiday calendar (financial centre) used for each leg currency
+CURRENCY_CALENDARS = {
+    "CLP": "CLSA",
+    "CLF": "CLSA",
+    "USD": "USNY",
+    "EUR": "EUTA",
+    "CHF": "CHZU",
+}
+
+# Discount curve (see curves.get_curve) used for each currency's FX forward points
+CURRENCY_CURVES = {
+    "CLP": "ICP",
+    "CLF": "CLF",
+    "USD": "SOFR",
+    "EUR": "ESTR",
+    "CHF": "SARON",
+}
+
+# FX spot settlement lag (business days) by currency pair; other pairs settle T+2
+FX_SPOT_LAGS = {
+    frozenset(("USD", "CAD")): 1,
+    frozenset(("USD", "TRY")): 1,
+    frozenset(("USD", "RUB")): 1,
+    frozenset(("USD", "PHP")): 1,
+}
+FX_DEFAULT_SPOT_LAG = 2
+
 # Amortization types
 class AmortizationType(str, Enum):
     BULLET = "BULLET"  # Principal paid at maturity
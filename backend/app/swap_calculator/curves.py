@@ -0,0 +1,324 @@
+# backend/app/swap_calculator/curves.py
+"""Discount curves for projecting floating-leg coupons.
+
+One curve per floating index is read from ``<CURVE_DIR>/<INDEX>.txt``::
+
+    # asof: 2025-01-17
+    # type: zero                  (zero | forward)
+    # interpolation: log-linear   (log-linear | linear)
+    1M   5.02
+    3M   4.98
+    2026-07-17  4.90
+
+Each node is a tenor from the as-of date (D/W/M/Y) or an ISO date, followed
+by a rate in percent: a continuously compounded zero rate for ``zero``
+curves, or the flat continuously compounded forward rate since the previous
+node for ``forward`` curves. Curve time is Actual/365F from the as-of date.
+
+Node discount factors are converted once into arrays. Interpolation runs on
+discount factors (linear) or their logarithm (log-linear, i.e. flat
+forwards between nodes). Beyond the nodes the first/last zero rate is held
+flat. Discount factors for every day from 40 years before the as-of date to
+100 years after it are precomputed into a table, so valuing a leg is a
+single array lookup (periods that started before the as-of date are
+projected with the first zero rate).
+
+``get_curve(index)`` returns a shared curve that is only rebuilt when its
+file changes on disk.
+"""
+import os
+import re
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+
+CURVE_TYPES = ("zero", "forward")
+INTERPOLATIONS = ("log-linear", "linear")
+
+# Days before/after the as-of date covered by the precomputed discount factor table
+TABLE_PAST_DAYS = 40 * 366
+TABLE_HORIZON_DAYS = 100 * 366
+
+_INDEX_NAME = re.compile(r"^[A-Z0-9][A-Z0-9_.-]*$")
+_TENOR = re.compile(r"^(\d+)([DWMY])$")
+
+
+def _add_tenor(start: date, tenor: str) -> date:
+    match = _TENOR.match(tenor.upper())
+    if not match:
+        raise ValueError(f"Invalid tenor: {tenor}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "D":
+        return date.fromordinal(start.toordinal() + count)
+    if unit == "W":
+        return date.fromordinal(start.toordinal() + 7 * count)
+    months = count * (12 if unit == "Y" else 1)
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    month += 1
+    # Clamp to the end of the target month
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - date(year, month, 1)).days
+    return date(year, month, min(start.day, last_day))
+
+
+class DiscountCurve:
+    """Discount curve with precomputed node arrays and a per-day factor table."""
+
+    def __init__(
+        self,
+        name: str,
+        asof: date,
+        node_dates: List[date],
+        log_discount_factors: List[float],
+        interpolation: str = "log-linear",
+        node_labels: Optional[List[str]] = None,
+        build_table: bool = True
+    ):
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation: {interpolation}")
+        if not node_dates:
+            raise ValueError(f"Curve {name} has no nodes")
+        self.name = name
+        self.asof = asof
+        self.interpolation = interpolation
+        self.node_labels = list(node_labels) if node_labels else [d.isoformat() for d in node_dates]
+        self.asof_ordinal = asof.toordinal()
+
+        # Node 0 is the as-of date itself (discount factor 1)
+        self.node_ordinals = np.array([self.asof_ordinal] + [d.toordinal() for d in node_dates], dtype=np.int64)
+        if np.any(np.diff(self.node_ordinals) <= 0):
+            raise ValueError(f"Curve {name} nodes must be strictly increasing and after the as-of date")
+        self.node_times = (self.node_ordinals - self.asof_ordinal) / 365.0
+        self.node_log_dfs = np.array([0.0] + list(log_discount_factors), dtype=np.float64)
+        self.node_dfs = np.exp(self.node_log_dfs)
+        # Zero rates used for flat extrapolation on either side
+        self._first_zero = -self.node_log_dfs[1] / self.node_times[1]
+        self._last_zero = -self.node_log_dfs[-1] / self.node_times[-1]
+
+        self.table_start = self.asof_ordinal - TABLE_PAST_DAYS
+        self._table = np.empty(0, dtype=np.float64)
+        if build_table:
+            self._table = self.interpolate(
+                np.arange(self.table_start, self.asof_ordinal + TABLE_HORIZON_DAYS + 1, dtype=np.int64)
+            )
+
+    def __repr__(self) -> str:
+        return f"DiscountCurve({self.name!r}, asof={self.asof}, nodes={len(self.node_ordinals) - 1})"
+
+    def interpolate(self, ordinals: np.ndarray) -> np.ndarray:
+        """Discount factors computed from the nodes, bypassing the table."""
+        times = (ordinals - self.asof_ordinal) / 365.0
+        if self.interpolation == "log-linear":
+            dfs = np.exp(np.interp(times, self.node_times, self.node_log_dfs))
+        else:
+            dfs = np.interp(times, self.node_times, self.node_dfs)
+        before = times < 0
+        after = times > self.node_times[-1]
+        if before.any():
+            dfs[before] = np.exp(-self._first_zero * times[before])
+        if after.any():
+            dfs[after] = np.exp(-self._last_zero * times[after])
+        return dfs
+
+    def discount_factors(self, ordinals: np.ndarray) -> np.ndarray:
+        """Discount factors for an array of day ordinals."""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        offsets = ordinals - self.table_start
+        inside = (offsets >= 0) & (offsets < len(self._table))
+        if inside.all():
+            return self._table[offsets]
+        # Each date always takes the same path, whatever else is in the batch
+        dfs = np.empty(ordinals.shape, dtype=np.float64)
+        dfs[inside] = self._table[offsets[inside]]
+        dfs[~inside] = self.interpolate(ordinals[~inside])
+        return dfs
+
+    def discount_factor(self, value_date: date) -> float:
+        """Discount factor for a single date."""
+        offset = value_date.toordinal() - self.table_start
+        if 0 <= offset < len(self._table):
+            return float(self._table[offset])
+        return float(self.interpolate(np.array([value_date.toordinal()], dtype=np.int64))[0])
+
+    def shifted(self, zero_shifts: np.ndarray, build_table: bool = False) -> "DiscountCurve":
+        """Copy of the curve with each node's zero rate shifted (decimal, e.g. 0.0001 = 1bp).
+
+        Used for bump-and-revalue; by default the per-day table is not built
+        since bumped curves are usually evaluated once through ``interpolate``.
+        """
+        times = self.node_times[1:]
+        return DiscountCurve(
+            self.name,
+            self.asof,
+            [date.fromordinal(int(o)) for o in self.node_ordinals[1:]],
+            (self.node_log_dfs[1:] - np.asarray(zero_shifts, dtype=np.float64) * times).tolist(),
+            self.interpolation,
+            self.node_labels,
+            build_table
+        )
+
+    def forward_rates(self, start: np.ndarray, end: np.ndarray, accrual: np.ndarray) -> np.ndarray:
+        """Simply compounded forward rates (decimal) over periods with the given accruals."""
+        growth = self.discount_factors(start) / self.discount_factors(end) - 1.0
+        safe = np.where(accrual > 0, accrual, 1.0)
+        return np.where(accrual > 0, growth / safe, 0.0)
+
+
+def parse_curve(name: str, text: str) -> DiscountCurve:
+    """Build a DiscountCurve from the text of a curve file."""
+    meta: Dict[str, str] = {}
+    nodes: List[Tuple[date, float, str]] = []
+    asof: Optional[date] = None
+    for line_number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            key, sep, value = line[1:].partition(":")
+            if sep:
+                meta[key.strip().lower()] = value.strip().lower()
+            continue
+        if asof is None:
+            if "asof" not in meta:
+                raise ValueError(f"Curve {name}: missing '# asof:' header before the nodes")
+            asof = date.fromisoformat(meta["asof"])
+        parts = line.replace(",", " ").split()
+        if len(parts) != 2:
+            raise ValueError(f"Curve {name}, line {line_number}: expected '<tenor|date> <rate>'")
+        pillar, rate = parts
+        node_date = date.fromisoformat(pillar) if "-" in pillar else _add_tenor(asof, pillar)
+        nodes.append((node_date, float(rate) / 100, pillar.upper()))
+
+    if asof is None:
+        raise ValueError(f"Curve {name} has no nodes")
+    curve_type = meta.get("type", "zero")
+    if curve_type not in CURVE_TYPES:
+        raise ValueError(f"Curve {name}: unknown type {curve_type}")
+
+    nodes.sort()
+    asof_ordinal = asof.toordinal()
+    log_dfs = []
+    previous_time = 0.0
+    previous_log_df = 0.0
+    for node_date, rate, _ in nodes:
+        time = (node_date.toordinal() - asof_ordinal) / 365.0
+        if curve_type == "zero":
+            log_df = -rate * time
+        else:
+            log_df = previous_log_df - rate * (time - previous_time)
+        log_dfs.append(log_df)
+        previous_time, previous_log_df = time, log_df
+
+    return DiscountCurve(
+        name,
+        asof,
+        [node_date for node_date, _, _ in nodes],
+        log_dfs,
+        meta.get("interpolation", "log-linear"),
+        [label for _, _, label in nodes]
+    )
+
+
+def load_curve(name: str, path: str) -> DiscountCurve:
+    with open(path, encoding="utf-8") as f:
+        return parse_curve(name, f.read())
+
+
+# index -> (file mtime, curve)
+_curves: Dict[str, Tuple[int, DiscountCurve]] = {}
+_curves_lock = threading.Lock()
+# Bumped whenever a curve is (re)loaded or the cache is cleared
+_version = 0
+
+
+def curve_path(index: str) -> Optional[str]:
+    """File a floating index's curve would be loaded from (None for invalid names)."""
+    name = index.strip().upper()
+    if not _INDEX_NAME.match(name):
+        return None
+    return os.path.join(settings.CURVE_DIR, f"{name}.txt")
+
+
+def get_curve(index: Optional[str]) -> Optional[DiscountCurve]:
+    """Shared curve for a floating index, or None when there is no (valid) curve file.
+
+    The file's modification time is checked on every call and the curve is
+    rebuilt only when it changed.
+    """
+    if not index or not isinstance(index, str):
+        return None
+    path = curve_path(index)
+    if path is None:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    name = index.strip().upper()
+    cached = _curves.get(name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _curves_lock:
+        cached = _curves.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            curve = load_curve(name, path)
+        except Exception as e:
+            logger.log_exception(
+                e,
+                message=f"Error loading curve {name}",
+                level=LogLevel.ERROR,
+                tags=["quantlib", "curve", "error"],
+                entity=current_entity_name()
+            )
+            # Keep serving the previous version, if any
+            return cached[1] if cached is not None else None
+        _curves[name] = (mtime, curve)
+        _bump_version()
+
+    logger.info(
+        "Curve loaded",
+        event_type=EventType.SYSTEM_EVENT,
+        data={
+            "index": name,
+            "asof": curve.asof.isoformat(),
+            "nodes": len(curve.node_ordinals) - 1,
+            "interpolation": curve.interpolation,
+            "reloaded": cached is not None
+        },
+        tags=["quantlib", "curve", "load"],
+        entity=current_entity_name()
+    )
+    return curve
+
+
+def _bump_version() -> None:
+    global _version
+    _version += 1
+
+
+def curve_version() -> int:
+    """Counter that changes whenever a cached curve is replaced, read without touching the disk.
+
+    Anything priced at an earlier version may be stale; at the current one it
+    is as fresh as the last ``get_curve`` that checked the file.
+    """
+    return _version
+
+
+def clear_curve_cache() -> None:
+    with _curves_lock:
+        _curves.clear()
+        _bump_version()
+
@@ -0,0 +1,386 @@
+# backend/app/swap_calculator/fixings.py
+"""Overnight index fixings and compounded-in-arrears coupon rates.
+
+Fixings of each overnight index (ICP, SOFR, ...) are kept in a compact
+binary file ``<FIXINGS_DIR>/<INDEX>.fix`` that is memory-mapped rather than
+parsed, so opening years of history costs a few microseconds::
+
+    header    64 bytes   magic, fixing count, day basis (360/365) and the
+                         exclusive end of the last fixing's accrual
+    dates     int32[n]   day ordinals of the fixing dates, increasing
+    rates     float64[n] fixings (decimal), starting 8-byte aligned
+
+The fixing dates are the index's business days and double as the date index:
+a fixing applies from its date until the next fixing date.
+
+A floating coupon compounds the fixings in arrears over its period:
+``prod(1 + r_i * d_i / basis) - 1`` with ``d_i`` the calendar days each
+fixing applies for. Cumulative products of the daily growth factors are
+built once per store (and lookback), so the compounded factor of any run of
+whole fixing days is a ratio of two array entries and every period of every
+trade is priced in one vectorized pass. Supported conventions:
+
+- ``lookback``: each day uses the fixing published that many fixing dates
+  earlier, weighted by the interest period's days
+- ``observation_shift``: the whole observation period (dates and weights)
+  is moved back ``lookback`` fixing dates instead
+- ``lockout``: the last ``lockout`` fixing days of the period reuse the
+  fixing of the day before them
+
+Periods, or their parts, after the last published fixing are projected from
+the index curve when there is one; periods before the first fixing have no
+rate (NaN).
+
+Files are written with ``write_fixings`` or imported from text (one
+``<ISO date> <rate in percent>`` per line) with::
+
+    python -m app.swap_calculator.fixings ICP icp_fixings.txt --basis 360 --calendar CLP
+"""
+import argparse
+import os
+import struct
+import threading
+from datetime import date
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+from app.swap_calculator.calendars import get_calendar
+from app.swap_calculator.curves import DiscountCurve, _INDEX_NAME
+
+MAGIC = b"FXFIX\x00\x00\x01"
+# magic, count, day basis, end ordinal (padded to HEADER_SIZE)
+HEADER = struct.Struct("<8sqqq")
+HEADER_SIZE = 64
+
+
+def _rates_offset(count: int) -> int:
+    return HEADER_SIZE + -(-4 * count // 8) * 8
+
+
+class FixingsStore:
+    """Fixings of one overnight index, backed by a memory-mapped file."""
+
+    def __init__(self, name: str, ordinals: np.ndarray, rates: np.ndarray, basis: int, end_ordinal: int):
+        if len(ordinals) != len(rates) or not len(ordinals):
+            raise ValueError(f"Fixings {name}: expected matching, non-empty date and rate arrays")
+        self.name = name
+        self.ordinals = ordinals
+        self.rates = rates
+        self.basis = basis
+        # Exclusive end of the last fixing's accrual: realized coupons stop here
+        self.end_ordinal = end_ordinal
+        self._grid: Optional[np.ndarray] = None
+        # lookback -> (cumulative growth, cumulative count of missing fixings)
+        self._growth: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def open(cls, name: str, path: str) -> "FixingsStore":
+        """Map a fixings file without reading it."""
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(mapped) < HEADER_SIZE:
+            raise ValueError(f"Fixings {name}: file too short")
+        magic, count, basis, end_ordinal = HEADER.unpack(mapped[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"Fixings {name}: not a fixings file")
+        rates_offset = _rates_offset(count)
+        if len(mapped) < rates_offset + 8 * count:
+            raise ValueError(f"Fixings {name}: truncated file")
+        ordinals = mapped[HEADER_SIZE:HEADER_SIZE + 4 * count].view("<i4")
+        rates = mapped[rates_offset:rates_offset + 8 * count].view("<f8")
+        return cls(name, ordinals, rates, int(basis), int(end_ordinal))
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def __repr__(self) -> str:
+        return (f"FixingsStore({self.name!r}, {date.fromordinal(int(self.ordinals[0]))}"
+                f"..{date.fromordinal(int(self.ordinals[-1]))}, basis={self.basis})")
+
+    @property
+    def grid(self) -> np.ndarray:
+        """Fixing dates plus the end of the last accrual (n + 1 ordinals)."""
+        if self._grid is None:
+            self._grid = np.append(self.ordinals.astype(np.int64), self.end_ordinal)
+        return self._grid
+
+    def fixing(self, fixing_date: date) -> Optional[float]:
+        """The fixing applying on a date, or None outside the stored range."""
+        ordinal = fixing_date.toordinal()
+        position = int(np.searchsorted(self.ordinals, ordinal, "right")) - 1
+        if position < 0 or ordinal >= self.end_ordinal:
+            return None
+        value = float(self.rates[position])
+        return None if np.isnan(value) else value
+
+    def _cumulative(self, lookback: int) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._growth.get(lookback)
+        if cached is not None:
+            return cached
+        n = len(self.rates)
+        # Day i compounds the fixing of day i - lookback over day i's weight
+        rates = np.full(n, np.nan)
+        if lookback < n:
+            rates[lookback:] = self.rates[:n - lookback]
+        growth = 1.0 + rates * np.diff(self.grid) / self.basis
+        missing = np.isnan(growth)
+        growth[missing] = 1.0
+        cumulative = (np.concatenate(([1.0], np.cumprod(growth))), np.concatenate(([0], np.cumsum(missing))))
+        self._growth[lookback] = cumulative
+        return cumulative
+
+    def _rate_at(self, positions: np.ndarray) -> np.ndarray:
+        inside = (positions >= 0) & (positions < len(self.rates))
+        return np.where(inside, self.rates[np.clip(positions, 0, len(self.rates) - 1)], np.nan)
+
+    def _shift_back(self, ordinals: np.ndarray, count: int) -> np.ndarray:
+        """Move dates back ``count`` fixing dates (unchanged beyond the stored dates)."""
+        grid = self.grid
+        positions = np.searchsorted(grid, ordinals, "left") - count
+        known = (ordinals <= grid[-1]) & (positions >= 0)
+        return np.where(known, grid[np.clip(positions, 0, len(grid) - 1)], ordinals)
+
+    def compounded_rates(
+        self,
+        start: np.ndarray,
+        end: np.ndarray,
+        accrual: np.ndarray,
+        lookback: int = 0,
+        lockout: int = 0,
+        observation_shift: bool = False,
+        curve: Optional[DiscountCurve] = None
+    ) -> np.ndarray:
+        """Compounded-in-arrears rates (decimal, simple over ``accrual``) per period.
+
+        The part of a period after the last fixing is projected from
+        ``curve`` (NaN without one); lockout only applies to periods whose
+        fixings are all published.
+        """
+        start = np.asarray(start, dtype=np.int64)
+        end = np.asarray(end, dtype=np.int64)
+        if observation_shift and lookback:
+            start = self._shift_back(start, lookback)
+            end = self._shift_back(end, lookback)
+            lookback = 0
+        grid = self.grid
+        n = len(self.rates)
+        basis = float(self.basis)
+        cumulative, missing = self._cumulative(lookback)
+
+        realized_end = np.minimum(end, self.end_ordinal)
+        realized = start < realized_end
+        # Last fixing date on or before the start / strictly before the (realized) end
+        a = np.searchsorted(grid, start, "right") - 1
+        b = np.searchsorted(grid, realized_end, "left") - 1
+        realized &= a >= 0
+        a = np.where(realized, a, 0)
+        b = np.where(realized, np.maximum(b, a), 0)
+
+        locked = np.where(end <= self.end_ordinal, lockout, 0)
+        # Days a+1 .. c-1 come from the cumulative products, c .. b one by one
+        c = np.maximum(b - np.maximum(locked, 1) + 1, a + 1)
+        lockout_rate = self._rate_at(b - locked - lookback)
+
+        head_rate = np.where((locked > 0) & (a > b - locked), lockout_rate, self._rate_at(a - lookback))
+        head_days = np.minimum(grid[np.minimum(a + 1, n)], realized_end) - start
+        factor = 1.0 + head_rate * head_days / basis
+
+        inner = c > a + 1
+        ratio = cumulative[np.where(inner, c, 0)] / cumulative[np.where(inner, a + 1, 0)]
+        factor = factor * np.where(inner, ratio, 1.0)
+        gaps = missing[np.where(inner, c, 0)] - missing[np.where(inner, a + 1, 0)]
+        factor = np.where(gaps > 0, np.nan, factor)
+
+        for step in range(max(lockout, 1)):
+            position = c + step
+            active = position <= b
+            position = np.where(active, position, 0)
+            days = np.minimum(grid[np.minimum(position + 1, n)], realized_end) - grid[position]
+            rate = np.where(locked > 0, lockout_rate, self._rate_at(position - lookback))
+            factor = factor * np.where(active, 1.0 + rate * days / basis, 1.0)
+
+        factor = np.where(realized, factor, np.where(start < self.end_ordinal, np.nan, 1.0))
+        # Remainder after the last fixing from the curve
+        unfixed = end > self.end_ordinal
+        if unfixed.any():
+            if curve is None:
+                factor = np.where(unfixed, np.nan, factor)
+            else:
+                projected_from = np.maximum(start, self.end_ordinal)
+                growth = curve.discount_factors(projected_from) / curve.discount_factors(end)
+                factor = np.where(unfixed, factor * growth, factor)
+
+        safe = np.where(accrual > 0, accrual, 1.0)
+        return np.where(accrual > 0, (factor - 1.0) / safe, 0.0)
+
+
+def index_rates(
+    curve: Optional[DiscountCurve],
+    fixings: Optional[FixingsStore],
+    start: np.ndarray,
+    end: np.ndarray,
+    accrual: np.ndarray,
+    lookback: int = 0,
+    lockout: int = 0,
+    observation_shift: bool = False
+) -> np.ndarray:
+    """Floating index rates (decimal, without spread) for a leg's periods.
+
+    Compounded fixings when the index has a fixings store (curve-projected
+    after the last fixing), otherwise curve forwards. Both cashflow engines
+    call this with the same arrays, so their coupons match exactly.
+    """
+    if fixings is not None:
+        return fixings.compounded_rates(start, end, accrual, lookback, lockout, observation_shift, curve)
+    return curve.forward_rates(start, end, accrual)
+
+
+def write_fixings(path: str, ordinals: Sequence[int], rates: Sequence[float], basis: int, end_ordinal: Optional[int] = None) -> None:
+    """Write a fixings file (rates in decimal); readers of the old file keep their mapping."""
+    ordinals = np.asarray(ordinals, dtype="<i4")
+    rates = np.asarray(rates, dtype="<f8")
+    if len(ordinals) != len(rates) or not len(ordinals):
+        raise ValueError("Expected matching, non-empty date and rate arrays")
+    if np.any(np.diff(ordinals) <= 0):
+        raise ValueError("Fixing dates must be strictly increasing")
+    if end_ordinal is None:
+        end_ordinal = int(ordinals[-1]) + 1
+    if end_ordinal <= ordinals[-1]:
+        raise ValueError("The last fixing's accrual must end after its date")
+
+    header = HEADER.pack(MAGIC, len(ordinals), int(basis), int(end_ordinal)).ljust(HEADER_SIZE, b"\0")
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        f.write(ordinals.tobytes().ljust(_rates_offset(len(ordinals)) - HEADER_SIZE, b"\0"))
+        f.write(rates.tobytes())
+    os.replace(temporary, path)
+
+
+def import_fixings(index: str, text: str, basis: int, calendar: Optional[str] = None) -> str:
+    """Write the fixings file of an index from ``<ISO date> <rate %>`` lines.
+
+    With a calendar, the last fixing applies until the next business day.
+    Returns the path written.
+    """
+    path = fixings_path(index)
+    if path is None:
+        raise ValueError(f"Invalid index name: {index}")
+    rows = []
+    for line_number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.replace(",", " ").split()
+        if len(parts) != 2:
+            raise ValueError(f"Line {line_number}: expected '<date> <rate>'")
+        rows.append((date.fromisoformat(parts[0]).toordinal(), float(parts[1]) / 100))
+    rows.sort()
+    ordinals = [ordinal for ordinal, _ in rows]
+    end_ordinal = None
+    if calendar and ordinals:
+        end_ordinal = get_calendar(calendar).adjust(date.fromordinal(ordinals[-1] + 1), "Following").toordinal()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_fixings(path, ordinals, [rate for _, rate in rows], basis, end_ordinal)
+    return path
+
+
+# index -> (file mtime, store)
+_stores: Dict[str, Tuple[int, FixingsStore]] = {}
+_stores_lock = threading.Lock()
+# Bumped whenever a fixings store is (re)loaded or the cache is cleared
+_version = 0
+
+
+def fixings_path(index: str) -> Optional[str]:
+    """File an index's fixings would be loaded from (None for invalid names)."""
+    name = index.strip().upper()
+    if not _INDEX_NAME.match(name):
+        return None
+    return os.path.join(settings.FIXINGS_DIR, f"{name}.fix")
+
+
+def get_fixings(index: Optional[str]) -> Optional[FixingsStore]:
+    """Shared fixings store of an index, or None when it has no (valid) file.
+
+    Like ``curves.get_curve``, the file is re-mapped only when it changes.
+    """
+    if not index or not isinstance(index, str):
+        return None
+    path = fixings_path(index)
+    if path is None:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    name = index.strip().upper()
+    cached = _stores.get(name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _stores_lock:
+        cached = _stores.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            store = FixingsStore.open(name, path)
+        except Exception as e:
+            logger.log_exception(
+                e,
+                message=f"Error loading fixings {name}",
+                level=LogLevel.ERROR,
+                tags=["quantlib", "fixings", "error"],
+                entity=current_entity_name()
+            )
+            # Keep serving the previous version, if any
+            return cached[1] if cached is not None else None
+        _stores[name] = (mtime, store)
+        _bump_version()
+
+    logger.info(
+        "Fixings loaded",
+        event_type=EventType.SYSTEM_EVENT,
+        data={
+            "index": name,
+            "fixings": len(store),
+            "first": date.fromordinal(int(store.ordinals[0])).isoformat(),
+            "last": date.fromordinal(int(store.ordinals[-1])).isoformat(),
+            "basis": store.basis
+        },
+        tags=["quantlib", "fixings", "load"],
+        entity=current_entity_name()
+    )
+    return store
+
+
+def _bump_version() -> None:
+    global _version
+    _version += 1
+
+
+def fixings_version() -> int:
+    """Counter that changes whenever a cached fixings store is replaced (see ``curves.curve_version``)."""
+    return _version
+
+
+def clear_fixings_cache() -> None:
+    with _stores_lock:
+        _stores.clear()
+        _bump_version()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import daily fixings into the binary fixings store")
+    parser.add_argument("index")
+    parser.add_argument("source", help="text file with '<ISO date> <rate in percent>' lines")
+    parser.add_argument("--basis", type=int, default=360)
+    parser.add_argument("--calendar", help="centre or currency of the index's business days")
+    args = parser.parse_args()
+    with open(args.source, encoding="utf-8") as f:
+        print(import_fixings(args.index, f.read(), args.basis, args.calendar))
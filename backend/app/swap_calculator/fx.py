@@ -0,0 +1,160 @@
+# backend/app/swap_calculator/fx.py
+"""FX spot/value dates and forward points.
+
+Spot dates follow the pair's settlement rule: the spot lag (``FX_SPOT_LAGS``,
+T+2 otherwise) is counted in business days of the pair's non-USD
+currencies, and the resulting date is rolled forward until it is a
+business day in both currencies and in USD. A USD holiday therefore only
+moves the spot date when it falls on it, not when it falls in between.
+
+For every pair and lag the spot date of every trade date in the calendar
+range is computed once, with array operations over the calendars' business
+day tables, and kept in a ``SettlementTable``; a spot date is then a single
+lookup. Forward value dates come from the maturity: an explicit date,
+rolled to a business day, or a tenor from spot (D/W: following; M/Y:
+end-of-month rule and modified following on the joint calendar).
+
+Forward prices come from covered interest parity over [spot, value]:
+``F = S * DF_1 / DF_2``, with the discount factors of the pair's two
+currencies (Currency 1 is the base) from their curves (``CURRENCY_CURVES``),
+computed for a whole batch of trades with one curve lookup per currency
+pair.
+"""
+from array import array
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.swap_calculator.adapters import get_month_end_day
+from app.swap_calculator.calendars import HolidayCalendar, get_calendar
+from app.swap_calculator.constants import (
+    CURRENCY_CALENDARS,
+    CURRENCY_CURVES,
+    FX_DEFAULT_SPOT_LAG,
+    FX_SPOT_LAGS
+)
+from app.swap_calculator.curves import DiscountCurve, get_curve
+from app.swap_calculator.terms import add_tenor, parse_date, parse_tenor, strip_maturity_prefix
+
+def spot_lag(currency1: str, currency2: str) -> int:
+    """Spot settlement lag of a pair in business days."""
+    return FX_SPOT_LAGS.get(frozenset((currency1.upper(), currency2.upper())), FX_DEFAULT_SPOT_LAG)
+
+
+def _calendar_code(currencies: Sequence[str]) -> str:
+    # Currencies without holiday data only observe weekends
+    return "+".join(sorted({c for c in currencies if c in CURRENCY_CALENDARS}))
+
+
+class SettlementTable:
+    """Spot date of every trade date in the calendar range, for one pair and lag."""
+
+    def __init__(self, currency1: str, currency2: str, lag: int):
+        self.pair = f"{currency1}/{currency2}"
+        self.lag = lag
+        non_usd = [c for c in (currency1, currency2) if c != "USD"] or ["USD"]
+        # Spot and value dates must be good days in both currencies and in USD
+        self.calendar: HolidayCalendar = get_calendar(_calendar_code([currency1, currency2, "USD"]) or None)
+        lag_calendar = get_calendar(_calendar_code(non_usd) or None)
+
+        first = self.calendar.first_ordinal
+        business = lag_calendar.business_day_mask()
+        size = len(business)
+        if lag > 0:
+            # First day whose running business-day count is `lag` above the trade date's
+            counts = np.cumsum(business)
+            offsets = np.searchsorted(counts, counts + lag, "left")
+        else:
+            offsets = np.arange(size)
+        inside = offsets < size
+        spot = self.calendar.adjust_ordinals(first + np.minimum(offsets, size - 1), "Following")
+        self.first_ordinal = first
+        self.spot = np.where(inside, spot, -1).astype(np.int64)
+        self._scalar = array("i", self.spot.astype(np.int32).tobytes())
+
+    def __repr__(self) -> str:
+        return f"SettlementTable({self.pair!r}, T+{self.lag}, calendar={self.calendar.name!r})"
+
+    def spot_ordinal(self, trade_date: date) -> int:
+        offset = trade_date.toordinal() - self.first_ordinal
+        if not 0 <= offset < len(self._scalar) or self._scalar[offset] < 0:
+            raise ValueError(f"Trade date {trade_date} outside the {self.pair} calendar range")
+        return self._scalar[offset]
+
+    def spot_date(self, trade_date: date) -> date:
+        return date.fromordinal(self.spot_ordinal(trade_date))
+
+    def spot_ordinals(self, trade_ordinals: np.ndarray) -> np.ndarray:
+        """Spot dates for an array of trade date ordinals (-1 outside the range)."""
+        offsets = np.asarray(trade_ordinals, dtype=np.int64) - self.first_ordinal
+        inside = (offsets >= 0) & (offsets < len(self.spot))
+        return np.where(inside, self.spot[np.clip(offsets, 0, len(self.spot) - 1)], -1)
+
+    def value_date(self, spot: date, maturity: Optional[str]) -> date:
+        """Value date of a maturity (DD-MM-YYYY or tenor from spot); spot when not given."""
+        if not maturity or str(maturity).strip().lower() in ("", "not mentioned", "spot"):
+            return spot
+        text = strip_maturity_prefix(str(maturity).strip().lower())
+        explicit = parse_date(text)
+        if explicit is not None:
+            return self.calendar.adjust(explicit, "Following")
+
+        tenor = parse_tenor(text)
+        if tenor is None or tenor == (0, 0):
+            raise ValueError(f"Invalid maturity: {maturity}")
+        unadjusted = add_tenor(spot, tenor)
+        if not tenor.months:
+            return self.calendar.adjust(unadjusted, "Following")
+        # End-of-month rule: spot on the month's last business day stays on the last business day
+        month_end = date(spot.year, spot.month, get_month_end_day(spot.year, spot.month))
+        if self.calendar.adjust(month_end, "Preceding") == spot:
+            target_end = date(unadjusted.year, unadjusted.month, get_month_end_day(unadjusted.year, unadjusted.month))
+            return self.calendar.adjust(target_end, "Preceding")
+        return self.calendar.adjust(unadjusted, "ModifiedFollowing")
+
+
+@lru_cache(maxsize=256)
+def settlement_table(currency1: str, currency2: str, lag: Optional[int] = None) -> SettlementTable:
+    """Memoized settlement table of a pair (``lag`` defaults to the pair's spot lag)."""
+    currency1, currency2 = currency1.upper(), currency2.upper()
+    if lag is None:
+        lag = spot_lag(currency1, currency2)
+    return SettlementTable(currency1, currency2, lag)
+
+
+def currency_curve(currency: str) -> Optional[DiscountCurve]:
+    """Discount curve of a currency, if it has one."""
+    index = CURRENCY_CURVES.get(currency.upper())
+    return get_curve(index) if index else None
+
+
+def forward_prices(
+    spot_prices: np.ndarray,
+    spot_ordinals: np.ndarray,
+    value_ordinals: np.ndarray,
+    base_curves: Sequence[Optional[DiscountCurve]],
+    quote_curves: Sequence[Optional[DiscountCurve]]
+) -> np.ndarray:
+    """Theoretical forward prices for a batch (NaN where a curve is missing).
+
+    ``F = S * (DF_base(value) / DF_base(spot)) / (DF_quote(value) / DF_quote(spot))``
+    """
+    spot_prices = np.asarray(spot_prices, dtype=np.float64)
+    spot_ordinals = np.asarray(spot_ordinals, dtype=np.int64)
+    value_ordinals = np.asarray(value_ordinals, dtype=np.int64)
+    forwards = np.full(len(spot_prices), np.nan)
+
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    for row, (base, quote) in enumerate(zip(base_curves, quote_curves)):
+        if base is not None and quote is not None:
+            groups.setdefault((id(base), id(quote)), []).append(row)
+    for rows in groups.values():
+        base, quote = base_curves[rows[0]], quote_curves[rows[0]]
+        rows = np.array(rows)
+        start, end = spot_ordinals[rows], value_ordinals[rows]
+        base_df = base.discount_factors(end) / base.discount_factors(start)
+        quote_df = quote.discount_factors(end) / quote.discount_factors(start)
+        forwards[rows] = spot_prices[rows] * base_df / quote_df
+    return forwards
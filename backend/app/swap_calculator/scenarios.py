@@ -0,0 +1,131 @@
+# backend/app/swap_calculator/scenarios.py
+"""Historical rate-shift scenarios and tail risk measures.
+
+A scenario file ``<SCENARIO_DIR>/<NAME>.txt`` holds one curve shock per
+line, as zero-rate shifts at a set of pillars::
+
+    # units: bp                   (bp | percent)
+    scenario    1M     1Y     5Y    10Y
+    2020-03-16  -45.2  -38.0  -21.5  -9.8
+    2022-09-26   12.0   28.4   31.1  25.7
+
+The header's first column names the scenarios, the others are pillars:
+tenors from the curve's as-of date (D/W/M/Y) or ISO dates. A shock is
+applied to a curve by interpolating the pillar shifts linearly (in time)
+onto the curve's nodes, holding the first/last shift flat beyond them, and
+shifting each node's zero rate by that amount.
+"""
+import math
+import os
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.swap_calculator.curves import DiscountCurve, _add_tenor
+
+UNITS = {"bp": 1e-4, "percent": 1e-2}
+
+_SCENARIO_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+class ScenarioSet:
+    """Named curve shocks at a common set of pillars."""
+
+    def __init__(self, name: str, pillars: List[str], scenario_names: List[str], shifts: np.ndarray):
+        shifts = np.asarray(shifts, dtype=np.float64)
+        if shifts.shape != (len(scenario_names), len(pillars)):
+            raise ValueError(f"Scenario set {name}: expected {len(scenario_names)} x {len(pillars)} shifts")
+        self.name = name
+        self.pillars = pillars
+        self.scenario_names = scenario_names
+        # Decimal zero-rate shifts, one row per scenario
+        self.shifts = shifts
+
+    def __len__(self) -> int:
+        return len(self.scenario_names)
+
+    def __repr__(self) -> str:
+        return f"ScenarioSet({self.name!r}, scenarios={len(self)}, pillars={len(self.pillars)})"
+
+    def node_shifts(self, curve: DiscountCurve) -> np.ndarray:
+        """Shifts of each of ``curve``'s nodes (n_scenarios x n_nodes, decimal)."""
+        pillar_ordinals = np.array([
+            (date.fromisoformat(p) if "-" in p else _add_tenor(curve.asof, p)).toordinal()
+            for p in self.pillars
+        ], dtype=np.float64)
+        order = np.argsort(pillar_ordinals)
+        pillar_ordinals = pillar_ordinals[order]
+        if np.any(np.diff(pillar_ordinals) <= 0):
+            raise ValueError(f"Scenario set {self.name}: pillars must be distinct dates")
+        nodes = curve.node_ordinals[1:].astype(np.float64)
+        shifts = self.shifts[:, order]
+        return np.stack([np.interp(nodes, pillar_ordinals, row) for row in shifts]) if len(self) else np.empty((0, len(nodes)))
+
+
+def parse_scenarios(name: str, text: str) -> ScenarioSet:
+    """Build a ScenarioSet from the text of a scenario file."""
+    units = "bp"
+    pillars: Optional[List[str]] = None
+    names: List[str] = []
+    rows: List[List[float]] = []
+    for line_number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            key, sep, value = line[1:].partition(":")
+            if sep and key.strip().lower() == "units":
+                units = value.strip().lower()
+            continue
+        parts = line.replace(",", " ").split()
+        if pillars is None:
+            if len(parts) < 2:
+                raise ValueError(f"Scenario set {name}, line {line_number}: header needs at least one pillar")
+            pillars = [p.upper() for p in parts[1:]]
+            continue
+        if len(parts) != len(pillars) + 1:
+            raise ValueError(f"Scenario set {name}, line {line_number}: expected {len(pillars)} shifts")
+        names.append(parts[0])
+        rows.append([float(value) for value in parts[1:]])
+
+    if pillars is None:
+        raise ValueError(f"Scenario set {name} has no header")
+    if units not in UNITS:
+        raise ValueError(f"Scenario set {name}: unknown units {units}")
+    shifts = np.array(rows, dtype=np.float64).reshape(len(rows), len(pillars)) * UNITS[units]
+    return ScenarioSet(name, pillars, names, shifts)
+
+
+def scenario_path(name: str) -> Optional[str]:
+    """File a scenario set would be loaded from (None for invalid names)."""
+    name = name.strip()
+    if not _SCENARIO_NAME.match(name):
+        return None
+    return os.path.join(settings.SCENARIO_DIR, f"{name}.txt")
+
+
+def load_scenarios(name: str) -> Optional[ScenarioSet]:
+    """Scenario set from SCENARIO_DIR, or None when there is no such file."""
+    path = scenario_path(name)
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return parse_scenarios(name.strip(), f.read())
+
+
+def tail_risk(pnl: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """Historical VaR and expected shortfall, as positive losses.
+
+    The tail is the worst ceil(n * (1 - confidence)) scenarios: VaR is the
+    smallest loss in it and the expected shortfall its average loss.
+    """
+    if not 0 < confidence < 1:
+        raise ValueError(f"Confidence must be between 0 and 1, got {confidence}")
+    losses = np.sort(-np.asarray(pnl, dtype=np.float64))[::-1]
+    if not len(losses):
+        raise ValueError("No scenarios")
+    tail = max(1, math.ceil(len(losses) * (1 - confidence) - 1e-9))
+    return float(losses[tail - 1]), float(losses[:tail].mean())
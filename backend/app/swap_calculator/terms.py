@@ -0,0 +1,340 @@
+# backend/app/swap_calculator/terms.py
+"""Parsing of the free-text trade terms the extraction returns.
+
+Maturities ("5Y", "1.5Y", "18M", "1Y6M", "10 años", "2W", "vcto 15-03-2030",
+"2030-03-15"), dates, amounts ("5MM", "2.5bn", "USD 500K"), date bases,
+business day conventions and coupon frequencies are matched against grammars compiled once at import. Dates
+go through a hand-rolled parser (no strptime, no exceptions as control
+flow) with a regex fallback for the less common spellings.
+
+Parses are LRU-memoized on the text as received, and inputs are only
+normalized (trimmed, case-folded, whitespace collapsed) on a cache miss,
+so the handful of spellings that make up almost every trade are parsed
+once per process and later lookups cost one dictionary probe.
+"""
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.swap_calculator.constants import (
+    BusinessDayConvention,
+    DayCountConvention,
+    FREQUENCY_DAYS,
+    FREQUENCY_MONTHS,
+    PaymentFrequency
+)
+
+# Distinct normalized spellings memoized per term kind
+TERM_CACHE_SIZE = 4096
+
+# How the extraction marks a data point it did not find
+NOT_MENTIONED = "Not Mentioned"
+_MISSING = frozenset({"", "not mentioned", "n/a", "na", "none", "null", "unknown"})
+
+
+class Tenor(NamedTuple):
+    """A period as whole months plus days (weeks are counted as 7 days)."""
+    months: int
+    days: int
+
+
+# "vcto 15-03-2030", "Vencimiento: 2030-03-15", "mat. 5Y", "maturity 10Y"
+_MATURITY_PREFIX = re.compile(r"^(?:vcto|vto|venc(?:imiento)?|mat(?:urity|uring|ures)?)(?![a-z])\.?\s*:?\s*")
+
+_TENOR = re.compile(
+    r"^(?:(?P<years>\d+(?:\.\d+)?)(?:y|yr|yrs|years?|a|años?|anos?))?"
+    r"(?:(?P<months>\d+)(?:m|mo|mos|months?|mes|meses))?"
+    r"(?:(?P<weeks>\d+)(?:w|wk|wks|weeks?|semanas?))?"
+    r"(?:(?P<days>\d+)(?:d|days?|dias?|días?))?$"
+)
+
+# D-M-YYYY / YYYY-M-D with "-", "/" or "." separators
+_DAY_FIRST = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})$")
+_YEAR_FIRST = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})$")
+
+# First match wins, so specific spellings come before the ones they contain
+_DATE_BASES = (
+    (re.compile(r"30e/360|30/360 ?(?:icma|e\b)|euro ?bond"), DayCountConvention.THIRTY_E_360),
+    (re.compile(r"act(?:ual)?/act(?:ual)?"), DayCountConvention.ACT_ACT_ISDA),
+    (re.compile(r"act(?:ual)?/360|\ba/?360"), DayCountConvention.ACT_360),
+    (re.compile(r"act(?:ual)?/365|\ba/?365"), DayCountConvention.ACT_365),
+    (re.compile(r"30/360|bond basis"), DayCountConvention.THIRTY_360),
+)
+
+_BUSINESS_DAY_CONVENTIONS = (
+    (re.compile(r"mod(?:ified|\.)? ?foll|\bmf\b|siguiente.* modificad"), BusinessDayConvention.MODIFIED_FOLLOWING),
+    (re.compile(r"follow|\bfoll\b|siguiente"), BusinessDayConvention.FOLLOWING),
+    (re.compile(r"mod(?:ified|\.)? ?prec|\bmp\b|anterior.* modificad"), BusinessDayConvention.MODIFIED_PRECEDING),
+    (re.compile(r"preced|\bprec\b|anterior"), BusinessDayConvention.PRECEDING),
+    (re.compile(r"no adjust|unadjusted|sin ajuste"), BusinessDayConvention.UNADJUSTED),
+)
+
+_FREQUENCIES = (
+    (re.compile(r"daily|diari|\b1d\b"), PaymentFrequency.DAILY),
+    (re.compile(r"weekly|semanal|\b1w\b"), PaymentFrequency.WEEKLY),
+    (re.compile(r"monthly|mensual|\b1m\b"), PaymentFrequency.MONTHLY),
+    (re.compile(r"quarterly|trimestral|\b3m\b"), PaymentFrequency.QUARTERLY),
+    (re.compile(r"semi-? ?annual|semestral|\b6m\b"), PaymentFrequency.SEMIANNUAL),
+    (re.compile(r"annual|\banual|\b12m\b|\b1y\b"), PaymentFrequency.ANNUAL),
+    (re.compile(r"one-off|once|at maturity|al vencimiento|zero coupon|bullet"), PaymentFrequency.ONCE),
+)
+
+
+# Thousands groups: "1,234,567.5" and "1.234.567,5"
+_COMMA_GROUPED = re.compile(r"^[+-]?[1-9]\d{0,2}(?:,\d{3})+(?:\.\d*)?$")
+_DOT_GROUPED = re.compile(r"^[+-]?[1-9]\d{0,2}(?:\.\d{3})+(?:,\d*)?$")
+
+# "5MM", "5 mm", "2,5M", "500K", "1.2bn", "USD 5MM", "5.000.000 CLP"
+_AMOUNT = re.compile(
+    r"^(?:[a-z]{3} ?)?(?P<number>\d[\d.,' ]*?) ?"
+    r"(?P<unit>millones|millions?|mio|mln|mm|mn|m|billions?|bln|bn|b|k)?(?: ?[a-z]{3})?$"
+)
+_AMOUNT_UNITS = {
+    None: 1.0, "k": 1e3,
+    "m": 1e6, "mm": 1e6, "mn": 1e6, "mio": 1e6, "mln": 1e6, "million": 1e6, "millions": 1e6, "millones": 1e6,
+    "b": 1e9, "bn": 1e9, "bln": 1e9, "billion": 1e9, "billions": 1e9,
+}
+
+
+def is_missing(value: Any) -> bool:
+    """Whether an extracted value is absent or one of the "Not Mentioned" spellings."""
+    return value is None or (isinstance(value, str) and value.strip().lower() in _MISSING)
+
+
+def _normalize(text: Any) -> str:
+    return " ".join(str(getattr(text, "value", text)).lower().split())
+
+
+_MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _days_in_month(year: int, month: int) -> int:
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+    return _MONTH_DAYS[month - 1]
+
+
+def _valid_date(year: int, month: int, day: int) -> Optional[date]:
+    if year >= 1 and 1 <= month <= 12 and 1 <= day <= _days_in_month(year, month):
+        return date(year, month, day)
+    return None
+
+
+def _parse_date(text: str) -> Optional[date]:
+    # Fast path: the two 10-character layouts the extraction produces
+    if len(text) == 10:
+        if text[2] == "-" and text[5] == "-":
+            day, month, year = text[:2], text[3:5], text[6:]
+        elif text[4] == "-" and text[7] == "-":
+            year, month, day = text[:4], text[5:7], text[8:]
+        else:
+            day = month = year = ""
+        if day.isdigit() and month.isdigit() and year.isdigit():
+            return _valid_date(int(year), int(month), int(day))
+    match = _DAY_FIRST.match(text)
+    if match:
+        return _valid_date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+    match = _YEAR_FIRST.match(text)
+    if match:
+        return _valid_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    return None
+
+
+def parse_date(text: Any) -> Optional[date]:
+    """A DD-MM-YYYY or ISO date (also with "/" or "." separators); None if the text is not one."""
+    if text is None:
+        return None
+    return _cached_date(text if isinstance(text, str) else str(text))
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def _cached_date(text: str) -> Optional[date]:
+    return _parse_date(text.strip())
+
+
+def _parse_number(text: str, comma_thousands: bool = False) -> Optional[float]:
+    text = text.replace(" ", "").replace("'", "")
+    if "," in text:
+        if _COMMA_GROUPED.match(text) and ("." in text or text.count(",") > 1 or comma_thousands):
+            # "1,234.5", "5,000,000"; a lone "5,000" only in amounts
+            text = text.replace(",", "")
+        elif _DOT_GROUPED.match(text) or ("." not in text and text.count(",") == 1):
+            # Decimal comma: "950,25", "0,925", "1,085", "1.234,5"
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            return None
+    elif text.count(".") > 1:
+        # "5.000.000"
+        if not _DOT_GROUPED.match(text):
+            return None
+        text = text.replace(".", "")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """A plain number with thousands separators or a decimal comma ("1,234.5", "950,25"); None if it is not one.
+
+    A single comma is a decimal one ("1,085" is 1.085, like "1.085"); commas
+    group thousands only next to a decimal point or in more than one group.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _cached_number(value if isinstance(value, str) else str(value))
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def _cached_number(text: str) -> Optional[float]:
+    return _parse_number(text.strip())
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """A notional with an optional unit and currency ("5MM", "2.5bn", "USD 500K"); None if it is not one.
+
+    M and MM are both millions, the way FX chats use them.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _cached_amount(value if isinstance(value, str) else str(value))
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def _cached_amount(text: str) -> Optional[float]:
+    match = _AMOUNT.match(_normalize(text))
+    if not match:
+        return None
+    # Notionals are whole amounts, so "USD 5,000" is five thousand
+    number = _parse_number(match.group("number"), comma_thousands=True)
+    if number is None:
+        return None
+    return number * _AMOUNT_UNITS[match.group("unit")]
+
+
+def format_date(value: date) -> str:
+    """DD-MM-YYYY, the format trade summaries use."""
+    return f"{value.day:02d}-{value.month:02d}-{value.year:04d}"
+
+
+def strip_maturity_prefix(text: str) -> str:
+    """Drop a leading "vcto", "vencimiento", "mat" or "maturity" marker."""
+    return _MATURITY_PREFIX.sub("", text, count=1)
+
+
+def _parse_tenor(text: str) -> Optional[Tenor]:
+    match = _TENOR.match(text.replace(" ", "").replace(",", "."))
+    if not match or not any(match.groups()):
+        return None
+    years, months, weeks, days = match.groups()
+    # Fractional years are whole months: 1.5Y = 18M
+    total_months = int(float(years) * 12 + 1e-9) if years else 0
+    total_months += int(months) if months else 0
+    total_days = (int(weeks) * 7 if weeks else 0) + (int(days) if days else 0)
+    return Tenor(total_months, total_days)
+
+
+def parse_tenor(text: Any) -> Optional[Tenor]:
+    """A tenor such as "5Y", "1.5Y", "18M", "1Y6M", "2W", "10D" or "6 meses"; None if it is not one."""
+    return _cached_tenor(text if isinstance(text, str) else str(text))
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def _cached_tenor(text: str) -> Optional[Tenor]:
+    return _parse_tenor(strip_maturity_prefix(_normalize(text)))
+
+
+def add_tenor(start: date, tenor: Tenor) -> date:
+    """Unadjusted end of a tenor; month steps keep the day, clamped to the month end."""
+    end = start
+    if tenor.months:
+        month_index = start.year * 12 + start.month - 1 + tenor.months
+        year, month = divmod(month_index, 12)
+        month += 1
+        end = date(year, month, min(start.day, _days_in_month(year, month)))
+    if tenor.days:
+        end += timedelta(days=tenor.days)
+    return end
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def _maturity_term(text: str):
+    """A maturity as an explicit date or a tenor (None if neither)."""
+    text = strip_maturity_prefix(_normalize(text))
+    return _parse_date(text) or _parse_tenor(text)
+
+
+def maturity_term(maturity_str: Any):
+    """A maturity as an explicit date or a Tenor, or None if it is neither."""
+    return _maturity_term(maturity_str if isinstance(maturity_str, str) else str(maturity_str))
+
+
+def parse_maturity(maturity_str: Any, effective_date: date) -> date:
+    """Termination date of an explicit maturity date or a tenor from the effective date.
+
+    Raises ValueError when the text is neither.
+    """
+    term = _maturity_term(maturity_str if isinstance(maturity_str, str) else str(maturity_str))
+    if term is None:
+        raise ValueError(f"Invalid maturity: {maturity_str}")
+    if isinstance(term, date):
+        return term
+    return add_tenor(effective_date, term)
+
+
+_GRAMMARS = {
+    "date_basis": _DATE_BASES,
+    "business_day_convention": _BUSINESS_DAY_CONVENTIONS,
+    "frequency": _FREQUENCIES,
+}
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def _match(kind: str, raw: Any):
+    text = _normalize(raw)
+    if kind == "date_basis":
+        # "Actual / 360" -> "actual/360"
+        text = text.replace(" /", "/").replace("/ ", "/")
+    for pattern, value in _GRAMMARS[kind]:
+        if pattern.search(text):
+            return value
+    return None
+
+
+def parse_date_basis(date_basis_str: Any) -> DayCountConvention:
+    """Convert a string date basis to a standardized format (Actual/360 when unrecognized)."""
+    return _match("date_basis", date_basis_str) or DayCountConvention.ACT_360
+
+
+def parse_business_day_convention(bdc_str: Any) -> BusinessDayConvention:
+    """Convert a string business day convention to a standardized format (Modified Following by default)."""
+    return _match("business_day_convention", bdc_str) or BusinessDayConvention.MODIFIED_FOLLOWING
+
+
+def parse_frequency(frequency_str: Any) -> Dict[str, Any]:
+    """Convert a string frequency to standardized period, months and (for Daily/Weekly) days."""
+    period = _match("frequency", frequency_str) or PaymentFrequency.SEMIANNUAL
+    return {
+        "period": period,
+        "months": FREQUENCY_MONTHS[period],
+        "days": FREQUENCY_DAYS.get(period, 0)
+    }
+
+
+def term_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the memoized parsers."""
+    stats = {}
+    caches = (
+        ("dates", _cached_date), ("tenors", _cached_tenor), ("maturities", _maturity_term),
+        ("numbers", _cached_number), ("amounts", _cached_amount), ("conventions", _match)
+    )
+    for name, fn in caches:
+        info = fn.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
+
+
+def clear_term_caches() -> None:
+    for fn in (_cached_date, _cached_tenor, _maturity_term, _cached_number, _cached_amount, _match):
+        fn.cache_clear()
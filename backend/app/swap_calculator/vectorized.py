@@ -0,0 +1,470 @@
+"""Array-backed cashflow engine.
+
+Produces exactly the same cashflows as ``calculators.calculate_swap_cashflows``
+but computes amortization, accrual and interest for a whole leg (or a whole
+portfolio of legs) with NumPy operations. Period dates are held as integer
+day ordinals (``date.toordinal()``); ``transform_output`` reads the columns
+directly and formats each distinct date once.
+
+Year fractions come from the same ``daycount`` kernels as the scalar engine
+(array variants) and floating point operations are applied in the same
+order, so results are bit-for-bit identical rather than merely close.
+"""
+from datetime import date
+from typing import List, Dict, Any, Tuple, Optional, Sequence
+
+import numpy as np
+
+from app.swap_calculator.calculators import Cashflow, calculate_period_dates, _get_day_counter
+from app.swap_calculator.curves import DiscountCurve, get_curve
+from app.swap_calculator.fixings import FixingsStore, get_fixings, index_rates
+from app.main import logger
+from core_logging.client import EventType, LogLevel
+from app.entities import current_entity_name
+
+
+class LegCashflows:
+    """Column-oriented cashflows for one leg.
+
+    Arrays are aligned by period; dates are integer day ordinals. Floating
+    legs priced from an index curve and/or fixings keep them and the index
+    rates (without spread) in ``forward``; periods whose rate is unknown
+    have NaN interest. Floating legs with neither have no interest column.
+    """
+
+    __slots__ = (
+        "start", "end", "notional", "amortization", "interest", "accrual",
+        "rate", "spread", "amortization_type", "is_floating", "reference_rate_name",
+        "forward", "curve", "fixings", "lookback", "lockout", "observation_shift",
+    )
+
+    def __init__(
+        self,
+        start: np.ndarray,
+        end: np.ndarray,
+        notional: np.ndarray,
+        amortization: np.ndarray,
+        interest: Optional[np.ndarray],
+        accrual: np.ndarray,
+        rate: Optional[float],
+        spread: float,
+        amortization_type: str,
+        is_floating: bool,
+        reference_rate_name: Optional[str],
+        forward: Optional[np.ndarray] = None,
+        curve: Optional[DiscountCurve] = None,
+        fixings: Optional[FixingsStore] = None,
+        lookback: int = 0,
+        lockout: int = 0,
+        observation_shift: bool = False
+    ):
+        self.start = start
+        self.end = end
+        self.notional = notional
+        self.amortization = amortization
+        self.interest = interest
+        self.accrual = accrual
+        self.rate = rate
+        self.spread = spread
+        self.amortization_type = amortization_type
+        self.is_floating = is_floating
+        self.reference_rate_name = reference_rate_name
+        self.forward = forward
+        self.curve = curve
+        self.fixings = fixings
+        self.lookback = lookback
+        self.lockout = lockout
+        self.observation_shift = observation_shift
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def columns(self) -> Tuple[List[int], List[int], List[Any], List[float], List[float], List[float], List[Any]]:
+        """Plain-Python columns in Cashflow field order (dates as ordinals)."""
+        count = len(self.start)
+        amortizations = self.amortization.tolist()
+        if self.amortization_type != "LINEAR" and count:
+            # The scalar engine reports non-final bullet amortization as integer 0
+            amortizations = [0] * (count - 1) + amortizations[-1:]
+
+        if self.is_floating:
+            spread = self.spread
+            rate_display = f"{self.reference_rate_name}{'+' + str(spread) if spread > 0 else ''}"
+            rates = [rate_display] * count
+            if self.interest is None:
+                interests = ["TBD"] * count
+            else:
+                interests = self.interest.tolist()
+                if np.isnan(self.interest).any():
+                    interests = ["TBD" if value != value else value for value in interests]
+        else:
+            rates = [self.rate] * count
+            interests = self.interest.tolist()
+
+        spreads = [self.spread] * count
+        return (
+            self.start.tolist(), self.end.tolist(), rates, spreads,
+            self.notional.tolist(), amortizations, interests
+        )
+
+    def to_cashflows(self) -> List[Cashflow]:
+        """Expand to the Cashflow objects produced by ``_generate_cashflows``."""
+        starts, ends, *rest = self.columns()
+        return [
+            Cashflow(date.fromordinal(start), date.fromordinal(end), *values)
+            for start, end, *values in zip(starts, ends, *rest)
+        ]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Serialize to the legacy per-period dicts (see ``Cashflow.to_dict``)."""
+        return [cashflow.to_dict() for cashflow in self.to_cashflows()]
+
+
+def _leg_spec(
+    periods: Sequence[Tuple[date, date]],
+    notional: float,
+    rate: Optional[float],
+    spread: float,
+    day_count_convention: str,
+    amortization_type: str,
+    is_floating: bool,
+    reference_rate_name: Optional[str],
+    lookback: int = 0,
+    lockout: int = 0,
+    observation_shift: bool = False
+) -> Dict[str, Any]:
+    return {
+        "periods": periods,
+        "notional": notional,
+        "rate": rate,
+        "spread": spread,
+        "day_count_convention": day_count_convention,
+        "amortization_type": amortization_type,
+        "is_floating": is_floating,
+        "reference_rate_name": reference_rate_name,
+        "lookback": lookback,
+        "lockout": lockout,
+        "observation_shift": observation_shift
+    }
+
+
+def _swap_leg_specs(
+    effective_date: date,
+    termination_date: date,
+    fixed_leg: Dict[str, Any],
+    floating_leg: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Resolve both legs' schedules and parameters exactly as calculate_swap_cashflows does."""
+    fixed_periods = calculate_period_dates(
+        effective_date,
+        termination_date,
+        fixed_leg["frequency"]["months"],
+        fixed_leg.get("business_day_convention", "ModifiedFollowing"),
+        fixed_leg.get("currency"),
+        fixed_leg["frequency"].get("days", 0)
+    )
+    floating_periods = calculate_period_dates(
+        effective_date,
+        termination_date,
+        floating_leg["frequency"]["months"],
+        floating_leg.get("business_day_convention", "ModifiedFollowing"),
+        floating_leg.get("currency"),
+        floating_leg["frequency"].get("days", 0)
+    )
+    fixed = _leg_spec(
+        fixed_periods,
+        fixed_leg["notional"],
+        fixed_leg["rate"],
+        0.0,
+        fixed_leg.get("day_count_convention", "Actual/365"),
+        fixed_leg.get("amortization_type", "BULLET"),
+        False,
+        None
+    )
+    floating = _leg_spec(
+        floating_periods,
+        floating_leg["notional"],
+        None,
+        floating_leg.get("spread", 0),
+        floating_leg.get("day_count_convention", "Actual/365"),
+        floating_leg.get("amortization_type", "BULLET"),
+        True,
+        floating_leg.get("rate", "Unknown"),
+        floating_leg.get("lookback", 0),
+        floating_leg.get("lockout", 0),
+        floating_leg.get("observation_shift", False)
+    )
+    return fixed, floating
+
+
+def _amortize(
+    notional: np.ndarray,
+    counts: np.ndarray,
+    linear: np.ndarray,
+    width: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Remaining notional and amortization on a padded (legs x periods) block."""
+    n_legs = len(notional)
+    columns = np.arange(width)
+    valid = columns < counts[:, None]
+    is_last = columns == (counts - 1)[:, None]
+
+    # Equal amortization per period for LINEAR legs, nothing before maturity for BULLET
+    per_period = np.divide(notional, counts, out=notional.copy(), where=counts > 0)
+    amortization = np.where(linear[:, None] & valid, per_period[:, None], 0.0)
+
+    # Remaining notional by sequential subtraction, as the scalar loop does
+    steps = np.empty((n_legs, width), dtype=np.float64)
+    steps[:, 0] = notional
+    steps[:, 1:] = amortization[:, :-1]
+    remaining = np.subtract.accumulate(steps, axis=1)
+    amortization = np.where(is_last, remaining, amortization)
+    return remaining, amortization
+
+
+def compute_legs(specs: Sequence[Dict[str, Any]]) -> List[LegCashflows]:
+    """Compute many legs at once on a padded (legs x periods) block."""
+    n_legs = len(specs)
+    if n_legs == 0:
+        return []
+
+    counts = np.fromiter((len(s["periods"]) for s in specs), dtype=np.int64, count=n_legs)
+    width = max(int(counts.max()), 1)
+
+    # Padding cells are 1 -> 1 (zero-length periods) and masked out below
+    start = np.ones((n_legs, width), dtype=np.int64)
+    end = np.ones((n_legs, width), dtype=np.int64)
+    for row, spec in enumerate(specs):
+        count = counts[row]
+        if count:
+            flat = np.fromiter(
+                (d.toordinal() for period in spec["periods"] for d in period),
+                dtype=np.int64,
+                count=2 * count
+            )
+            start[row, :count] = flat[0::2]
+            end[row, :count] = flat[1::2]
+
+    valid = np.arange(width) < counts[:, None]
+    notional = np.array([s["notional"] for s in specs], dtype=np.float64)
+    linear = np.array([s["amortization_type"] == "LINEAR" for s in specs])
+    remaining, amortization = _amortize(notional, counts, linear, width)
+
+    # Accrual and interest only need the real periods, so work on the
+    # flattened valid cells rather than the padded block
+    cell_row = np.broadcast_to(np.arange(n_legs)[:, None], (n_legs, width))[valid]
+    cell_start = start[valid]
+    cell_end = end[valid]
+    cell_remaining = remaining[valid]
+    cell_accrual = np.zeros(cell_row.size, dtype=np.float64)
+
+    conventions = [s["day_count_convention"] for s in specs]
+    rate_decimal = np.array(
+        [0.0 if s["is_floating"] else s["rate"] / 100 for s in specs],
+        dtype=np.float64
+    )
+    for convention in set(conventions):
+        rows = np.array([c == convention for c in conventions])
+        cells = np.flatnonzero(rows[cell_row])
+        year_fractions = _get_day_counter(convention).year_fractions
+        cell_accrual[cells] = year_fractions(cell_start[cells], cell_end[cells])
+
+    cell_rate = rate_decimal[cell_row]
+
+    # Floating legs with an index curve and/or fixings: index rate + spread,
+    # one pass per index and compounding convention
+    curves = [get_curve(s["reference_rate_name"]) if s["is_floating"] else None for s in specs]
+    fixings = [get_fixings(s["reference_rate_name"]) if s["is_floating"] else None for s in specs]
+    groups: Dict[Tuple, List[int]] = {}
+    for row, spec in enumerate(specs):
+        if curves[row] is not None or fixings[row] is not None:
+            key = (id(curves[row]), id(fixings[row]), spec["lookback"], spec["lockout"], spec["observation_shift"])
+            groups.setdefault(key, []).append(row)
+    cell_forward = np.zeros(cell_row.size, dtype=np.float64)
+    spread_decimal = np.array([s["spread"] / 100 for s in specs], dtype=np.float64)
+    for group_rows in groups.values():
+        row = group_rows[0]
+        rows = np.zeros(n_legs, dtype=bool)
+        rows[group_rows] = True
+        cells = np.flatnonzero(rows[cell_row])
+        forward = index_rates(
+            curves[row], fixings[row], cell_start[cells], cell_end[cells], cell_accrual[cells],
+            specs[row]["lookback"], specs[row]["lockout"], specs[row]["observation_shift"]
+        )
+        cell_forward[cells] = forward
+        cell_rate[cells] = forward + spread_decimal[cell_row[cells]]
+
+    # Interest is notional * rate * year fraction, as in the scalar engine
+    cell_interest = cell_remaining * cell_rate * cell_accrual
+
+    interest = np.zeros((n_legs, width), dtype=np.float64)
+    accrual = np.zeros((n_legs, width), dtype=np.float64)
+    forwards = np.zeros((n_legs, width), dtype=np.float64)
+    interest[valid] = cell_interest
+    accrual[valid] = cell_accrual
+    forwards[valid] = cell_forward
+
+    legs = []
+    for row, spec in enumerate(specs):
+        count = counts[row]
+        priced = curves[row] is not None or fixings[row] is not None
+        legs.append(LegCashflows(
+            start=start[row, :count],
+            end=end[row, :count],
+            notional=remaining[row, :count],
+            amortization=amortization[row, :count],
+            interest=None if spec["is_floating"] and not priced else interest[row, :count],
+            accrual=accrual[row, :count],
+            rate=spec["rate"],
+            spread=spec["spread"],
+            amortization_type=spec["amortization_type"],
+            is_floating=spec["is_floating"],
+            reference_rate_name=spec["reference_rate_name"],
+            forward=forwards[row, :count] if priced else None,
+            curve=curves[row],
+            fixings=fixings[row],
+            lookback=spec["lookback"],
+            lockout=spec["lockout"],
+            observation_shift=spec["observation_shift"]
+        ))
+    return legs
+
+
+def reprice_leg(
+    leg: LegCashflows,
+    notional: Optional[float] = None,
+    rate: Optional[Any] = None,
+    spread: Optional[float] = None,
+    amortization_type: Optional[str] = None
+) -> LegCashflows:
+    """Recompute a leg's amount columns after a notional/rate/spread/amortization change.
+
+    The schedule and accrual fractions are reused as they are; only the
+    remaining notional, amortization and interest columns are recomputed,
+    with the same operations as ``compute_legs`` so results match a full
+    re-pricing exactly. ``None`` keeps the current value. For floating legs
+    ``rate`` is the reference rate name.
+    """
+    count = len(leg)
+    if notional is None:
+        notional = float(leg.notional[0]) if count else 0.0
+    if amortization_type is None:
+        amortization_type = leg.amortization_type
+    if spread is None:
+        spread = leg.spread
+    reference_rate_name = leg.reference_rate_name
+    if leg.is_floating:
+        if rate is not None:
+            reference_rate_name = rate
+        rate = None
+    elif rate is None:
+        rate = leg.rate
+
+    remaining, amortization = _amortize(
+        np.array([notional], dtype=np.float64),
+        np.array([count], dtype=np.int64),
+        np.array([amortization_type == "LINEAR"]),
+        max(count, 1)
+    )
+    remaining = remaining[0, :count]
+    interest = None
+    forward = None
+    curve = None
+    fixings = None
+    if not leg.is_floating:
+        interest = remaining * np.float64(rate / 100) * leg.accrual
+    else:
+        curve = get_curve(reference_rate_name)
+        fixings = get_fixings(reference_rate_name)
+        if curve is not None or fixings is not None:
+            forward = leg.forward
+            if curve is not leg.curve or fixings is not leg.fixings or forward is None:
+                forward = index_rates(
+                    curve, fixings, leg.start, leg.end, leg.accrual,
+                    leg.lookback, leg.lockout, leg.observation_shift
+                )
+            interest = remaining * (forward + spread / 100) * leg.accrual
+
+    return LegCashflows(
+        start=leg.start,
+        end=leg.end,
+        notional=remaining,
+        amortization=amortization[0, :count],
+        interest=interest,
+        accrual=leg.accrual,
+        rate=rate,
+        spread=spread,
+        amortization_type=amortization_type,
+        is_floating=leg.is_floating,
+        reference_rate_name=reference_rate_name,
+        forward=forward,
+        curve=curve,
+        fixings=fixings,
+        lookback=leg.lookback,
+        lockout=leg.lockout,
+        observation_shift=leg.observation_shift
+    )
+
+
+def calculate_swap_leg_arrays(
+    trade_date: date,
+    effective_date: date,
+    termination_date: date,
+    fixed_leg: Dict[str, Any],
+    floating_leg: Dict[str, Any]
+) -> Tuple[LegCashflows, LegCashflows]:
+    """Array form of both legs of a swap: (fixed, floating)."""
+    fixed, floating = _swap_leg_specs(effective_date, termination_date, fixed_leg, floating_leg)
+    fixed_arrays, floating_arrays = compute_legs([fixed, floating])
+    return fixed_arrays, floating_arrays
+
+
+def calculate_swap_cashflows_vectorized(
+    trade_date: date,
+    effective_date: date,
+    termination_date: date,
+    fixed_leg: Dict[str, Any],
+    floating_leg: Dict[str, Any]
+) -> Tuple[List[Cashflow], List[Cashflow]]:
+    """Drop-in replacement for ``calculate_swap_cashflows``."""
+    try:
+        fixed_arrays, floating_arrays = calculate_swap_leg_arrays(
+            trade_date, effective_date, termination_date, fixed_leg, floating_leg
+        )
+        return fixed_arrays.to_cashflows(), floating_arrays.to_cashflows()
+    except Exception as e:
+        logger.log_exception(
+            e,
+            message="Error calculating vectorized swap cashflows",
+            level=LogLevel.ERROR,
+            tags=["quantlib", "cashflow", "vectorized", "error"],
+            entity=current_entity_name()
+        )
+        raise
+
+
+def calculate_portfolio_leg_arrays(trades: Sequence[Dict[str, Any]]) -> List[Tuple[LegCashflows, LegCashflows]]:
+    """Compute every leg of a portfolio in a single block.
+
+    ``trades`` are parameter dicts as returned by ``prepare_swap_parameters``.
+    Returns one (fixed, floating) pair per trade, in order.
+    """
+    specs = []
+    for params in trades:
+        specs.extend(_swap_leg_specs(
+            params["effective_date"],
+            params["termination_date"],
+            params["fixed_leg"],
+            params["floating_leg"]
+        ))
+
+    logger.info(
+        "Calculating portfolio cashflows (vectorized)",
+        event_type=EventType.SYSTEM_EVENT,
+        data={"trades": len(trades), "legs": len(specs)},
+        tags=["quantlib", "cashflow", "vectorized"],
+        entity=current_entity_name()
+    )
+
+    legs = compute_legs(specs)
+    return [(legs[i], legs[i + 1]) for i in range(0, len(legs), 2)]
@@ -0,0 +1,250 @@
+"""Admission control of /api/process-fx: checks and overload simulation.
+
+Checks that the controller:
+
+- runs at most max_in_flight requests, and max_per_user per user, and
+  starts queued ones text first, then by arrival
+- skips a queued request whose user is at their limit in favour of the
+  ones behind it
+- rejects a full queue (a text request displaces the newest image one),
+  too many queued requests of one user and requests that wait too long,
+  each with a Retry-After of at least a second
+- hands the slot of a cancelled request back
+
+and that the middleware, in front of the real app, returns 429s with
+Retry-After before reading the body when saturated, replays the body of
+admitted requests, and reports queue depth and waits in its stats.
+
+Then simulates a burst against a provider that slows down with the number
+of calls it serves at once, with and without admission control.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_admission [--requests 300]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import app.main  # noqa: F401
+from app.api.admission import PRIORITY_IMAGE, PRIORITY_TEXT, AdmissionController, AdmissionMiddleware, Rejected
+from benchmarks.bench_profiling import call
+
+
+async def settle() -> None:
+    """Let woken waiters run (a wake-up passes through shield and wait_for)."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def check_controller() -> None:
+    controller = AdmissionController(max_in_flight=2, max_per_user=2, max_queue=3, max_wait=5)
+    started = []
+
+    async def run(name: str, user: str, priority: int):
+        await controller.acquire(user, priority)
+        started.append(name)
+
+    assert await controller.acquire("ana", PRIORITY_IMAGE) == 0.0
+    assert await controller.acquire("luis", PRIORITY_IMAGE) == 0.0
+    tasks = [asyncio.create_task(run(name, user, priority)) for name, user, priority in (
+        ("image-1", "eva", PRIORITY_IMAGE), ("image-2", "max", PRIORITY_IMAGE), ("text-1", "ana", PRIORITY_TEXT)
+    )]
+    await settle()
+    assert controller.in_flight == 2 and controller.queue_depth == 3 and not started
+
+    # Full queue: a text request takes the newest image request's place, an image one is turned away
+    preempting = asyncio.create_task(run("text-2", "zoe", PRIORITY_TEXT))
+    await settle()
+    try:
+        await tasks[1]
+        raise AssertionError("image-2 was not displaced")
+    except Rejected as rejected:
+        assert rejected.reason == "preempted" and rejected.retry_after >= 1
+    try:
+        await controller.acquire("kim", PRIORITY_IMAGE)
+        raise AssertionError("accepted into a full queue")
+    except Rejected as rejected:
+        assert rejected.reason == "queue_full"
+
+    controller.release("ana", 0.5)
+    controller.release("luis", 0.5)
+    await settle()
+    assert started == ["text-1", "text-2"], started
+    # The preempting text request was admitted, not rejected
+    await preempting
+    controller.release("ana", 0.5)
+    await settle()
+    assert started == ["text-1", "text-2", "image-1"]
+    for user in ("zoe", "eva"):
+        controller.release(user, 0.5)
+    assert controller.in_flight == 0 and controller.queue_depth == 0
+
+    # Per user: the queued request of a user at their limit lets the next one through
+    await controller.acquire("ana", PRIORITY_TEXT)
+    await controller.acquire("ana", PRIORITY_TEXT)
+    controller.max_in_flight = 3
+    blocked = asyncio.create_task(run("ana-3", "ana", PRIORITY_TEXT))
+    await settle()
+    assert controller.queue_depth == 1 and controller.in_flight == 2
+    await controller.acquire("luis", PRIORITY_IMAGE)
+    assert controller.in_flight == 3
+    extra = asyncio.create_task(controller.acquire("ana", PRIORITY_TEXT))
+    await settle()
+    try:
+        await controller.acquire("ana", PRIORITY_TEXT)
+        raise AssertionError("more queued requests than max_per_user")
+    except Rejected as rejected:
+        assert rejected.reason == "user_limit"
+    extra.cancel()
+    await settle()
+    controller.release("ana", None)
+    await settle()
+    assert started[-1] == "ana-3" and blocked.done()
+    for user in ("ana", "ana", "luis"):
+        controller.release(user, None)
+    await settle()
+    assert controller.in_flight == 0 and controller.queue_depth == 0, controller.stats()
+
+    # Timeouts, and cancelled waiters give their place back
+    controller = AdmissionController(max_in_flight=1, max_per_user=1, max_queue=4, max_wait=0.05)
+    await controller.acquire("ana", PRIORITY_TEXT)
+    try:
+        await controller.acquire("luis", PRIORITY_TEXT)
+        raise AssertionError("no timeout")
+    except Rejected as rejected:
+        assert rejected.reason == "timeout"
+    waiting = asyncio.create_task(controller.acquire("eva", PRIORITY_TEXT))
+    await settle()
+    waiting.cancel()
+    await settle()
+    assert controller.queue_depth == 0
+    controller.release("ana", None)
+    assert controller.in_flight == 0
+    stats = controller.stats()
+    assert stats["rejected"] == {"timeout": 1} and stats["admitted"] == 1, stats
+
+
+async def check_middleware() -> None:
+    controller = AdmissionController(max_in_flight=2, max_per_user=1, max_queue=2, max_wait=5)
+    running = []
+    gate = asyncio.Event()
+
+    async def endpoint(scope, receive, send):
+        message = await receive()
+        running.append(json.loads(message["body"]))
+        await gate.wait()
+        body = json.dumps({"bytes": len(message["body"])}).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    asgi = AdmissionMiddleware(endpoint, controller)
+
+    def extraction(user: str, input_type: str) -> dict:
+        return {"user_name": user, "input_type": input_type, "input_image": "iVBOR" + "A" * 200_000 if input_type == "image" else None}
+
+    def post(user: str, input_type: str):
+        return asyncio.create_task(call(asgi, "/api/process-fx", extraction(user, input_type), {}))
+
+    requests = [post("ana", "image"), post("luis", "image"), post("ana", "text"), post("eva", "text")]
+    await asyncio.sleep(0.01)
+    assert len(running) == 2 and controller.queue_depth == 2
+
+    # Saturated (only text requests queued): rejected before the body is read
+    unread = {"type": "http", "method": "POST", "path": "/api/process-fx", "headers": []}
+    sent = []
+
+    async def receive():
+        raise AssertionError("body read while saturated")
+
+    async def send(message):
+        sent.append(message)
+
+    start = time.perf_counter()
+    await asgi(unread, receive, send)
+    rejected_in = time.perf_counter() - start
+    headers = dict(sent[0]["headers"])
+    assert sent[0]["status"] == 429 and int(headers[b"retry-after"]) >= 1
+    status, headers, body = await call(asgi, "/api/process-fx", extraction("kim", "image"), {})
+    assert status == 429 and json.loads(body)["reason"] == "queue_full"
+
+    gate.set()
+    results = await asyncio.gather(*requests)
+    assert [status for status, _, _ in results] == [200] * 4
+    assert json.loads(results[0][2])["bytes"] > 200_000
+    # ana's text request waited for her image request, eva's for a free slot
+    assert [r["user_name"] for r in running] == ["ana", "luis", "ana", "eva"]
+    assert all("x-queue-wait-ms" in headers for _, headers, _ in results)
+    stats = controller.stats()
+    assert stats["admitted"] == 4 and stats["rejected"] == {"queue_full": 2} and stats["peak_queue"] == 2, stats
+    assert stats["in_flight"] == 0 and stats["wait_ms"]["max"] > 0
+
+    status, _, _ = await call(app.main.app, "/api/process-fx/admission", {}, {}, method="GET")
+    assert status == 200
+    print(f"saturated 429 in {rejected_in * 1e6:.0f} us, stats: {stats}")
+
+
+async def simulate(requests: int, admission: bool, base_latency: float, seed: int) -> dict:
+    """A burst of extractions against a provider that slows down with its concurrency."""
+    provider_calls = 0
+
+    async def endpoint(scope, receive, send):
+        nonlocal provider_calls
+        await receive()
+        provider_calls += 1
+        try:
+            # Rate-limited providers and a saturated threadpool degrade with load
+            await asyncio.sleep(base_latency * (1 + provider_calls / 4))
+        finally:
+            provider_calls -= 1
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    controller = AdmissionController(max_in_flight=8, max_per_user=2, max_queue=32, max_wait=20 * base_latency)
+    asgi = AdmissionMiddleware(endpoint, controller) if admission else endpoint
+    rng = random.Random(seed)
+
+    async def one(index: int):
+        await asyncio.sleep(rng.uniform(0, 2 * base_latency))
+        body = {"user_name": f"trader-{index % 40}", "input_type": rng.choice(["text", "text", "image"])}
+        start = time.perf_counter()
+        status, _, _ = await call(asgi, "/api/process-fx", body, {})
+        return status, time.perf_counter() - start
+
+    results = await asyncio.gather(*(one(i) for i in range(requests)))
+    served = sorted(latency for status, latency in results if status == 200)
+    rejected = sorted(latency for status, latency in results if status == 429)
+    return {
+        "served": len(served),
+        "rejected": len(rejected),
+        "p50": statistics.median(served),
+        "p95": served[int(0.95 * (len(served) - 1))],
+        "max": served[-1],
+        "reject_p95": rejected[int(0.95 * (len(rejected) - 1))] if rejected else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="provider latency when idle, seconds (default 0.02)")
+    args = parser.parse_args()
+
+    asyncio.run(check_controller())
+    asyncio.run(check_middleware())
+    print("admission checks passed\n")
+
+    print(f"burst of {args.requests} extractions, provider latency {args.latency * 1e3:.0f} ms when idle")
+    print(f"  {'':22} {'served':>6} {'429':>5} {'p50':>9} {'p95':>9} {'max':>9} {'429 p95':>9}")
+    for admission in (False, True):
+        result = asyncio.run(simulate(args.requests, admission, args.latency, seed=1))
+        print(f"  {'admission control' if admission else 'accept everything':22} {result['served']:6d} {result['rejected']:5d} "
+              f"{result['p50'] * 1e3:7.0f}ms {result['p95'] * 1e3:7.0f}ms {result['max'] * 1e3:7.0f}ms "
+              f"{result['reject_p95'] * 1e3:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
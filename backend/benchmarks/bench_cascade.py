@@ -0,0 +1,262 @@
+"""Model cascade (``CASCADE_MODELS``): checks and benchmark.
+
+Checks that:
+
+- ``CASCADE_MODELS`` names the providers with a cascade and their small
+  models, defaulting to ``SMALL_TEXT_MODELS``, and rejects unknown providers
+- a small model's answer is kept only when it validates, is consistent
+  (maturity after the trade date, forward price near spot) and reports a
+  high enough confidence, which is not stored with the trade
+- ``/process-fx`` (against fake OpenAI and Anthropic clients) asks the
+  small model for JSON-constrained output, keeps its good answers, and
+  escalates to the large model on a bad answer or a failure; providers
+  without a cascade only call their large model; a cancel seen at the
+  ``escalating`` stage stops the extraction before the large model's call
+- ``/process-fx/cascade`` reports escalations per reason and latency saved
+
+Then runs extractions against fake models with a small/large latency gap,
+with and without the cascade, at several escalation rates.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_cascade [--extractions 40]
+"""
+import argparse
+import copy
+import json
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Keep the scratch trades out of the real store
+os.environ["TRADE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_trades.db")
+
+import app.main  # noqa: E402
+
+from app.api.endpoints import fx  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.schemas.trade_summary import consistency_errors, parse_extraction  # noqa: E402
+from app.services import cascade, provider_router  # noqa: E402
+from app.services.ai_service import SMALL_TEXT_MODELS, TEXT_MODELS, cascade_models  # noqa: E402
+from app.services.cascade import check_answer  # noqa: E402
+from app.services.trade_store import get_trade_store  # noqa: E402
+from benchmarks.bench_profiling import request  # noqa: E402
+from benchmarks.bench_trade_summary import extracted_fx  # noqa: E402
+
+BODY = {"input_type": "text", "input_text": "chat", "user_name": "Ana", "user_entity": "Bank A", "ai_provider": "OpenAI"}
+
+
+def answer(confidence=0.95, **fields) -> str:
+    trade = extracted_fx(**fields)
+    if confidence is not None:
+        trade["Confidence"] = confidence
+    return json.dumps(trade)
+
+
+def check_config() -> None:
+    original = settings.CASCADE_MODELS
+    try:
+        settings.CASCADE_MODELS = "OpenAI=gpt-4o-mini-2024-07-18, Google"
+        assert cascade_models() == {"OpenAI": "gpt-4o-mini-2024-07-18", "Google": SMALL_TEXT_MODELS["Google"]}
+        settings.CASCADE_MODELS = ""
+        assert cascade_models() == {}
+        settings.CASCADE_MODELS = "Mistral=small"
+        try:
+            cascade_models()
+            raise AssertionError("accepted an unknown provider")
+        except ValueError:
+            pass
+    finally:
+        settings.CASCADE_MODELS = original
+
+
+def check_answers() -> None:
+    assert consistency_errors(parse_extraction(answer(None)), 0.2) == []
+    early = consistency_errors(parse_extraction(answer(None, Maturity="01-01-2025")), 0.2)
+    assert len(early) == 1 and early[0].startswith("TradeSummary.Maturity"), early
+    points = parse_extraction(answer(None, Prices={"Spot Price": 950.0, "Forward Price": 3.2}))
+    assert consistency_errors(points, 0.2)[0].startswith("TradeSummary.Prices.Forward Price"), points
+
+    trade_json, problems, reason = check_answer(answer(0.95))
+    assert reason == "accepted" and not problems and "Confidence" not in trade_json
+    for raw, expected in (
+        (answer(0.5), "low_confidence"),
+        (answer(None), "low_confidence"),
+        (answer("high"), "low_confidence"),
+        (answer(0.99, Prices={"Spot Price": 950.0, "Forward Price": 3.2}), "inconsistent"),
+        (answer(0.99, **{"Notional Amount": "a lot"}), "invalid"),
+        ("I could not find a trade", "invalid"),
+    ):
+        trade_json, problems, reason = check_answer(raw)
+        assert (trade_json, reason) == (None, expected) and problems, (raw, reason, problems)
+
+
+class FakeModels:
+    """One provider's client: scripted answers per model (JSON text or an exception), with a latency."""
+
+    def __init__(self, latency_s: dict = None):
+        self.answers = {}
+        self.calls = []
+        self.latency_s = latency_s or {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **kwargs):
+        model = kwargs["model"]
+        self.calls.append((model, kwargs))
+        time.sleep(self.latency_s.get(model, 0))
+        script = self.answers.get(model) or []
+        reply = script.pop(0) if script else answer(None)
+        if isinstance(reply, Exception):
+            raise reply
+        if kwargs["messages"][-1]["role"] == "assistant":
+            # Anthropic continues the prefilled "{"
+            reply = reply[len(kwargs["messages"][-1]["content"]):]
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50, input_tokens=100, output_tokens=50),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+            content=[SimpleNamespace(text=reply)]
+        )
+
+
+class fake_providers:
+    """Swap the shared AIService's clients for fakes, with the given CASCADE_MODELS."""
+
+    def __init__(self, cascade_spec: str, openai: FakeModels, anthropic: FakeModels = None):
+        self.cascade_spec = cascade_spec
+        self.clients = openai, anthropic or FakeModels()
+
+    def __enter__(self):
+        service = fx.ai_service
+        self.saved = service.openai_client, service.anthropic_client, service.google_api_key, settings.CASCADE_MODELS
+        service.openai_client, service.anthropic_client = self.clients
+        service.google_api_key = None
+        settings.CASCADE_MODELS = self.cascade_spec
+        provider_router._router = None
+        cascade._metrics = None
+        return self
+
+    def __exit__(self, *exc):
+        service = fx.ai_service
+        service.openai_client, service.anthropic_client, service.google_api_key, settings.CASCADE_MODELS = self.saved
+        provider_router._router = None
+        cascade._metrics = None
+
+
+def extract(provider: str = "OpenAI") -> tuple:
+    status, _, body = request(app.main.app, "/api/process-fx", dict(BODY, ai_provider=provider))
+    assert status == 200, body
+    response = json.loads(body)
+    return response, get_trade_store().get_trade(response["TradeId"], None)
+
+
+def check_pipeline() -> None:
+    small, large = SMALL_TEXT_MODELS["OpenAI"], TEXT_MODELS["OpenAI"]
+    openai, anthropic = FakeModels(), FakeModels()
+    with fake_providers("OpenAI,Anthropic", openai, anthropic):
+        openai.answers[small] = [answer(0.95)]
+        response, stored = extract()
+        assert [model for model, _ in openai.calls] == [small] and stored["model"] == small
+        assert openai.calls[0][1]["response_format"] == {"type": "json_object"}
+        assert "Confidence" in openai.calls[0][1]["messages"][-1]["content"]
+        assert "Confidence" not in response and "Confidence" not in json.dumps(stored)
+
+        cases = [
+            ([answer(0.4)], "low_confidence"),
+            ([answer(0.99, Prices={"Spot Price": 950.0, "Forward Price": 3.2})], "inconsistent"),
+            ([answer(0.99, Maturity="01-01-2025")], "inconsistent"),
+            ([RuntimeError("timeout")], "error"),
+        ]
+        for script, _ in cases:
+            openai.calls.clear()
+            openai.answers[small] = list(script)
+            _, stored = extract()
+            assert [model for model, _ in openai.calls] == [small, large], openai.calls
+            # The large model gets the usual prompt and answers without a confidence
+            assert "response_format" not in openai.calls[1][1] and stored["model"] == large
+
+        anthropic.answers[SMALL_TEXT_MODELS["Anthropic"]] = [answer(0.9)]
+        _, stored = extract("Anthropic")
+        assert stored["model"] == SMALL_TEXT_MODELS["Anthropic"]
+        assert anthropic.calls[0][1]["messages"][-1] == {"role": "assistant", "content": "{"}
+
+        status, _, body = request(app.main.app, "/api/process-fx/cascade", {}, method="GET")
+        report = json.loads(body)["OpenAI"]
+        assert status == 200 and (report["extractions"], report["escalations"]) == (5, 4), report
+        assert report["reasons"] == {"low_confidence": 1, "inconsistent": 2, "error": 1}
+        assert report["escalation_rate"] == 0.8
+        # The rejected small answers count against the small model in the routing stats
+        routing = provider_router.get_provider_router().summary("OpenAI", small)
+        assert routing["samples"] == 5 and routing["error_rate"] == 0.8, routing
+
+        # An extraction cancelled during the small model's call stops before the large model's
+        openai.calls.clear()
+        openai.answers[small] = [answer(0.4)]
+        stages = []
+
+        def on_stage(stage: str, progress: float) -> None:
+            stages.append(stage)
+            if stage == "escalating":
+                raise fx.ExtractionCancelled()
+
+        try:
+            fx.run_extraction(fx.ProcessFXRequest(**BODY), copy.copy(fx.ai_service), on_stage)
+            raise AssertionError("escalated after the cancel")
+        except fx.ExtractionCancelled:
+            pass
+        assert [model for model, _ in openai.calls] == [small] and stages[-1] == "escalating", stages
+
+    openai = FakeModels()
+    with fake_providers("Anthropic", openai):
+        extract()
+        assert [model for model, _ in openai.calls] == [large]
+        assert "response_format" not in openai.calls[0][1]
+
+
+def run(extractions: int, escalation_rate: float, cascade_spec: str) -> tuple:
+    """Mean and p95 end-to-end latency (ms) of /process-fx, and the cascade report."""
+    small, large = SMALL_TEXT_MODELS["OpenAI"], TEXT_MODELS["OpenAI"]
+    openai = FakeModels({small: 0.04, large: 0.12})
+    escalated = round(extractions * escalation_rate)
+    # Spread the low-confidence answers over the run
+    openai.answers[small] = [
+        answer(0.3 if (i * escalated) // extractions != ((i + 1) * escalated) // extractions else 0.95)
+        for i in range(extractions)
+    ]
+    latencies = []
+    with fake_providers(cascade_spec, openai):
+        for _ in range(extractions):
+            start = time.perf_counter()
+            extract()
+            latencies.append((time.perf_counter() - start) * 1000)
+        report = cascade.get_cascade_metrics().stats().get("OpenAI")
+    latencies.sort()
+    return statistics.fmean(latencies), latencies[int(0.95 * len(latencies))], report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--extractions", type=int, default=40)
+    args = parser.parse_args()
+
+    check_config()
+    check_answers()
+    check_pipeline()
+    print("cascade checks passed\n")
+
+    print(f"{args.extractions} extractions per row, fake small model 40 ms, large model 120 ms")
+    mean_ms, p95_ms, _ = run(args.extractions, 0.0, "")
+    print(f"  {'large model only':22} {mean_ms:8.1f} ms mean {p95_ms:8.1f} ms p95")
+    for rate in (0.1, 0.3, 0.6):
+        mean_ms, p95_ms, report = run(args.extractions, rate, "OpenAI")
+        print(
+            f"  {f'cascade, {rate:.0%} escalated':22} {mean_ms:8.1f} ms mean {p95_ms:8.1f} ms p95"
+            f"   reported: {report['escalation_rate']:.0%} escalated,"
+            f" {report['latency_saved_per_extraction_ms']:.1f} ms saved per extraction"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Lazily computed trade cashflows: checks and benchmark.
+
+Stores trades in a scratch trade store, then calls
+``GET /api/trades/{id}/cashflows`` on the ASGI app directly and checks that:
+
+- the first request computes the cashflows (``X-Cashflow-Cache: miss``)
+  and returns exactly the transform_output of the stored trade; later
+  requests are served from the cache (``hit``) with the same bytes
+- concurrent first requests for one trade price it once
+- hits are answered without touching the curve and fixings files until
+  ``CASHFLOW_MARKET_CHECK_S`` has passed since they were last checked
+- amending the trade, or rebuilding its floating index curve, makes the
+  next request recompute (the curve once the check window has passed)
+- unknown trades are a 404 and trades that are not swaps a 422
+
+Then compares what computing cashflows inline would add to every
+extraction with the cost of the first and of later requests.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_cashflow_cache
+"""
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+
+# Keep the scratch trades out of the real store
+os.environ["TRADE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_trades.db")
+
+# Also points CURVE_DIR at a scratch directory before the app reads its settings
+from benchmarks.bench_curves import CURVE_DIR, write_curve  # noqa: E402
+
+import app.main  # noqa: E402
+from app.api.responses import dumps  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.services import cashflow_service  # noqa: E402
+from app.services.cashflow_service import get_cashflow_service  # noqa: E402
+from app.services.swap_service import SwapParamTransformer, create_swap_cashflows, load_ql_parameters, transform_output  # noqa: E402
+from app.services.trade_store import get_trade_store  # noqa: E402
+from benchmarks.bench_cashflow_engine import time_it  # noqa: E402
+from benchmarks.bench_fx import fx_trade  # noqa: E402
+from benchmarks.bench_profiling import request  # noqa: E402
+from benchmarks.bench_repricing import long_dated_trade  # noqa: E402
+
+
+def priced(trade_json: dict) -> bytes:
+    """What process_fx used to compute inline, serialized."""
+    params = load_ql_parameters(SwapParamTransformer().transform_json(trade_json))
+    return dumps(transform_output(trade_json, *create_swap_cashflows(**params)))
+
+
+def get(trade_id: int):
+    return request(app.main.app, f"/api/trades/{trade_id}/cashflows", {}, method="GET")
+
+
+def check_cache() -> None:
+    store = get_trade_store()
+    service = get_cashflow_service()
+    trade_json = long_dated_trade()
+    trade_id = store.save_trade(trade_json, input_digest="bench")
+
+    status, headers, first = get(trade_id)
+    assert status == 200 and headers["x-cashflow-cache"] == "miss", (status, headers)
+    assert first == priced(trade_json), "lazy cashflows differ from the inline computation"
+    status, headers, again = get(trade_id)
+    assert status == 200 and headers["x-cashflow-cache"] == "hit" and again == first
+
+    # A recent hit is served from memory alone, a later one checks the files again
+    def no_disk(index):
+        raise AssertionError("market data files checked on a recent hit")
+
+    saved = cashflow_service.get_curve
+    cashflow_service.get_curve = no_disk
+    try:
+        assert service.cached(trade_id) == first
+    finally:
+        cashflow_service.get_curve = saved
+    window = settings.CASHFLOW_MARKET_CHECK_S
+    settings.CASHFLOW_MARKET_CHECK_S = 0.05
+    time.sleep(0.06)
+    assert service.cached(trade_id) is None and service.lookup(trade_id) == first
+    assert service.cached(trade_id) == first
+
+    # One computation for concurrent first requests
+    other_id = store.save_trade(trade_json, input_digest="bench")
+    misses = service.stats()["misses"]
+    bodies = []
+    threads = [threading.Thread(target=lambda: bodies.append(service.get_cashflows(other_id)[0])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert service.stats()["misses"] == misses + 1 and len(set(bodies)) == 1 and bodies[0] == first
+
+    # Amendments invalidate
+    status, _, _ = request(app.main.app, f"/api/trades/{trade_id}/cashflows", {"leg1": {"notional": 5e9}}, method="PATCH")
+    assert status == 200
+    status, headers, amended = get(trade_id)
+    assert headers["x-cashflow-cache"] == "miss" and amended == priced(store.get_trade(trade_id)["trade_json"])
+    assert amended != first
+
+    # So does a rebuilt curve of the floating index
+    write_curve("ICP", "zero", "log-linear")
+    get(other_id)
+    write_curve("ICP", "zero", "log-linear", shift=0.5)
+    path = os.path.join(CURVE_DIR, "ICP.txt")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    time.sleep(0.06)
+    status, headers, shifted = get(other_id)
+    assert headers["x-cashflow-cache"] == "miss" and shifted == priced(trade_json) and shifted != first
+    # The reload is seen by the other trades' hits at once
+    assert service.cached(trade_id) is None
+    settings.CASHFLOW_MARKET_CHECK_S = window
+
+    assert get(10**9)[0] == 404
+    fx_id = store.save_trade(fx_trade("USD", "CLP", date(2025, 3, 14), "3M", 950.0), input_digest="bench")
+    assert get(fx_id)[0] == 422
+
+
+def main():
+    check_cache()
+    print("cache checks passed\n")
+
+    store = get_trade_store()
+    trade_json = long_dated_trade()
+    inline = time_it(lambda: priced(trade_json), 20)
+
+    def first_request():
+        trade_id = store.save_trade(trade_json, input_digest="bench")
+        assert get(trade_id)[1]["x-cashflow-cache"] == "miss"
+
+    trade_id = store.save_trade(trade_json, input_digest="bench")
+    get(trade_id)
+    first = time_it(first_request, 20)
+    repeat = time_it(lambda: get(trade_id), 200)
+    body = get(trade_id)[2]
+    print(f"30Y monthly swap ({len(body) / 1024:.0f} KiB of cashflows)")
+    print(f"  inline in process_fx (every extraction)   {inline * 1e3:8.2f} ms")
+    print(f"  first GET (store + price + cache)         {first * 1e3:8.2f} ms")
+    print(f"  later GETs (from the cache)               {repeat * 1e3:8.2f} ms   x{first / repeat:.0f}")
+    print(f"  cache: {get_cashflow_service().stats()}")
+
+
+if __name__ == "__main__":
+    main()
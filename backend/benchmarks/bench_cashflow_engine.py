@@ -0,0 +1,188 @@
+"""Scalar vs vectorized cashflow engine: differential check and benchmark.
+
+Generates a synthetic book of fixed/floating swaps covering every day count
+convention, both amortization types, leg holiday calendars and awkward dates
+(month ends, Feb 29, Dec 31). Every trade is first priced by both engines and
+the serialized outputs are compared with ``repr`` so any last-bit or
+int/float difference fails the run. Then per-trade and per-portfolio timings are reported.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_cashflow_engine [--trades 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+import app.main  # noqa: F401 - initialises the shared logger before the services
+from app.swap_calculator.calculators import (
+    calculate_swap_cashflows,
+    _generate_cashflows,
+    clear_schedule_cache,
+    schedule_cache_stats
+)
+from app.swap_calculator.vectorized import (
+    calculate_swap_cashflows_vectorized,
+    calculate_portfolio_leg_arrays,
+    compute_legs,
+    _swap_leg_specs
+)
+
+DAY_COUNTS = [
+    "Actual/360", "Actual/365", "Actual/365F", "30/360", "Bond Basis",
+    "30E/360", "Eurobond Basis", "Actual/Actual", "Actual/Actual ISDA"
+]
+BUSINESS_DAY_CONVENTIONS = ["Following", "ModifiedFollowing", "Preceding", "Unadjusted"]
+FREQUENCY_MONTHS = [0, 1, 3, 6, 12]
+CURRENCIES = ["CLP", "CLF", "USD", "EUR", None]
+EDGE_DATES = [
+    date(2024, 1, 31), date(2024, 2, 29), date(2023, 12, 31),
+    date(2024, 8, 30), date(2025, 3, 31), date(2027, 12, 31)
+]
+
+
+def random_trade(rng: random.Random) -> dict:
+    if rng.random() < 0.3:
+        effective = rng.choice(EDGE_DATES)
+    else:
+        effective = date(2024, 1, 1) + timedelta(days=rng.randrange(0, 3 * 365))
+    termination = effective + timedelta(days=rng.randrange(30, 30 * 365))
+
+    def leg(is_floating: bool) -> dict:
+        return {
+            "type": "floating" if is_floating else "fixed",
+            "rate": "ICP" if is_floating else round(rng.uniform(0.5, 9.0), 4),
+            "currency": rng.choice(CURRENCIES),
+            "notional": float(rng.choice([1_000_000, 5_000_000, 2_500_000_000, 12_345_678.9])),
+            "frequency": {"months": rng.choice(FREQUENCY_MONTHS)},
+            "business_day_convention": rng.choice(BUSINESS_DAY_CONVENTIONS),
+            "day_count_convention": rng.choice(DAY_COUNTS),
+            "amortization_type": rng.choice(["BULLET", "LINEAR"]),
+            "spread": rng.choice([0, 0.25]) if is_floating else 0.0
+        }
+
+    return {
+        "trade_date": effective,
+        "effective_date": effective,
+        "termination_date": termination,
+        "fixed_leg": leg(False),
+        "floating_leg": leg(True)
+    }
+
+
+def quarterly_30y_trade() -> dict:
+    effective = date(2025, 1, 17)
+    leg = {
+        "notional": 10_000_000_000.0,
+        "frequency": {"months": 3},
+        "business_day_convention": "ModifiedFollowing",
+        "day_count_convention": "Actual/360",
+        "amortization_type": "LINEAR"
+    }
+    return {
+        "trade_date": effective,
+        "effective_date": effective,
+        "termination_date": date(2055, 1, 17),
+        "fixed_leg": dict(leg, rate=5.125),
+        "floating_leg": dict(leg, rate="ICP", spread=0)
+    }
+
+
+def args_of(trade: dict) -> tuple:
+    return (
+        trade["trade_date"],
+        trade["effective_date"],
+        trade["termination_date"],
+        trade["fixed_leg"],
+        trade["floating_leg"]
+    )
+
+
+def time_it(fn, repeats: int) -> float:
+    fn()  # warmup
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def as_dicts(legs) -> list:
+    return [[cashflow.to_dict() for cashflow in leg] for leg in legs]
+
+
+def check_identical(trades: list) -> None:
+    for i, trade in enumerate(trades):
+        expected = as_dicts(calculate_swap_cashflows(*args_of(trade)))
+        actual = as_dicts(calculate_swap_cashflows_vectorized(*args_of(trade)))
+        if repr(expected) != repr(actual):
+            raise AssertionError(f"Engines differ on trade {i}: {trade}")
+
+    portfolio = calculate_portfolio_leg_arrays(trades)
+    for i, (trade, (fixed, floating)) in enumerate(zip(trades, portfolio)):
+        expected = as_dicts(calculate_swap_cashflows(*args_of(trade)))
+        if repr(expected) != repr([fixed.to_dicts(), floating.to_dicts()]):
+            raise AssertionError(f"Portfolio engine differs on trade {i}: {trade}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    trades = [random_trade(rng) for _ in range(args.trades)]
+
+    clear_schedule_cache()
+    check_identical(trades)
+    print(f"differential check: {len(trades)} trades identical across engines\n")
+
+    single = quarterly_30y_trade()
+    scalar = time_it(lambda: calculate_swap_cashflows(*args_of(single)), 200)
+    vector = time_it(lambda: calculate_swap_cashflows_vectorized(*args_of(single)), 200)
+    print("30Y quarterly LINEAR swap, per trade (Cashflow output)")
+    print(f"  scalar     {scalar * 1e3:9.3f} ms")
+    print(f"  vectorized {vector * 1e3:9.3f} ms   x{scalar / vector:.2f}\n")
+
+    scalar = time_it(lambda: [calculate_swap_cashflows(*args_of(t)) for t in trades], 3)
+    vector = time_it(lambda: calculate_portfolio_leg_arrays(trades), 3)
+    vector_objects = time_it(
+        lambda: [(f.to_cashflows(), g.to_cashflows()) for f, g in calculate_portfolio_leg_arrays(trades)], 3
+    )
+    print(f"portfolio of {len(trades)} trades")
+    print(f"  scalar               {scalar * 1e3:9.1f} ms")
+    print(f"  vectorized (arrays)  {vector * 1e3:9.1f} ms   x{scalar / vector:.2f}")
+    print(f"  vectorized (objects) {vector_objects * 1e3:9.1f} ms   x{scalar / vector_objects:.2f}\n")
+
+    # Schedules are shared by both engines; isolate the amortization/interest stage
+    specs = [spec for t in trades for spec in _swap_leg_specs(
+        t["effective_date"], t["termination_date"], t["fixed_leg"], t["floating_leg"]
+    )]
+    scalar = time_it(lambda: [_generate_cashflows(**spec) for spec in specs], 3)
+    vector = time_it(lambda: compute_legs(specs), 3)
+    print(f"portfolio of {len(trades)} trades, schedules precomputed")
+    print(f"  scalar               {scalar * 1e3:9.1f} ms")
+    print(f"  vectorized (arrays)  {vector * 1e3:9.1f} ms   x{scalar / vector:.2f}\n")
+
+    def build_schedules():
+        for t in trades:
+            _swap_leg_specs(t["effective_date"], t["termination_date"], t["fixed_leg"], t["floating_leg"])
+
+    clear_schedule_cache()
+    start = time.perf_counter()
+    build_schedules()
+    cold = time.perf_counter() - start
+    warm = time_it(build_schedules, 3)
+    stats = schedule_cache_stats()
+    print(f"schedules for {len(trades)} trades")
+    print(f"  cold cache           {cold * 1e3:9.1f} ms")
+    print(f"  warm cache           {warm * 1e3:9.1f} ms   x{cold / warm:.2f}")
+    print(f"  hit rate             {stats['hit_rate']:9.1%}   ({stats['size']} schedules cached)")
+
+
+if __name__ == "__main__":
+    main()
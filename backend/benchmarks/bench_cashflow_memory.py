@@ -0,0 +1,127 @@
+"""Memory and serialization cost of the cashflow representations.
+
+Prices a book of 30-year monthly LINEAR swaps (about 10k cashflows) and
+reports, per 10k cashflows:
+
+- retained memory (tracemalloc) of legacy per-period dicts with ISO date
+  strings, of Cashflow objects (scalar engine) and of LegCashflows columns
+  (vectorized engine)
+- time of transform_output on Cashflow lists and on LegCashflows, plus the
+  end-to-end calculate + transform time of both engines
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_cashflow_memory [--trades 14]
+"""
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+from datetime import date
+
+import app.main  # noqa: F401 - initialises the shared logger before the services
+from app.services.swap_service import transform_output
+from app.swap_calculator.calculators import calculate_swap_cashflows
+from app.swap_calculator.vectorized import calculate_swap_leg_arrays
+
+
+def leg(notional: float, rate) -> dict:
+    return {
+        "notional": notional,
+        "rate": rate,
+        "currency": "CLP",
+        "frequency": {"months": 1},
+        "business_day_convention": "ModifiedFollowing",
+        "day_count_convention": "Actual/360",
+        "amortization_type": "LINEAR"
+    }
+
+
+def trade_json() -> dict:
+    def payer(company: str, leg_type: str, rate: str) -> dict:
+        return {
+            "Leg Type": leg_type,
+            "Rate": rate,
+            "Company": company,
+            "Leg Currency": "CLP",
+            "Notional Amount": "1000000000",
+            "Date Basis": "Actual/360",
+            "Business Date Adjustment": "Modified Following"
+        }
+
+    return {
+        "TradeSummary": {
+            "Trade Date": "17-01-2025",
+            "Maturity": "30Y",
+            "Price Maker": "Banco ABC",
+            "Price Taker": "Client XYZ",
+            "Accepted Price": "5.1",
+            "Accepted Side": "Pay",
+            "Leg 1 Payer": payer("Banco ABC", "Fixed", "5.1"),
+            "Leg 2 Payer": payer("Client XYZ", "Floating", "ICP")
+        }
+    }
+
+
+def retained(build) -> tuple:
+    """Build an object graph and return it with the bytes it retains."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def time_it(fn, repeats: int = 5) -> float:
+    fn()  # warmup
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=14)
+    args = parser.parse_args()
+
+    start, end = date(2025, 1, 17), date(2055, 1, 17)
+    # Distinct notionals so no amounts are shared between trades
+    book = [
+        (start, start, end, leg(1e9 + i, 5.1), leg(1e9 + i, "ICP"))
+        for i in range(args.trades)
+    ]
+    summary = trade_json()
+    calculate_swap_cashflows(*book[0])  # warm the schedule cache
+
+    objects, objects_size = retained(lambda: [calculate_swap_cashflows(*t) for t in book])
+    _, dicts_size = retained(lambda: [[[cf.to_dict() for cf in leg] for leg in legs] for legs in objects])
+    arrays, arrays_size = retained(lambda: [calculate_swap_leg_arrays(*t) for t in book])
+    count = sum(len(fixed) + len(floating) for fixed, floating in objects)
+
+    scale = 10_000 / count / 1024
+    print(f"{args.trades} trades, {count} cashflows\n")
+    print("retained memory per 10k cashflows")
+    print(f"  per-period dicts     {dicts_size * scale:8.0f} KiB")
+    print(f"  Cashflow objects     {objects_size * scale:8.0f} KiB")
+    print(f"  LegCashflows columns {arrays_size * scale:8.0f} KiB\n")
+
+    print("transform_output")
+    on_objects = time_it(lambda: [transform_output(summary, *legs) for legs in objects])
+    on_arrays = time_it(lambda: [transform_output(summary, *legs) for legs in arrays])
+    print(f"  Cashflow objects     {on_objects * 1e3:8.1f} ms")
+    print(f"  LegCashflows         {on_arrays * 1e3:8.1f} ms\n")
+
+    print("calculate + transform_output")
+    scalar = time_it(lambda: [transform_output(summary, *calculate_swap_cashflows(*t)) for t in book])
+    vector = time_it(lambda: [transform_output(summary, *calculate_swap_leg_arrays(*t)) for t in book])
+    print(f"  scalar engine        {scalar * 1e3:8.1f} ms")
+    print(f"  vectorized engine    {vector * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
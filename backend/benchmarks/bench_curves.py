@@ -0,0 +1,128 @@
+"""Discount curves and floating-leg projection: checks and benchmark.
+
+Writes synthetic index curves into a scratch CURVE_DIR and checks that:
+
+- node discount factors reproduce the input zero/forward rates
+- log-linear interpolation gives flat forwards between nodes, linear
+  interpolation is linear in discount factors
+- the scalar and vectorized engines project floating legs identically
+- the shared curve object is reused until its file changes, then rebuilt
+
+Then times curve lookup, discount factor lookup and the cost projection
+adds to a book of swaps.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_curves [--trades 2000]
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+
+# Curves are read from a scratch directory
+CURVE_DIR = tempfile.mkdtemp()
+os.environ["CURVE_DIR"] = CURVE_DIR
+
+import app.main  # noqa: F401,E402 - initialises the shared logger before the services
+from app.swap_calculator.calculators import calculate_swap_cashflows  # noqa: E402
+from app.swap_calculator.curves import get_curve  # noqa: E402
+from app.swap_calculator.vectorized import calculate_portfolio_leg_arrays  # noqa: E402
+from benchmarks.bench_cashflow_engine import args_of, check_identical, random_trade, time_it  # noqa: E402
+
+ASOF = date(2025, 1, 17)
+TENORS = ["1M", "3M", "6M", "1Y", "2Y", "3Y", "5Y", "7Y", "10Y", "15Y", "20Y", "30Y"]
+RATES = [5.00, 4.95, 4.80, 4.60, 4.40, 4.35, 4.50, 4.70, 4.90, 5.05, 5.10, 5.15]
+
+
+def write_curve(index: str, curve_type: str, interpolation: str, shift: float = 0.0) -> None:
+    lines = [f"# asof: {ASOF.isoformat()}", f"# type: {curve_type}", f"# interpolation: {interpolation}"]
+    lines += [f"{tenor} {rate + shift:.4f}" for tenor, rate in zip(TENORS, RATES)]
+    with open(os.path.join(CURVE_DIR, f"{index}.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def check_curves() -> None:
+    write_curve("ZERO", "zero", "log-linear")
+    write_curve("FWD", "forward", "linear")
+    zero, fwd = get_curve("ZERO"), get_curve("fwd")
+
+    for i, rate in enumerate(RATES, 1):
+        t = zero.node_times[i]
+        assert math.isclose(zero.discount_factor(date.fromordinal(int(zero.node_ordinals[i]))), math.exp(-rate / 100 * t), rel_tol=1e-12)
+
+    # Forward curve: each segment discounts at its own flat rate
+    log_dfs = np.log(fwd.node_dfs)
+    segment_rates = -np.diff(log_dfs) / np.diff(fwd.node_times) * 100
+    assert np.allclose(segment_rates, RATES), segment_rates
+
+    # Log-linear: constant one-day forwards inside a segment
+    days = np.arange(zero.node_ordinals[5] + 1, zero.node_ordinals[6], dtype=np.int64)
+    one_day = np.log(zero.discount_factors(days[:-1]) / zero.discount_factors(days[1:]))
+    assert np.allclose(one_day, one_day[0], rtol=1e-9)
+
+    # Linear: discount factors on the chord between nodes
+    a, b = fwd.node_ordinals[3], fwd.node_ordinals[4]
+    mid = np.array([(a + b) // 2])
+    weight = (mid[0] - a) / (b - a)
+    expected = fwd.node_dfs[3] + weight * (fwd.node_dfs[4] - fwd.node_dfs[3])
+    assert math.isclose(fwd.discount_factors(mid)[0], expected, rel_tol=1e-12)
+
+    # Shared until the file changes
+    assert get_curve("ZERO") is zero
+    write_curve("ZERO", "zero", "log-linear", shift=0.25)
+    stat = os.stat(os.path.join(CURVE_DIR, "ZERO.txt"))
+    os.utime(os.path.join(CURVE_DIR, "ZERO.txt"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    rebuilt = get_curve("ZERO")
+    assert rebuilt is not zero and rebuilt.discount_factor(date(2030, 1, 1)) < zero.discount_factor(date(2030, 1, 1))
+    assert get_curve("UNKNOWN") is None and get_curve("../ZERO") is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=2000)
+    args = parser.parse_args()
+
+    check_curves()
+    print("curve checks passed")
+
+    rng = random.Random(35)
+    trades = [random_trade(rng) for _ in range(args.trades)]
+
+    # Without an ICP curve floating interest stays "TBD"
+    unprojected = calculate_swap_cashflows(*args_of(trades[0]))[1]
+    assert all(cf.interest == "TBD" for cf in unprojected)
+    no_curve = time_it(lambda: calculate_portfolio_leg_arrays(trades), 3)
+    no_curve_scalar = time_it(lambda: [calculate_swap_cashflows(*args_of(t)) for t in trades], 3)
+
+    write_curve("ICP", "zero", "log-linear")
+    for trade in trades:
+        # Exercise spreads on the projected legs too
+        trade["floating_leg"]["spread"] = rng.choice([0, 0.25, 1.1])
+    check_identical(trades)
+    projected = calculate_swap_cashflows(*args_of(trades[0]))[1]
+    assert all(isinstance(cf.interest, float) for cf in projected)
+    print(f"differential check: {len(trades)} trades projected identically by both engines\n")
+
+    curve = get_curve("ICP")
+    lookups = time_it(lambda: [get_curve("ICP") for _ in range(10_000)], 5)
+    ordinals = np.arange(ASOF.toordinal() - 2000, ASOF.toordinal() + 30 * 365, dtype=np.int64)
+    table = time_it(lambda: curve.discount_factors(ordinals), 20)
+    scalar = time_it(lambda: [curve.discount_factor(ASOF + timedelta(days=int(d))) for d in range(0, 10_000)], 3)
+    print(f"get_curve (unchanged file)       {lookups / 10_000 * 1e6:8.2f} us")
+    print(f"discount factors, array          {table / len(ordinals) * 1e9:8.2f} ns per date")
+    print(f"discount factor, scalar          {scalar / 10_000 * 1e6:8.2f} us per date\n")
+
+    with_curve = time_it(lambda: calculate_portfolio_leg_arrays(trades), 3)
+    with_curve_scalar = time_it(lambda: [calculate_swap_cashflows(*args_of(t)) for t in trades], 3)
+    print(f"portfolio of {len(trades)} trades   {'TBD':>10} {'projected':>10}")
+    print(f"  scalar engine            {no_curve_scalar * 1e3:8.1f} ms {with_curve_scalar * 1e3:8.1f} ms")
+    print(f"  vectorized engine        {no_curve * 1e3:8.1f} ms {with_curve * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
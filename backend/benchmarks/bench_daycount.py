@@ -0,0 +1,65 @@
+"""Micro-benchmarks for the day count kernels.
+
+For each convention, times over the same set of random periods:
+
+- calculate_interest: resolves the convention on every call
+- scalar kernel: DayCounter.year_fraction resolved once
+- array kernel: DayCounter.year_fractions over all periods at once
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_daycount [--periods 100000]
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import app.main  # noqa: F401 - initialises the shared logger before the services
+from app.swap_calculator.calculators import calculate_interest
+from app.swap_calculator.daycount import get_day_counter
+
+CONVENTIONS = ["Actual/360", "Actual/365F", "30/360", "30E/360", "Actual/Actual ISDA"]
+
+
+def best_of(fn, repeats: int = 5) -> float:
+    fn()  # warmup
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--periods", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    periods = []
+    for _ in range(args.periods):
+        start = date(2020, 1, 1) + timedelta(days=rng.randrange(0, 15 * 365))
+        periods.append((start, start + timedelta(days=rng.randrange(1, 2 * 365))))
+    starts = np.fromiter((s.toordinal() for s, _ in periods), dtype=np.int64, count=len(periods))
+    ends = np.fromiter((e.toordinal() for _, e in periods), dtype=np.int64, count=len(periods))
+
+    print(f"{len(periods)} periods, ns per period (best of 5)\n")
+    print(f"{'convention':<20} {'calculate_interest':>19} {'scalar kernel':>14} {'array kernel':>13}")
+    for name in CONVENTIONS:
+        counter = get_day_counter(name)
+        year_fraction = counter.year_fraction
+
+        per_call = best_of(lambda: [calculate_interest(1e6, 5.0, s, e, name) for s, e in periods])
+        scalar = best_of(lambda: [year_fraction(s, e) for s, e in periods])
+        array = best_of(lambda: counter.year_fractions(starts, ends))
+
+        scale = 1e9 / len(periods)
+        print(f"{name:<20} {per_call * scale:>19.1f} {scalar * scale:>14.1f} {array * scale:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
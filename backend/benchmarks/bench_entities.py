@@ -0,0 +1,253 @@
+"""Serving several entities from one process: checks and benchmark.
+
+Checks, against the real app with a scripted provider, that:
+
+- the registry file is read with defaults for omitted settings, gets the
+  default entity added, and rejects unknown settings and providers
+- requests are served for their ``X-Entity`` (the default entity without
+  one), and an unknown entity is a 400, or a closed WebSocket handshake;
+  with several entities and no default, so is a request naming none, and
+  no code path reads the trades unfiltered
+- the entity reaches the pipeline's worker thread: an entity's provider
+  is used for extractions that do not pick one, and its trades are stored
+  under it
+- trades, their cashflows and amendments are only visible to their own
+  entity, whose cashflow and repricing caches are separate and sized by
+  its settings
+- a store written before entities were recorded gets its trades assigned
+  to the default entity
+
+Then compares the start-up time and memory of one process per entity
+with one process serving them all.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_entities [--entities 4]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# Keep the scratch trades out of the real store
+os.environ["TRADE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_trades.db")
+
+import app.main  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+from starlette.websockets import WebSocketDisconnect  # noqa: E402
+
+from app import entities  # noqa: E402
+from app.api.admission import user_key  # noqa: E402
+from app.api.endpoints import fx  # noqa: E402
+from app.entities import Entity, EntityRegistry, bind_entity, load_registry, unbind_entity  # noqa: E402
+from app.services.cashflow_service import get_cashflow_service  # noqa: E402
+from app.services.repricing_service import get_repricing_service  # noqa: E402
+from app.services.trade_store import TradeStore, get_trade_store  # noqa: E402
+from benchmarks.bench_repricing import long_dated_trade  # noqa: E402
+from benchmarks.bench_trade_summary import extracted_fx  # noqa: E402
+
+BODY = {"input_type": "text", "input_text": "chat", "user_name": "Ana", "user_entity": "Bank A"}
+
+
+def check_registry() -> None:
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "entities.json")
+    with open(path, "w") as f:
+        json.dump({"Banco ABC1": {"ai_provider": "Anthropic", "cashflow_cache_mb": 8}, "Banco XYZ": {}}, f)
+    registry = load_registry(path, "Banco Sur")
+    assert registry.names() == ["Banco ABC1", "Banco XYZ", "Banco Sur"] and registry.isolated
+    assert registry.resolve(None).name == "Banco Sur"
+    abc, xyz = registry.resolve("Banco ABC1"), registry.resolve("Banco XYZ")
+    assert (abc.ai_provider, abc.cashflow_cache_mb) == ("Anthropic", 8)
+    assert xyz.ai_provider is None and xyz.cashflow_cache_mb == Entity("x").cashflow_cache_mb
+    try:
+        registry.resolve("Banco Norte")
+        raise AssertionError("unknown entity resolved")
+    except entities.UnknownEntity:
+        pass
+
+    for config in ({"Banco ABC1": {"cache_mb": 8}}, {"Banco ABC1": {"ai_provider": "Mistral"}}):
+        with open(path, "w") as f:
+            json.dump(config, f)
+        try:
+            load_registry(path, None)
+            raise AssertionError(f"accepted {config}")
+        except ValueError:
+            pass
+
+    # Several entities without a default: a request must name one
+    no_default = EntityRegistry([Entity("Banco ABC1"), Entity("Banco XYZ")])
+    try:
+        no_default.resolve(None)
+        raise AssertionError("resolved no entity with several registered")
+    except entities.UnknownEntity:
+        pass
+
+    # No file: one entity as before, or any entity at all without a default
+    assert load_registry(os.path.join(directory, "missing.json"), "Banco Sur").names() == ["Banco Sur"]
+    open_registry = load_registry(None, None)
+    assert open_registry.resolve("Anyone").name == "Anyone" and not open_registry.isolated
+
+
+def check_requests(client: TestClient) -> None:
+    providers = []
+
+    def process_text(text, provider="OpenAI", correction=None):
+        providers.append((provider, entities.current_entity_name()))
+        return json.dumps(extracted_fx())
+
+    original = fx.ai_service.process_text
+    fx.ai_service.process_text = process_text
+    try:
+        trade_ids = {}
+        for name in ("Banco ABC1", "Banco XYZ"):
+            response = client.post("/api/process-fx", json=BODY, headers={"X-Entity": name})
+            assert response.status_code == 200, response.text
+            trade_ids[name] = response.json()["TradeId"]
+        response = client.post("/api/process-fx", json=dict(BODY, ai_provider="Google"), headers={"X-Entity": "Banco ABC1"})
+        assert response.status_code == 200
+        # The provider call runs in a worker thread, which still sees the entity
+        assert providers == [("Anthropic", "Banco ABC1"), ("OpenAI", "Banco XYZ"), ("Google", "Banco ABC1")], providers
+    finally:
+        fx.ai_service.process_text = original
+
+    assert client.post("/api/process-fx", json=BODY, headers={"X-Entity": "Banco Norte"}).status_code == 400
+    try:
+        with client.websocket_connect("/api/ws/snips?entity=Banco%20Norte"):
+            raise AssertionError("handshake accepted")
+    except WebSocketDisconnect as e:
+        assert e.code == 1008
+
+    for name, trade_id in trade_ids.items():
+        other = "Banco XYZ" if name == "Banco ABC1" else "Banco ABC1"
+        assert client.get(f"/api/trades/{trade_id}", headers={"X-Entity": name}).json()["tenant"] == name
+        assert client.get(f"/api/trades/{trade_id}", headers={"X-Entity": other}).status_code == 404
+        listed = [item["id"] for item in client.get("/api/trades", headers={"X-Entity": name}).json()["items"]]
+        assert trade_id in listed and trade_ids[other] not in listed
+    # Without X-Entity: the default entity, which has none of these trades
+    assert not set(trade_ids.values()) & {item["id"] for item in client.get("/api/trades").json()["items"]}
+
+
+def check_no_default(client: TestClient) -> None:
+    registry = entities._registry
+    entities._registry = EntityRegistry([Entity("Banco ABC1"), Entity("Banco XYZ")])
+    try:
+        store = get_trade_store()
+        abc = store.save_trade(extracted_fx(), input_digest="bench", tenant="Banco ABC1")
+        store.save_trade(extracted_fx(), input_digest="bench", tenant="Banco XYZ")
+        for method, path in (("get", "/api/trades"), ("get", f"/api/trades/{abc}"), ("get", f"/api/trades/{abc}/cashflows")):
+            response = getattr(client, method)(path)
+            assert response.status_code == 400 and "No entity" in response.json()["detail"], (path, response.text)
+        assert client.post("/api/process-fx", json=BODY).status_code == 400
+        try:
+            with client.websocket_connect("/api/ws/snips"):
+                raise AssertionError("handshake accepted")
+        except WebSocketDisconnect as e:
+            assert e.code == 1008
+        # Nor is a missing entity taken as "every entity" outside a request
+        try:
+            entities.partition()
+            raise AssertionError("partitioned without an entity")
+        except entities.UnknownEntity:
+            pass
+        listed = {item["tenant"] for item in client.get("/api/trades", headers={"X-Entity": "Banco ABC1"}).json()["items"]}
+        assert listed == {"Banco ABC1"}, listed
+    finally:
+        entities._registry = registry
+
+
+def check_partitions(client: TestClient) -> None:
+    store = get_trade_store()
+    swap = store.save_trade(long_dated_trade(), input_digest="bench", tenant="Banco ABC1")
+    abc, xyz = {"X-Entity": "Banco ABC1"}, {"X-Entity": "Banco XYZ"}
+    assert client.get(f"/api/trades/{swap}/cashflows", headers=abc).status_code == 200
+    assert client.get(f"/api/trades/{swap}/cashflows", headers=xyz).status_code == 404
+    amendment = {"leg1": {"notional": 2_000_000}}
+    assert client.patch(f"/api/trades/{swap}/cashflows", json=amendment, headers=xyz).status_code == 404
+    assert client.patch(f"/api/trades/{swap}/cashflows", json=amendment, headers=abc).status_code == 200
+
+    services = {}
+    for name in ("Banco ABC1", "Banco XYZ"):
+        token = bind_entity(entities.get_entity_registry().resolve(name))
+        try:
+            services[name] = (get_cashflow_service(), get_repricing_service(), user_key("Ana"))
+            assert get_cashflow_service() is services[name][0]
+        finally:
+            unbind_entity(token)
+    (abc_cashflows, abc_repricing, abc_key), (xyz_cashflows, xyz_repricing, xyz_key) = services.values()
+    assert abc_cashflows is not xyz_cashflows and abc_repricing is not xyz_repricing and abc_key != xyz_key
+    assert abc_cashflows.max_bytes == 8 * 2**20 and abc_repricing.max_size == 16
+    assert abc_cashflows.stats()["misses"] == 1 and xyz_cashflows.stats()["trades"] == 0
+
+
+def check_migration() -> None:
+    path = os.path.join(tempfile.mkdtemp(), "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT NOT NULL, entity TEXT, user_name TEXT,
+            input_type TEXT, input_digest TEXT NOT NULL, provider TEXT, model TEXT, latency_ms INTEGER,
+            cost REAL, counterparty TEXT, currency_pair TEXT, trade_date TEXT, maturity TEXT, trade_json TEXT NOT NULL
+        );
+        INSERT INTO trades (created_at, input_digest, trade_json) VALUES ('2025-01-01', 'old', '{"TradeSummary": {}}');
+    """)
+    conn.commit()
+    conn.close()
+    store = TradeStore(path, default_tenant="Banco Sur")
+    assert store.get_trade(1, "Banco Sur")["tenant"] == "Banco Sur" and store.get_trade(1, "Banco ABC1") is None
+    new_id = store.save_trade(extracted_fx(), input_digest="new", tenant="Banco ABC1")
+    assert [row["id"] for row in store.iter_trades(tenant="Banco ABC1")] == [new_id]
+
+
+STARTUP = """
+import os, resource, sys, time
+start = time.perf_counter()
+import app.main
+from app.api.endpoints import fx, trades, portfolio, swaps, snips
+from app.services.portfolio_service import value_trades
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+"""
+
+
+def startup(count: int) -> tuple:
+    """Wall time and total peak RSS of starting ``count`` backend processes."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path), MY_ENTITY="Banco Sur")
+    seconds = megabytes = 0.0
+    for _ in range(count):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", STARTUP], env=env, capture_output=True, text=True, check=True)
+        seconds += time.perf_counter() - start
+        megabytes += float(output.stdout.split()[-1])
+    return seconds, megabytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=4)
+    args = parser.parse_args()
+
+    check_registry()
+    entities._registry = EntityRegistry(
+        [Entity("Banco ABC1", ai_provider="Anthropic", cashflow_cache_mb=8, repricing_cache_size=16), Entity("Banco XYZ")],
+        default="Banco Sur"
+    )
+    with TestClient(app.main.app) as client:
+        check_requests(client)
+        check_no_default(client)
+        check_partitions(client)
+    check_migration()
+    print("entity checks passed\n")
+
+    per_entity = startup(args.entities)
+    shared = startup(1)
+    print(f"start-up of {args.entities} entities (interpreter, app and services imported)")
+    print(f"  {'one process per entity':26} {per_entity[0]:6.2f} s {per_entity[1]:8.0f} MB")
+    print(f"  {'one process for all':26} {shared[0]:6.2f} s {shared[1]:8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
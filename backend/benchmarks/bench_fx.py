@@ -0,0 +1,167 @@
+"""FX settlement dates and forward points: checks and benchmark.
+
+Checks that:
+
+- known USD/CLP spot dates come out right around Chilean and US holidays
+- the memoized settlement tables match a day-by-day walk for random
+  pairs, lags and trade dates
+- tenor value dates follow the end-of-month and modified following rules
+- the batch forward check matches a scalar covered-interest-parity loop
+- European-style quotes ("1,085") are read as decimals by the forward check
+
+Then times building a pair's table, settling one trade and a batch.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_fx [--trades 10000]
+"""
+import argparse
+import math
+import random
+from datetime import date, timedelta
+
+# Also points CURVE_DIR at a scratch directory before the app reads its settings
+from benchmarks.bench_curves import ASOF, write_curve
+
+from app.services.fx_service import settle_fx_trade, settle_fx_trades
+from app.swap_calculator.calendars import get_calendar
+from app.swap_calculator.fx import SettlementTable, currency_curve, settlement_table
+from benchmarks.bench_cashflow_engine import time_it
+
+PAIRS = [("USD", "CLP"), ("EUR", "USD"), ("USD", "CHF"), ("EUR", "CLP"), ("CLF", "CLP"), ("USD", "CAD"), ("GBP", "USD")]
+MATURITIES = ["Not Mentioned", "1W", "2W", "10D", "1M", "3M", "6M", "1Y", "18M", "1Y6M", "2Y"]
+
+
+def fx_trade(currency1: str, currency2: str, trade_date: date, maturity: str, spot: float = 950.0, forward=None):
+    return {
+        "TradeSummary": {
+            "Currency 1": currency1,
+            "Currency 2": currency2,
+            "Direction": "Buy",
+            "Trade Date": trade_date.strftime("%d-%m-%Y"),
+            "Start Lag": "Not Mentioned",
+            "Maturity": maturity,
+            "Notional Amount": "1000000",
+            "Prices": {"Spot Price": spot, "Forward Price": "Not Mentioned" if forward is None else forward},
+        }
+    }
+
+
+def walk_spot(currency1: str, currency2: str, lag: int, trade_date: date) -> date:
+    """Day-by-day reference: count lag days on the non-USD calendars, then roll on the joint one."""
+    known = {"CLP", "CLF", "USD", "EUR", "CHF"}
+    non_usd = [c for c in (currency1, currency2) if c != "USD"] or ["USD"]
+    lag_calendar = get_calendar("+".join(c for c in non_usd if c in known) or None)
+    joint = get_calendar("+".join(c for c in (currency1, currency2, "USD") if c in known))
+    day = trade_date
+    for _ in range(lag):
+        day += timedelta(days=1)
+        while not lag_calendar.is_business_day(day):
+            day += timedelta(days=1)
+    while not joint.is_business_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def check_known_dates() -> None:
+    cases = [
+        (date(2025, 9, 16), "22-09-2025"),  # Fiestas Patrias on 18-19 September
+        (date(2025, 7, 2), "07-07-2025"),   # USD holiday on spot (4 July) rolls to Monday
+        (date(2025, 7, 3), "07-07-2025"),   # 4 July counts as a CLP business day
+        (date(2025, 12, 30), "05-01-2026"),  # 31 December is a CLP bank holiday
+    ]
+    for trade_date, expected in cases:
+        settlement = settle_fx_trade(fx_trade("USD", "CLP", trade_date, "Not Mentioned"))
+        assert settlement["Spot Date"] == expected, (trade_date, settlement)
+
+    # 1M from a month-end spot stays on the month end
+    table = settlement_table("USD", "CLP")
+    assert table.value_date(date(2025, 1, 31), "1M") == date(2025, 2, 28)
+    assert table.value_date(date(2025, 6, 30), "3M") == date(2025, 9, 30)
+    # Modified following does not leave the month
+    assert table.value_date(date(2025, 2, 28), "1M") == date(2025, 3, 31)
+    assert table.value_date(date(2025, 9, 22), "1W") == date(2025, 9, 29)
+    assert table.value_date(date(2025, 9, 22), "15-11-2025") == date(2025, 11, 17)
+
+
+def check_tables(rng: random.Random) -> int:
+    checked = 0
+    for currency1, currency2 in PAIRS:
+        for lag in (0, 1, 2, 3):
+            table = SettlementTable(currency1, currency2, lag)
+            for _ in range(400):
+                trade_date = date(2000, 1, 1) + timedelta(days=rng.randrange(0, 365 * 80))
+                assert table.spot_date(trade_date) == walk_spot(currency1, currency2, lag, trade_date), (
+                    currency1, currency2, lag, trade_date)
+                checked += 1
+    return checked
+
+
+def random_trades(rng: random.Random, count: int) -> list:
+    trades = []
+    for _ in range(count):
+        currency1, currency2 = rng.choice(PAIRS)
+        trade_date = ASOF + timedelta(days=rng.randrange(0, 300))
+        spot = rng.uniform(0.5, 1000)
+        forward = rng.choice([None, spot * rng.uniform(0.99, 1.01)])
+        trades.append(fx_trade(currency1, currency2, trade_date, rng.choice(MATURITIES), spot, forward))
+    return trades
+
+
+def check_batch(trades: list) -> None:
+    for trade, result in zip(trades, settle_fx_trades(trades)):
+        assert result["status"] == "ok", result
+        settlement, summary = result["settlement"], trade["TradeSummary"]
+        assert settlement == settle_fx_trade(trade)
+        check = settlement["Forward Check"]
+        base, quote = currency_curve(summary["Currency 1"]), currency_curve(summary["Currency 2"])
+        if base is None or quote is None:
+            assert check["Status"] == "Not Available"
+            continue
+        to_date = lambda text: date(int(text[6:]), int(text[3:5]), int(text[:2]))  # noqa: E731
+        spot_date, value_date = to_date(settlement["Spot Date"]), to_date(settlement["Value Date"])
+        expected = summary["Prices"]["Spot Price"] * (
+            base.discount_factor(value_date) / base.discount_factor(spot_date)
+        ) / (quote.discount_factor(value_date) / quote.discount_factor(spot_date))
+        assert math.isclose(check["Implied Forward"], round(expected, 6), rel_tol=1e-12), (check, expected)
+
+
+def check_decimal_comma() -> None:
+    trade_date = date(2025, 3, 14)
+    quoted = settle_fx_trade(fx_trade("EUR", "USD", trade_date, "3M", spot="1,085", forward="1,0912"))
+    assert quoted == settle_fx_trade(fx_trade("EUR", "USD", trade_date, "3M", spot=1.085, forward=1.0912)), quoted
+    check = quoted["Forward Check"]
+    assert abs(check["Implied Forward"] - 1.085) < 0.05, check
+    assert abs(check["Quoted Points"] - 0.0062) < 1e-9, check
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=10000)
+    args = parser.parse_args()
+
+    for index in ("ICP", "SOFR", "ESTR"):
+        write_curve(index, "zero", "log-linear", shift={"ICP": 0.5, "SOFR": 0.0, "ESTR": -2.0}[index])
+
+    rng = random.Random(39)
+    check_known_dates()
+    print("known dates: USD/CLP spot dates and tenor value dates as expected")
+    checked = check_tables(rng)
+    print(f"settlement tables: {checked} spot dates match a day-by-day walk")
+    trades = random_trades(rng, args.trades)
+    check_batch(trades[:2000])
+    print("forward check: batch implied forwards match a scalar parity loop")
+    check_decimal_comma()
+    print("forward check: decimal-comma quotes read as decimals\n")
+
+    built = time_it(lambda: SettlementTable("EUR", "CLP", 2), 5)
+    one = trades[0]
+    single = time_it(lambda: settle_fx_trade(one), 2000)
+    batch = time_it(lambda: settle_fx_trades(trades), 5)
+    print(f"  settlement table build (one pair, 81 years)   {built * 1e3:8.2f} ms")
+    print(f"  settle one trade (process_fx)                 {single * 1e6:8.1f} us")
+    print(f"  settle batch of {args.trades}                    {batch * 1e3:8.1f} ms ({batch / args.trades * 1e6:.1f} us/trade)")
+
+
+if __name__ == "__main__":
+    main()
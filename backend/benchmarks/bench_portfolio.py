@@ -0,0 +1,114 @@
+"""Portfolio cashflow batches: scaling with the number of worker processes.
+
+Builds a synthetic book of swap trade JSONs (the shape the AI extraction
+returns, a few deliberately broken), then prices it in chunks through
+``portfolio_service.price_chunk`` on process pools of 1, 2, 4 and 8 workers,
+the same way the ``/portfolio/cashflows`` endpoint does. Reports wall time,
+throughput and speedup against a single worker and checks that every
+worker count returns the same results.
+
+Speedup is bounded by the number of CPU cores of the machine it runs on.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_portfolio [--trades 10000] [--chunk-size 250] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import app.main  # noqa: F401 - initialises the shared logger before the services
+from app.services.portfolio_service import price_chunk
+
+DATE_BASES = ["Actual/360", "Actual/365", "30/360", "30E/360"]
+ADJUSTMENTS = ["Modified Following", "Following", "Preceding", "No Adjustment"]
+FREQUENCIES = ["Monthly", "Quarterly", "Semi-Annually", "Annually"]
+CURRENCIES = ["CLP", "CLF", "USD"]
+MATURITIES = ["1Y", "2Y", "5Y", "10Y", "1Y6M", "18M", "20Y"]
+
+
+def synthetic_trade(rng: random.Random) -> dict:
+    trade_date = date(2024, 1, 1) + timedelta(days=rng.randrange(0, 2 * 365))
+    currency = rng.choice(CURRENCIES)
+    notional = rng.choice(["1000000", "5000000", "2500000000"])
+
+    def leg(leg_type: str, company: str) -> dict:
+        return {
+            "Leg Type": leg_type,
+            "Rate": f"{rng.uniform(0.5, 9.0):.4f}" if leg_type == "Fixed" else "ICP",
+            "Company": company,
+            "Leg Currency": currency,
+            "Notional Amount": notional,
+            "Date Basis": rng.choice(DATE_BASES),
+            "Business Date Adjustment": rng.choice(ADJUSTMENTS),
+            "Coupon Frequency": rng.choice(FREQUENCIES)
+        }
+
+    trade = {
+        "TradeSummary": {
+            "Trade Date": trade_date.strftime("%d-%m-%Y"),
+            "Start Lag": rng.choice([0, 2]),
+            "Maturity": rng.choice(MATURITIES),
+            "Price Maker": "Bank A",
+            "Price Taker": "Bank B",
+            "Accepted Price": "Not Mentioned",
+            "Accepted Side": "Not Mentioned",
+            "Leg 1 Payer": leg("Fixed", "Bank A"),
+            "Leg 2 Payer": leg("Floating", "Bank B")
+        }
+    }
+    # A few malformed trades to exercise per-trade error isolation
+    if rng.random() < 0.01:
+        trade["TradeSummary"]["Trade Date"] = "not a date"
+    return trade
+
+
+def run(trades, chunk_size: int, workers: int):
+    indexed = list(enumerate(trades))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+    results = [None] * len(trades)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Start the workers before timing
+        list(pool.map(abs, range(workers)))
+        start = time.perf_counter()
+        first = None
+        for future in as_completed([pool.submit(price_chunk, chunk) for chunk in chunks]):
+            for result in future.result():
+                results[result["index"]] = result
+            if first is None:
+                first = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+    return elapsed, first, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=10_000)
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = random.Random(32)
+    trades = [synthetic_trade(rng) for _ in range(args.trades)]
+
+    print(f"{args.trades} trades, chunk size {args.chunk_size}, {os.cpu_count()} CPU cores\n")
+    print(f"{'workers':>7} {'wall s':>8} {'first chunk s':>14} {'trades/s':>9} {'speedup':>8} {'errors':>7}")
+    baseline = reference = None
+    for workers in args.workers:
+        elapsed, first, results = run(trades, args.chunk_size, workers)
+        if reference is None:
+            baseline, reference = elapsed, results
+        elif results != reference:
+            raise SystemExit(f"Results with {workers} workers differ from {args.workers[0]} worker(s)")
+        errors = sum(1 for r in results if r["status"] == "error")
+        print(
+            f"{workers:>7} {elapsed:>8.2f} {first:>14.3f} {len(trades) / elapsed:>9.0f} "
+            f"{baseline / elapsed:>8.2f} {errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Per-request profiling: checks and overhead.
+
+Calls the ASGI app directly (no server) and checks that:
+
+- a request sending ``X-Profile: 1`` gets an ``X-Profile-Id`` and leaves
+  ``<id>.cpu.folded``, ``<id>.mem.folded`` and ``<id>.json`` in
+  PROFILE_DIR, with the cashflow engine in the CPU stacks
+- a streamed ``/swaps/cashflows`` response and an ``/fx/settlement`` batch
+  are byte-identical with and without profiling
+- ``X-Profile: cpu`` writes the CPU profile only
+- requests without the header get no profile headers and write nothing
+
+Then times the middleware when a request does not ask for a profile
+(against the bare app) and the cost of profiling a request, CPU only and
+with memory tracing.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_profiling
+"""
+import json
+import os
+import tempfile
+from datetime import date
+
+import anyio
+
+PROFILE_DIR = tempfile.mkdtemp()
+os.environ["PROFILE_DIR"] = PROFILE_DIR
+os.environ["PROFILING"] = "header"
+
+import app.main  # noqa: E402
+from app.api.profiling import ProfilingMiddleware  # noqa: E402
+from benchmarks.bench_cashflow_engine import time_it  # noqa: E402
+from benchmarks.bench_fx import fx_trade  # noqa: E402
+from benchmarks.bench_schedules import daily_swap  # noqa: E402
+
+
+async def call(asgi, path: str, body: dict, headers: dict, method: str = "POST"):
+    """Send a JSON body; returns (status, response headers, body bytes)."""
+    payload = json.dumps(body).encode()
+    raw_headers = [(b"content-type", b"application/json")]
+    raw_headers += [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": raw_headers, "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 5008)
+    }
+    sent = False
+    response = {"headers": {}, "body": b""}
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            # The client stays connected; streamed responses stop on a disconnect
+            await anyio.sleep_forever()
+        sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode().lower(): v.decode() for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await asgi(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+def request(asgi, path: str, body: dict, headers: dict = None, method: str = "POST"):
+    return anyio.run(call, asgi, path, body, headers or {}, method)
+
+
+def check_profiles() -> None:
+    cases = [
+        ("/api/swaps/cashflows", {"trade": daily_swap("Daily")}),
+        ("/api/fx/settlement", {"trades": [fx_trade("USD", "CLP", date(2025, 3, 14), "3M", 950.0, 953.2)] * 50}),
+    ]
+    for path, body in cases:
+        status, headers, plain = request(app.main.app, path, body)
+        assert status == 200 and plain and "x-profile-id" not in headers and not os.listdir(PROFILE_DIR), path
+
+        status, headers, profiled = request(app.main.app, path, body, {"X-Profile": "1"})
+        assert status == 200, (path, status)
+        profile_id = headers["x-profile-id"]
+        if path.endswith("cashflows"):
+            # The stream ends with a summary line carrying its own duration
+            plain, profiled = plain.rsplit(b"\n", 2)[0], profiled.rsplit(b"\n", 2)[0]
+        assert plain == profiled, f"{path}: body differs when profiled"
+
+        base = os.path.join(PROFILE_DIR, profile_id)
+        with open(f"{base}.json", encoding="utf-8") as f:
+            summary = json.load(f)
+        assert summary["path"] == path and summary["status"] == 200
+        for suffix in (".cpu.folded", ".mem.folded"):
+            with open(base + suffix, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            # A request shorter than the sampling interval has no CPU samples
+            assert lines or suffix == ".cpu.folded", suffix
+            assert all(line.rpartition(" ")[2].isdigit() for line in lines), suffix
+        print(f"{path}: profile {profile_id}, {summary['duration_ms']} ms, {summary['cpu']['samples']} samples, "
+              f"peak {summary['memory']['peak_bytes'] / 2**20:.1f} MiB, retained {summary['memory']['retained_bytes'] / 1024:.0f} KiB")
+        if path.endswith("cashflows"):
+            with open(f"{base}.cpu.folded", encoding="utf-8") as f:
+                assert "calculators.py" in f.read(), "cashflow engine missing from the CPU profile"
+        for name in os.listdir(PROFILE_DIR):
+            os.remove(os.path.join(PROFILE_DIR, name))
+
+    status, headers, _ = request(app.main.app, cases[0][0], cases[0][1], {"X-Profile": "cpu"})
+    profile_id = headers["x-profile-id"]
+    assert sorted(os.listdir(PROFILE_DIR)) == [f"{profile_id}.cpu.folded", f"{profile_id}.json"]
+
+
+def main():
+    check_profiles()
+    print("profile checks passed\n")
+
+    async def ok(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    headers = {"Accept": "application/json", "User-Agent": "bench", "Authorization": "Bearer x" * 4}
+
+    def per_request(asgi, count: int = 20000) -> float:
+        async def run():
+            for _ in range(count):
+                await call(asgi, "/", {}, headers)
+        return time_it(lambda: anyio.run(run), 5) / count
+
+    bare = per_request(ok)
+    off = per_request(ProfilingMiddleware(ok, "off"))
+    header = per_request(ProfilingMiddleware(ok, "header"))
+    print("request not asking for a profile (trivial app, includes the ASGI call)")
+    print(f"  no middleware        {bare * 1e6:8.2f} us")
+    print(f"  PROFILING=off        {off * 1e6:8.2f} us   {(off - bare) * 1e6:+.2f} us")
+    print(f"  PROFILING=header     {header * 1e6:8.2f} us   {(header - bare) * 1e6:+.2f} us\n")
+
+    body = {"trade": daily_swap("Weekly")}
+    plain = time_it(lambda: request(app.main.app, "/api/swaps/cashflows", body), 10)
+    cpu = time_it(lambda: request(app.main.app, "/api/swaps/cashflows", body, {"X-Profile": "cpu"}), 10)
+    both = time_it(lambda: request(app.main.app, "/api/swaps/cashflows", body, {"X-Profile": "1"}), 10)
+    print("30Y swap cashflow stream (weekly floating leg)")
+    print(f"  unprofiled           {plain * 1e3:8.1f} ms")
+    print(f"  X-Profile: cpu       {cpu * 1e3:8.1f} ms   x{cpu / plain:.2f}")
+    print(f"  X-Profile: 1         {both * 1e3:8.1f} ms   x{both / plain:.2f} (tracemalloc traces every allocation)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Incremental re-pricing of amended trades: differential check and benchmark.
+
+Stores a book of synthetic swaps in a scratch trade store, amends each one
+(notional, fixed rate, spread, amortization type, reference rate) through
+the repricing service and checks that the result is identical to pricing
+the amended trade JSON from scratch. Then times a full re-pricing against
+an incremental amendment for a 30-year monthly swap.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_repricing [--trades 500]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Keep the scratch trades out of the real store
+os.environ["TRADE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_trades.db")
+
+import app.main  # noqa: F401,E402 - initialises the shared logger before the services
+from app.services.repricing_service import get_repricing_service, price_swap  # noqa: E402
+from app.services.trade_store import get_trade_store  # noqa: E402
+from app.swap_calculator.calculators import clear_schedule_cache  # noqa: E402
+from app.swap_calculator.vectorized import reprice_leg  # noqa: E402
+from benchmarks.bench_portfolio import synthetic_trade  # noqa: E402
+
+
+def random_amendment(rng: random.Random, trade_json: dict) -> dict:
+    amendments = {}
+    for leg_number in (1, 2):
+        leg = trade_json["TradeSummary"][f"Leg {leg_number} Payer"]
+        floating = leg["Leg Type"].lower() == "floating"
+        changes = {}
+        if rng.random() < 0.6:
+            changes["notional"] = rng.choice([1_000_000.0, 7_500_000.0, 3_333_333.33])
+        if rng.random() < 0.5:
+            changes["rate"] = rng.choice(["ICP", "SOFR"]) if floating else round(rng.uniform(0.5, 9.0), 4)
+        if floating and rng.random() < 0.4:
+            changes["spread"] = rng.choice([0.0, 0.15, 0.5])
+        if rng.random() < 0.5:
+            changes["amortization_type"] = rng.choice(["BULLET", "LINEAR"])
+        if changes:
+            amendments[leg_number] = changes
+    return amendments
+
+
+def check_identical(rng: random.Random, count: int) -> int:
+    store = get_trade_store()
+    service = get_repricing_service()
+    checked = 0
+    while checked < count:
+        trade_json = synthetic_trade(rng)
+        try:
+            price_swap(trade_json)
+        except Exception:
+            continue  # malformed on purpose
+        trade_id = store.save_trade(trade_json, input_digest="bench")
+        # Several amendments in a row, each building on the previous one
+        for _ in range(3):
+            amendments = random_amendment(rng, trade_json)
+            if not amendments:
+                continue
+            output, _ = service.amend(trade_id, amendments)
+            trade_json = store.get_trade(trade_id)["trade_json"]
+            expected = price_swap(trade_json).output()
+            if json.dumps(output) != json.dumps(expected):
+                raise AssertionError(f"Incremental re-pricing differs on trade {trade_id}: {amendments}")
+        checked += 1
+    return checked
+
+
+def long_dated_trade() -> dict:
+    def leg(leg_type: str, rate: str, company: str) -> dict:
+        return {
+            "Leg Type": leg_type,
+            "Rate": rate,
+            "Company": company,
+            "Leg Currency": "CLP",
+            "Notional Amount": "10000000000",
+            "Date Basis": "Actual/360",
+            "Business Date Adjustment": "Modified Following",
+            "Coupon Frequency": "Monthly"
+        }
+
+    return {
+        "TradeSummary": {
+            "Trade Date": "17-01-2025",
+            "Start Lag": 2,
+            "Maturity": "30Y",
+            "Price Maker": "Banco ABC",
+            "Price Taker": "Client XYZ",
+            "Accepted Price": "5.125",
+            "Accepted Side": "Pay",
+            "Leg 1 Payer": leg("Fixed", "5.125", "Banco ABC"),
+            "Leg 2 Payer": leg("Floating", "ICP", "Client XYZ")
+        }
+    }
+
+
+def time_it(fn, repeats: int = 50) -> float:
+    fn()  # warmup
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(34)
+    checked = check_identical(rng, args.trades)
+    print(f"differential check: {checked} trades x 3 amendments identical to full re-pricing\n")
+
+    store = get_trade_store()
+    service = get_repricing_service()
+    trade_json = long_dated_trade()
+    trade_id = store.save_trade(trade_json, input_digest="bench")
+    notionals = iter(rng.uniform(1e9, 2e10) for _ in range(10_000))
+
+    def full():
+        # What an amendment costs without the incremental path
+        amended = json.loads(json.dumps(trade_json))
+        amended["TradeSummary"]["Leg 1 Payer"]["Notional Amount"] = next(notionals)
+        price_swap(amended).output()
+
+    def full_cold():
+        # Same, for a trade whose schedules are not in the schedule cache
+        clear_schedule_cache()
+        full()
+
+    def incremental():
+        service.amend(trade_id, {1: {"notional": next(notionals)}})
+
+    def incremental_amounts():
+        # Amount columns only, without transform_output and the store write
+        priced, _ = service.get_priced(trade_id)
+        reprice_leg(priced.fixed, notional=next(notionals))
+
+    full_time = time_it(full)
+    cold_time = time_it(full_cold)
+    incremental_time = time_it(incremental)
+    amounts_time = time_it(incremental_amounts)
+    print("30Y monthly fixed/floating swap, notional amendment (median)")
+    print(f"  full, cold schedules    {cold_time * 1e3:8.3f} ms")
+    print(f"  full, cached schedules  {full_time * 1e3:8.3f} ms")
+    print(f"  incremental amendment   {incremental_time * 1e3:8.3f} ms   x{full_time / incremental_time:.1f}")
+    print(f"  amount columns only     {amounts_time * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
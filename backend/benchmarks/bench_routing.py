@@ -0,0 +1,278 @@
+"""Provider routing for ``ai_provider="auto"``: checks and benchmark.
+
+Checks that:
+
+- the rolling stats of a provider give its latency percentiles, error rate
+  and cost per success, and forget calls older than the window's age
+- providers are ranked by the latency/cost objective, with providers
+  still warming up first and an ``explore`` share sent to another one
+- ``/process-fx`` with ``"auto"`` goes through the router (against fake
+  OpenAI and Anthropic clients), records each call, falls back to the next
+  provider when one fails, sends a correction back to the provider that
+  gave the invalid answer and counts that answer against it
+- ``/process-fx/providers`` reports the stats and decisions
+- a call that fails after its usage was taken is recorded once, as a failure
+
+Then simulates providers with different latency, error and cost profiles
+(one of which slows down half way) and compares "auto" with always using
+each of them, and times a routing decision.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_routing [--extractions 2000]
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Keep the scratch trades out of the real store
+os.environ["TRADE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_trades.db")
+
+import app.main  # noqa: E402
+
+from app.api.endpoints import fx  # noqa: E402
+from app.services import provider_router  # noqa: E402
+from app.services.ai_service import TEXT_MODELS  # noqa: E402
+from app.services.provider_router import ProviderRouter, ProviderStats, CallSample  # noqa: E402
+from app.services.trade_store import get_trade_store  # noqa: E402
+from benchmarks.bench_cashflow_engine import time_it  # noqa: E402
+from benchmarks.bench_profiling import request  # noqa: E402
+from benchmarks.bench_trade_summary import extracted_fx  # noqa: E402
+
+BODY = {"input_type": "text", "input_text": "chat", "user_name": "Ana", "user_entity": "Bank A", "ai_provider": "auto"}
+
+
+def router(**overrides) -> ProviderRouter:
+    options = dict(window=50, max_age=3600, min_samples=3, explore=0.0, latency_weight=1.0, cost_weight=100.0, seed=7)
+    options.update(overrides)
+    return ProviderRouter(**options)
+
+
+def check_stats() -> None:
+    stats = ProviderStats(window=20, max_age=3600)
+    for latency in range(1, 21):
+        stats.add(CallSample(latency * 100, 0.01, ok=latency % 4 != 0))
+    summary = stats.summary()
+    assert (summary["samples"], summary["p50_ms"], summary["p95_ms"]) == (20, 1100, 2000), summary
+    assert summary["error_rate"] == 0.25
+    assert abs(summary["cost_per_success"] - 0.2 / 15) < 1e-12
+
+    # The window keeps the latest calls, and calls older than max_age drop out
+    stats.add(CallSample(5000, 0.01, ok=True))
+    assert stats.summary()["samples"] == 20 and stats.summary()["calls"] == 21
+    stale = ProviderStats(window=20, max_age=0.01)
+    stale.add(CallSample(100, None, ok=True))
+    time.sleep(0.02)
+    assert stale.summary() == {"samples": 0, "calls": 1}
+
+
+def check_ranking() -> None:
+    candidates = {"OpenAI": "a", "Anthropic": "b", "Google": "c"}
+    routing = router()
+    for _ in range(5):
+        routing.record("OpenAI", "a", 3000, 0.010, ok=True)      # 3.0 + 1.0
+        routing.record("Anthropic", "b", 2000, 0.005, ok=True)   # 2.0 + 0.5
+    routing.record("Google", "c", 500, 0.001, ok=True)
+    ranked, reason, scores = routing.rank(candidates)
+    assert (ranked, reason) == (["Google", "Anthropic", "OpenAI"], "warm-up"), ranked
+    assert scores["Google"]["samples"] == 1 and scores["Anthropic"]["score"] == 2.5
+
+    for _ in range(4):
+        routing.record("Google", "c", 1000, 0.001, ok=False)
+    # Google is fast and cheap but fails 80% of the time
+    ranked, reason, scores = routing.rank(candidates)
+    assert (ranked, reason) == (["Anthropic", "OpenAI", "Google"], "best"), (ranked, scores)
+
+    # A cost-only objective prefers the cheapest per successful extraction
+    cheap = router(latency_weight=0.0)
+    for _ in range(5):
+        cheap.record("OpenAI", "a", 100, 0.010, ok=True)
+        cheap.record("Anthropic", "b", 9000, 0.005, ok=True)
+    assert cheap.rank(candidates)[0][:2] == ["Google", "Anthropic"]
+    assert cheap.rank({"OpenAI": "a", "Anthropic": "b"})[0] == ["Anthropic", "OpenAI"]
+
+    explorer = router(explore=1.0)
+    for _ in range(5):
+        explorer.record("OpenAI", "a", 1000, 0.01, ok=True)
+        explorer.record("Anthropic", "b", 2000, 0.01, ok=True)
+    ranked, reason, _ = explorer.rank({"OpenAI": "a", "Anthropic": "b"})
+    assert (ranked, reason) == (["Anthropic", "OpenAI"], "explore")
+
+    try:
+        routing.choose({})
+        raise AssertionError("routed without providers")
+    except ValueError:
+        pass
+
+
+class FakeClient:
+    """Scripted answers of one provider: JSON text, or an exception to raise."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.answers = []
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        self.calls.append(prompt)
+        answer = self.answers.pop(0) if self.answers else json.dumps(extracted_fx())
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50, input_tokens=100, output_tokens=50),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+            content=[SimpleNamespace(text=answer)]
+        )
+
+
+def extract() -> dict:
+    status, _, body = request(app.main.app, "/api/process-fx", BODY)
+    assert status == 200, body
+    return get_trade_store().get_trade(json.loads(body)["TradeId"], None)
+
+
+def check_auto() -> None:
+    openai, anthropic = FakeClient("OpenAI"), FakeClient("Anthropic")
+    originals = fx.ai_service.openai_client, fx.ai_service.anthropic_client, fx.ai_service.google_api_key
+    fx.ai_service.openai_client, fx.ai_service.anthropic_client, fx.ai_service.google_api_key = openai, anthropic, None
+    provider_router._router = routing = router(min_samples=2)
+    try:
+        assert fx.ai_service.available_providers() == {p: TEXT_MODELS[p] for p in ("OpenAI", "Anthropic")}
+        # Warm-up: each provider gets its first calls before scores count
+        assert [extract()["provider"] for _ in range(4)] == ["OpenAI", "Anthropic", "OpenAI", "Anthropic"]
+        assert routing.decisions == {"OpenAI": 2, "Anthropic": 2}
+
+        # OpenAI fails: the extraction falls back to Anthropic, and OpenAI's failure is recorded
+        openai.answers = [RuntimeError("overloaded")]
+        before = len(anthropic.calls)
+        trade = extract()
+        assert not openai.answers and trade["provider"] == "Anthropic" and len(anthropic.calls) == before + 1
+        stats = routing.stats()["providers"]
+        assert stats[f"OpenAI/{TEXT_MODELS['OpenAI']}"]["error_rate"] > 0
+
+        # An invalid answer counts against its provider, and the correction goes back to it
+        ranked = routing.rank(fx.ai_service.available_providers())[0]
+        client = anthropic if ranked[0] == "Anthropic" else openai
+        client.answers = [json.dumps(extracted_fx(**{"Notional Amount": "a lot"}))]
+        calls = len(client.calls)
+        errors_before = routing.stats()["providers"][f"{ranked[0]}/{TEXT_MODELS[ranked[0]]}"]["error_rate"]
+        assert extract()["provider"] == ranked[0]
+        assert len(client.calls) == calls + 2 and "Notional Amount" in client.calls[-1]
+        errors_after = routing.stats()["providers"][f"{ranked[0]}/{TEXT_MODELS[ranked[0]]}"]["error_rate"]
+        assert errors_after > errors_before, (errors_before, errors_after)
+
+        # Every provider failing fails the extraction with a 500
+        openai.answers, anthropic.answers = [RuntimeError("down")], [RuntimeError("down")]
+        status, _, _ = request(app.main.app, "/api/process-fx", BODY)
+        assert status == 500
+
+        # A fixed provider is still used as asked, and still feeds the stats
+        calls = routing.stats()["providers"][f"OpenAI/{TEXT_MODELS['OpenAI']}"]["calls"]
+        status, _, _ = request(app.main.app, "/api/process-fx", dict(BODY, ai_provider="OpenAI"))
+        assert status == 200
+        assert routing.stats()["providers"][f"OpenAI/{TEXT_MODELS['OpenAI']}"]["calls"] == calls + 1
+
+        status, _, body = request(app.main.app, "/api/process-fx/providers", {}, method="GET")
+        report = json.loads(body)
+        assert status == 200 and set(report["decisions"]) == {"OpenAI", "Anthropic"}
+        assert report["objective"] == {"latency_weight": 1.0, "cost_weight": 100.0}
+
+        # A call failing after its usage was taken (here: no choices in the response) is recorded once, as a failure
+        provider_router._router = single = router()
+        service = copy.copy(fx.ai_service)
+        service.update_user_info("Ana", "Bank A")
+        service.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create=lambda **kwargs: SimpleNamespace(usage=SimpleNamespace(prompt_tokens=1, completion_tokens=1), choices=[])
+        )))
+        try:
+            service.process_text("chat", "OpenAI")
+            failed = False
+        except Exception:
+            failed = True
+        summary = single.summary("OpenAI", TEXT_MODELS["OpenAI"])
+        assert failed and (summary["samples"], summary["error_rate"]) == (1, 1.0), summary
+    finally:
+        fx.ai_service.openai_client, fx.ai_service.anthropic_client, fx.ai_service.google_api_key = originals
+        provider_router._router = None
+
+
+# name: (median latency s, error rate, cost per call)
+PROFILES = {
+    "OpenAI": (2.0, 0.02, 0.012),
+    "Anthropic": (3.2, 0.03, 0.004),
+    "Google": (1.4, 0.35, 0.006),
+}
+# OpenAI's latency from half way through the run
+SLOWDOWN = 3.0
+
+
+def simulate(extractions: int, policy: str, seed: int = 1) -> dict:
+    """Extractions under ``policy`` ("auto" or a provider), two attempts each as with ROUTING_ATTEMPTS."""
+    rng = random.Random(seed)
+    routing = router(window=200, min_samples=5, explore=0.05, seed=seed)
+    candidates = {name: name for name in PROFILES}
+    latencies, cost, successes = [], 0.0, 0
+    for i in range(extractions):
+        ranked = routing.rank(candidates)[0] if policy == "auto" else [policy, policy]
+        elapsed = 0.0
+        for provider in ranked[:2]:
+            median, error_rate, price = PROFILES[provider]
+            if provider == "OpenAI" and i >= extractions // 2:
+                median *= SLOWDOWN
+            latency = median * rng.lognormvariate(0, 0.3)
+            ok = rng.random() >= error_rate
+            elapsed += latency
+            cost += price if ok else 0.0
+            routing.record(provider, provider, latency * 1000, price if ok else None, ok)
+            if ok:
+                successes += 1
+                break
+        latencies.append(elapsed)
+    latencies.sort()
+    return {
+        "success": successes / extractions,
+        "mean_s": statistics.fmean(latencies),
+        "p95_s": latencies[int(0.95 * len(latencies))],
+        "cost_per_success": cost / successes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--extractions", type=int, default=2000)
+    args = parser.parse_args()
+
+    check_stats()
+    check_ranking()
+    check_auto()
+    print("routing checks passed\n")
+
+    print(f"{args.extractions} simulated extractions, OpenAI {SLOWDOWN:.0f}x slower in the second half")
+    print(f"  {'policy':10} {'success':>8} {'mean s':>8} {'p95 s':>8} {'$/success':>10}")
+    for policy in ("auto", *PROFILES):
+        result = simulate(args.extractions, policy)
+        print(
+            f"  {policy:10} {result['success']:8.1%} {result['mean_s']:8.2f} {result['p95_s']:8.2f}"
+            f" {result['cost_per_success']:10.4f}"
+        )
+
+    routing = router(window=200)
+    candidates = {name: name for name in PROFILES}
+    for name, (median, _, price) in PROFILES.items():
+        for _ in range(200):
+            routing.record(name, name, median * 1000, price, ok=True)
+    seconds = time_it(lambda: routing.rank(candidates), 200)
+    print(f"\nrouting decision over 3 x 200 samples: {seconds * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
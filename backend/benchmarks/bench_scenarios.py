@@ -0,0 +1,117 @@
+"""Historical-scenario revaluation: checks and scaling benchmark.
+
+Prices a synthetic swap book, writes a file of synthetic historical curve
+shocks into a scratch SCENARIO_DIR and revalues the book under every shock
+through ``scenario_service.scenario_pnl`` on process pools of 1, 2 and 4
+workers sharing the book through shared memory. Checks that:
+
+- P&L rows match revaluing the ValuationBlock against each shocked curve
+- a zero shock gives exactly zero P&L
+- every worker count returns identical P&L matrices
+
+Speedup is bounded by the number of CPU cores of the machine it runs on.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_scenarios [--trades 20000] [--scenarios 500] [--workers 1 2 4]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+# Scenario files are read from a scratch directory
+SCENARIO_DIR = tempfile.mkdtemp()
+os.environ["SCENARIO_DIR"] = SCENARIO_DIR
+
+# Also points CURVE_DIR at a scratch directory before the app reads its settings
+from benchmarks.bench_curves import write_curve  # noqa: E402
+
+from app.services.portfolio_service import create_pool  # noqa: E402
+from app.services.scenario_service import scenario_pnl  # noqa: E402
+from app.swap_calculator.curves import get_curve  # noqa: E402
+from app.swap_calculator.scenarios import load_scenarios, tail_risk  # noqa: E402
+from app.swap_calculator.valuation import ValuationBlock  # noqa: E402
+from benchmarks.bench_valuation import build_book  # noqa: E402
+
+PILLARS = ["3M", "1Y", "2Y", "5Y", "10Y", "20Y"]
+
+
+def write_scenarios(rng: random.Random, name: str, count: int) -> None:
+    """Level/slope shocks in bp, plus one zero shock."""
+    lines = ["# units: bp", "scenario " + " ".join(PILLARS), "zero " + " ".join("0" for _ in PILLARS)]
+    for i in range(count - 1):
+        level, slope = rng.gauss(0, 8), rng.gauss(0, 4)
+        shifts = [level + slope * (j / (len(PILLARS) - 1) - 0.5) + rng.gauss(0, 1.5) for j in range(len(PILLARS))]
+        lines.append(f"day{i:04d} " + " ".join(f"{shift:.3f}" for shift in shifts))
+    with open(os.path.join(SCENARIO_DIR, f"{name}.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _noop() -> None:
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=20_000)
+    parser.add_argument("--scenarios", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    rng = random.Random(37)
+    write_curve("ICP", "zero", "log-linear")
+    write_scenarios(rng, "HIST", args.scenarios)
+    curve = get_curve("ICP")
+    scenarios = load_scenarios("HIST")
+    node_shifts = scenarios.node_shifts(curve)
+
+    block = ValuationBlock(build_book(rng, args.trades), np.array([rng.choice([1.0, -1.0]) for _ in range(args.trades)]))
+    trade, _, _ = block.discount_weights(curve.asof_ordinal)
+    print(f"{args.trades} trades, {len(block)} coupon periods -> {len(trade)} discount weights, "
+          f"{len(scenarios)} scenarios on {len(node_shifts[0])} curve nodes ({os.cpu_count()} CPU)")
+
+    timings = {}
+    reference = None
+    for workers in args.workers:
+        with create_pool(workers) as pool:
+            # Start the workers before timing
+            for future in [pool.submit(_noop) for _ in range(workers)]:
+                future.result()
+            start = time.perf_counter()
+            base, pnl = scenario_pnl(block, curve, node_shifts, pool, workers)
+            timings[workers] = time.perf_counter() - start
+        if reference is None:
+            reference = pnl
+        elif not np.array_equal(reference, pnl):
+            raise AssertionError(f"{workers} workers returned a different P&L matrix")
+
+    # Against revaluing the block itself, one scenario at a time
+    base_npv = block.npv(curve)
+    assert np.allclose(base, base_npv, rtol=1e-9, atol=1e-6)
+    assert not reference[0].any(), "zero shock should give zero P&L"
+    start = time.perf_counter()
+    for i in range(1, min(len(scenarios), 21)):
+        expected = block.npv(curve.shifted(node_shifts[i])) - base_npv
+        assert np.allclose(reference[i], expected, rtol=1e-7, atol=1e-4), i
+    per_scenario_block = (time.perf_counter() - start) / min(len(scenarios) - 1, 20)
+    print("checks passed: P&L matches block revaluation; identical across worker counts\n")
+
+    portfolio = reference.sum(axis=1)
+    for level in (0.99, 0.975):
+        var, es = tail_risk(portfolio, level)
+        assert es >= var
+        print(f"  {level:.1%}  VaR {var:16,.0f}   ES {es:16,.0f}")
+    print()
+
+    print(f"  {'workers':>8} {'seconds':>9} {'scen/s':>9} {'speedup':>8}")
+    for workers, elapsed in timings.items():
+        print(f"  {workers:8d} {elapsed:9.2f} {len(scenarios) / elapsed:9.1f} {timings[args.workers[0]] / elapsed:7.2f}x")
+    print(f"\n  ValuationBlock.npv per scenario, in process: {per_scenario_block * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Daily/Weekly schedules and streamed swap cashflows: checks and benchmark.
+
+Checks that:
+
+- Daily periods run from each business day of the leg calendar to the
+  next, Weekly periods land on the effective date's weekday (rolled), and
+  both end on the adjusted termination date
+- the scalar and vectorized engines produce identical cashflows for
+  trades mixing Daily, Weekly and monthly legs
+- the streamed records match transform_output of the same trade
+
+Then compares serving a 30-year daily swap as one document against the
+NDJSON stream: time to the first record, total time and peak memory.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_schedules
+"""
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import app.main  # noqa: F401 - initialises the shared logger before the services
+from app.api.responses import dumps
+from app.services.swap_service import iter_swap_output, transform_output
+from app.swap_calculator.adapters import prepare_swap_parameters
+from app.swap_calculator.calculators import (
+    calculate_period_dates,
+    calculate_swap_cashflows,
+    clear_schedule_cache,
+    iter_period_dates
+)
+from app.swap_calculator.calendars import get_calendar
+from benchmarks.bench_cashflow_engine import check_identical, random_trade, time_it
+from benchmarks.bench_repricing import long_dated_trade
+
+
+def daily_swap(frequency: str = "Daily", currency: str = "CLP") -> dict:
+    trade_json = long_dated_trade()
+    for leg_number in (1, 2):
+        leg = trade_json["TradeSummary"][f"Leg {leg_number} Payer"]
+        leg["Leg Currency"] = currency
+    trade_json["TradeSummary"]["Leg 2 Payer"]["Coupon Frequency"] = frequency
+    return trade_json
+
+
+def check_schedules(rng: random.Random) -> int:
+    checked = 0
+    for _ in range(200):
+        currency = rng.choice(["CLP", "USD", "EUR", None])
+        calendar = get_calendar(currency)
+        effective = date(2024, 1, 1) + timedelta(days=rng.randrange(0, 3 * 365))
+        termination = effective + timedelta(days=rng.randrange(1, 5 * 365))
+        convention = rng.choice(["Following", "ModifiedFollowing", "Preceding"])
+
+        daily = calculate_period_dates(effective, termination, 0, convention, currency, 1)
+        assert tuple(iter_period_dates(effective, termination, 0, convention, currency, 1)) == daily
+        for (start, end), (next_start, _) in zip(daily, daily[1:]):
+            assert end == next_start
+            assert calendar.is_business_day(end)
+            assert calendar.adjust(start + timedelta(days=1), "Following") == end
+        last = daily[-1][1]
+        assert last == calendar.adjust(termination, convention) or last == calendar.adjust(daily[-1][0] + timedelta(days=1), "Following")
+
+        weekly = calculate_period_dates(effective, termination, 0, convention, currency, 7)
+        anchors = {
+            calendar.adjust(effective + timedelta(days=7 * k), convention)
+            for k in range(1, (termination - effective).days // 7 + 2)
+        }
+        assert weekly[0][0] == effective
+        assert all(end in anchors for _, end in weekly[:-1])
+        assert weekly[-1][1] in anchors or weekly[-1][1] == calendar.adjust(termination, convention)
+        checked += len(daily) + len(weekly)
+    return checked
+
+
+def check_stream(trade_json: dict) -> None:
+    params = prepare_swap_parameters(trade_json)
+    fixed, floating = calculate_swap_cashflows(
+        params["trade_date"], params["effective_date"], params["termination_date"],
+        params["fixed_leg"], params["floating_leg"]
+    )
+    expected = transform_output(trade_json, fixed, floating)
+    records = list(iter_swap_output(trade_json))
+    assert records[0] == {"tradeInfo": expected["tradeInfo"]}
+    legs, rows = [], []
+    for record in records[1:]:
+        if "leg" in record:
+            header = dict(record["leg"])
+            header["cashflows"] = rows = []
+            del header["periods"]
+            legs.append(header)
+        else:
+            row = dict(record)
+            del row["legNumber"]
+            rows.append(row)
+    assert legs == expected["legs"], "streamed legs differ from transform_output"
+
+
+def main():
+    rng = random.Random(40)
+    checked = check_schedules(rng)
+    print(f"schedule checks passed: {checked} Daily/Weekly periods")
+
+    trades = [random_trade(rng) for _ in range(300)]
+    for trade in trades:
+        for leg in (trade["fixed_leg"], trade["floating_leg"]):
+            if rng.random() < 0.3:
+                leg["frequency"] = {"months": 0, "days": rng.choice([1, 7])}
+    check_identical(trades)
+    print("differential check: scalar and vectorized engines identical with Daily/Weekly legs")
+
+    for frequency in ("Daily", "Weekly", "Monthly"):
+        check_stream(daily_swap(frequency))
+    print("stream check: streamed records match transform_output\n")
+
+    trade_json = daily_swap("Daily")
+
+    def full_document():
+        # A new trade's schedule is not in the schedule cache yet
+        clear_schedule_cache()
+        params = prepare_swap_parameters(trade_json)
+        legs = calculate_swap_cashflows(
+            params["trade_date"], params["effective_date"], params["termination_date"],
+            params["fixed_leg"], params["floating_leg"]
+        )
+        return dumps(transform_output(trade_json, *legs))
+
+    def stream():
+        first = None
+        size = 0
+        start = time.perf_counter()
+        for record in iter_swap_output(trade_json):
+            size += len(dumps(record)) + 1
+            if first is None:
+                first = time.perf_counter() - start
+        return first, size
+
+    def peak_memory(fn) -> int:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    body = full_document()
+    first, stream_size = stream()
+    full_time = time_it(full_document, 5)
+    stream_time = time_it(stream, 5)
+    first = min(stream()[0] for _ in range(5))
+    full_peak = peak_memory(full_document)
+    stream_peak = peak_memory(stream)
+
+    periods = sum(1 for _ in iter_period_dates(date(2025, 1, 21), date(2055, 1, 21), 0, "Following", "CLP", 1))
+    print(f"30Y swap, daily floating leg ({periods} periods) and monthly fixed leg")
+    print(f"  one document    first byte {full_time * 1e3:7.1f} ms   total {full_time * 1e3:7.1f} ms   "
+          f"peak {full_peak / 2**20:5.2f} MiB   body {len(body) / 2**20:.2f} MiB")
+    print(f"  NDJSON stream   first byte {first * 1e3:7.2f} ms   total {stream_time * 1e3:7.1f} ms   "
+          f"peak {stream_peak / 2**20:5.2f} MiB   body {stream_size / 2**20:.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
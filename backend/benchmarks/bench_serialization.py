@@ -0,0 +1,135 @@
+"""Serialization and compression benchmark for large cashflow payloads.
+
+Builds the transform_output payload of a 30-year quarterly fixed/floating
+swap and compares FastAPI's default encoder path (jsonable_encoder + json)
+against FastJSONResponse, plus bytes on the wire with gzip and brotli.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization
+"""
+import gzip
+import json
+import statistics
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+import app.main  # noqa: F401 - initialises the shared logger before the services
+from app.api.responses import dumps
+from app.swap_calculator.adapters import prepare_swap_parameters
+from app.swap_calculator.calculators import calculate_swap_cashflows
+from app.services.swap_service import transform_output
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPEATS = 50
+
+
+def build_trade_json() -> dict:
+    """A 30-year quarterly two-leg swap in the extraction schema."""
+    def leg(company, leg_type, rate):
+        return {
+            "Company": company,
+            "Leg Type": leg_type,
+            "Rate": rate,
+            "Leg Currency": "CLP",
+            "Notional Amount": "10000000000",
+            "Date Basis": "Actual/360",
+            "Business Date Adjustment": "Modified Following",
+            "Coupon Frequency": "Quarterly"
+        }
+
+    return {
+        "TradeSummary": {
+            "Trade Date": "15-01-2025",
+            "Start Lag": 2,
+            "Maturity": "30Y",
+            "Price Maker": "Banco ABC",
+            "Price Taker": "Client XYZ",
+            "Accepted Price": "5.125",
+            "Accepted Side": "Pay",
+            "Leg 1 Payer": leg("Banco ABC", "Fixed", "5.125"),
+            "Leg 2 Payer": leg("Client XYZ", "Floating", "ICP")
+        }
+    }
+
+
+def build_payload() -> dict:
+    trade_json = build_trade_json()
+    params = prepare_swap_parameters(trade_json)
+    leg1, leg2 = calculate_swap_cashflows(
+        params["trade_date"],
+        params["effective_date"],
+        params["termination_date"],
+        params["fixed_leg"],
+        params["floating_leg"]
+    )
+    return transform_output(trade_json, leg1, leg2)
+
+
+def build_native_payload(payload: dict) -> dict:
+    """Same payload with Decimal amounts and date objects instead of strings/floats."""
+    native = json.loads(json.dumps(payload))
+    for leg in native["legs"]:
+        for cf in leg["cashflows"]:
+            cf["startDate"] = datetime.strptime(cf["startDate"], "%a-%d-%m-%Y").date()
+            cf["endDate"] = datetime.strptime(cf["endDate"], "%a-%d-%m-%Y").date()
+            cf["remainingCapital"] = Decimal(str(cf["remainingCapital"]))
+            if isinstance(cf["interest"], float):
+                cf["interest"] = Decimal(f"{cf['interest']:.2f}")
+    return native
+
+
+def time_it(fn, repeats: int = REPEATS) -> dict:
+    fn()  # warmup
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(samples), "median_ms": statistics.median(samples)}
+
+
+def default_encoder(payload) -> bytes:
+    """FastAPI's default JSONResponse path for a plain dict return value."""
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def main():
+    payload = build_payload()
+    native = build_native_payload(payload)
+    flows = sum(len(leg["cashflows"]) for leg in payload["legs"])
+    print(f"30Y quarterly two-leg swap: {flows} cashflows\n")
+
+    print(f"{'payload':<10} {'encoder':<22} {'min ms':>8} {'median ms':>10}")
+    for name, data in (("plain", payload), ("native", native)):
+        for label, fn in (("jsonable_encoder+json", default_encoder), ("FastJSONResponse", dumps)):
+            stats = time_it(lambda: fn(data))
+            print(f"{name:<10} {label:<22} {stats['min_ms']:>8.3f} {stats['median_ms']:>10.3f}")
+
+    body = dumps(payload)
+    print(f"\n{'encoding':<12} {'bytes':>10} {'ratio':>7} {'median ms':>10}")
+    print(f"{'identity':<12} {len(body):>10} {1.0:>7.2f} {0.0:>10.3f}")
+    gz = gzip.compress(body, compresslevel=6)
+    stats = time_it(lambda: gzip.compress(body, compresslevel=6))
+    print(f"{'gzip-6':<12} {len(gz):>10} {len(body) / len(gz):>7.2f} {stats['median_ms']:>10.3f}")
+    if brotli is not None:
+        br = brotli.compress(body, quality=4)
+        stats = time_it(lambda: brotli.compress(body, quality=4))
+        print(f"{'br-4':<12} {len(br):>10} {len(body) / len(br):>7.2f} {stats['median_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Snip channel (/api/ws/snips): checks and benchmark.
+
+Checks, against the real app with a scripted provider, that:
+
+- a text and a binary image extraction on one connection both get
+  accepted, stage events in pipeline order and a result equal to what
+  ``/api/process-fx`` returns
+- results come back by id, in the order the extractions finish
+- a cancel stops an extraction at its next stage, before the next
+  provider call, and frees its admission slot
+- a saturated controller answers ``rejected`` with a retry_after, and bad
+  requests, duplicate ids, unreadable frames and frames that are not JSON
+  objects get errors without closing the connection, and a failing
+  writer closes it
+
+Then times the round trip of an extraction over the open channel against
+one POST to ``/api/process-fx`` per extraction. Both run in process, so
+neither pays for the TCP and TLS setup of a new connection that the
+channel saves the desktop client; the numbers show the channel's own
+overhead is of the same order as a request's.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_snips
+"""
+import base64
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+# Keep the scratch trades out of the real store
+os.environ["TRADE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_trades.db")
+
+import app.main  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+from starlette.websockets import WebSocketDisconnect  # noqa: E402
+
+from app.api import admission  # noqa: E402
+from app.api.endpoints import fx, snips  # noqa: E402
+from app.api.responses import dumps  # noqa: E402
+from benchmarks.bench_cashflow_engine import time_it  # noqa: E402
+from benchmarks.bench_trade_summary import extracted_fx  # noqa: E402
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+TRADE = json.dumps(extracted_fx(**{"Notional Amount": "5MM"}))
+
+
+class ScriptedProvider:
+    """Stands in for the provider calls of ``fx.ai_service``, recording them."""
+
+    def __init__(self):
+        self.calls = []
+        self.images = []
+        # Calls whose text is in here block until the event is set
+        self.gates = {}
+
+    def extract_text(self, image):
+        self.images.append(base64.b64decode(image))
+        self.calls.append("extract_text")
+        return "chat read from the image"
+
+    def process_text(self, text, provider="OpenAI", correction=None):
+        self.calls.append(f"process_text:{text}")
+        gate = self.gates.get(text)
+        if gate is not None:
+            gate.wait(5)
+        return TRADE
+
+    def install(self):
+        originals = (fx.ai_service.extract_text, fx.ai_service.process_text)
+        fx.ai_service.extract_text = self.extract_text
+        fx.ai_service.process_text = self.process_text
+        return originals
+
+
+def extraction(snip_id: str, text: str = "chat", **fields) -> dict:
+    return {"type": "extract", "id": snip_id, "input_type": "text", "input_text": text,
+            "user_name": "Ana", "user_entity": "Bank A", **fields}
+
+
+def image_frame(snip_id: str, png: bytes) -> bytes:
+    header = json.dumps(extraction(snip_id, input_type="image", input_text=None)).encode()
+    return struct.pack(">I", len(header)) + header + png
+
+
+def receive_until(ws, done: set) -> dict:
+    """Events by id until every id in ``done`` has a final one."""
+    events = {}
+    while done - {i for i, e in events.items() if e[-1]["type"] in ("result", "error", "cancelled", "rejected")}:
+        event = ws.receive_json()
+        events.setdefault(event["id"], []).append(event)
+    return events
+
+
+def check_channel(client: TestClient, provider: ScriptedProvider) -> None:
+    status = client.post("/api/process-fx", json={k: v for k, v in extraction("").items() if k not in ("type", "id")})
+    expected = status.json()
+    assert status.status_code == 200, expected
+
+    with client.websocket_connect("/api/ws/snips") as ws:
+        ws.send_json(extraction("t1"))
+        ws.send_bytes(image_frame("i1", PNG))
+        events = receive_until(ws, {"t1", "i1"})
+    assert provider.images == [PNG]
+    for snip_id, stages in (("t1", ["extracting_trade", "storing", "settling"]),
+                            ("i1", ["reading_image", "extracting_trade", "storing", "settling"])):
+        kinds = [e["type"] for e in events[snip_id]]
+        assert kinds == ["accepted"] + ["stage"] * len(stages) + ["result"], kinds
+        assert [e["stage"] for e in events[snip_id] if e["type"] == "stage"] == stages
+        progress = [e["progress"] for e in events[snip_id] if e["type"] == "stage"]
+        assert progress == sorted(progress)
+        result = events[snip_id][-1]["trade"]
+        assert result["TradeSummary"] == expected["TradeSummary"] and result["TradeId"] != expected["TradeId"]
+
+
+def check_cancel(client: TestClient, provider: ScriptedProvider) -> None:
+    controller = admission.get_admission_controller()
+    slow = threading.Event()
+    provider.gates = {"slow": slow}
+    provider.calls.clear()
+    with client.websocket_connect("/api/ws/snips") as ws:
+        ws.send_json(extraction("slow", "slow"))
+        ws.send_json(extraction("fast", "fast"))
+        ws.send_bytes(image_frame("img", PNG))
+        # The image snip is cancelled while its image is being read: no text call follows
+        original = provider.extract_text
+
+        def extract_then_cancel(image):
+            ws.send_json({"type": "cancel", "id": "img"})
+            time.sleep(0.05)
+            return original(image)
+
+        provider.extract_text = extract_then_cancel
+        fx.ai_service.extract_text = extract_then_cancel
+        try:
+            events = receive_until(ws, {"fast", "img"})
+        finally:
+            provider.extract_text = original
+            fx.ai_service.extract_text = original
+        assert events["img"][-1]["type"] == "cancelled"
+        assert not any(e.get("stage") == "extracting_trade" for e in events["img"])
+        assert "process_text:chat read from the image" not in provider.calls
+        # "fast" finished while "slow" was still with the provider
+        assert events["fast"][-1]["type"] == "result"
+        assert all(e["type"] != "result" for e in events.get("slow", []))
+        slow.set()
+        events = receive_until(ws, {"slow"})
+        assert events["slow"][-1]["type"] == "result"
+
+        # Cancelled while waiting for admission: never runs
+        in_flight = controller.max_in_flight
+        controller.max_in_flight = 0
+        ws.send_json(extraction("queued"))
+        time.sleep(0.05)
+        assert controller.queue_depth == 1
+        ws.send_json({"type": "cancel", "id": "queued"})
+        events = receive_until(ws, {"queued"})
+        assert [e["type"] for e in events["queued"]] == ["cancelled"]
+        controller.max_in_flight = in_flight
+    assert controller.in_flight == 0 and controller.queue_depth == 0, controller.stats()
+
+
+def check_errors(client: TestClient, provider: ScriptedProvider) -> None:
+    controller = admission.get_admission_controller()
+    gate = threading.Event()
+    provider.gates = {"held": gate}
+    with client.websocket_connect("/api/ws/snips") as ws:
+        ws.send_json(extraction("dup", "held"))
+        ws.send_json(extraction("dup"))
+        events = []
+        while not events or events[-1]["type"] != "error":
+            events.append(ws.receive_json())
+        assert events[-1]["status"] == 409
+        gate.set()
+        assert receive_until(ws, {"dup"})["dup"][-1]["type"] == "result"
+
+        ws.send_json({"type": "extract", "id": "bad", "input_type": "text"})
+        event = ws.receive_json()
+        assert event["type"] == "error" and event["status"] == 422
+        ws.send_text("not json")
+        assert ws.receive_json()["status"] == 400
+        ws.send_bytes(b"\x00")
+        assert ws.receive_json()["status"] == 400
+        # Valid JSON that is not an object, as text or as a binary frame's header
+        for frame in ("[]", "1", '"x"'):
+            ws.send_text(frame)
+            assert ws.receive_json()["status"] == 400
+        ws.send_bytes(struct.pack(">I", 2) + b"[]" + PNG)
+        assert ws.receive_json()["status"] == 400
+        ws.send_json({"type": "extract"})
+        assert ws.receive_json()["detail"] == "Missing id"
+
+        limits = controller.max_in_flight, controller.max_queue
+        controller.max_in_flight, controller.max_queue = 0, 0
+        try:
+            ws.send_json(extraction("r1"))
+            event = ws.receive_json()
+            assert event["type"] == "rejected" and event["reason"] == "queue_full" and event["retry_after"] >= 1
+        finally:
+            controller.max_in_flight, controller.max_queue = limits
+
+        # Still open after all of that
+        ws.send_json(extraction("ok"))
+        assert receive_until(ws, {"ok"})["ok"][-1]["type"] == "result"
+
+    # An event that cannot be sent closes the channel instead of leaving it deaf
+    def unsendable(message):
+        raise TypeError("cannot serialize")
+
+    snips.dumps = unsendable
+    try:
+        with client.websocket_connect("/api/ws/snips") as ws:
+            ws.send_text("not json")
+            try:
+                ws.receive_json()
+                raise AssertionError("event sent")
+            except WebSocketDisconnect as e:
+                assert e.code == snips.WS_INTERNAL_ERROR
+    finally:
+        snips.dumps = dumps
+
+
+def main():
+    provider = ScriptedProvider()
+    originals = provider.install()
+    try:
+        with TestClient(app.main.app) as client:
+            check_channel(client, provider)
+            check_cancel(client, provider)
+            check_errors(client, provider)
+            print("snip channel checks passed\n")
+
+            body = {k: v for k, v in extraction("").items() if k not in ("type", "id")}
+            count = 50
+            with client.websocket_connect("/api/ws/snips") as ws:
+                def over_channel():
+                    for i in range(count):
+                        ws.send_json(extraction(str(i)))
+                        receive_until(ws, {str(i)})
+
+                def over_http():
+                    for _ in range(count):
+                        client.post("/api/process-fx", json=body)
+
+                print("per extraction, scripted provider")
+                for name, fn in (("POST /api/process-fx", over_http), ("over the open snip channel", over_channel)):
+                    print(f"  {name:28} {time_it(fn, 3) / count * 1e3:8.2f} ms")
+    finally:
+        fx.ai_service.extract_text, fx.ai_service.process_text = originals
+
+
+if __name__ == "__main__":
+    main()
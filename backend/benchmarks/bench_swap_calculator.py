@@ -0,0 +1,267 @@
+"""Swap calculator micro-benchmarks, comparable between commits.
+
+Times each building block of the scalar engine (``add_months``,
+``adjust_for_business_day``, ``calculate_period_dates`` with cold and warm
+schedule cache, ``calculate_interest``, ``_generate_cashflows``) and the
+full ``calculate_swap_cashflows`` on representative trades: a 30Y
+quarterly amortizing swap, a 5Y swap with a daily floating leg and a mixed
+book of random trades. Floating legs are projected from a synthetic ICP
+curve.
+
+Every benchmark runs on a fixed input batch. After warmup rounds, the
+number of batches per sample is calibrated so a sample takes at least
+``--min-time``; the garbage collector is paused while timing and the
+median, minimum and spread of ``--repeats`` samples are reported per call.
+``--json`` saves the results (with the commit and interpreter they were
+measured on); ``--compare`` prints the change against a saved run and
+flags the benchmarks whose median and minimum both moved more than
+``--threshold``.
+
+Validate a faster implementation with ``benchmarks.golden_cashflows``
+before comparing timings.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_swap_calculator [--json after.json] [--compare before.json] [--only NAME ...]
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+# Also points CURVE_DIR at a scratch directory before the app reads its settings
+from benchmarks.bench_curves import write_curve
+
+from app.swap_calculator.calculators import (
+    _generate_cashflows,
+    add_months,
+    adjust_for_business_day,
+    calculate_interest,
+    calculate_period_dates,
+    calculate_swap_cashflows,
+    clear_schedule_cache
+)
+from benchmarks.bench_cashflow_engine import args_of, quarterly_30y_trade, random_trade
+
+DAY_COUNTS = ["Actual/360", "Actual/365", "30/360", "30E/360", "Actual/Actual ISDA"]
+BUSINESS_DAY_CONVENTIONS = ["Following", "ModifiedFollowing", "Preceding", "ModifiedPreceding"]
+
+
+class Benchmark:
+    """A callable over a fixed batch of ``calls`` inputs, with an optional untimed setup per batch."""
+
+    def __init__(self, name: str, fn, calls: int, setup=None):
+        self.name = name
+        self.fn = fn
+        self.calls = calls
+        self.setup = setup
+
+
+def measure(benchmark: Benchmark, repeats: int, warmup: int, min_time: float) -> dict:
+    for _ in range(warmup):
+        if benchmark.setup:
+            benchmark.setup()
+        benchmark.fn()
+
+    # Batches per sample; a setup (e.g. a cache reset) has to run before every batch
+    number = 1
+    if benchmark.setup is None:
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                benchmark.fn()
+            if time.perf_counter() - start >= min_time:
+                break
+            number *= 2
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            elapsed = 0.0
+            for _ in range(number):
+                if benchmark.setup:
+                    benchmark.setup()
+                start = time.perf_counter()
+                benchmark.fn()
+                elapsed += time.perf_counter() - start
+            samples.append(elapsed / (number * benchmark.calls))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    median = statistics.median(samples)
+    return {
+        "median_ns": median * 1e9,
+        "min_ns": min(samples) * 1e9,
+        "stdev_pct": statistics.stdev(samples) / median * 100 if len(samples) > 1 else 0.0,
+        "calls": benchmark.calls,
+        "samples": len(samples),
+        "number": number
+    }
+
+
+def daily_5y_trade() -> dict:
+    trade = quarterly_30y_trade()
+    trade["termination_date"] = date(2030, 1, 17)
+    trade["fixed_leg"] = dict(trade["fixed_leg"], currency="CLP")
+    trade["floating_leg"] = dict(trade["floating_leg"], currency="CLP", frequency={"months": 0, "days": 1})
+    return trade
+
+
+def build_benchmarks(rng: random.Random) -> list:
+    benchmarks = []
+
+    month_steps = [
+        (date(2000, 1, 1) + timedelta(days=rng.randrange(0, 60 * 365)), rng.randrange(0, 360))
+        for _ in range(1000)
+    ]
+    benchmarks.append(Benchmark("add_months", lambda: [add_months(d, m) for d, m in month_steps], len(month_steps)))
+
+    days = [date(2001, 1, 1) + timedelta(days=rng.randrange(0, 60 * 365)) for _ in range(1000)]
+    for convention in BUSINESS_DAY_CONVENTIONS:
+        benchmarks.append(Benchmark(
+            f"adjust_for_business_day[{convention}, CLP]",
+            lambda convention=convention: [adjust_for_business_day(d, convention, "CLP") for d in days],
+            len(days)
+        ))
+    benchmarks.append(Benchmark(
+        "adjust_for_business_day[ModifiedFollowing, USD+CLP]",
+        lambda: [adjust_for_business_day(d, "ModifiedFollowing", "USD+CLP") for d in days],
+        len(days)
+    ))
+
+    schedules = [
+        (effective, effective + timedelta(days=rng.randrange(365, 30 * 365)),
+         rng.choice([1, 3, 6, 12]), rng.choice(BUSINESS_DAY_CONVENTIONS), rng.choice(["CLP", "USD", None]))
+        for effective in (date(2024, 1, 1) + timedelta(days=rng.randrange(0, 3 * 365)) for _ in range(200))
+    ]
+
+    def build_schedules():
+        for schedule in schedules:
+            calculate_period_dates(*schedule)
+
+    benchmarks.append(Benchmark("calculate_period_dates[cold]", build_schedules, len(schedules), clear_schedule_cache))
+    benchmarks.append(Benchmark("calculate_period_dates[warm]", build_schedules, len(schedules)))
+
+    accruals = [
+        (start, start + timedelta(days=rng.randrange(28, 370)))
+        for start in (date(2024, 1, 1) + timedelta(days=rng.randrange(0, 20 * 365)) for _ in range(1000))
+    ]
+    for day_count in DAY_COUNTS:
+        benchmarks.append(Benchmark(
+            f"calculate_interest[{day_count}]",
+            lambda day_count=day_count: [calculate_interest(1e7, 5.125, s, e, day_count) for s, e in accruals],
+            len(accruals)
+        ))
+
+    quarterly = quarterly_30y_trade()
+    periods = calculate_period_dates(quarterly["effective_date"], quarterly["termination_date"], 3, "ModifiedFollowing", "CLP")
+    for is_floating in (False, True):
+        leg = quarterly["floating_leg" if is_floating else "fixed_leg"]
+        benchmarks.append(Benchmark(
+            f"_generate_cashflows[30Y quarterly {'floating' if is_floating else 'fixed'}]",
+            lambda leg=leg, is_floating=is_floating: _generate_cashflows(
+                periods, leg["notional"], None if is_floating else leg["rate"], 0.0,
+                leg["day_count_convention"], leg["amortization_type"], is_floating,
+                leg["rate"] if is_floating else None
+            ),
+            1
+        ))
+
+    daily = daily_5y_trade()
+    book = [random_trade(rng) for _ in range(200)]
+    benchmarks.append(Benchmark(
+        "calculate_swap_cashflows[30Y quarterly]", lambda: calculate_swap_cashflows(*args_of(quarterly)), 1
+    ))
+    benchmarks.append(Benchmark(
+        "calculate_swap_cashflows[5Y daily floating, cold]",
+        lambda: calculate_swap_cashflows(*args_of(daily)), 1, clear_schedule_cache
+    ))
+    benchmarks.append(Benchmark(
+        "calculate_swap_cashflows[random book, per trade]",
+        lambda: [calculate_swap_cashflows(*args_of(trade)) for trade in book], len(book)
+    ))
+    return benchmarks
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:8.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:8.2f} us"
+    return f"{ns:8.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per sample (default 0.05)")
+    parser.add_argument("--only", nargs="*", help="run the benchmarks whose name contains one of these")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--compare", help="results file of a previous run")
+    parser.add_argument("--threshold", type=float, default=5.0, help="percent change flagged in --compare (default 5)")
+    args = parser.parse_args()
+
+    write_curve("ICP", "zero", "log-linear")
+    benchmarks = build_benchmarks(random.Random(42))
+    if args.only:
+        benchmarks = [b for b in benchmarks if any(part in b.name for part in args.only)]
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        baseline = previous["results"]
+        print(f"compared with {previous['commit']} ({previous['python']})")
+
+    results = {}
+    print(f"  {'benchmark':52} {'median':>11} {'min':>11} {'spread':>7}" + (f" {'change':>8}" if baseline else ""))
+    for benchmark in benchmarks:
+        result = measure(benchmark, args.repeats, args.warmup, args.min_time)
+        results[benchmark.name] = result
+        line = (f"  {benchmark.name:52} {format_ns(result['median_ns'])} {format_ns(result['min_ns'])} "
+                f"{result['stdev_pct']:6.1f}%")
+        if benchmark.name in baseline:
+            before = baseline[benchmark.name]
+            change = (result["median_ns"] / before["median_ns"] - 1) * 100
+            # Only flagged when the best sample moved the same way, so one noisy run is not a regression
+            min_change = (result["min_ns"] / before["min_ns"] - 1) * 100
+            flag = ""
+            if min(change, min_change) > args.threshold:
+                flag = "  slower"
+            elif max(change, min_change) < -args.threshold:
+                flag = "  faster"
+            line += f" {change:+7.1f}%{flag}"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": git_commit(),
+                "python": f"{platform.python_implementation()} {platform.python_version()}",
+                "platform": platform.platform(),
+                "argv": sys.argv[1:],
+                "results": results
+            }, f, indent=2)
+        print(f"\nsaved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
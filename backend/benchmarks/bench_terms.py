@@ -0,0 +1,262 @@
+"""Trade-term parsers: checks and micro-benchmark.
+
+Builds a corpus of the term strings trades carry (maturities as tenors and
+dates with "vcto"/"maturity" prefixes, date bases, business day
+conventions, coupon frequencies, trade dates), with the skewed repetition
+and spelling noise of extracted trades, and checks that:
+
+- known spellings parse to the expected values (30E/360 aliases,
+  Actual/Actual, 1.5Y, ISO and DD/MM/YYYY dates, "vcto" prefixes)
+- on the canonical spellings the extraction prompt asks for, the parsers
+  agree with the previous substring/strptime implementations
+
+Then times the previous implementations against the new ones with cold
+and warm caches.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_terms [--size 200000]
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from app.swap_calculator.constants import BusinessDayConvention, DayCountConvention, FREQUENCY_MONTHS, PaymentFrequency
+from app.swap_calculator.terms import (
+    Tenor,
+    clear_term_caches,
+    parse_business_day_convention,
+    parse_date,
+    parse_date_basis,
+    parse_frequency,
+    parse_maturity,
+    parse_tenor
+)
+
+EFFECTIVE = date(2025, 1, 31)
+
+
+# Previous implementations, kept as the reference for the differential check
+def legacy_date_basis(text: str) -> str:
+    lower = text.lower()
+    if "actual/360" in lower:
+        return DayCountConvention.ACT_360
+    elif "actual/365" in lower:
+        return DayCountConvention.ACT_365
+    elif "30/360" in lower:
+        return DayCountConvention.THIRTY_360
+    elif "30e/360" in lower:
+        return DayCountConvention.THIRTY_E_360
+    return DayCountConvention.ACT_360
+
+
+def legacy_business_day_convention(text: str) -> str:
+    lower = text.lower()
+    if "modified following" in lower:
+        return BusinessDayConvention.MODIFIED_FOLLOWING
+    elif "following" in lower:
+        return BusinessDayConvention.FOLLOWING
+    elif "modified preceding" in lower:
+        return BusinessDayConvention.MODIFIED_PRECEDING
+    elif "preceding" in lower:
+        return BusinessDayConvention.PRECEDING
+    elif "no adjustment" in lower:
+        return BusinessDayConvention.UNADJUSTED
+    return BusinessDayConvention.MODIFIED_FOLLOWING
+
+
+def legacy_frequency(text: str) -> dict:
+    lower = text.lower()
+    if "daily" in lower:
+        period = PaymentFrequency.DAILY
+    elif "weekly" in lower:
+        period = PaymentFrequency.WEEKLY
+    elif "monthly" in lower:
+        period = PaymentFrequency.MONTHLY
+    elif "quarterly" in lower:
+        period = PaymentFrequency.QUARTERLY
+    elif "semi-annually" in lower or "semiannually" in lower:
+        period = PaymentFrequency.SEMIANNUAL
+    elif "annually" in lower:
+        period = PaymentFrequency.ANNUAL
+    elif "one-off" in lower:
+        period = PaymentFrequency.ONCE
+    else:
+        period = PaymentFrequency.SEMIANNUAL
+    return {"period": period, "months": FREQUENCY_MONTHS[period]}
+
+
+def legacy_maturity(text: str, effective: date) -> date:
+    try:
+        return datetime.strptime(text, "%d-%m-%Y").date()
+    except ValueError:
+        pass
+    years = months = 0
+    if "Y" in text:
+        years_part = text.split("Y")[0]
+        if years_part:
+            years = float(years_part)
+    if "M" in text:
+        months_part = text.split("M")[0]
+        if "Y" in months_part:
+            months_part = months_part.split("Y")[1]
+        if months_part and months_part.strip():
+            months = int(months_part)
+    total_months = int(years * 12) + months
+    new_year = effective.year + total_months // 12
+    new_month = effective.month + total_months % 12
+    if new_month > 12:
+        new_year += 1
+        new_month -= 12
+    end_day = ((date(new_year + (new_month == 12), new_month % 12 + 1, 1)) - timedelta(days=1)).day
+    return date(new_year, new_month, min(effective.day, end_day))
+
+
+CANONICAL_TENORS = ["1Y", "2Y", "3Y", "5Y", "7Y", "10Y", "15Y", "20Y", "30Y", "6M", "18M", "1Y6M", "2Y3M", "1.5Y", "2.5Y", "9M"]
+TENOR_VARIANTS = ["5y", "5 Y", "5 years", "10 años", "6 meses", "1y 6m", "2,5Y", "3W", "10D", "mat 5Y", "Maturity: 10Y"]
+DATE_BASES = ["Actual/360"] * 6 + ["Actual/365"] * 3 + ["30/360", "30E/360", "ACT/360", "Act/365", "Actual / 360",
+                                                        "Eurobond Basis", "30/360 ICMA", "Actual/Actual", "Bond Basis"]
+ADJUSTMENTS = ["Modified Following"] * 6 + ["Following"] * 2 + ["Preceding", "Modified Preceding", "No Adjustment",
+                                                              "Mod Foll", "MF", "modified following"]
+FREQUENCIES = ["Semi-Annually"] * 4 + ["Quarterly"] * 3 + ["Monthly", "Annually", "Daily", "Weekly", "Semiannual",
+                                                          "Mensual", "Trimestral", "Semestral", "At Maturity", "6M"]
+
+
+def random_date(rng: random.Random) -> date:
+    return date(2025, 1, 1) + timedelta(days=rng.randrange(0, 30 * 365))
+
+
+def build_corpus(rng: random.Random, size: int) -> list:
+    """(kind, text) pairs; maturities dominate, as every leg and trade carries them."""
+    corpus = []
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.2:
+            corpus.append(("trade_date", random_date(rng).strftime("%d-%m-%Y")))
+        elif kind < 0.45:
+            roll = rng.random()
+            if roll < 0.6:
+                text = rng.choice(CANONICAL_TENORS)
+            elif roll < 0.75:
+                text = rng.choice(TENOR_VARIANTS)
+            elif roll < 0.92:
+                text = random_date(rng).strftime("%d-%m-%Y")
+            else:
+                d = random_date(rng)
+                text = rng.choice([f"vcto {d:%d-%m-%Y}", f"Vencimiento: {d:%d/%m/%Y}", d.isoformat()])
+            corpus.append(("maturity", text))
+        elif kind < 0.65:
+            corpus.append(("date_basis", rng.choice(DATE_BASES)))
+        elif kind < 0.85:
+            corpus.append(("adjustment", rng.choice(ADJUSTMENTS)))
+        else:
+            corpus.append(("frequency", rng.choice(FREQUENCIES)))
+    return corpus
+
+
+def check_known() -> None:
+    assert parse_date_basis("30E/360") == DayCountConvention.THIRTY_E_360
+    assert parse_date_basis("Eurobond Basis") == DayCountConvention.THIRTY_E_360
+    assert parse_date_basis("30/360 ICMA") == DayCountConvention.THIRTY_E_360
+    assert parse_date_basis("30/360") == DayCountConvention.THIRTY_360
+    assert parse_date_basis("Actual/Actual") == DayCountConvention.ACT_ACT_ISDA
+    assert parse_date_basis("ACT / 365") == DayCountConvention.ACT_365
+    assert parse_business_day_convention("Mod Foll") == BusinessDayConvention.MODIFIED_FOLLOWING
+    assert parse_business_day_convention("MF") == BusinessDayConvention.MODIFIED_FOLLOWING
+    assert parse_business_day_convention("Modified Preceding") == BusinessDayConvention.MODIFIED_PRECEDING
+    assert parse_frequency("Semestral")["period"] == PaymentFrequency.SEMIANNUAL
+    assert parse_frequency("Weekly") == {"period": PaymentFrequency.WEEKLY, "months": 0, "days": 7}
+    assert parse_tenor("1.5Y") == parse_tenor("18M") == parse_tenor("1Y6M") == parse_tenor("1 año 6 meses") == Tenor(18, 0)
+    assert parse_tenor("2W") == Tenor(0, 14) and parse_tenor("Not Mentioned") is None
+    assert parse_maturity("vcto 15-03-2030", EFFECTIVE) == date(2030, 3, 15)
+    assert parse_maturity("Vencimiento: 15/03/2030", EFFECTIVE) == date(2030, 3, 15)
+    assert parse_maturity("2030-03-15", EFFECTIVE) == date(2030, 3, 15)
+    assert parse_maturity("1M", EFFECTIVE) == date(2025, 2, 28)
+    assert parse_date("31-02-2025") is None and parse_date("2025-13-01") is None
+    for bad in ("Not Mentioned", "soon", ""):
+        try:
+            parse_maturity(bad, EFFECTIVE)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} should not parse")
+
+
+def check_against_legacy(corpus: list) -> int:
+    checked = 0
+    for kind, text in corpus:
+        if kind == "maturity" and (text in CANONICAL_TENORS or parse_date(text) and text[2] == "-"):
+            assert parse_maturity(text, EFFECTIVE) == legacy_maturity(text, EFFECTIVE), text
+        elif kind == "date_basis" and text in ("Actual/360", "Actual/365", "30/360", "30E/360"):
+            assert parse_date_basis(text) == legacy_date_basis(text), text
+        elif kind == "adjustment" and text in ("Modified Following", "Following", "Preceding", "Modified Preceding", "No Adjustment"):
+            assert parse_business_day_convention(text) == legacy_business_day_convention(text), text
+        elif kind == "frequency" and text in ("Semi-Annually", "Quarterly", "Monthly", "Annually", "Daily", "Weekly"):
+            new = parse_frequency(text)
+            assert {"period": new["period"], "months": new["months"]} == legacy_frequency(text), text
+        else:
+            continue
+        checked += 1
+    return checked
+
+
+def run(texts: list, parse) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        try:
+            parse(text)
+        except ValueError:
+            pass
+    return time.perf_counter() - start
+
+
+def best_of(texts: list, parse, clear=None, repeats: int = 5) -> float:
+    samples = []
+    for _ in range(repeats):
+        if clear is not None:
+            clear()
+        samples.append(run(texts, parse))
+    return min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(41)
+    corpus = build_corpus(rng, args.size)
+    check_known()
+    print("known spellings parse as expected")
+    checked = check_against_legacy(corpus)
+    print(f"differential check: {checked} canonical terms match the previous parsers\n")
+
+    legacy = {
+        "trade_date": lambda text: datetime.strptime(text, "%d-%m-%Y").date(),
+        "maturity": lambda text: legacy_maturity(text, EFFECTIVE),
+        "date_basis": legacy_date_basis,
+        "adjustment": legacy_business_day_convention,
+        "frequency": legacy_frequency,
+    }
+    new = {
+        "trade_date": parse_date,
+        "maturity": lambda text: parse_maturity(text, EFFECTIVE),
+        "date_basis": parse_date_basis,
+        "adjustment": parse_business_day_convention,
+        "frequency": parse_frequency,
+    }
+    by_kind = {}
+    for kind, text in corpus:
+        by_kind.setdefault(kind, []).append(text)
+    print(f"{len(corpus)} terms ({len(set(corpus))} distinct), ns per term:")
+    print(f"  {'kind':12} {'count':>7} {'distinct':>9} {'previous':>9} {'cold':>7} {'warm':>7}")
+    for kind, texts in by_kind.items():
+        previous = best_of(texts, legacy[kind])
+        cold = best_of(texts, new[kind], clear_term_caches)
+        warm = best_of(texts, new[kind])
+        scale = 1e9 / len(texts)
+        print(f"  {kind:12} {len(texts):7d} {len(set(texts)):9d} {previous * scale:9.0f} {cold * scale:7.0f} {warm * scale:7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""TradeSummary validation of provider output: checks and benchmark.
+
+Checks that:
+
+- amounts ("5MM", "2,5M", "USD 500K"), prices with a decimal comma
+  ("1,085"), dates, start lags ("T+2"), directions and "Not Mentioned"
+  spellings are normalized, and that
+  ```json fences and undeclared keys survive
+- normalized FX trades settle, and normalized swaps produce the same swap
+  parameters, as the raw trades they came from
+- invalid output (bad currency, date, maturity or amount, missing legs,
+  not JSON) is rejected with one line per bad field
+- ``/process-fx`` retries an invalid answer once with a prompt naming the
+  bad fields, and fails with those fields once the retries are used up;
+  only FX trades get a settlement
+
+Then times validating provider output against the previous ``json.loads``
+and key check, and how long rejecting an invalid answer takes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_trade_summary
+"""
+import json
+import os
+import random
+import tempfile
+from datetime import date
+
+# Keep the scratch trades out of the real store
+os.environ["TRADE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_trades.db")
+
+import app.main  # noqa: E402
+from pydantic import ValidationError  # noqa: E402
+
+from app.api.endpoints import fx  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.schemas.trade_summary import parse_extraction, validation_errors  # noqa: E402
+from app.services.fx_service import settle_fx_trade  # noqa: E402
+from app.swap_calculator.adapters import prepare_swap_parameters  # noqa: E402
+from benchmarks.bench_cashflow_engine import time_it  # noqa: E402
+from benchmarks.bench_fx import fx_trade  # noqa: E402
+from benchmarks.bench_portfolio import synthetic_trade  # noqa: E402
+from benchmarks.bench_profiling import request  # noqa: E402
+
+TRADE_DATE = date(2025, 3, 14)
+
+
+def extracted_fx(**fields) -> dict:
+    """An FX extraction as the prompt asks for it, with some fields overridden."""
+    trade = fx_trade("USD", "CLP", TRADE_DATE, "3M", 950.0, 953.2)
+    trade["TradeSummary"].update({
+        "Price Maker": {"Name": "Ana", "Company": "Bank A"},
+        "Price Taker": {"Name": "Luis", "Company": "Corp B"},
+    })
+    trade["TradeSummary"].update(fields)
+    return trade
+
+
+def rejected(raw: str) -> list:
+    try:
+        parse_extraction(raw)
+    except ValidationError as e:
+        return validation_errors(e)
+    raise AssertionError(f"accepted: {raw[:80]}")
+
+
+def check_normalization() -> None:
+    cases = [
+        ({"Notional Amount": "5MM"}, ("Notional Amount",), 5e6),
+        ({"Notional Amount": "2,5M"}, ("Notional Amount",), 2.5e6),
+        ({"Notional Amount": "USD 500K"}, ("Notional Amount",), 5e5),
+        ({"Notional Amount": "1,000,000"}, ("Notional Amount",), 1e6),
+        ({"Notional Amount": "N/A"}, ("Notional Amount",), "Not Mentioned"),
+        ({"Trade Date": "2025-03-14"}, ("Trade Date",), "14-03-2025"),
+        ({"Trade Date": "14/03/2025"}, ("Trade Date",), "14-03-2025"),
+        ({"Maturity": "vcto 2025-06-16"}, ("Maturity",), "16-06-2025"),
+        ({"Maturity": ""}, ("Maturity",), "Not Mentioned"),
+        ({"Start Lag": "T+2"}, ("Start Lag",), 2),
+        ({"Start Lag": None}, ("Start Lag",), "Not Mentioned"),
+        ({"Direction": "sell"}, ("Direction",), "Sell"),
+        ({"Currency 1": " usd"}, ("Currency 1",), "USD"),
+        ({"Prices": {"Spot Price": "950,25", "Forward Price": "not mentioned"}}, ("Prices", "Spot Price"), 950.25),
+        ({"Prices": {"Spot Price": "950,25", "Forward Price": "not mentioned"}}, ("Prices", "Forward Price"), "Not Mentioned"),
+        # A single comma is a decimal one, whatever the digits after it
+        ({"Prices": {"Spot Price": "0,925"}}, ("Prices", "Spot Price"), 0.925),
+        ({"Prices": {"Spot Price": "1,085"}}, ("Prices", "Spot Price"), 1.085),
+        ({"Prices": {"Spot Price": "5,000"}}, ("Prices", "Spot Price"), 5.0),
+        ({"Prices": {"Spot Price": "5.000"}}, ("Prices", "Spot Price"), 5.0),
+        ({"Prices": {"Spot Price": "1,085.5"}}, ("Prices", "Spot Price"), 1085.5),
+        ({"Notional Amount": "USD 5,000"}, ("Notional Amount",), 5000.0),
+        ({"Price Maker": "Bank A"}, ("Price Maker", "Company"), "Bank A"),
+        ({"Broker": "XYZ"}, ("Broker",), "XYZ"),
+    ]
+    for fields, path, expected in cases:
+        value = parse_extraction(json.dumps(extracted_fx(**fields)))["TradeSummary"]
+        for key in path:
+            value = value[key]
+        assert value == expected, (fields, value)
+
+    raw = json.dumps(extracted_fx())
+    assert parse_extraction(f"```json\n{raw}\n```") == parse_extraction(raw.encode())
+
+    # Normalized trades mean the same to the code downstream
+    for maturity in ("SPOT", "1W", "3M", "1Y", "16-06-2025"):
+        trade = extracted_fx(Maturity=maturity, **{"Notional Amount": "5MM"})
+        assert settle_fx_trade(parse_extraction(json.dumps(trade))) == settle_fx_trade(trade), maturity
+    rng = random.Random(7)
+    swaps = 0
+    for _ in range(300):
+        trade = synthetic_trade(rng)
+        try:
+            expected = prepare_swap_parameters(trade)
+        except ValueError:
+            rejected(json.dumps(trade))
+            continue
+        assert prepare_swap_parameters(parse_extraction(json.dumps(trade))) == expected, trade
+        swaps += 1
+    assert swaps > 250
+
+
+def check_rejections() -> None:
+    bad = extracted_fx(**{"Currency 1": "US", "Trade Date": "32-01-2025", "Maturity": "3X", "Notional Amount": "lots"})
+    assert rejected(json.dumps(bad)) == [
+        "TradeSummary.Currency 1: invalid currency 'US', expected an ISO code",
+        "TradeSummary.Trade Date: invalid date '32-01-2025', expected DD-MM-YYYY",
+        "TradeSummary.Maturity: invalid maturity '3X', expected DD-MM-YYYY or a tenor",
+        "TradeSummary.Notional Amount: invalid amount 'lots'",
+    ]
+    # Misplaced thousands groups are not guessed at
+    assert rejected(json.dumps(extracted_fx(Prices={"Spot Price": "12,34.5"}))) == [
+        "TradeSummary.Prices.Spot Price: invalid number '12,34.5'",
+    ]
+    swap = synthetic_trade(random.Random(1))
+    del swap["TradeSummary"]["Leg 2 Payer"]
+    swap["TradeSummary"]["Leg 1 Payer"]["Notional Amount"] = "Not Mentioned"
+    assert rejected(json.dumps(swap)) == [
+        "TradeSummary.Leg 1 Payer.Notional Amount: is required (got 'Not Mentioned')",
+        "TradeSummary.Leg 2 Payer: Field required",
+    ]
+    assert rejected("Sorry, I cannot find a trade in this chat.")[0].startswith("output: Invalid JSON")
+    assert rejected('{"Trade": {}}') == ["TradeSummary: Field required"]
+
+
+def check_retry() -> None:
+    good = json.dumps(extracted_fx(**{"Notional Amount": "5MM"}))
+    bad = json.dumps(extracted_fx(**{"Notional Amount": "a lot"}))
+    body = {"input_type": "text", "input_text": "chat", "user_name": "Ana", "user_entity": "Bank A"}
+    original = fx.ai_service.process_text
+    calls = []
+
+    def answers(*replies):
+        def process_text(text, provider="OpenAI", correction=None):
+            calls.append(correction)
+            return replies[min(len(calls), len(replies)) - 1]
+        return process_text
+
+    try:
+        fx.ai_service.process_text = answers(bad, good)
+        status, _, response = request(app.main.app, "/api/process-fx", body)
+        assert status == 200 and len(calls) == 2, (status, response)
+        assert calls[0] is None and "Notional Amount: invalid amount 'a lot'" in calls[1]
+        assert json.loads(response)["TradeSummary"]["Notional Amount"] == 5e6
+
+        calls.clear()
+        fx.ai_service.process_text = answers(bad)
+        status, _, response = request(app.main.app, "/api/process-fx", body)
+        assert status == 500 and len(calls) == 1 + settings.EXTRACTION_RETRIES
+        assert "Notional Amount" in json.loads(response)["detail"]
+
+        # Swaps have no FX settlement step
+        fx.ai_service.process_text = answers(json.dumps(synthetic_trade(random.Random(2))))
+        status, _, response = request(app.main.app, "/api/process-fx", body)
+        assert status == 200 and json.loads(response)["Settlement"] is None, response
+    finally:
+        fx.ai_service.process_text = original
+
+
+def main():
+    check_normalization()
+    check_rejections()
+    check_retry()
+    print("validation checks passed\n")
+
+    raw = json.dumps(extracted_fx(**{"Notional Amount": "5MM"}))
+    invalid = json.dumps(extracted_fx(**{"Currency 2": "Chilean pesos"}))
+    swap = json.dumps(synthetic_trade(random.Random(3)))
+    count = 20000
+
+    def previous(text):
+        trade = json.loads(text)
+        if "TradeSummary" not in trade:
+            raise ValueError
+
+    def reject(text):
+        try:
+            parse_extraction(text)
+        except ValidationError as e:
+            validation_errors(e)
+
+    rows = [
+        ("json.loads + key check (FX, previous)", lambda: [previous(raw) for _ in range(count)]),
+        ("parse_extraction (FX, normalized)", lambda: [parse_extraction(raw) for _ in range(count)]),
+        ("parse_extraction (swap, normalized)", lambda: [parse_extraction(swap) for _ in range(count)]),
+        ("rejecting an invalid FX answer", lambda: [reject(invalid) for _ in range(count)]),
+    ]
+    print("per provider answer")
+    for name, fn in rows:
+        print(f"  {name:42} {time_it(fn, 5) / count * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
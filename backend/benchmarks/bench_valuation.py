@@ -0,0 +1,107 @@
+"""Portfolio NPV and bucketed DV01: checks and benchmark.
+
+Prices a book of synthetic swaps with the vectorized engine, flattens it
+into a ValuationBlock and checks against a period-by-period valuation that:
+
+- block NPVs match valuing each coupon with the curve's discount factors
+- bucketed DV01s add up to the parallel DV01 (to first order)
+
+Then times building the block, one revaluation and a full sensitivity run
+(base, parallel and one bump per curve node).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_valuation [--trades 50000]
+"""
+import argparse
+import random
+import time
+from datetime import date
+
+import numpy as np
+
+# First: points CURVE_DIR at a scratch directory before the app reads its settings
+from benchmarks.bench_curves import write_curve
+
+from app.swap_calculator.curves import get_curve
+from app.swap_calculator.valuation import BUMP, ValuationBlock
+from app.swap_calculator.vectorized import calculate_portfolio_leg_arrays
+from benchmarks.bench_cashflow_engine import random_trade, time_it
+
+# Trades priced per vectorized block while building the book
+CHUNK = 2000
+
+
+def build_book(rng: random.Random, count: int) -> list:
+    """(fixed, floating) leg arrays of ``count`` synthetic swaps with spreads."""
+    legs = []
+    for i in range(0, count, CHUNK):
+        trades = [random_trade(rng) for _ in range(min(CHUNK, count - i))]
+        for trade in trades:
+            trade["floating_leg"]["spread"] = rng.choice([0, 0.25, 1.1])
+        legs.extend(calculate_portfolio_leg_arrays(trades))
+    return legs
+
+
+def brute_force_npv(fixed, floating, curve, sign: float) -> float:
+    """One coupon at a time, straight from the curve."""
+    npv = 0.0
+    for leg, leg_sign in ((fixed, -sign), (floating, sign)):
+        for i in range(len(leg)):
+            start, end = int(leg.start[i]), int(leg.end[i])
+            if end <= curve.asof_ordinal:
+                continue
+            df_start = curve.discount_factor(date.fromordinal(start))
+            df_end = curve.discount_factor(date.fromordinal(end))
+            if leg.is_floating:
+                coupon = leg.notional[i] * (df_start / df_end - 1) + leg.notional[i] * leg.spread / 100 * leg.accrual[i]
+            else:
+                coupon = leg.interest[i]
+            npv += leg_sign * coupon * df_end
+    return npv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=50_000)
+    args = parser.parse_args()
+
+    write_curve("ICP", "zero", "log-linear")
+    curve = get_curve("ICP")
+    rng = random.Random(36)
+
+    start = time.perf_counter()
+    legs = build_book(rng, args.trades)
+    pricing = time.perf_counter() - start
+    signs = np.array([rng.choice([1.0, -1.0]) for _ in legs])
+
+    block_time = time_it(lambda: ValuationBlock(legs, signs), 3)
+    block = ValuationBlock(legs, signs)
+    values = block.sensitivities(curve)
+
+    # Differential check on a sample of trades
+    sample = rng.sample(range(len(legs)), min(500, len(legs)))
+    for i in sample:
+        expected = brute_force_npv(*legs[i], curve, signs[i])
+        if not np.isclose(values["npv"][i], expected, rtol=1e-9, atol=1e-6):
+            raise AssertionError(f"NPV differs on trade {i}: {values['npv'][i]} != {expected}")
+    bucket_sum = values["buckets"].sum(axis=1)
+    scale = np.maximum(np.abs(values["dv01"]), 1.0)
+    worst = float(np.max(np.abs(bucket_sum - values["dv01"]) / scale))
+    assert worst < 1e-2, worst
+    print(f"checks passed: {len(sample)} NPVs match a per-coupon valuation, "
+          f"bucket sums within {worst:.1e} of parallel DV01\n")
+
+    revalue = time_it(lambda: block.npv(curve), 5)
+    full = time_it(lambda: block.sensitivities(curve), 3)
+    n_nodes = len(curve.node_ordinals) - 1
+    print(f"{len(legs)} trades, {len(block)} coupon periods, {len(block.dates)} distinct dates, "
+          f"{n_nodes} curve nodes, {BUMP * 1e4:.0f}bp bumps")
+    print(f"  pricing legs (not timed below)  {pricing:8.2f} s")
+    print(f"  build valuation block           {block_time * 1e3:8.1f} ms")
+    print(f"  one revaluation                 {revalue * 1e3:8.1f} ms")
+    print(f"  base + parallel + {n_nodes} buckets    {full * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
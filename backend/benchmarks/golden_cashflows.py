@@ -0,0 +1,366 @@
+"""Swap calculator golden outputs and property checks.
+
+Locks in the numbers the cashflow engine produces today, so a faster
+implementation of ``add_months``, ``adjust_for_business_day``,
+``calculate_period_dates``, ``calculate_interest`` or ``_generate_cashflows``
+can be validated against them.
+
+Golden file (``benchmarks/golden/cashflows.json``): one line per case with
+the ``calculate_swap_cashflows`` inputs and, per leg, the period count,
+first and last dates, digests of the dates and of the exact amounts, and
+the notional/amortization/interest totals. Cases cover every day count and
+business day convention, all frequencies (Daily and Weekly included),
+both amortization types, leg calendars, month ends, Feb 29 and holiday
+maturities, with floating legs fixed from a synthetic ICP fixings store,
+projected from its curve, or left "TBD" (an index without market data).
+Dates must always match exactly; amounts too, unless ``--rtol`` accepts
+last-bit differences in the totals (e.g. a reordered sum).
+
+Property checks run on random inputs against the same functions:
+
+- ``add_months`` keeps the day, clamped to the month end
+- adjusted dates are business days on the right side of the input, and
+  the modified conventions stay in the month when they can
+- schedules are contiguous, start on the effective date and end on the
+  adjusted termination date
+- ``calculate_interest`` is notional x rate x year fraction
+- amortization adds up to the notional and interest follows the
+  outstanding notional
+- the scalar, lazy and vectorized engines agree
+
+Run from the backend directory:
+
+    python -m benchmarks.golden_cashflows            # check
+    python -m benchmarks.golden_cashflows --update   # rewrite the golden file
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+from itertools import product
+
+# Market data is read from scratch directories
+FIXINGS_DIR = tempfile.mkdtemp()
+os.environ["FIXINGS_DIR"] = FIXINGS_DIR
+
+# Also points CURVE_DIR at a scratch directory before the app reads its settings
+from benchmarks.bench_curves import ASOF, write_curve  # noqa: E402
+
+from app.swap_calculator.calculators import (  # noqa: E402
+    _generate_cashflows,
+    _get_month_end_day,
+    add_months,
+    adjust_for_business_day,
+    calculate_interest,
+    calculate_period_dates,
+    calculate_swap_cashflows,
+    iter_cashflows
+)
+from app.swap_calculator.calendars import get_calendar  # noqa: E402
+from app.swap_calculator.daycount import get_day_counter  # noqa: E402
+from app.swap_calculator.fixings import import_fixings  # noqa: E402
+from benchmarks.bench_cashflow_engine import args_of, check_identical, random_trade  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "cashflows.json")
+
+DAY_COUNTS = ["Actual/360", "Actual/365", "30/360", "30E/360", "Actual/Actual ISDA"]
+BUSINESS_DAY_CONVENTIONS = ["Following", "ModifiedFollowing", "Preceding", "ModifiedPreceding", "Unadjusted"]
+# (months, days): One-off, Monthly, Quarterly, Semi-Annually, Annually
+FREQUENCIES = [(0, 0), (1, 0), (3, 0), (6, 0), (12, 0)]
+CURRENCIES = ["CLP", "USD", "EUR", "USD+CLP", None]
+# Month ends, leap days, year ends and holidays
+EDGE_DATES = [
+    date(2023, 1, 31), date(2024, 2, 29), date(2023, 12, 31), date(2024, 8, 30),
+    date(2025, 3, 31), date(2025, 9, 18), date(2026, 6, 30), date(2027, 12, 31)
+]
+TENOR_MONTHS = [1, 6, 13, 24, 61, 120]
+# ICP has fixings up to ASOF and a curve after it; SOFR has neither
+INDICES = ["ICP", "SOFR"]
+
+
+def write_market_data() -> None:
+    """Deterministic ICP fixings (Jan 2022 to the day before ASOF) and curve."""
+    calendar = get_calendar("CLP")
+    lines = []
+    day = date(2022, 1, 3)
+    while day < ASOF:
+        if calendar.is_business_day(day):
+            k = day.toordinal()
+            lines.append(f"{day.isoformat()} {4.0 + 1.5 * math.sin(k / 90) + (k % 7) / 100:.4f}")
+        day += timedelta(days=1)
+    import_fixings("ICP", "\n".join(lines) + "\n", 360, "CLP")
+    write_curve("ICP", "zero", "log-linear")
+
+
+def golden_cases() -> list:
+    """Every edge date x business day convention x day count, other terms rotating."""
+    cases = []
+    combos = product(EDGE_DATES, BUSINESS_DAY_CONVENTIONS, DAY_COUNTS)
+    for i, (effective, convention, day_count) in enumerate(combos):
+        termination = add_months(effective, TENOR_MONTHS[i % len(TENOR_MONTHS)])
+        if i % 4 == 1:
+            # Maturity off the roll day
+            termination += timedelta(days=11)
+
+        def leg(j: int, is_floating: bool) -> dict:
+            months, days = FREQUENCIES[(i + j) % len(FREQUENCIES)]
+            leg = {
+                "currency": CURRENCIES[(i + 2 * j) % len(CURRENCIES)],
+                "notional": [10_000_000.0, 2_500_000_000.0, 12_345_678.9][(i + j) % 3],
+                "frequency": {"months": months, "days": days},
+                "business_day_convention": convention if j == 0 else BUSINESS_DAY_CONVENTIONS[(i + 1) % 5],
+                "day_count_convention": day_count if j == 0 else DAY_COUNTS[(i + 3) % 5],
+                "amortization_type": "LINEAR" if (i + j) % 3 == 0 else "BULLET"
+            }
+            if is_floating:
+                leg.update(rate=INDICES[i % 2], spread=[0, 0.25][(i // 2) % 2])
+            else:
+                leg["rate"] = round(0.5 + (i * 0.37) % 8.5, 4)
+            return leg
+
+        cases.append({
+            "trade_date": effective,
+            "effective_date": effective,
+            "termination_date": termination,
+            "fixed_leg": leg(0, False),
+            "floating_leg": leg(1, True)
+        })
+
+    # Daily and Weekly legs over short spans, across calendars
+    for i, (effective, days) in enumerate(product(EDGE_DATES, (1, 7))):
+        termination = effective + timedelta(days=45 if days == 1 else 200)
+        base = {
+            "currency": CURRENCIES[i % len(CURRENCIES)],
+            "notional": 1_000_000_000.0,
+            "business_day_convention": BUSINESS_DAY_CONVENTIONS[i % 5],
+            "day_count_convention": DAY_COUNTS[i % 5],
+            "amortization_type": "LINEAR" if i % 2 else "BULLET"
+        }
+        cases.append({
+            "trade_date": effective,
+            "effective_date": effective,
+            "termination_date": termination,
+            "fixed_leg": dict(base, rate=3.5, frequency={"months": 0, "days": days}),
+            "floating_leg": dict(base, rate=INDICES[i % 2], spread=0.1, frequency={"months": 0, "days": days})
+        })
+    return cases
+
+
+def _digest(values) -> str:
+    return hashlib.sha256(repr(values).encode()).hexdigest()[:16]
+
+
+def leg_summary(cashflows) -> dict:
+    numeric = [cf.interest for cf in cashflows if not isinstance(cf.interest, str)]
+    return {
+        "periods": len(cashflows),
+        "first_start": cashflows[0].start_date.isoformat(),
+        "last_end": cashflows[-1].end_date.isoformat(),
+        "dates": _digest([(cf.start_date, cf.end_date) for cf in cashflows]),
+        "amounts": _digest([(cf.notional, cf.amortization, cf.interest) for cf in cashflows]),
+        "notional": math.fsum(cf.notional for cf in cashflows),
+        "amortization": math.fsum(cf.amortization for cf in cashflows),
+        "interest": math.fsum(numeric),
+        "tbd": len(cashflows) - len(numeric)
+    }
+
+
+def _to_json(case: dict) -> dict:
+    return {key: value.isoformat() if isinstance(value, date) else value for key, value in case.items()}
+
+
+def _from_json(case: dict) -> dict:
+    return {key: date.fromisoformat(value) if key.endswith("_date") else value for key, value in case.items()}
+
+
+def golden_record(case: dict) -> dict:
+    fixed, floating = calculate_swap_cashflows(*args_of(case))
+    return {"case": _to_json(case), "fixed": leg_summary(fixed), "floating": leg_summary(floating)}
+
+
+def write_golden(path: str) -> int:
+    records = [golden_record(case) for case in golden_cases()]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return len(records)
+
+
+def compare_leg(expected: dict, actual: dict, rtol: float) -> list:
+    """Fields of one leg that moved."""
+    differences = []
+    for field in ("periods", "first_start", "last_end", "dates", "tbd"):
+        if expected[field] != actual[field]:
+            differences.append(f"{field}: {expected[field]} -> {actual[field]}")
+    if expected["amounts"] != actual["amounts"]:
+        totals = [
+            f"{field}: {expected[field]!r} -> {actual[field]!r}"
+            for field in ("notional", "amortization", "interest")
+            if not math.isclose(expected[field], actual[field], rel_tol=rtol, abs_tol=rtol)
+        ]
+        if rtol == 0 or totals:
+            differences += totals or ["amounts: last-bit differences (totals match)"]
+    return differences
+
+
+def check_golden(path: str, rtol: float) -> int:
+    failures = 0
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    for number, record in enumerate(records, 1):
+        actual = golden_record(_from_json(record["case"]))
+        for leg in ("fixed", "floating"):
+            differences = compare_leg(record[leg], actual[leg], rtol)
+            if differences:
+                failures += 1
+                print(f"case {number} {leg} leg: {record['case']}")
+                for difference in differences:
+                    print(f"    {difference}")
+    if failures:
+        raise AssertionError(f"{failures} legs differ from {path}")
+    return len(records)
+
+
+def check_add_months(rng: random.Random) -> int:
+    for _ in range(5000):
+        start = date(1990, 1, 1) + timedelta(days=rng.randrange(0, 80 * 365))
+        months = rng.randrange(0, 600)
+        end = add_months(start, months)
+        index = start.year * 12 + start.month - 1 + months
+        assert end.year * 12 + end.month - 1 == index, (start, months, end)
+        assert end.day == min(start.day, _get_month_end_day(end.year, end.month)), (start, months, end)
+    return 5000
+
+
+def check_adjustment(rng: random.Random) -> int:
+    checked = 0
+    for currency in CURRENCIES:
+        calendar = get_calendar(currency)
+        for _ in range(2000):
+            # Inside the precomputed range, whose edges have no business day beyond them
+            day = date(2001, 1, 1) + timedelta(days=rng.randrange(0, 60 * 365))
+            following = adjust_for_business_day(day, "Following", currency)
+            preceding = adjust_for_business_day(day, "Preceding", currency)
+            assert calendar.is_business_day(following) and calendar.is_business_day(preceding), day
+            assert preceding <= day <= following, day
+            # Nothing skipped: no business day strictly between the input and the result
+            assert following - day < timedelta(days=12) and day - preceding < timedelta(days=12), day
+            for other in (following - timedelta(days=1), preceding + timedelta(days=1)):
+                assert not (preceding < other < following and calendar.is_business_day(other)), day
+            if calendar.is_business_day(day):
+                assert following == preceding == day
+            modified_following = adjust_for_business_day(day, "ModifiedFollowing", currency)
+            modified_preceding = adjust_for_business_day(day, "ModifiedPreceding", currency)
+            assert modified_following == (following if following.month == day.month else preceding), day
+            assert modified_preceding == (preceding if preceding.month == day.month else following), day
+            assert adjust_for_business_day(day, "Unadjusted", currency) == day
+            checked += 1
+    return checked
+
+
+def check_schedules(rng: random.Random) -> int:
+    checked = 0
+    for _ in range(3000):
+        effective = rng.choice(EDGE_DATES) if rng.random() < 0.3 else date(2023, 1, 1) + timedelta(days=rng.randrange(0, 5 * 365))
+        termination = effective + timedelta(days=rng.randrange(1, 15 * 365))
+        months = rng.choice([0, 1, 3, 6, 12])
+        convention = rng.choice(BUSINESS_DAY_CONVENTIONS)
+        currency = rng.choice(CURRENCIES)
+        calendar = get_calendar(currency)
+        periods = calculate_period_dates(effective, termination, months, convention, currency)
+
+        assert periods[0][0] == effective
+        for (start, end), (next_start, _) in zip(periods, periods[1:]):
+            assert start < end == next_start, (effective, termination, months, convention)
+        if months == 0:
+            assert periods == ((effective, termination),)
+            continue
+        last_end = calendar.adjust(termination, convention)
+        if last_end > effective:
+            assert periods[-1][1] == last_end, (effective, termination, months, convention, periods[-1])
+        if convention != "Unadjusted":
+            assert all(calendar.is_business_day(end) for _, end in periods[:-1])
+        checked += len(periods)
+    return checked
+
+
+def check_interest(rng: random.Random) -> int:
+    for _ in range(5000):
+        start = date(2020, 1, 1) + timedelta(days=rng.randrange(0, 10 * 365))
+        end = start + timedelta(days=rng.randrange(0, 800))
+        notional = rng.choice([1.0, 1_000_000.0, 2_500_000_000.0])
+        rate = rng.uniform(-1.0, 12.0)
+        day_count = rng.choice(DAY_COUNTS)
+        interest = calculate_interest(notional, rate, start, end, day_count)
+        expected = notional * (rate / 100) * get_day_counter(day_count).year_fraction(start, end)
+        assert interest == expected, (notional, rate, start, end, day_count)
+        assert calculate_interest(notional, rate, start, start, day_count) == 0
+    return 5000
+
+
+def check_generated(rng: random.Random) -> int:
+    checked = 0
+    for _ in range(2000):
+        trade = random_trade(rng)
+        leg = trade["fixed_leg"]
+        periods = calculate_period_dates(
+            trade["effective_date"], trade["termination_date"], leg["frequency"]["months"],
+            leg["business_day_convention"], leg["currency"]
+        )
+        notional, rate = leg["notional"], leg["rate"]
+        arguments = dict(
+            periods=periods, notional=notional, rate=rate, day_count_convention=leg["day_count_convention"],
+            amortization_type=leg["amortization_type"]
+        )
+        cashflows = _generate_cashflows(**arguments)
+        lazy = list(iter_cashflows(periods, len(periods), notional, rate, 0.0, leg["day_count_convention"], leg["amortization_type"]))
+        assert repr([cf.to_dict() for cf in cashflows]) == repr([cf.to_dict() for cf in lazy])
+
+        assert len(cashflows) == len(periods)
+        assert math.isclose(math.fsum(cf.amortization for cf in cashflows), notional, rel_tol=1e-12)
+        assert cashflows[0].notional == notional
+        outstanding = notional
+        for i, cf in enumerate(cashflows):
+            assert cf.notional == outstanding
+            if leg["amortization_type"] == "BULLET" and i < len(cashflows) - 1:
+                assert cf.amortization == 0
+            assert cf.interest == calculate_interest(cf.notional, rate, cf.start_date, cf.end_date, leg["day_count_convention"])
+            outstanding -= cf.amortization
+        checked += len(cashflows)
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="rewrite the golden file from the current engine")
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--rtol", type=float, default=0.0, help="relative tolerance on leg totals (default: exact)")
+    args = parser.parse_args()
+
+    write_market_data()
+    if args.update:
+        count = write_golden(args.golden)
+        print(f"wrote {count} golden cases to {args.golden}")
+        return
+
+    count = check_golden(args.golden, args.rtol)
+    print(f"golden check: {count} cases match {os.path.relpath(args.golden)}")
+
+    rng = random.Random(42)
+    print(f"add_months: {check_add_months(rng)} dates")
+    print(f"adjust_for_business_day: {check_adjustment(rng)} dates x conventions")
+    print(f"calculate_period_dates: {check_schedules(rng)} periods")
+    print(f"calculate_interest: {check_interest(rng)} accruals")
+    print(f"_generate_cashflows: {check_generated(rng)} cashflows")
+    trades = [random_trade(rng) for _ in range(500)]
+    check_identical(trades)
+    print(f"engines: scalar and vectorized identical on {len(trades)} trades")
+
+
+if __name__ == "__main__":
+    main()
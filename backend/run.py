@@ -4,18 +4,23 @@ import os
 from app.config import settings
 
 # Command line is as follows:
-# python run.py --entity "Banco ABC1"
+# python run.py --entity "Banco ABC1" [--entities data/entities.json]
+# --entity is the default entity; the entities file lists every entity served (see app/entities.py)
 
 if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Start the FX Snipper application.')
     
-    # Add only the two required arguments
-    parser.add_argument('--entity', required=True)
+    parser.add_argument('--entity', help='entity of requests that do not name one')
+    parser.add_argument('--entities', help='JSON file of the entities served and their settings')
     args = parser.parse_args()
 
     # Store arguments in environment variables for access in the app
-    os.environ['MY_ENTITY'] = args.entity
+    if args.entity:
+        os.environ['MY_ENTITY'] = args.entity
+    if args.entities:
+        # settings was read before the arguments were parsed
+        os.environ['ENTITIES_FILE'] = settings.ENTITIES_FILE = args.entities
 
     uvicorn.run(
         "app.main:app",
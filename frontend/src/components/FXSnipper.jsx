@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Settings from './Settings';
+import { extractTrade } from '../services/api';
 import './FXSnipper.css';
 
 const FXSnipper = () => {
@@ -12,6 +13,8 @@ const FXSnipper = () => {
   const [error, setError] = useState(null);
   const [tradeSentToMurex, setTradeSentToMurex] = useState(false);
   const [isSending, setIsSending] = useState(false);
+  // The extraction in flight, cancelled when a new snip replaces it
+  const currentSnip = useRef(null);
   const [showCurrencyMenu, setShowCurrencyMenu] = useState({
     visible: false,
     currencyNumber: null,
@@ -34,6 +37,10 @@ const FXSnipper = () => {
     };
   }, [pastedContent]);
 
+  useEffect(() => {
+    return () => currentSnip.current?.cancel();
+  }, []);
+
   useEffect(() => {
     console.log('tradeInfo updated:', tradeInfo);
   }, [tradeInfo]);
@@ -56,39 +63,43 @@ const FXSnipper = () => {
   const processSwap = async (content, type) => {
     setIsLoading(true);
     setError(null);
+    currentSnip.current?.cancel();
+    let snip = null;
     
     try {
       const storedPairs = localStorage.getItem('personCompanyPairs');
       const requestBody = {
         input_type: type,
-        [type === 'text' ? 'input_text' : 'input_image']: content,
         ai_provider: localStorage.getItem('aiProvider') || 'Anthropic',
         user_name: localStorage.getItem('myName') || '',
         user_entity: localStorage.getItem('myEntity') || '',
         person_company_pairs: storedPairs ? JSON.parse(storedPairs) : []
       };
-
-      const response = await fetch('http://localhost:5008/api/process-fx', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(requestBody)
-      });
-
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
+      if (type === 'text') {
+        requestBody.input_text = content;
       }
 
-      const data = await response.json();
+      // Images go over the snip channel as raw bytes
+      snip = extractTrade(requestBody, type === 'image' ? content : null);
+      currentSnip.current = snip;
+      const data = await snip.result;
+      if (data === null) {
+        // Replaced by a newer snip
+        return;
+      }
       
       console.log(data);
       setTradeInfo(data);
     } catch (err) {
-      setError('Failed to process trade: ' + err.message);
+      if (currentSnip.current === snip) {
+        setError('Failed to process trade: ' + err.message);
+      }
       console.error('Error processing trade:', err);
     } finally {
-      setIsLoading(false);
+      if (currentSnip.current === snip) {
+        currentSnip.current = null;
+        setIsLoading(false);
+      }
     }
   };
 
@@ -101,18 +112,11 @@ const FXSnipper = () => {
     for (const item of items) {
       if (item.type.indexOf('image') !== -1) {
         const file = item.getAsFile();
-        const reader = new FileReader();
-        
-        reader.onload = async (event) => {
-          const base64Image = event.target.result.split(',')[1];
-          setPastedContent({
-            type: 'image',
-            content: URL.createObjectURL(file)
-          });
-          await processSwap(base64Image, 'image');
-        };
-        
-        reader.readAsDataURL(file);
+        setPastedContent({
+          type: 'image',
+          content: URL.createObjectURL(file)
+        });
+        await processSwap(await file.arrayBuffer(), 'image');
         break;
       } else if (item.type === 'text/plain') {
         item.getAsString(async (text) => {
@@ -352,16 +356,11 @@ const FXSnipper = () => {
                 if (clipboardItem.types.some(type => type.startsWith('image/'))) {
                   const imageType = clipboardItem.types.find(type => type.startsWith('image/'));
                   const blob = await clipboardItem.getType(imageType);
-                  const reader = new FileReader();
-                  reader.onload = async (event) => {
-                    const base64Image = event.target.result.split(',')[1];
-                    setPastedContent({
-                      type: 'image',
-                      content: URL.createObjectURL(blob)
-                    });
-                    await processSwap(base64Image, 'image');
-                  };
-                  reader.readAsDataURL(blob);
+                  setPastedContent({
+                    type: 'image',
+                    content: URL.createObjectURL(blob)
+                  });
+                  await processSwap(await blob.arrayBuffer(), 'image');
                   break;
                 } 
                 // Check for text
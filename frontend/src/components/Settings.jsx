@@ -350,6 +350,7 @@ const Settings = ({ onClose }) => {
                 width: '100%',
               }}
             >
+              <option value="auto">Auto (fastest / cheapest)</option>
               <option value="Anthropic">Anthropic</option>
               <option value="Google">Google</option>
               <option value="OpenAI">Open AI</option>
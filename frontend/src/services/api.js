@@ -0,0 +1,217 @@
+// Backend calls of the desktop client.
+//
+// Snips go over one WebSocket (/api/ws/snips) kept open for the life of the
+// window: no connection set-up per snip, images sent as raw bytes instead of
+// base64, and a replaced snip is cancelled on the server. When the channel
+// cannot be opened, a snip falls back to a plain POST /api/process-fx.
+//
+// Every call names the user's entity (user_entity) to the backend, in the
+// X-Entity header or, for the channel, its entity parameter.
+
+const API_URL = 'http://localhost:5008/api';
+const SNIP_CHANNEL_URL = 'ws://localhost:5008/api/ws/snips';
+
+// Wait before reopening a channel that failed to connect
+const RECONNECT_DELAY_MS = 5000;
+
+const toBase64 = (buffer) => {
+  const bytes = new Uint8Array(buffer);
+  let binary = '';
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+  }
+  return btoa(binary);
+};
+
+const entityHeaders = (entity) => (entity ? { 'X-Entity': entity } : {});
+
+const postSnip = async (body, image) => {
+  const response = await fetch(`${API_URL}/process-fx`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...entityHeaders(body.user_entity),
+    },
+    body: JSON.stringify(image ? { ...body, input_image: toBase64(image) } : body)
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return response.json();
+};
+
+class SnipChannel {
+  constructor(url) {
+    this.url = url;
+    // The connection being opened or open, and the open one
+    this.current = null;
+    this.socket = null;
+    // Entity the connection is made for
+    this.entity = null;
+    this.opening = null;
+    this.failedAt = 0;
+    this.nextId = 0;
+    // id -> { resolve, reject, onStage }
+    this.snips = new Map();
+  }
+
+  connect(entity) {
+    if (this.entity !== entity) {
+      // The entity is fixed per connection: reopen for the new one
+      this.close();
+      this.entity = entity;
+      this.failedAt = 0;
+    }
+    if (this.socket) {
+      return Promise.resolve(this.socket);
+    }
+    if (this.opening) {
+      return this.opening;
+    }
+    if (Date.now() - this.failedAt < RECONNECT_DELAY_MS) {
+      return Promise.reject(new Error('Snip channel unavailable'));
+    }
+    const socket = new WebSocket(entity ? `${this.url}?entity=${encodeURIComponent(entity)}` : this.url);
+    socket.binaryType = 'arraybuffer';
+    this.current = socket;
+    this.opening = new Promise((resolve, reject) => {
+      let opened = false;
+      socket.onopen = () => {
+        opened = true;
+        this.socket = socket;
+        this.opening = null;
+        resolve(socket);
+      };
+      socket.onmessage = (event) => this.dispatch(JSON.parse(event.data));
+      socket.onclose = () => {
+        const current = socket === this.current;
+        if (current) {
+          this.current = null;
+          this.socket = null;
+        }
+        if (!opened) {
+          if (current) {
+            this.opening = null;
+            this.failedAt = Date.now();
+          }
+          reject(new Error('Snip channel unavailable'));
+        } else if (current) {
+          // The server cancels everything on close
+          this.rejectAll();
+        }
+      };
+    });
+    return this.opening;
+  }
+
+  close() {
+    const socket = this.current;
+    this.current = null;
+    this.socket = null;
+    this.opening = null;
+    this.rejectAll();
+    if (socket) {
+      socket.close();
+    }
+  }
+
+  rejectAll() {
+    for (const snip of this.snips.values()) {
+      snip.reject(new Error('Snip channel closed'));
+    }
+    this.snips.clear();
+  }
+
+  dispatch(message) {
+    const snip = this.snips.get(message.id);
+    if (!snip) {
+      if (message.type === 'error') {
+        console.error('Snip channel error:', message.detail);
+      }
+      return;
+    }
+    switch (message.type) {
+      case 'stage':
+        snip.onStage(message.stage, message.progress);
+        break;
+      case 'result':
+        this.snips.delete(message.id);
+        snip.resolve(message.trade);
+        break;
+      case 'cancelled':
+        this.snips.delete(message.id);
+        snip.resolve(null);
+        break;
+      case 'rejected':
+        this.snips.delete(message.id);
+        snip.reject(new Error(`server busy (${message.reason}), retry in ${message.retry_after}s`));
+        break;
+      case 'error':
+        this.snips.delete(message.id);
+        snip.reject(new Error(`HTTP error! status: ${message.status}`));
+        break;
+      default:
+        break;
+    }
+  }
+
+  async extract(id, body, image, onStage, isCancelled) {
+    const socket = await this.connect(body.user_entity || null);
+    if (isCancelled()) {
+      return null;
+    }
+    const result = new Promise((resolve, reject) => {
+      this.snips.set(id, { resolve, reject, onStage });
+    });
+    const header = { type: 'extract', id, ...body };
+    if (image) {
+      // 4-byte big-endian header length, the JSON header, then the raw image
+      const json = new TextEncoder().encode(JSON.stringify(header));
+      const frame = new Uint8Array(4 + json.length + image.byteLength);
+      new DataView(frame.buffer).setUint32(0, json.length, false);
+      frame.set(json, 4);
+      frame.set(new Uint8Array(image), 4 + json.length);
+      socket.send(frame.buffer);
+    } else {
+      socket.send(JSON.stringify(header));
+    }
+    return result;
+  }
+
+  cancel(id) {
+    if (this.snips.has(id) && this.socket) {
+      this.socket.send(JSON.stringify({ type: 'cancel', id }));
+    }
+  }
+
+  newId() {
+    this.nextId += 1;
+    return `snip-${Date.now()}-${this.nextId}`;
+  }
+}
+
+const channel = new SnipChannel(SNIP_CHANNEL_URL);
+
+// Extract a trade from a text snip (body.input_text) or an image snip (image, an
+// ArrayBuffer). Returns { result, cancel }: result resolves to the
+// /api/process-fx response, or null when the snip was cancelled.
+export const extractTrade = (body, image = null, onStage = () => {}) => {
+  const id = channel.newId();
+  let cancelled = false;
+  const result = channel.extract(id, body, image, onStage, () => cancelled).catch((err) => {
+    if (cancelled) {
+      return null;
+    }
+    if (err.message !== 'Snip channel unavailable') {
+      throw err;
+    }
+    return postSnip(body, image);
+  });
+  return {
+    result: result.then((trade) => (cancelled ? null : trade)),
+    cancel: () => {
+      cancelled = true;
+      channel.cancel(id);
+    }
+  };
+};